@@ -0,0 +1,115 @@
+"""audit_log: monthly RANGE partitioning on created_at + composite indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, user_id, user_email, user_role, organization_id, action, entity_type, "
+    "entity_id, changes, description, ip_address, created_at"
+)
+
+
+def _add_months(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def _create_partition(month: date) -> None:
+    name = f"audit_log_{month.year:04d}_{month.month:02d}"
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_log "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE audit_log RENAME TO audit_log_legacy")
+    for idx in ("idx_audit_log_org", "idx_audit_log_entity", "idx_audit_log_user", "idx_audit_log_created"):
+        op.execute(f"DROP INDEX IF EXISTS {idx}")
+
+    op.execute("""
+        CREATE TABLE audit_log (
+            id VARCHAR(36) NOT NULL,
+            user_id VARCHAR(36),
+            user_email VARCHAR(255),
+            user_role VARCHAR(64),
+            organization_id VARCHAR(36),
+            action VARCHAR(50) NOT NULL,
+            entity_type VARCHAR(100) NOT NULL,
+            entity_id VARCHAR(36),
+            changes JSON,
+            description TEXT,
+            ip_address VARCHAR(64),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    # Партиции: от самой старой записи до текущего месяца + MONTHS_AHEAD
+    oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM audit_log_legacy")).scalar()
+    today = datetime.now(timezone.utc).date()
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        _create_partition(month)
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT")
+
+    op.execute(
+        f"INSERT INTO audit_log ({COLUMNS}) "
+        f"SELECT {COLUMNS.replace('created_at', 'COALESCE(created_at, now())')} FROM audit_log_legacy"
+    )
+    op.execute("DROP TABLE audit_log_legacy")
+
+    # Композитные индексы под запросы /audit/events (фильтр + ORDER BY created_at DESC).
+    # Создаются на родительской таблице и наследуются партициями.
+    op.execute("CREATE INDEX ix_audit_log_entity_created ON audit_log (entity_type, entity_id, created_at DESC)")
+    op.execute("CREATE INDEX ix_audit_log_user_created ON audit_log (user_id, created_at DESC)")
+    op.execute("CREATE INDEX ix_audit_log_org_created ON audit_log (organization_id, created_at DESC)")
+    op.execute("CREATE INDEX ix_audit_log_created ON audit_log (created_at DESC)")
+    op.execute("ANALYZE audit_log")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE audit_log RENAME TO audit_log_partitioned")
+    op.create_table(
+        'audit_log',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), nullable=True),
+        sa.Column('user_email', sa.String(255), nullable=True),
+        sa.Column('user_role', sa.String(64), nullable=True),
+        sa.Column('organization_id', sa.String(36), nullable=True),
+        sa.Column('action', sa.String(50), nullable=False),
+        sa.Column('entity_type', sa.String(100), nullable=False),
+        sa.Column('entity_id', sa.String(36), nullable=True),
+        sa.Column('changes', sa.JSON(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('ip_address', sa.String(64), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.execute(f"INSERT INTO audit_log ({COLUMNS}) SELECT {COLUMNS} FROM audit_log_partitioned")
+    op.execute("DROP TABLE audit_log_partitioned CASCADE")
+    op.create_index('idx_audit_log_org', 'audit_log', ['organization_id'])
+    op.create_index('idx_audit_log_entity', 'audit_log', ['entity_type', 'entity_id'])
+    op.create_index('idx_audit_log_user', 'audit_log', ['user_id'])
+    op.create_index('idx_audit_log_created', 'audit_log', ['created_at'])
@@ -0,0 +1,29 @@
+"""seed_versions: version marker for one-shot seed job
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'seed_versions',
+        sa.Column('name', sa.String(64), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(16), nullable=False),
+        sa.Column('duration_ms', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('applied_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('seed_versions')
@@ -0,0 +1,74 @@
+"""rls: tenant isolation policies on app.current_org_id (replaces migrations/001_rls_multi_tenant.sql)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+# '' / не задано — без ограничения (админ, фоновые задачи); подзапрос current_setting
+# вычисляется один раз на оператор (InitPlan), а не на строку.
+ORG = "(SELECT coalesce(current_setting('app.current_org_id', true), ''))"
+UNSCOPED = f"{ORG} = ''"
+OWN_AIRCRAFT = f"aircraft_id IN (SELECT id FROM aircraft WHERE operator_id = {ORG})"
+
+POLICIES = {
+    "organizations": ("id", f"{UNSCOPED} OR id = {ORG}"),
+    "aircraft": ("operator_id", f"{UNSCOPED} OR operator_id = {ORG}"),
+    "cert_applications": ("applicant_org_id", f"{UNSCOPED} OR applicant_org_id = {ORG}"),
+    "users": ("organization_id", f"{UNSCOPED} OR organization_id = {ORG}"),
+    "audit_log": ("organization_id", f"{UNSCOPED} OR organization_id = {ORG}"),
+    "notifications": ("recipient_user_id",
+                      f"{UNSCOPED} OR recipient_user_id IN (SELECT id FROM users WHERE organization_id = {ORG})"),
+}
+AIRCRAFT_SCOPED = (
+    "airworthiness_certificates", "maintenance_tasks", "damage_reports", "defect_reports",
+    "aircraft_modifications", "risk_alerts", "limited_life_components", "landing_gear_components",
+    "aircraft_history", "audits",
+)
+POLICIES.update({t: ("aircraft_id", f"{UNSCOPED} OR {OWN_AIRCRAFT}") for t in AIRCRAFT_SCOPED})
+
+INDEXES = {
+    "aircraft": "operator_id",
+    "cert_applications": "applicant_org_id",
+    "users": "organization_id",
+}
+
+
+def _targets():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table, (column, expr) in POLICIES.items():
+        if table in tables and column in {c["name"] for c in inspector.get_columns(table)}:
+            yield table, expr
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, expr in _targets():
+        op.execute(f"DROP POLICY IF EXISTS {table}_tenant ON {table}")
+        op.execute(f"CREATE POLICY {table}_tenant ON {table} USING ({expr})")
+        op.execute(f"ALTER TABLE {table} ENABLE ROW LEVEL SECURITY")
+        # Приложение подключается владельцем таблиц — без FORCE политики к нему не применяются
+        op.execute(f"ALTER TABLE {table} FORCE ROW LEVEL SECURITY")
+    for table, column in INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_rls ON {table} ({column})")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, _ in _targets():
+        op.execute(f"ALTER TABLE {table} NO FORCE ROW LEVEL SECURITY")
+        op.execute(f"ALTER TABLE {table} DISABLE ROW LEVEL SECURITY")
+        op.execute(f"DROP POLICY IF EXISTS {table}_tenant ON {table}")
+    for table, column in INDEXES.items():
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_rls")
@@ -0,0 +1,38 @@
+"""number_counters: atomic per-day document numbering (app.services.numbering)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    counters = op.create_table(
+        'number_counters',
+        sa.Column('scope', sa.String(32), primary_key=True),
+        sa.Column('period', sa.String(16), primary_key=True),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    # Продолжить нумерацию заявок с максимума за каждый день (KLG-YYYYMMDD-NNNN)
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table('cert_applications'):
+        return
+    latest: dict[str, int] = {}
+    for (number,) in conn.execute(sa.text("SELECT number FROM cert_applications WHERE number LIKE 'KLG-%'")):
+        parts = number.split("-")
+        if len(parts) == 3 and parts[2].isdigit():
+            latest[parts[1]] = max(latest.get(parts[1], 0), int(parts[2]))
+    if latest:
+        op.bulk_insert(counters, [{"scope": "cert_application", "period": p, "value": v} for p, v in latest.items()])
+
+
+def downgrade() -> None:
+    op.drop_table('number_counters')
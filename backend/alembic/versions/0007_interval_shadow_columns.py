@@ -0,0 +1,84 @@
+"""interval shadow columns: typed FH/FC/calendar for maintenance tasks, LLP, landing gear
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+Строки форм ТЗ остаются как есть; теневые колонки заполняются разбором
+(app.services.intervals) — здесь для существующих строк, далее при записи.
+"""
+from types import SimpleNamespace
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+SHADOW = (
+    ('interval_fh', sa.Float()), ('interval_fc', sa.Float()),
+    ('interval_months', sa.Integer()), ('interval_days', sa.Integer()),
+    ('remaining_fh', sa.Float()), ('remaining_fc', sa.Float()), ('calendar_due', sa.Date()),
+)
+INDEXED = ('remaining_fh', 'remaining_fc', 'calendar_due')
+
+# таблица → (доп. колонки, исходные поля, функция разбора)
+TABLES = {
+    'maintenance_tasks': (
+        (),
+        ('interval', 'threshold', 'time_remaining', 'last_accomplished', 'next_due'),
+        'sync_maintenance_task',
+    ),
+    'limited_life_components': (
+        (('tsn_fh', sa.Float()), ('csn_fc', sa.Float()), ('tah_inst_fh', sa.Float()), ('tac_inst_fc', sa.Float())),
+        ('interval', 'to_go', 'tsn', 'csn', 'tah_inst', 'tac_inst', 'install_date', 'expected_date'),
+        'sync_limited_life',
+    ),
+    'landing_gear_components': (
+        (('tsn_fh', sa.Float()), ('csn_fc', sa.Float()), ('tsr_value', sa.Float())),
+        ('interval', 'to_go', 'tsn', 'csn', 'tsr', 'dim', 'install_date', 'due_at', 'expected'),
+        'sync_landing_gear',
+    ),
+}
+
+
+def _backfill(conn, table: str, sources: tuple, targets: list[str], sync_name: str) -> None:
+    from app.services import intervals
+
+    sync = getattr(intervals, sync_name)
+    rows = conn.execute(sa.text(f"SELECT id, {', '.join(sources)} FROM {table}")).mappings().all()
+    updates = []
+    for row in rows:
+        obj = SimpleNamespace(**row)
+        sync(obj)
+        updates.append({"_id": row["id"], **{t: getattr(obj, t) for t in targets}})
+    if updates:
+        stmt = sa.text(f"UPDATE {table} SET {', '.join(f'{t} = :{t}' for t in targets)} WHERE id = :_id")
+        conn.execute(stmt, updates)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    for table, (extra, sources, sync_name) in TABLES.items():
+        if not inspector.has_table(table):
+            continue
+        columns = SHADOW + extra
+        for name, type_ in columns:
+            op.add_column(table, sa.Column(name, type_, nullable=True))
+        for name in INDEXED:
+            op.create_index(f'ix_{table}_{name}', table, [name])
+        _backfill(conn, table, sources, [name for name, _ in columns], sync_name)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, (extra, _, _) in TABLES.items():
+        if not inspector.has_table(table):
+            continue
+        for name in INDEXED:
+            op.drop_index(f'ix_{table}_{name}', table_name=table)
+        for name, _ in SHADOW + extra:
+            op.drop_column(table, name)
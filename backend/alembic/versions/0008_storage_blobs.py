@@ -0,0 +1,42 @@
+"""storage_blobs: content-addressed attachment storage with reference counting
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+Существующие вложения остаются на диске по storage_path (sha256 = NULL) и
+отдаются как раньше; новые — объекты хранилища по sha256 (app.services.storage).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'storage_blobs',
+        sa.Column('sha256', sa.String(64), primary_key=True),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('content_type', sa.String(128), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_storage_blobs_ref_count', 'storage_blobs', ['ref_count'])
+    if sa.inspect(op.get_bind()).has_table('attachments'):
+        op.add_column('attachments', sa.Column('sha256', sa.String(64), nullable=True))
+        op.add_column('attachments', sa.Column('size', sa.BigInteger(), nullable=True))
+        op.create_index('ix_attachments_sha256', 'attachments', ['sha256'])
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('attachments'):
+        op.drop_index('ix_attachments_sha256', table_name='attachments')
+        op.drop_column('attachments', 'size')
+        op.drop_column('attachments', 'sha256')
+    op.drop_index('ix_storage_blobs_ref_count', table_name='storage_blobs')
+    op.drop_table('storage_blobs')
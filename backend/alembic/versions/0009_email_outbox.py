@@ -0,0 +1,38 @@
+"""email_outbox: durable retry queue for SMTP delivery
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+
+Письма, не доставленные из-за временного отказа SMTP (4xx, обрыв соединения),
+и остаток очереди при остановке процесса — app.services.email_service.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('to_addr', sa.String(320), nullable=False),
+        sa.Column('subject', sa.String(998), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('html', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_email_outbox_next_attempt_at', 'email_outbox', ['next_attempt_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_next_attempt_at', table_name='email_outbox')
+    op.drop_table('email_outbox')
@@ -0,0 +1,58 @@
+"""notification_preferences: persisted per-user notification settings
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+
+Раньше настройки жили в памяти процесса по user.sub (которого у UserInfo нет) —
+не сохранялись и не учитывались при рассылке. Теперь — строка на пользователя
+(users.external_subject — sub токена, тот же ключ, что notifications.recipient_user_id),
+нет строки — значения по умолчанию; app.services.notifications.dispatch
+читает их одним запросом вместе с получателями.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+FLAGS = {
+    'ad_mandatory': True,
+    'ad_recommended': False,
+    'defect_critical': True,
+    'defect_major': True,
+    'defect_minor': False,
+    'wo_aog': True,
+    'wo_closed': True,
+    'life_limit_critical': True,
+    'personnel_expiry': True,
+    'channels_email': True,
+    'channels_push': False,
+    'channels_ws': True,
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_preferences',
+        sa.Column('user_id', sa.String(255), primary_key=True),
+        *[sa.Column(name, sa.Boolean(), nullable=False, server_default=sa.true() if default else sa.false())
+          for name, default in FLAGS.items()],
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table('users'):
+        # Рассылка по организации / роли — фильтр users до соединения с настройками
+        existing = {ix['name'] for ix in inspector.get_indexes('users')}
+        if 'ix_users_organization_id_role' not in existing:
+            op.create_index('ix_users_organization_id_role', 'users', ['organization_id', 'role'])
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('users'):
+        op.drop_index('ix_users_organization_id_role', table_name='users')
+    op.drop_table('notification_preferences')
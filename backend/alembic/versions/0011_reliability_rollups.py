@@ -0,0 +1,44 @@
+"""reliability rollups: daily defects per ATA chapter and daily utilization per aircraft
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+
+Программа надёжности (EASA Part-M.A.301, AMC M.A.708(b)(8)): показатели дефектов
+на 1000 лётных часов по главам ATA / типам / бортам считаются по суточным
+свёрткам, а не по сырым отчётам — app.services.reliability.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reliability_defect_daily',
+        sa.Column('aircraft_id', sa.String(36), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('ata_chapter', sa.String(2), primary_key=True),
+        sa.Column('defects', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('ix_reliability_defect_daily_day', 'reliability_defect_daily', ['day'])
+    op.create_table(
+        'reliability_utilization_daily',
+        sa.Column('aircraft_id', sa.String(36), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('flight_hours', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('cycles', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('source', sa.String(16), nullable=False, server_default='history'),
+    )
+    op.create_index('ix_reliability_utilization_daily_day', 'reliability_utilization_daily', ['day'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reliability_utilization_daily_day', table_name='reliability_utilization_daily')
+    op.drop_table('reliability_utilization_daily')
+    op.drop_index('ix_reliability_defect_daily_day', table_name='reliability_defect_daily')
+    op.drop_table('reliability_defect_daily')
@@ -0,0 +1,47 @@
+"""flight legs: utilization ingestion, aircraft FH/FC totals
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+
+Налёт поступает из журнала полётов пачками рейсов (app.services.utilization):
+flight_legs — принятые рейсы (повторная доставка не учитывается), aircraft.total_time /
+total_cycles — наработка ВС, от которой считаются приращения LLP и шасси.
+На части установок колонки наработки ВС уже добавлены вручную — добавляются только недостающие.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+AIRCRAFT_COLUMNS = (('total_time', sa.Float()), ('total_cycles', sa.Integer()))
+
+
+def upgrade() -> None:
+    op.create_table(
+        'flight_legs',
+        sa.Column('aircraft_id', sa.String(36), primary_key=True),
+        sa.Column('leg_key', sa.String(96), primary_key=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('flight_no', sa.String(16), nullable=True),
+        sa.Column('takeoff', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('landing', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('flight_hours', sa.Float(), nullable=False),
+        sa.Column('cycles', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('ingested_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_flight_legs_day', 'flight_legs', ['day'])
+    existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('aircraft')}
+    for name, type_ in AIRCRAFT_COLUMNS:
+        if name not in existing:
+            op.add_column('aircraft', sa.Column(name, type_, nullable=True))
+
+
+def downgrade() -> None:
+    for name, _ in AIRCRAFT_COLUMNS:
+        op.drop_column('aircraft', name)
+    op.drop_index('ix_flight_legs_day', table_name='flight_legs')
+    op.drop_table('flight_legs')
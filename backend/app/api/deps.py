@@ -7,6 +7,7 @@ from __future__ import annotations
 from fastapi import Depends, HTTPException, Header
 
 from app.db.session import get_db
+from app.db.tenant import bind_user
 from app.core.config import settings
 from app.services.security import decode_token, token_to_user, AuthError, TokenUser
 
@@ -50,8 +51,9 @@ async def get_current_user(authorization: str = Header(default="")) -> UserInfo:
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = token_to_user(claims)
-    return UserInfo(token_user=user)
+    user = UserInfo(token_user=token_to_user(claims))
+    bind_user(user)  # app.current_org_id для RLS в транзакциях этого запроса
+    return user
 
 
 def require_roles(*allowed_roles: str):
@@ -13,6 +13,8 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session, Query
 
 from app.models.audit_log import AuditLog
+from app.models.common import uuid4_str
+from app.services.audit_writer import audit_writer, hold, is_buffered
 
 logger = logging.getLogger(__name__)
 
@@ -20,24 +22,81 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 # Audit
 # ---------------------------------------------------------------------------
+def _audit_row(
+    user, action: str, entity_type: str, entity_id: str | None,
+    changes: dict | None, description: str | None, ip: str | None,
+) -> dict:
+    return {
+        "id": uuid4_str(),
+        "user_id": user.id,
+        "user_email": getattr(user, "email", None),
+        "user_role": getattr(user, "role", None),
+        "organization_id": getattr(user, "organization_id", None),
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "changes": changes,
+        "description": description,
+        "ip_address": ip,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
 def audit(
     db: Session, user, action: str, entity_type: str,
     entity_id: str | None = None, changes: dict | None = None,
     description: str | None = None, ip: str | None = None,
 ):
-    """Write an audit trail entry. Call BEFORE db.commit()."""
-    db.add(AuditLog(
-        user_id=user.id,
-        user_email=getattr(user, "email", None),
-        user_role=getattr(user, "role", None),
-        organization_id=getattr(user, "organization_id", None),
-        action=action,
-        entity_type=entity_type,
-        entity_id=entity_id,
-        changes=changes,
-        description=description,
-        ip_address=ip,
-    ))
+    """Write an audit trail entry. Call BEFORE db.commit().
+
+    AUDIT_MODE=transactional: row is added to the request's session.
+    AUDIT_MODE=buffered: row is held on the session and handed to the
+    background writer after a successful commit (dropped on rollback).
+    """
+    row = _audit_row(user, action, entity_type, entity_id, changes, description, ip)
+    if is_buffered():
+        hold(db, row)
+    else:
+        db.add(AuditLog(**row))
+
+
+def audit_many(
+    db: Session, user, action: str, entity_type: str, entity_ids: list[str],
+    description: str | None = None, changes: dict | None = None, ip: str | None = None,
+) -> int:
+    """Одна запись аудита на сущность — одним multi-row INSERT (пакетные операции)."""
+    rows = [_audit_row(user, action, entity_type, eid, changes, description, ip) for eid in entity_ids]
+    if not rows:
+        return 0
+    if is_buffered():
+        for row in rows:
+            hold(db, row)
+    else:
+        from sqlalchemy import insert
+        db.execute(insert(AuditLog.__table__), rows)
+    return len(rows)
+
+
+def audit_detached(
+    user, action: str, entity_type: str,
+    entity_id: str | None = None, changes: dict | None = None,
+    description: str | None = None, ip: str | None = None,
+):
+    """Audit entry for routes without a request DB session (e.g. inbox on SQLite)."""
+    row = _audit_row(user, action, entity_type, entity_id, changes, description, ip)
+    if is_buffered():
+        audit_writer.submit([row])
+        return
+    from app.db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        db.add(AuditLog(**row))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Audit write failed for %s/%s: %s", entity_type, entity_id, e)
+    finally:
+        db.close()
 
 
 def diff_changes(obj, data: dict) -> dict:
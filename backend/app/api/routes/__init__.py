@@ -1,23 +1,79 @@
-from .health import router as health_router
-from .stats import router as stats_router
-from .organizations import router as organizations_router
-from .aircraft import router as aircraft_router
-from .cert_applications import router as cert_applications_router
-from .attachments import router as attachments_router
-from .notifications import router as notifications_router
-from .ingest import router as ingest_router
-from .airworthiness import router as airworthiness_router
-from .modifications import router as modifications_router
-from .users import router as users_router
-from .legal import router as legal_router
-from .risk_alerts import router as risk_alerts_router
-from .checklists import router as checklists_router
-from .checklist_audits import router as checklist_audits_router
-from .inbox import router as inbox_router
-from .tasks import router as tasks_router
-from .audit import router as audit_router
-from .ai_assistant import router as ai_router
-from .document_templates import router as document_templates_router
+"""
+Реестр роутеров API v1.
+
+Модули роутеров импортируются лениво: `from app.api.routes import health_router`
+загружает только health, а main.py подключает роутеры через iter_routers(),
+пропуская модули отключённых функций (ENABLE_AI / ENABLE_FGIS / ENABLE_LEGAL) —
+их код и зависимости (httpx, XML, legal_agents) в процесс не загружаются.
+Профиль импорта: python -m benchmarks.import_profile.
+"""
+from importlib import import_module
+
+# (модуль, флаг функции в settings или None, требуется авторизация) — порядок подключения
+ROUTER_MODULES = (
+    ("fgis_revs", "ENABLE_FGIS", True),
+    ("notification_prefs", None, True),
+    ("import_export", None, True),
+    ("global_search", None, True),
+    ("work_orders", None, True),
+    ("defects", None, True),
+    ("airworthiness_core", None, True),
+    ("personnel_plg", None, True),
+    ("regulator", None, True),
+    ("backup", None, True),
+    ("batch", None, True),
+    ("export", None, True),
+    ("metrics", None, False),
+    ("profiling", None, True),
+    ("health", None, False),
+    ("stats", None, True),
+    ("organizations", None, True),
+    ("aircraft", None, True),
+    ("cert_applications", None, True),
+    ("attachments", None, True),
+    ("uploads", None, True),
+    ("notifications", None, True),
+    ("ingest", None, True),
+    ("airworthiness", None, True),
+    ("modifications", None, True),
+    ("users", None, True),
+    ("legal", "ENABLE_LEGAL", True),
+    ("risk_alerts", None, True),
+    ("maintenance_planning", None, True),
+    ("reliability", None, True),
+    ("utilization", None, True),
+    ("checklists", None, True),
+    ("checklist_audits", None, True),
+    ("inbox", None, True),
+    ("tasks", None, True),
+    ("audit", None, True),
+    ("ai_assistant", "ENABLE_AI", True),
+    ("document_templates", None, True),
+    ("ws_notifications", None, False),
+)
+
+_ALIASES = {"ai_router": "ai_assistant"}
+
+
+def load_router(module: str):
+    return import_module(f"{__name__}.{module}").router
+
+
+def iter_routers(settings):
+    """(router, требуется_авторизация) для включённых функций, в порядке ROUTER_MODULES."""
+    for module, flag, auth in ROUTER_MODULES:
+        if flag and not getattr(settings, flag, True):
+            continue
+        yield module, load_router(module), auth
+
+
+def __getattr__(name: str):
+    if name.endswith("_router"):
+        module = _ALIASES.get(name, name[: -len("_router")])
+        if any(m == module for m, _, _ in ROUTER_MODULES):
+            return load_router(module)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "health_router",
@@ -26,6 +82,7 @@ __all__ = [
     "aircraft_router",
     "cert_applications_router",
     "attachments_router",
+    "uploads_router",
     "notifications_router",
     "ingest_router",
     "airworthiness_router",
@@ -40,5 +97,6 @@ __all__ = [
     "audit_router",
     "ai_router",
     "document_templates_router",
+    "ROUTER_MODULES",
+    "iter_routers",
 ]
-
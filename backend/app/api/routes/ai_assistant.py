@@ -5,7 +5,6 @@ from pydantic import BaseModel
 from app.api.deps import get_current_user
 from app.core.config import settings
 from app.db.session import SessionLocal
-import httpx
 
 router = APIRouter(prefix="/ai", tags=["AI Assistant"])
 
@@ -62,6 +61,8 @@ async def ai_chat(req: ChatRequest, user=Depends(get_current_user)):
         "messages": [{"role": "user", "content": req.message}],
     }
 
+    import httpx
+
     async with httpx.AsyncClient(timeout=30.0) as client:
         if proxy_url and proxy_secret:
             resp = await client.post(
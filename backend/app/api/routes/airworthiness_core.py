@@ -19,7 +19,6 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_current_user
 from app.api.helpers import audit
-import asyncio
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/airworthiness-core", tags=["airworthiness-core"])
@@ -33,6 +32,35 @@ _life_limits: dict = {}
 _maint_programs: dict = {}
 _components: dict = {}
 
+_forecaster = None
+_applicability = None
+
+
+def applicability_engine():
+    """Применимость AD/SB к бортам (матрица «парк × директивы», app.services.applicability)."""
+    global _applicability
+    if _applicability is None:
+        from app.services.applicability import ApplicabilityEngine
+        _applicability = ApplicabilityEngine(_directives, _bulletins, _components, _life_limits)
+    return _applicability
+
+
+def store_directive(d: dict) -> dict:
+    """Записать ДЛГ в реестр и в матрицу применимости (все записи _directives — только через неё)."""
+    _directives[d["id"]] = d
+    if _applicability is not None:  # не построен — проиндексирует реестр целиком при первом обращении
+        _applicability.upsert_directive("ad", d)
+    return d
+
+
+def life_limit_forecaster():
+    """Прогноз ресурсов (NumPy импортируется при первом обращении, не при старте)."""
+    global _forecaster
+    if _forecaster is None:
+        from app.services.life_limit_forecast import LifeLimitForecaster
+        _forecaster = LifeLimitForecaster(_life_limits)
+    return _forecaster
+
 
 def seed_airworthiness_core_demo(aircraft_id: Optional[str] = None) -> None:
     """Заполнить демо-данными ДЛГ и Life Limits при первом запуске (если пусто)."""
@@ -49,7 +77,7 @@ def seed_airworthiness_core_demo(aircraft_id: Optional[str] = None) -> None:
     ]
     for d in demo_ads:
         did = str(uuid.uuid4())
-        _directives[did] = {"id": did, "created_at": now, "issuing_authority": "FATA", "ata_chapter": None, "repetitive": False, "description": "", "affected_parts": [], **d}
+        store_directive({"id": did, "created_at": now, "issuing_authority": "FATA", "ata_chapter": None, "repetitive": False, "description": "", "affected_parts": [], **d})
     logger.info("seed_airworthiness_core: %s directives", len(demo_ads))
 
     if not _life_limits and aircraft_id:
@@ -63,6 +91,10 @@ def seed_airworthiness_core_demo(aircraft_id: Optional[str] = None) -> None:
             lid = str(uuid.uuid4())
             _life_limits[lid] = {"id": lid, "created_at": now, "calendar_limit_months": None, "install_date": None, "last_overhaul_date": None, "notes": None, **ll}
         logger.info("seed_airworthiness_core: %s life limits", len(demo_ll))
+        if _forecaster is not None:
+            _forecaster.rebuild()
+    if _applicability is not None:
+        _applicability.rebuild()
 
 
 # ===================================================================
@@ -105,18 +137,31 @@ def list_directives(
 def create_directive(data: DirectiveCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     """Зарегистрировать директиву ЛГ."""
     did = str(uuid.uuid4())
-    d = {"id": did, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
-    _directives[did] = d
-    if data.compliance_type == "mandatory":
-        try:
-            from app.services.ws_manager import notify_new_ad
-            asyncio.create_task(notify_new_ad(data.number, data.aircraft_types, data.compliance_type))
-        except Exception:
-            pass
+    d = store_directive({"id": did, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()})
     audit(db, user, "create", "directive", entity_id=did, description=f"ДЛГ: {data.number}")
     db.commit()
+    if data.compliance_type == "mandatory":
+        _notify_mandatory_ad(db, data)
     return d
 
+
+def _notify_mandatory_ad(db: Session, data: DirectiveCreate) -> None:
+    """Обязательная ДЛГ: пользователям эксплуатантов ВС этих типов — in-app, email, WS по их настройкам."""
+    from app.services.email_service import render_critical
+    from app.services.notifications import Audience, aircraft_type_ids, dispatch
+    try:
+        type_ids = aircraft_type_ids(db, data.aircraft_types)
+        if not type_ids:
+            return
+        subject, body = render_critical("ad_new_mandatory", ad_number=data.number,
+                                        aircraft_types=", ".join(data.aircraft_types),
+                                        deadline=data.compliance_deadline or "—")
+        dispatch(db, "ad_new_mandatory", Audience(aircraft_type_ids=tuple(type_ids)), subject, body,
+                 payload={"ad_number": data.number, "aircraft_types": data.aircraft_types, "severity": "critical"})
+    except Exception as e:
+        db.rollback()
+        logger.warning("Mandatory AD %s notification failed: %s", data.number, e)
+
 @router.get("/directives/{directive_id}")
 def get_directive(directive_id: str, user=Depends(get_current_user)):
     d = _directives.get(directive_id)
@@ -132,6 +177,7 @@ def comply_directive(directive_id: str, compliance_date: str = "", notes: str =
     d["status"] = "complied"
     d["compliance_date"] = compliance_date or datetime.now(timezone.utc).isoformat()
     d["compliance_notes"] = notes
+    applicability_engine().set_status("ad", d)
     audit(db, user, "comply", "directive", entity_id=directive_id, description=f"ДЛГ выполнена: {d['number']}")
     db.commit()
     return d
@@ -167,6 +213,7 @@ def create_bulletin(data: BulletinCreate, db: Session = Depends(get_db), user=De
     bid = str(uuid.uuid4())
     b = {"id": bid, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
     _bulletins[bid] = b
+    applicability_engine().upsert_directive("sb", b)
     audit(db, user, "create", "bulletin", entity_id=bid, description=f"SB: {data.number}")
     db.commit()
     return b
@@ -179,6 +226,7 @@ def incorporate_bulletin(bulletin_id: str, date: str = "", notes: str = "",
     b["status"] = "incorporated"
     b["incorporation_date"] = date or datetime.now(timezone.utc).isoformat()
     b["incorporation_notes"] = notes
+    applicability_engine().set_status("sb", b)
     audit(db, user, "incorporate", "bulletin", entity_id=bulletin_id, description=f"SB выполнен: {b['number']}")
     db.commit()
     return b
@@ -205,33 +253,27 @@ class LifeLimitCreate(BaseModel):
 
 @router.get("/life-limits")
 def list_life_limits(aircraft_id: Optional[str] = None, user=Depends(get_current_user)):
-    items = list(_life_limits.values())
-    if aircraft_id: items = [ll for ll in items if ll.get("aircraft_id") == aircraft_id]
-    # Calculate remaining
-    for ll in items:
-        remaining = {}
-        if ll.get("flight_hours_limit"):
-            remaining["hours"] = round(ll["flight_hours_limit"] - ll.get("current_hours", 0), 1)
-        if ll.get("cycles_limit"):
-            remaining["cycles"] = ll["cycles_limit"] - ll.get("current_cycles", 0)
-        if ll.get("calendar_limit_months") and ll.get("install_date"):
-            from dateutil.relativedelta import relativedelta
-            try:
-                install = datetime.fromisoformat(ll["install_date"])
-                expiry = install + timedelta(days=ll["calendar_limit_months"] * 30)
-                remaining["days"] = (expiry - datetime.now(timezone.utc).replace(tzinfo=None)).days
-            except:
-                pass
-        ll["remaining"] = remaining
-        ll["critical"] = any(v <= 0 for v in remaining.values() if isinstance(v, (int, float)))
+    """Остаток ресурса и прогнозная дата исчерпания (по налёту ВС)."""
+    items = life_limit_forecaster().for_aircraft(aircraft_id) if aircraft_id else life_limit_forecaster().all_items()
     return {"total": len(items), "items": items,
             "legal_basis": "ФАП-148 п.4.2; EASA Part-M.A.302; ICAO Annex 8 Part II 4.2"}
 
+@router.get("/life-limits/expiring")
+def list_expiring_life_limits(days: int = Query(30, ge=0, le=3650), aircraft_id: Optional[str] = None,
+                              user=Depends(get_current_user)):
+    """Ресурсы, которые исчерпаются в ближайшие N дней (включая уже исчерпанные)."""
+    items = life_limit_forecaster().expiring_within(days, aircraft_id=aircraft_id)
+    return {"total": len(items), "days": days, "items": items,
+            "legal_basis": "ФАП-148 п.4.2; EASA Part-M.A.302"}
+
 @router.post("/life-limits")
 def create_life_limit(data: LifeLimitCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     lid = str(uuid.uuid4())
     ll = {"id": lid, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
     _life_limits[lid] = ll
+    # Первое наблюдение наработки: первый update-usage даст налёт от момента создания
+    life_limit_forecaster().record_usage(ll)
+    applicability_engine().upsert_part(ll)
     audit(db, user, "create", "life_limit", entity_id=lid, description=f"Ресурс: {data.component_name} P/N {data.part_number}")
     db.commit()
     return ll
@@ -243,6 +285,7 @@ def update_usage(limit_id: str, hours: Optional[float] = None, cycles: Optional[
     if not ll: raise HTTPException(404)
     if hours is not None: ll["current_hours"] = hours
     if cycles is not None: ll["current_cycles"] = cycles
+    life_limit_forecaster().record_usage(ll)
     audit(db, user, "update_usage", "life_limit", entity_id=limit_id)
     db.commit()
     return ll
@@ -322,6 +365,7 @@ def create_component(data: ComponentCreate, db: Session = Depends(get_db), user=
     cid = str(uuid.uuid4())
     c = {"id": cid, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
     _components[cid] = c
+    applicability_engine().upsert_part(c)
     audit(db, user, "create", "component", entity_id=cid, description=f"Компонент: {data.name} S/N {data.serial_number}")
     db.commit()
     return c
@@ -342,6 +386,7 @@ def transfer_component(component_id: str, new_aircraft_id: str = "", position: s
     c["aircraft_id"] = new_aircraft_id or None
     c["install_position"] = position
     c["install_date"] = datetime.now(timezone.utc).isoformat()
+    applicability_engine().upsert_part(c)
     audit(db, user, "transfer", "component", entity_id=component_id,
           description=f"Компонент {c['name']} S/N {c['serial_number']}: {old_aircraft} → {new_aircraft_id or 'склад'}")
     db.commit()
@@ -351,24 +396,67 @@ def transfer_component(component_id: str, new_aircraft_id: str = "", position: s
 # ===================================================================
 #  6. СВОДНЫЙ ОТЧЁТ ПО ЛГ КОНКРЕТНОГО ВС
 # ===================================================================
+def resolve_aircraft(db: Session, aircraft_reg: str) -> str:
+    """Регистрация → id борта (парк сверяется с БД); 404, если борта нет."""
+    engine = applicability_engine()
+    engine.sync_fleet(db)
+    aircraft_id = engine.aircraft_id_for(aircraft_reg)
+    if not aircraft_id:
+        raise HTTPException(404, f"Aircraft {aircraft_reg} not found")
+    return aircraft_id
+
+
 @router.get("/aircraft-status/{aircraft_reg}")
-def aircraft_airworthiness_status(aircraft_reg: str, user=Depends(get_current_user)):
-    """Полный статус лётной годности конкретного ВС."""
-    open_ads = [d for d in _directives.values() if d["status"] == "open"]
-    open_sbs = [b for b in _bulletins.values() if b["status"] == "open"]
-    critical_ll = [ll for ll in _life_limits.values()
-                   if ll.get("remaining", {}) and any(v <= 0 for v in ll["remaining"].values() if isinstance(v, (int, float)))]
-    components = [c for c in _components.values() if c.get("aircraft_id")]
+def aircraft_airworthiness_status(aircraft_reg: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Полный статус лётной годности конкретного ВС (только применимые к нему AD/SB)."""
+    aircraft_id = resolve_aircraft(db, aircraft_reg)
+    counts = applicability_engine().summary(aircraft_id)
+    critical_ll = life_limit_forecaster().critical_count(aircraft_id=aircraft_id)
+    components = [c for c in _components.values() if c.get("aircraft_id") == aircraft_id]
 
     return {
         "aircraft": aircraft_reg,
+        "aircraft_id": aircraft_id,
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "summary": {
-            "open_directives": len(open_ads),
-            "open_bulletins": len(open_sbs),
-            "critical_life_limits": len(critical_ll),
+            **counts,
+            "critical_life_limits": critical_ll,
             "installed_components": len(components),
         },
-        "airworthy": len(open_ads) == 0 and len(critical_ll) == 0,
+        "airworthy": counts["open_directives"] == 0 and critical_ll == 0,
         "legal_basis": "ВК РФ ст. 36, 37, 37.2; ФАП-148; EASA Part-M.A.901; ICAO Annex 8",
     }
+
+
+# ===================================================================
+#  7. ПРИМЕНИМОСТЬ AD / SB (парк × директивы)
+# ===================================================================
+@router.get("/applicability/aircraft/{aircraft_reg}")
+def aircraft_applicability(aircraft_reg: str, outstanding_only: bool = False,
+                           db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """AD и SB, применимые к борту (по типу и установленным P/N)."""
+    aircraft_id = resolve_aircraft(db, aircraft_reg)
+    items = applicability_engine().applicable(aircraft_id, outstanding_only=outstanding_only)
+    return {"aircraft": aircraft_reg, "aircraft_id": aircraft_id, "total": len(items), "items": items,
+            "legal_basis": "ФАП-148 п.4.3, 4.5; EASA Part-M.A.301"}
+
+
+@router.get("/applicability/directives/{directive_id}")
+def directive_applicability(directive_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Борта, к которым применима AD или SB."""
+    kind = "ad" if directive_id in _directives else "sb" if directive_id in _bulletins else None
+    if not kind:
+        raise HTTPException(404, "Directive not found")
+    engine = applicability_engine()
+    engine.sync_fleet(db)
+    aircraft = [{"aircraft_id": a, "registration": engine.registration_of(a)} for a in engine.aircraft_for(kind, directive_id)]
+    return {"directive_id": directive_id, "kind": kind, "total": len(aircraft), "aircraft": aircraft}
+
+
+@router.get("/applicability/matrix")
+def applicability_matrix(outstanding_only: bool = True, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Разреженная матрица «борт → id применимых директив» (по умолчанию только невыполненные)."""
+    engine = applicability_engine()
+    engine.sync_fleet(db)
+    matrix = engine.matrix(outstanding_only=outstanding_only)
+    return {"total_aircraft": len(matrix), "items": matrix}
@@ -1,7 +1,8 @@
+from datetime import datetime, timezone
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import os
 
@@ -11,20 +12,29 @@ from app.api.deps import get_db
 from app.core.config import settings
 from app.models import Attachment
 from app.schemas.attachment import AttachmentOut
-from app.services.storage import save_upload
+from app.services import resumable
+from app.services.file_responses import ranged_response
+from app.services.storage import SpooledUpload, get_backend, release, spool_upload, store
 
 router = APIRouter(tags=["attachments"])
 
 
-@router.post("/attachments/{owner_kind}/{owner_id}", response_model=AttachmentOut)
-async def upload_attachment(owner_kind: str, owner_id: str, file: UploadFile = File(...), db: Session = Depends(get_db), user=Depends(get_current_user)):
-    storage_path, filename = await save_upload(owner_kind, owner_id, file)
+async def _create_attachment(db: Session, user, owner_kind: str, owner_id: str, filename: str | None,
+                             content_type: str | None, upload: SpooledUpload) -> Attachment:
+    filename = os.path.basename(filename or "file")
+    try:
+        # Загрузка в бэкенд (S3 — сеть) вне event loop
+        await run_in_threadpool(store, db, upload, content_type)
+    finally:
+        upload.discard()
     att = Attachment(
         owner_kind=owner_kind,
         owner_id=owner_id,
         filename=filename,
-        content_type=file.content_type,
-        storage_path=storage_path,
+        content_type=content_type,
+        storage_path=upload.sha256,
+        sha256=upload.sha256,
+        size=upload.size,
         uploaded_by_user_id=user.id,
     )
     db.add(att)
@@ -34,6 +44,32 @@ async def upload_attachment(owner_kind: str, owner_id: str, file: UploadFile = F
     return att
 
 
+@router.post("/attachments/{owner_kind}/{owner_id}", response_model=AttachmentOut)
+async def upload_attachment(owner_kind: str, owner_id: str, file: UploadFile = File(...), db: Session = Depends(get_db), user=Depends(get_current_user)):
+    upload = await spool_upload(file)
+    return await _create_attachment(db, user, owner_kind, owner_id, file.filename, file.content_type, upload)
+
+
+@router.post("/attachments/{owner_kind}/{owner_id}/uploads/{upload_id}", response_model=AttachmentOut)
+async def attach_resumable_upload(
+    owner_kind: str,
+    owner_id: str,
+    upload_id: str,
+    sha256: str | None = Body(None, embed=True, description="Контрольная сумма всего файла (hex)"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Оформить завершённую загрузку tus (/uploads) вложением; имя и тип — из Upload-Metadata."""
+    try:
+        session = resumable.get(upload_id, user.id)
+        upload = await run_in_threadpool(resumable.finish, session, sha256)
+    except resumable.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    meta = session.metadata
+    return await _create_attachment(db, user, owner_kind, owner_id, meta.get("filename"),
+                                    meta.get("filetype") or None, upload)
+
+
 @router.get("/attachments/{attachment_id}", response_model=AttachmentOut)
 def get_attachment_meta(attachment_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
     att = db.query(Attachment).filter(Attachment.id == attachment_id).first()
@@ -45,19 +81,41 @@ def get_attachment_meta(attachment_id: str, db: Session = Depends(get_db), user=
 
 
 @router.get("/attachments/{attachment_id}/download")
-def download_attachment(attachment_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def download_attachment(attachment_id: str, request: Request, db: Session = Depends(get_db), user=Depends(get_current_user)):
     att = db.query(Attachment).filter(Attachment.id == attachment_id).first()
     if not att:
         raise HTTPException(status_code=404, detail="Not found")
     if not is_authority(user) and getattr(att, "uploaded_by_user_id", None) != user.id:
         raise HTTPException(status_code=403, detail="Нет доступа к этому вложению")
+    if att.sha256:
+        return _object_response(att, request)
+    # Записи до перехода на хранилище по содержимому — путь на диске
     storage_root = Path(settings.INBOX_DATA_DIR).resolve()
     real_path = Path(att.storage_path).resolve()
     if not str(real_path).startswith(str(storage_root)):
         raise HTTPException(status_code=403, detail="Доступ к файлу запрещён")
     if not real_path.exists():
         raise HTTPException(status_code=404, detail="Файл не найден на диске")
-    return FileResponse(path=str(real_path), filename=att.filename, media_type=att.content_type)
+    stat = real_path.stat()
+    return ranged_response(
+        request, size=stat.st_size, etag=f"{int(stat.st_mtime):x}-{stat.st_size:x}", filename=att.filename,
+        media_type=att.content_type, last_modified=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+        path=real_path,
+    )
+
+
+def _object_response(att: Attachment, request: Request):
+    """Отдача объекта хранилища с Range / ETag (= sha256): локальный — с диска, S3 — поток."""
+    backend = get_backend()
+    path = backend.local_path(att.sha256)
+    if path is not None and not path.exists():
+        raise HTTPException(status_code=404, detail="Файл не найден в хранилище")
+    size = path.stat().st_size if path is not None else att.size
+    return ranged_response(
+        request, size=size, etag=att.sha256, filename=att.filename, media_type=att.content_type,
+        last_modified=att.created_at, path=path,
+        read_range=lambda offset, length: backend.iter_chunks(att.sha256, offset=offset, length=length),
+    )
 
 
 @router.delete("/attachments/{attachment_id}", status_code=204)
@@ -68,8 +126,10 @@ def delete_attachment(attachment_id: str, db: Session = Depends(get_db), user=De
     if not is_authority(user) and getattr(att, "uploaded_by_user_id", None) != user.id:
         raise HTTPException(status_code=403, detail="Нет доступа к этому вложению")
 
-    # Удаляем файл с диска
-    if os.path.exists(att.storage_path):
+    if att.sha256:
+        # Объект общий для одинаковых вложений — снимаем ссылку, удалит сборка мусора
+        release(db, att.sha256)
+    elif os.path.exists(att.storage_path):
         try:
             os.remove(att.storage_path)
         except Exception as e:
@@ -1,6 +1,12 @@
-"""Audit events API — now uses real AuditLog table."""
+"""Audit events API — now uses real AuditLog table.
+
+audit_log is partitioned by month on created_at: pass date_from/date_to so the
+planner prunes partitions; composite indexes cover filter + ORDER BY created_at DESC.
+"""
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, Query as OrmQuery
 
 from app.api.deps import get_current_user, require_roles
 from app.api.helpers import is_authority, paginate_query
@@ -10,18 +16,38 @@ from app.models.audit_log import AuditLog
 router = APIRouter(tags=["audit"])
 
 
+def audit_events_query(
+    db: Session, user=None, *,
+    entity_type: str | None = None, entity_id: str | None = None,
+    user_id: str | None = None, action: str | None = None,
+    organization_id: str | None = None,
+    date_from: datetime | None = None, date_to: datetime | None = None,
+) -> OrmQuery:
+    """Query shape shared by /audit/events and benchmarks/bench_audit_list.py."""
+    q = db.query(AuditLog)
+    if entity_type: q = q.filter(AuditLog.entity_type == entity_type)
+    if entity_id: q = q.filter(AuditLog.entity_id == entity_id)
+    if user_id: q = q.filter(AuditLog.user_id == user_id)
+    if action: q = q.filter(AuditLog.action == action)
+    if organization_id: q = q.filter(AuditLog.organization_id == organization_id)
+    if user is not None and not is_authority(user): q = q.filter(AuditLog.organization_id == user.organization_id)
+    if date_from: q = q.filter(AuditLog.created_at >= date_from)
+    if date_to: q = q.filter(AuditLog.created_at < date_to)
+    return q.order_by(AuditLog.created_at.desc())
+
+
 @router.get("/audit/events", dependencies=[Depends(require_roles("admin", "authority_inspector"))])
 def list_audit_events(
     entity_type: str | None = Query(None), entity_id: str | None = Query(None),
     user_id: str | None = Query(None), action: str | None = Query(None),
+    organization_id: str | None = Query(None),
+    date_from: datetime | None = Query(None, description="created_at >= date_from (partition pruning)"),
+    date_to: datetime | None = Query(None, description="created_at < date_to"),
     page: int = Query(1, ge=1), per_page: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db), user=Depends(get_current_user),
 ):
-    q = db.query(AuditLog)
-    if entity_type: q = q.filter(AuditLog.entity_type == entity_type)
-    if entity_id: q = q.filter(AuditLog.entity_id == entity_id)
-    if user_id: q = q.filter(AuditLog.user_id == user_id)
-    if action: q = q.filter(AuditLog.action == action)
-    if not is_authority(user): q = q.filter(AuditLog.organization_id == user.organization_id)
-    q = q.order_by(AuditLog.created_at.desc())
+    q = audit_events_query(
+        db, user, entity_type=entity_type, entity_id=entity_id, user_id=user_id,
+        action=action, organization_id=organization_id, date_from=date_from, date_to=date_to,
+    )
     return paginate_query(q, page, per_page)
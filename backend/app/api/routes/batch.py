@@ -1,21 +1,29 @@
 """
 Batch operations API — bulk create/update/delete.
 Reduces N+1 API calls for bulk operations.
+Set-based UPDATE/DELETE … RETURNING пачками (app.services.bulk_ops): без лимита
+в 100 id, фильтр организации, аудит на каждую сущность (M.A.305), итог по каждому id.
 """
-from typing import List
-from fastapi import APIRouter, Depends
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, require_roles, get_db
-from app.api.helpers import audit
+from app.api.helpers import audit, audit_many
+from app.core.config import settings
 from app.models import Aircraft, Organization, RiskAlert
+from app.services import bulk_ops
+from app.services.bulk_ops import BulkEntity
 
 router = APIRouter(prefix="/batch", tags=["batch"])
 
 
 class BatchDeleteRequest(BaseModel):
-    entity_type: str  # aircraft, organizations, risk_alerts
+    entity_type: str  # aircraft, organizations, risk_alerts, work_orders, defects
     ids: List[str]
 
 
@@ -25,12 +33,56 @@ class BatchStatusUpdate(BaseModel):
     status: str
 
 
+class RiskAlertResolveRequest(BaseModel):
+    ids: Optional[List[str]] = None  # пусто — все нерешённые по фильтрам
+    aircraft_id: Optional[str] = None
+    severity: Optional[str] = None
+    entity_type: Optional[str] = None
+
+
+def _own_aircraft(model, org_id):
+    return model.aircraft_id.in_(select(Aircraft.id).where(Aircraft.operator_id == org_id))
+
+
 ENTITY_MAP = {
-    "aircraft": Aircraft,
-    "organizations": Organization,
-    "risk_alerts": RiskAlert,
+    "aircraft": BulkEntity(Aircraft, "aircraft", tenant=lambda m, org: m.operator_id == org),
+    "organizations": BulkEntity(Organization, "organization", tenant=lambda m, org: m.id == org),
+    "risk_alerts": BulkEntity(RiskAlert, "risk_alert", tenant=_own_aircraft),
 }
 
+# Наряды и дефекты хранятся в памяти роутов — статусы из их схем
+MEMORY_STATUSES = {
+    "work_orders": frozenset({"draft", "in_progress", "closed", "cancelled"}),
+    "defects": frozenset({"open", "deferred", "rectified", "closed"}),
+}
+# Допустимые пакетные переходы (текущий статус → новые)
+MEMORY_TRANSITIONS = {
+    "work_orders": {"draft": frozenset({"in_progress", "cancelled"}), "in_progress": frozenset({"cancelled"})},
+    "defects": {"open": frozenset({"rectified"}), "deferred": frozenset({"rectified"}),
+                "rectified": frozenset({"closed"})},
+}
+# Статусы, требующие данных перехода, — только через маршрут сущности
+MEMORY_DEDICATED = {
+    "work_orders": {"closed": "PUT /work-orders/{id}/close (CRS, ФАП-145 п.145.A.50)"},
+    "defects": {"deferred": "PUT /defects/{id}/defer (ссылка MEL)"},
+}
+# Отметки времени перехода — как в маршрутах сущностей
+MEMORY_STAMPS = {"in_progress": "opened_at", "rectified": "rectified_at"}
+MEMORY_AUDIT_TYPE = {"work_orders": "work_order", "defects": "defect"}
+
+
+def _memory_store(entity_type: str) -> dict:
+    if entity_type == "work_orders":
+        from app.api.routes.work_orders import _work_orders
+        return _work_orders
+    from app.api.routes.defects import _defects
+    return _defects
+
+
+def _check_size(ids: list[str]) -> None:
+    if len(ids) > settings.BULK_MAX_IDS:
+        raise HTTPException(400, f"Слишком много id: {len(ids)} > {settings.BULK_MAX_IDS}")
+
 
 @router.post(
     "/delete",
@@ -38,21 +90,22 @@ ENTITY_MAP = {
 )
 def batch_delete(req: BatchDeleteRequest, db: Session = Depends(get_db), user=Depends(get_current_user)):
     """Delete multiple entities in one request."""
-    model = ENTITY_MAP.get(req.entity_type)
-    if not model:
-        return {"error": f"Unknown entity: {req.entity_type}", "deleted": 0}
-
-    deleted = 0
-    for eid in req.ids[:100]:  # max 100 per batch
-        obj = db.query(model).filter(model.id == eid).first()
-        if obj:
-            db.delete(obj)
-            deleted += 1
-
+    _check_size(req.ids)
+    if req.entity_type in MEMORY_STATUSES:
+        result = bulk_ops.bulk_delete_memory(_memory_store(req.entity_type), req.ids)
+        audit_type = MEMORY_AUDIT_TYPE[req.entity_type]
+    else:
+        entity = ENTITY_MAP.get(req.entity_type)
+        if not entity:
+            return {"error": f"Unknown entity: {req.entity_type}", "deleted": 0}
+        result = bulk_ops.bulk_delete(db, entity, req.ids, user)
+        audit_type = entity.audit_type
+
+    audit_many(db, user, "delete", audit_type, result.affected, description="Batch delete")
     audit(db, user, "batch_delete", req.entity_type,
-          description=f"Batch deleted {deleted}/{len(req.ids)} {req.entity_type}")
+          description=f"Batch deleted {len(result.affected)}/{result.requested} {req.entity_type}")
     db.commit()
-    return {"deleted": deleted, "total_requested": len(req.ids)}
+    return result.as_dict("deleted")
 
 
 @router.post(
@@ -61,18 +114,64 @@ def batch_delete(req: BatchDeleteRequest, db: Session = Depends(get_db), user=De
 )
 def batch_status_update(req: BatchStatusUpdate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     """Update status of multiple entities."""
-    model = ENTITY_MAP.get(req.entity_type)
-    if not model or not hasattr(model, "status"):
-        return {"error": f"Unknown entity or no status field: {req.entity_type}", "updated": 0}
+    _check_size(req.ids)
+    now = datetime.now(timezone.utc).isoformat()
+    if req.entity_type in MEMORY_STATUSES:
+        if req.status not in MEMORY_STATUSES[req.entity_type]:
+            raise HTTPException(400, f"Недопустимый статус {req.status}: {sorted(MEMORY_STATUSES[req.entity_type])}")
+        dedicated = MEMORY_DEDICATED[req.entity_type].get(req.status)
+        if dedicated:
+            raise HTTPException(400, f"Статус {req.status} пакетно не устанавливается: {dedicated}")
+        stamp = MEMORY_STAMPS.get(req.status)
+
+        def apply(obj: dict) -> None:
+            obj["status_changed_at"] = now
+            if stamp:
+                obj[stamp] = now
+
+        result = bulk_ops.bulk_update_memory(_memory_store(req.entity_type), req.ids, req.status,
+                                             MEMORY_TRANSITIONS[req.entity_type], apply)
+        audit_type = MEMORY_AUDIT_TYPE[req.entity_type]
+    else:
+        entity = ENTITY_MAP.get(req.entity_type)
+        if not entity or not hasattr(entity.model, "status"):
+            return {"error": f"Unknown entity or no status field: {req.entity_type}", "updated": 0}
+        result = bulk_ops.bulk_update(db, entity, req.ids, {"status": req.status}, user)
+        audit_type = entity.audit_type
+
+    audit_many(db, user, "update", audit_type, result.affected,
+               changes={"status": {"new": req.status}}, description="Batch status update")
+    audit(db, user, "batch_update", req.entity_type,
+          description=f"Batch status→{req.status} for {len(result.affected)}/{result.requested} {req.entity_type}")
+    db.commit()
+    return {**result.as_dict("updated"), "status": req.status}
 
-    updated = 0
-    for eid in req.ids[:100]:
-        obj = db.query(model).filter(model.id == eid).first()
-        if obj:
-            obj.status = req.status
-            updated += 1
 
-    audit(db, user, "batch_update", req.entity_type,
-          description=f"Batch status→{req.status} for {updated}/{len(req.ids)} {req.entity_type}")
+@router.post(
+    "/risk-alerts/resolve",
+    dependencies=[Depends(require_roles("admin", "authority_inspector", "operator_manager"))],
+)
+def batch_resolve_risk_alerts(req: RiskAlertResolveRequest, db: Session = Depends(get_db),
+                              user=Depends(get_current_user)):
+    """Закрыть риски: по списку id или все нерешённые по фильтрам — один UPDATE … RETURNING."""
+    entity = ENTITY_MAP["risk_alerts"]
+    values = {"is_resolved": True, "resolved_at": datetime.now(timezone.utc)}
+    if req.ids:
+        _check_size(req.ids)
+        result = bulk_ops.bulk_update(db, entity, req.ids, values, user,
+                                      extra_where=[RiskAlert.is_resolved.is_(False)])
+        resolved, body = result.affected, result.as_dict("resolved")
+    else:
+        conditions = [RiskAlert.is_resolved.is_(False)]
+        if req.aircraft_id:
+            conditions.append(RiskAlert.aircraft_id == req.aircraft_id)
+        if req.severity:
+            conditions.append(RiskAlert.severity == req.severity)
+        if req.entity_type:
+            conditions.append(RiskAlert.entity_type == req.entity_type)
+        resolved = bulk_ops.resolve_where(db, entity, user, conditions, values)
+        body = {"resolved": len(resolved)}
+
+    audit_many(db, user, "update", "risk_alert", resolved, description="Resolved (batch)")
     db.commit()
-    return {"updated": updated, "status": req.status}
+    return body
@@ -14,6 +14,7 @@ from app.models import CertApplication, ApplicationRemark, CertApplicationStatus
 from app.models.organization import Organization
 from app.schemas.cert_application import CertApplicationCreate, CertApplicationOut, RemarkCreate, RemarkOut
 from app.services.notifications import notify
+from app.services.numbering import next_number
 from app.services.ws_manager import ws_manager, make_notification
 
 router = APIRouter(tags=["cert_applications"])
@@ -22,16 +23,8 @@ REMARK_DEADLINE_DAYS = 30
 
 
 def _next_number(db: Session) -> str:
-    """Генерация номера с защитой от race condition через SELECT FOR UPDATE."""
-    today = datetime.now(timezone.utc).strftime("%Y%m%d")
-    prefix = f"KLG-{today}-"
-    rows = (
-        db.query(CertApplication)
-        .filter(CertApplication.number.like(prefix + "%"))
-        .with_for_update()
-        .all()
-    )
-    return prefix + str(len(rows) + 1).zfill(4)
+    """Номер заявки KLG-YYYYMMDD-NNNN — атомарный счётчик на сутки (app.services.numbering)."""
+    return next_number(db, "cert_application")
 
 
 def _serialize(app, db: Session) -> CertApplicationOut:
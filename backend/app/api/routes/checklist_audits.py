@@ -1,4 +1,5 @@
-"""Checklist Audits API — refactored: pagination, audit trail, tenant filtering."""
+"""Checklist Audits API — refactored: pagination, audit trail, tenant filtering.
+Шаблон и его пункты берутся из кэша шаблонов (app.services.checklist_cache)."""
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
@@ -6,8 +7,9 @@ from sqlalchemy.orm import Session
 from app.api.deps import get_current_user, require_roles
 from app.api.helpers import audit as audit_log, filter_by_org, paginate_query, check_aircraft_access
 from app.api.deps import get_db
-from app.models import Audit, AuditResponse, Finding, ChecklistTemplate, ChecklistItem, Aircraft
-from app.schemas.audit import AuditCreate, AuditOut, AuditResponseCreate, AuditResponseOut, FindingOut
+from app.models import Audit, AuditResponse, Finding, Aircraft
+from app.schemas.audit import AuditCreate, AuditOut, AuditResponseCreate, AuditResponseOut, ChecklistTemplateOut, FindingOut
+from app.services.checklist_cache import template_cache
 from app.services.ws_manager import ws_manager, make_notification
 
 router = APIRouter(tags=["checklist-audits"])
@@ -32,7 +34,7 @@ def list_audits(
 @router.post("/audits", response_model=AuditOut, status_code=201,
              dependencies=[Depends(require_roles("admin", "authority_inspector", "operator_manager"))])
 def create_audit(payload: AuditCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    if not db.query(ChecklistTemplate).filter(ChecklistTemplate.id == payload.template_id).first():
+    if not template_cache.get(db, payload.template_id):
         raise HTTPException(404, "Template not found")
     check_aircraft_access(db, user, payload.aircraft_id)
     a = Audit(template_id=payload.template_id, aircraft_id=payload.aircraft_id,
@@ -50,13 +52,24 @@ def get_audit(audit_id: str, db: Session = Depends(get_db), user=Depends(get_cur
     return AuditOut.model_validate(a)
 
 
+@router.get("/audits/{audit_id}/checklist", response_model=ChecklistTemplateOut)
+def get_audit_checklist(audit_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Шаблон аудита с пунктами (экран проведения аудита) — из кэша."""
+    a = db.query(Audit).filter(Audit.id == audit_id).first()
+    if not a: raise HTTPException(404, "Not found")
+    t = template_cache.get(db, a.template_id)
+    if not t: raise HTTPException(404, "Template not found")
+    return t
+
+
 @router.post("/audits/{audit_id}/responses", response_model=AuditResponseOut,
              dependencies=[Depends(require_roles("admin", "authority_inspector", "operator_manager"))])
 def submit_response(audit_id: str, payload: AuditResponseCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     a = db.query(Audit).filter(Audit.id == audit_id).first()
     if not a: raise HTTPException(404, "Audit not found")
     if a.status == "completed": raise HTTPException(400, "Audit completed")
-    item = db.query(ChecklistItem).filter(ChecklistItem.id == payload.item_id).first()
+    template = template_cache.get(db, a.template_id)
+    item = next((i for i in (template.items if template else []) if i.id == payload.item_id), None)
     if not item: raise HTTPException(404, "Checklist item not found")
 
     existing = db.query(AuditResponse).filter(AuditResponse.audit_id == audit_id, AuditResponse.item_id == payload.item_id).first()
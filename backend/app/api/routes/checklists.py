@@ -1,4 +1,6 @@
-"""Checklists API — refactored: pagination, audit, DRY."""
+"""Checklists API — refactored: pagination, audit, DRY.
+Шаблоны с пунктами — из версионного кэша (app.services.checklist_cache): пункты
+грузятся одним selectinload-запросом на промахи, изменения повышают version."""
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Query
 from sqlalchemy.orm import Session
 import csv, io
@@ -7,6 +9,7 @@ from app.api.deps import get_current_user, require_roles
 from app.api.helpers import audit, paginate_query
 from app.api.deps import get_db
 from app.models import ChecklistTemplate, ChecklistItem
+from app.services.checklist_cache import bump_version, template_cache
 from app.schemas.audit import (
     ChecklistTemplateCreate,
     ChecklistTemplateOut,
@@ -19,11 +22,18 @@ from app.schemas.audit import (
 router = APIRouter(tags=["checklists"])
 
 
+MAX_BULK_TEMPLATES = 100
+
+
 def _template_with_items(template, db) -> ChecklistTemplateOut:
-    items = db.query(ChecklistItem).filter(ChecklistItem.template_id == template.id).order_by(ChecklistItem.sort_order).all()
-    out = ChecklistTemplateOut.model_validate(template)
-    out.items = [ChecklistItemOut.model_validate(i) for i in items]
-    return out
+    return template_cache.hydrate(db, [template])[0]
+
+
+def _get_template_or_404(db: Session, template_id: str) -> ChecklistTemplate:
+    t = db.query(ChecklistTemplate).filter(ChecklistTemplate.id == template_id).first()
+    if not t:
+        raise HTTPException(404, "Template not found")
+    return t
 
 
 @router.get("/checklists/templates")
@@ -35,10 +45,21 @@ def list_templates(
     if domain: q = q.filter(ChecklistTemplate.domain == domain)
     q = q.order_by(ChecklistTemplate.name, ChecklistTemplate.version.desc())
     result = paginate_query(q, page, per_page)
-    result["items"] = [_template_with_items(t, db) for t in result["items"]]
+    result["items"] = template_cache.hydrate(db, result["items"])
     return result
 
 
+@router.get("/checklists/templates/bulk", response_model=list[ChecklistTemplateOut])
+def get_templates_bulk(
+    ids: list[str] = Query(..., description="ID шаблонов (повторяющийся параметр ids)"),
+    db: Session = Depends(get_db), user=Depends(get_current_user),
+):
+    """Несколько шаблонов с пунктами за один запрос (порядок — как в ids; неизвестные пропускаются)."""
+    if len(ids) > MAX_BULK_TEMPLATES:
+        raise HTTPException(400, f"Не более {MAX_BULK_TEMPLATES} шаблонов за запрос")
+    return list(template_cache.get_many(db, ids).values())
+
+
 @router.post("/checklists/templates", response_model=ChecklistTemplateOut, status_code=201,
              dependencies=[Depends(require_roles("admin", "authority_inspector"))])
 def create_template(payload: ChecklistTemplateCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
@@ -77,9 +98,9 @@ def generate_checklist(source: str, name: str, items: list[ChecklistItemCreate]
 
 @router.get("/checklists/templates/{template_id}", response_model=ChecklistTemplateOut)
 def get_template(template_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    t = db.query(ChecklistTemplate).filter(ChecklistTemplate.id == template_id).first()
-    if not t: raise HTTPException(404, "Not found")
-    return _template_with_items(t, db)
+    out = template_cache.get(db, template_id)
+    if not out: raise HTTPException(404, "Not found")
+    return out
 
 
 @router.patch("/checklists/templates/{template_id}", response_model=ChecklistTemplateOut,
@@ -90,15 +111,14 @@ def update_template(
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    t = db.query(ChecklistTemplate).filter(ChecklistTemplate.id == template_id).first()
-    if not t:
-        raise HTTPException(404, "Template not found")
+    t = _get_template_or_404(db, template_id)
     if payload.name is not None:
         t.name = payload.name
     if payload.description is not None:
         t.description = payload.description
     if payload.domain is not None:
         t.domain = payload.domain
+    bump_version(t)
     audit(db, user, "update", "checklist_template", entity_id=template_id)
     db.commit()
     db.refresh(t)
@@ -122,6 +142,7 @@ def update_item(
         item.text = payload.text
     if payload.sort_order is not None:
         item.sort_order = payload.sort_order
+    bump_version(_get_template_or_404(db, item.template_id))
     audit(db, user, "update", "checklist_item", entity_id=item_id)
     db.commit()
     db.refresh(item)
@@ -136,9 +157,7 @@ def add_item(
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
-    t = db.query(ChecklistTemplate).filter(ChecklistTemplate.id == template_id).first()
-    if not t:
-        raise HTTPException(404, "Template not found")
+    t = _get_template_or_404(db, template_id)
     max_order = db.query(ChecklistItem).filter(ChecklistItem.template_id == template_id).count()
     item = ChecklistItem(
         template_id=template_id,
@@ -148,6 +167,7 @@ def add_item(
         sort_order=payload.sort_order if payload.sort_order else (max_order + 1),
     )
     db.add(item)
+    bump_version(t)
     audit(db, user, "create", "checklist_item")
     db.commit()
     db.refresh(item)
@@ -165,6 +185,7 @@ def delete_item(
     if not item:
         raise HTTPException(404, "Item not found")
     audit(db, user, "delete", "checklist_item", entity_id=item_id)
+    bump_version(_get_template_or_404(db, item.template_id))
     db.delete(item)
     db.commit()
 
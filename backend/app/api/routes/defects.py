@@ -10,6 +10,7 @@ from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from app.api.deps import get_db, get_current_user
 from app.api.helpers import audit
+from app.services.numbering import next_number
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -48,7 +49,7 @@ def list_defects(status: Optional[str] = None, aircraft_reg: Optional[str] = Non
 @router.post("/")
 def create_defect(data: DefectCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     did = str(uuid.uuid4())
-    d = {"id": did, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
+    d = {"id": did, "number": next_number(db, "defect"), **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
     _defects[did] = d
     if data.severity == "critical":
         try:
@@ -56,7 +57,7 @@ def create_defect(data: DefectCreate, db: Session = Depends(get_db), user=Depend
             asyncio.create_task(notify_critical_defect(data.aircraft_reg, data.description, did))
         except Exception:
             pass
-    audit(db, user, "create", "defect", entity_id=did, description=f"Дефект: {data.aircraft_reg} — {data.description[:60]}")
+    audit(db, user, "create", "defect", entity_id=did, description=f"Дефект {d['number']}: {data.aircraft_reg} — {data.description[:60]}")
     db.commit()
     return d
 
@@ -44,6 +44,14 @@ def health_check(db: Session = Depends(get_db)):
     except Exception:
         checks["risk_scanner"] = {"status": "not_configured"}
 
+    # Audit log writer
+    from app.services.audit_writer import audit_writer
+    checks["audit_log"] = audit_writer.stats()
+
+    # Холодный старт процесса (мс) и фазы lifespan
+    from app.core import startup
+    checks["startup"] = startup.report()
+
     # Version info
     checks["version"] = "2.2.0"
     checks["environment"] = "production" if not __import__("os").getenv("ENABLE_DEV_AUTH", "true").lower() == "true" else "development"
@@ -119,21 +119,22 @@ async def import_xlsx(
                 item["current_cycles"] = int(item.get("current_cycles", 0) or 0)
                 _components[item["id"]] = item
             elif entity_type == "specialists":
-                from app.api.routes.personnel_plg import _specialists
+                from app.api.routes.personnel_plg import _specialists, compliance_engine
                 if not item.get("full_name") or not item.get("personnel_number"):
                     errors.append(f"Row {i}: missing full_name or personnel_number")
                     continue
                 item.setdefault("status", "active")
                 item.setdefault("specializations", [])
                 _specialists[item["id"]] = item
+                compliance_engine.on_specialist(item)
             elif entity_type == "directives":
-                from app.api.routes.airworthiness_core import _directives
+                from app.api.routes.airworthiness_core import store_directive
                 if not item.get("number") or not item.get("title"):
                     errors.append(f"Row {i}: missing number or title")
                     continue
                 item.setdefault("status", "open")
                 item.setdefault("aircraft_types", [])
-                _directives[item["id"]] = item
+                store_directive(item)
             else:
                 errors.append(f"Import not supported for: {entity_type}")
                 break
@@ -4,187 +4,196 @@ COD-004: Inbox API — интеграция из Express inbox-server в FastAPI
 """
 
 import os
-import hashlib
+import shutil
 import uuid
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
-import sqlite3
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, UploadFile, File
 
 from app.core.config import settings
 from app.api.deps import get_current_user
-from app.api.helpers import audit as audit_log
-from app.api.deps import get_db as get_pg_db
+from app.api.helpers import audit_detached
+from app.services import resumable
+from app.services.file_responses import ranged_response
+from app.services.inbox_extraction import extraction_pipeline, load_prompts
+from app.services.inbox_store import inbox_store
+from app.services.storage import SpooledUpload, UploadTooLarge, spool_file
 
 router = APIRouter(prefix="/inbox", tags=["inbox"])
 
 DATA_DIR = Path(settings.INBOX_DATA_DIR).resolve()
 INBOX_DIR = DATA_DIR / "ai-inbox"
-DB_PATH = DATA_DIR / "db" / "inbox.db"
 
 
-def _ensure_dirs():
-    INBOX_DIR.mkdir(parents=True, exist_ok=True)
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-
-def _get_db():
-    _ensure_dirs()
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS file_registry (
-            id TEXT PRIMARY KEY,
-            original_name TEXT NOT NULL,
-            stored_path TEXT NOT NULL,
-            mime TEXT NOT NULL,
-            size INTEGER NOT NULL,
-            sha256 TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            status TEXT DEFAULT 'pending'
-        );
-        CREATE TABLE IF NOT EXISTS ai_extraction_run (
-            id TEXT PRIMARY KEY,
-            file_id TEXT NOT NULL,
-            started_at TEXT NOT NULL,
-            completed_at TEXT,
-            status TEXT DEFAULT 'running',
-            error TEXT,
-            FOREIGN KEY (file_id) REFERENCES file_registry(id)
-        );
-        CREATE TABLE IF NOT EXISTS ai_extraction_field (
-            id TEXT PRIMARY KEY,
-            run_id TEXT NOT NULL,
-            field_code TEXT NOT NULL,
-            value TEXT,
-            confidence REAL,
-            provenance TEXT,
-            FOREIGN KEY (run_id) REFERENCES ai_extraction_run(id)
-        );
-        CREATE TABLE IF NOT EXISTS tmc_request_draft (
-            id TEXT PRIMARY KEY,
-            file_id TEXT NOT NULL,
-            extraction_run_id TEXT,
-            status TEXT DEFAULT 'draft',
-            data TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            updated_at TEXT,
-            FOREIGN KEY (file_id) REFERENCES file_registry(id),
-            FOREIGN KEY (extraction_run_id) REFERENCES ai_extraction_run(id)
-        );
-    """)
-    conn.commit()
-    return conn
+def _file_path(stored_path: str) -> Path:
+    return DATA_DIR / stored_path if not str(stored_path).startswith("/") else Path(stored_path)
 
 
 @router.get("/files")
-def list_files(user=Depends(get_current_user)):
-    """Список файлов в inbox"""
-    conn = _get_db()
-    try:
-        rows = conn.execute(
-            "SELECT id, original_name, stored_path, mime, size, sha256, created_at, status FROM file_registry ORDER BY created_at DESC"
-        ).fetchall()
-        return [dict(r) for r in rows]
-    finally:
-        conn.close()
+def list_files(
+    status: Optional[str] = Query(None, description="pending | processed | …"),
+    date_from: Optional[str] = Query(None, description="created_at >= (ISO 8601)"),
+    date_to: Optional[str] = Query(None, description="created_at < (ISO 8601)"),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=500),
+    user=Depends(get_current_user),
+):
+    """Список файлов в inbox — постранично, новые сверху"""
+    items, total = inbox_store().list_files(status, date_from, date_to, limit=per_page, offset=(page - 1) * per_page)
+    pages = (total + per_page - 1) // per_page if total > 0 else 0
+    return {"items": items, "total": total, "page": page, "per_page": per_page, "pages": pages}
+
+
+ALLOWED_MIME = (
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/msword",
+)
+
+
+def _register_file(user, original_name: str | None, mime: str | None, upload: SpooledUpload) -> dict:
+    """Перенести принятый файл в inbox и зарегистрировать в file_registry.
+
+    Документ с тем же sha256 уже в реестре — второй раз не сохраняется,
+    возвращается существующая запись (duplicate: true).
+    """
+    INBOX_DIR.mkdir(parents=True, exist_ok=True)
+    file_id = str(uuid.uuid4())
+    original_name = original_name or "file"
+    safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in original_name)
+    stored_name = f"{file_id}_{safe_name}"
+    shutil.move(str(upload.path), INBOX_DIR / stored_name)
+
+    record, created = inbox_store().register_file({
+        "id": file_id,
+        "original_name": original_name,
+        "stored_path": f"ai-inbox/{stored_name}",
+        "mime": mime or "application/octet-stream",
+        "size": upload.size,
+        "sha256": upload.sha256,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "status": "pending",
+    })
+    if created:
+        audit_detached(user, "create", "inbox_file", file_id, description=f"Uploaded {original_name}")
+        extraction_pipeline.wake()
+    else:
+        (INBOX_DIR / stored_name).unlink(missing_ok=True)
+
+    return {
+        "id": record["id"],
+        "originalName": record["original_name"],
+        "storedPath": record["stored_path"],
+        "mime": record["mime"],
+        "size": record["size"],
+        "sha256": record["sha256"],
+        "createdAt": record["created_at"],
+        "status": record["status"],
+        "duplicate": not created,
+    }
 
 
 @router.post("/upload")
 def upload_file(file: UploadFile = File(...), user=Depends(get_current_user)):
-    """Загрузка файла в inbox"""
-    allowed = [
-        "application/pdf",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "application/msword",
-    ]
-    if file.content_type not in allowed:
+    """Загрузка файла в inbox (потоково: sha256 при записи, без чтения в память)"""
+    if file.content_type not in ALLOWED_MIME:
         raise HTTPException(400, "Разрешены только PDF и DOCX")
-    max_size = settings.INBOX_UPLOAD_MAX_MB * 1024 * 1024
-
-    _ensure_dirs()
-    file_id = str(uuid.uuid4())
-    safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in (file.filename or "file"))
-    stored_name = f"{file_id}_{safe_name}"
-    stored_path = INBOX_DIR / stored_name
-
-    content = file.file.read()
-    if len(content) > max_size:
+    try:
+        upload = spool_file(file.file, max_bytes=settings.INBOX_UPLOAD_MAX_MB * 1024 * 1024)
+    except UploadTooLarge:
         raise HTTPException(400, f"Файл превышает {settings.INBOX_UPLOAD_MAX_MB} МБ")
-    sha256 = hashlib.sha256(content).hexdigest()
-    stored_path.write_bytes(content)
-
-    db_path_rel = f"ai-inbox/{stored_name}"
-    created_at = __import__("datetime").datetime.utcnow().isoformat() + "Z"
-
-    conn = _get_db()
     try:
-        conn.execute(
-            "INSERT INTO file_registry (id, original_name, stored_path, mime, size, sha256, created_at, status) VALUES (?,?,?,?,?,?,?,?)",
-            (file_id, file.filename or "file", db_path_rel, file.content_type or "application/octet-stream", len(content), sha256, created_at, "pending"),
-        )
-        conn.commit()
+        return _register_file(user, file.filename, file.content_type, upload)
     finally:
-        conn.close()
+        upload.discard()
 
-    # Audit log
-    try:
-        pg_db = next(get_pg_db())
-        audit_log(pg_db, user, "create", "inbox_file", file_id, description=f"Uploaded {file.filename}")
-        pg_db.commit()
-    except Exception:
-        pass
 
-    return {
-        "id": file_id,
-        "originalName": file.filename or "file",
-        "storedPath": db_path_rel,
-        "mime": file.content_type or "application/octet-stream",
-        "size": len(content),
-        "sha256": sha256,
-        "createdAt": created_at,
-        "status": "pending",
-    }
+@router.post("/uploads/{upload_id}")
+def complete_resumable_upload(
+    upload_id: str,
+    sha256: str | None = Body(None, embed=True, description="Контрольная сумма всего файла (hex)"),
+    user=Depends(get_current_user),
+):
+    """Зарегистрировать завершённую загрузку tus (/uploads); имя и тип — из Upload-Metadata."""
+    try:
+        session = resumable.get(upload_id, user.id)
+    except resumable.UploadError as e:
+        raise HTTPException(e.status_code, e.detail)
+    mime = session.metadata.get("filetype")
+    if mime not in ALLOWED_MIME:
+        raise HTTPException(400, "Разрешены только PDF и DOCX")
+    if session.length > settings.INBOX_UPLOAD_MAX_MB * 1024 * 1024:
+        raise HTTPException(400, f"Файл превышает {settings.INBOX_UPLOAD_MAX_MB} МБ")
+    try:
+        upload = resumable.finish(session, sha256)
+    except resumable.UploadError as e:
+        raise HTTPException(e.status_code, e.detail)
+    try:
+        return _register_file(user, session.metadata.get("filename"), mime, upload)
+    finally:
+        upload.discard()
 
 
 @router.get("/files/{file_id}/download")
-def download_file(file_id: str, user=Depends(get_current_user)):
-    """Скачать файл"""
-    conn = _get_db()
-    try:
-        row = conn.execute("SELECT * FROM file_registry WHERE id = ?", (file_id,)).fetchone()
-    finally:
-        conn.close()
+def download_file(file_id: str, request: Request, user=Depends(get_current_user)):
+    """Скачать файл (Range / If-Range для докачки, ETag = sha256)"""
+    row = inbox_store().get_file(file_id)
     if not row:
         raise HTTPException(404, "File not found")
-    path = DATA_DIR / row["stored_path"] if not str(row["stored_path"]).startswith("/") else Path(row["stored_path"])
+    path = _file_path(row["stored_path"])
     if not path.exists():
         raise HTTPException(404, "File not found on disk")
-    return FileResponse(path, filename=row["original_name"])
+    created_at = datetime.fromisoformat(row["created_at"].rstrip("Z")).replace(tzinfo=timezone.utc)
+    return ranged_response(
+        request, size=path.stat().st_size, etag=row["sha256"], filename=row["original_name"],
+        media_type=row["mime"], last_modified=created_at, path=path,
+    )
+
+
+@router.get("/extraction/stats")
+def extraction_stats(user=Depends(get_current_user)):
+    """Конвейер извлечения: очередь по статусам, документов в минуту, задержки этапов"""
+    return extraction_pipeline.snapshot()
+
+
+@router.get("/files/{file_id}/extraction")
+def get_extraction(file_id: str, user=Depends(get_current_user)):
+    """Последний запуск извлечения по файлу и его поля (confidence, provenance)"""
+    if not inbox_store().get_file(file_id):
+        raise HTTPException(404, "File not found")
+    latest = inbox_store().latest_run(file_id)
+    if latest is None:
+        raise HTTPException(404, "Extraction not found")
+    run, fields = latest
+    return {**run, "truncated": bool(run["truncated"]), "fields": fields}
+
+
+@router.post("/files/{file_id}/extract")
+def extract_file(
+    file_id: str,
+    force: bool = Query(False, description="Извлечь заново, не переиспользуя прежний результат"),
+    user=Depends(get_current_user),
+):
+    """Поставить файл в очередь извлечения (повторно — только с force)"""
+    row = inbox_store().get_file(file_id)
+    if not row:
+        raise HTTPException(404, "File not found")
+    latest = inbox_store().latest_run(file_id)
+    if not force and latest and latest[0]["status"] == "completed" and latest[0]["prompt_version"] == load_prompts()[1]:
+        return {"id": file_id, "status": row["status"], "queued": False, "run_id": latest[0]["id"]}
+    queued = extraction_pipeline.reprocess(file_id, force=force)
+    audit_detached(user, "update", "inbox_file", file_id, description=f"Extraction requested (force={force})")
+    return {"id": file_id, "status": "pending" if queued else row["status"], "queued": queued}
 
 
 @router.delete("/files/{file_id}")
 def delete_file(file_id: str, user=Depends(get_current_user)):
     """Удалить файл"""
-    conn = _get_db()
-    try:
-        row = conn.execute("SELECT * FROM file_registry WHERE id = ?", (file_id,)).fetchone()
-        if not row:
-            raise HTTPException(404, "File not found")
-        path = DATA_DIR / row["stored_path"] if not str(row["stored_path"]).startswith("/") else Path(row["stored_path"])
-        if path.exists():
-            path.unlink()
-        conn.execute("DELETE FROM file_registry WHERE id = ?", (file_id,))
-        conn.commit()
-    finally:
-        conn.close()
-    # Audit log
-    try:
-        pg_db = next(get_pg_db())
-        audit_log(pg_db, user, "delete", "inbox_file", file_id, description=f"Deleted file")
-        pg_db.commit()
-    except Exception:
-        pass
+    row = inbox_store().delete_file(file_id)
+    if not row:
+        raise HTTPException(404, "File not found")
+    _file_path(row["stored_path"]).unlink(missing_ok=True)
+    audit_detached(user, "delete", "inbox_file", file_id, description="Deleted file")
     return {"success": True}
@@ -5,7 +5,6 @@ from datetime import datetime, timezone
 from typing import Any
 
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
-from openpyxl import load_workbook
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
@@ -90,6 +89,8 @@ def _parse_csv(content: bytes) -> tuple[list[str], list[dict[str, Any]]]:
 
 def _parse_xlsx(content: bytes) -> list[tuple[str, list[str], list[dict[str, Any]]]]:
     """Парсит XLSX файл, возвращает список (sheet_name, headers, rows)."""
+    from openpyxl import load_workbook
+
     wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
     result = []
     for sheet_name in wb.sheetnames:
@@ -0,0 +1,111 @@
+"""
+Планирование ТО по остатку ресурса: карты ТО, LLP/HT, шасси (ФАП-148 п.4.2; EASA Part-M.A.302).
+
+Отбор — в SQL по типизированным теневым колонкам (remaining_fh / remaining_fc /
+calendar_due, B-tree) и порядок срочности тоже в SQL — LIMIT отрезает наименее
+срочные; прогноз даты исполнения по налёту — векторно
+(app.services.intervals.project_due), «что наступит раньше».
+"""
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, get_db
+from app.api.helpers import filter_by_org
+from app.core.config import settings
+from app.models import Aircraft, LandingGearComponent, LimitedLifeComponent, MaintenanceTask
+
+router = APIRouter(prefix="/maintenance", tags=["maintenance-planning"])
+
+# kind → (модель, поле-наименование)
+KINDS = {
+    "task": (MaintenanceTask, "task_number"),
+    "llp": (LimitedLifeComponent, "part_number"),
+    "landing_gear": (LandingGearComponent, "part_number"),
+}
+
+# Дни «без срока» для сортировки в SQL — после любых реальных сроков
+NO_DUE_DAYS = 1e9
+
+
+def _urgency(db: Session, model, today: date, fh_per_day: float, fc_per_day: float):
+    """Дни до исполнения в SQL: min(остаток ч / налёт, остаток ц / налёт, дни до срока), NULL — в конец."""
+    by_fh = func.coalesce(model.remaining_fh / fh_per_day, NO_DUE_DAYS)
+    by_fc = func.coalesce(model.remaining_fc / fc_per_day, NO_DUE_DAYS)
+    if db.get_bind().dialect.name == "postgresql":
+        by_date = func.coalesce(model.calendar_due - today, NO_DUE_DAYS)
+        return func.least(by_fh, by_fc, by_date)
+    by_date = func.coalesce(func.julianday(model.calendar_due) - func.julianday(today.isoformat()), NO_DUE_DAYS)
+    return func.min(by_fh, by_fc, by_date)  # SQLite: скалярный min от нескольких аргументов
+
+
+@router.get("/due")
+def list_due(
+    kind: str | None = Query(None, description="task | llp | landing_gear; пусто — все"),
+    aircraft_id: str | None = None,
+    max_remaining_fh: float | None = Query(None, description="Остаток ч не больше"),
+    max_remaining_fc: float | None = Query(None, description="Остаток циклов не больше"),
+    due_within_days: int | None = Query(None, ge=0, description="Календарный срок в пределах N дней"),
+    fh_per_day: float | None = Query(None, gt=0, description="Налёт ч/сут для прогноза"),
+    fc_per_day: float | None = Query(None, gt=0, description="Циклов/сут для прогноза"),
+    limit: int = Query(200, ge=1, le=1000),
+    db: Session = Depends(get_db), user=Depends(get_current_user),
+):
+    """Что подходит к сроку: условия объединяются по «или»; без условий — пороги предупреждений."""
+    from app.services.intervals import DRIVERS, project_due
+
+    today = date.today()
+    fh_per_day = fh_per_day or settings.PLANNING_DEFAULT_FH_PER_DAY
+    fc_per_day = fc_per_day or settings.PLANNING_DEFAULT_FC_PER_DAY
+    if max_remaining_fh is None and max_remaining_fc is None and due_within_days is None:
+        max_remaining_fh = settings.RISK_REMAINING_FH_WARNING
+        max_remaining_fc = settings.RISK_REMAINING_FC_WARNING
+        due_within_days = 30
+
+    rows = []
+    total = 0
+    for name, (model, label) in KINDS.items():
+        if kind and kind != name:
+            continue
+        conditions = []
+        if max_remaining_fh is not None:
+            conditions.append(model.remaining_fh <= max_remaining_fh)
+        if max_remaining_fc is not None:
+            conditions.append(model.remaining_fc <= max_remaining_fc)
+        if due_within_days is not None:
+            conditions.append(model.calendar_due <= today + timedelta(days=due_within_days))
+        q = db.query(model).join(Aircraft).filter(or_(*conditions))
+        if aircraft_id:
+            q = q.filter(model.aircraft_id == aircraft_id)
+        q = filter_by_org(q, Aircraft, user)
+        total += q.count()
+        q = q.order_by(_urgency(db, model, today, fh_per_day, fc_per_day), model.id)
+        rows += [(name, getattr(obj, label), obj) for obj in q.limit(limit).all()]
+
+    if not rows:
+        return {"items": [], "total": total}
+    days, driver = project_due(
+        [r[2].remaining_fh for r in rows], [r[2].remaining_fc for r in rows], [r[2].calendar_due for r in rows],
+        fh_per_day, fc_per_day, today=today,
+    )
+    items = []
+    for i in sorted(range(len(rows)), key=lambda i: days[i])[:limit]:
+        name, label, obj = rows[i]
+        finite = days[i] != float("inf")
+        items.append({
+            "kind": name,
+            "id": obj.id,
+            "aircraft_id": obj.aircraft_id,
+            "name": label,
+            "description": obj.description,
+            "interval": obj.interval,
+            "remaining_fh": obj.remaining_fh,
+            "remaining_fc": obj.remaining_fc,
+            "calendar_due": obj.calendar_due.isoformat() if obj.calendar_due else None,
+            "projected_days": int(days[i]) if finite else None,
+            "projected_date": (today + timedelta(days=int(days[i]))).isoformat() if finite else None,
+            "limiting_factor": DRIVERS[driver[i]] if driver[i] >= 0 else None,
+        })
+    return {"items": items, "total": total}
@@ -4,9 +4,11 @@ Exposes request counts, latencies, and business metrics.
 """
 import time
 from collections import defaultdict
-from fastapi import APIRouter, Request, Response
+from fastapi import APIRouter, Depends, Query, Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.api.deps import require_roles
+
 router = APIRouter(tags=["monitoring"])
 
 # In-memory counters (production: use prometheus_client library)
@@ -59,4 +61,57 @@ def prometheus_metrics():
     for code, count in sorted(_error_count.items()):
         lines.append(f'klg_http_errors_total{{status="{code}"}} {count}')
 
+    from app.services.audit_writer import audit_writer
+    lines += [
+        "# HELP klg_audit_queue_depth Audit entries waiting for the background writer",
+        "# TYPE klg_audit_queue_depth gauge",
+        f"klg_audit_queue_depth {audit_writer.depth}",
+        "# HELP klg_audit_written_total Audit entries written by the background writer",
+        "# TYPE klg_audit_written_total counter",
+        f"klg_audit_written_total {audit_writer.written_total}",
+        "# HELP klg_audit_flush_seconds Audit batch flush latency",
+        "# TYPE klg_audit_flush_seconds summary",
+        f"klg_audit_flush_seconds_sum {audit_writer.flush_seconds_sum:.4f}",
+        f"klg_audit_flush_seconds_count {audit_writer.batches_total}",
+        "# HELP klg_audit_write_errors_total Failed audit batch writes (retried)",
+        "# TYPE klg_audit_write_errors_total counter",
+        f"klg_audit_write_errors_total {audit_writer.errors_total}",
+    ]
+
+    from app.services.email_service import email_service
+    delivery = email_service.delivery
+    lines += [
+        "# HELP klg_email_queue_depth Emails waiting for an SMTP sender",
+        "# TYPE klg_email_queue_depth gauge",
+        f"klg_email_queue_depth {delivery.depth}",
+        "# HELP klg_email_sent_total Emails accepted by the SMTP server",
+        "# TYPE klg_email_sent_total counter",
+        f"klg_email_sent_total {delivery.sent_total}",
+        "# HELP klg_email_failed_total Emails rejected permanently or dropped after retries",
+        "# TYPE klg_email_failed_total counter",
+        f"klg_email_failed_total {delivery.failed_total}",
+        "# HELP klg_email_deferred_total Emails moved to the retry outbox",
+        "# TYPE klg_email_deferred_total counter",
+        f"klg_email_deferred_total {delivery.deferred_total}",
+        "# HELP klg_email_smtp_connections_total SMTP connections opened (handshake + auth)",
+        "# TYPE klg_email_smtp_connections_total counter",
+        f"klg_email_smtp_connections_total {delivery.connections_opened}",
+    ]
+
+    from app.db import instrumentation
+    lines += instrumentation.render_prometheus()
+
+    from app.db.session import db_router
+    lines += db_router.render_prometheus()
+
+    from app.services.inbox_extraction import extraction_pipeline
+    lines += extraction_pipeline.render_prometheus()
+
     return Response(content="\n".join(lines) + "\n", media_type="text/plain")
+
+
+@router.get("/metrics/slow-queries")
+def slow_queries(limit: int = Query(50, ge=1, le=200), user=Depends(require_roles("admin"))):
+    """Медленные SQL-запросы (нормализованные): последние и агрегаты по форме."""
+    from app.db import instrumentation
+    return instrumentation.slow_queries(limit)
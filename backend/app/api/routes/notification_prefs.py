@@ -1,16 +1,20 @@
 """
 Настройки уведомлений пользователя.
 Позволяет включать/отключать: email, push, WS для разных типов событий.
+Хранятся в notification_preferences по sub токена (UserInfo.id = users.external_subject);
+учитываются app.services.notifications.dispatch.
 """
-import uuid
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field
-from typing import Optional
-from app.api.deps import get_current_user
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, get_db
+from app.models.notification_preference import PREFERENCE_DEFAULTS, NotificationPreference
+from app.services.numbering import _upsert
 
 router = APIRouter(prefix="/notification-preferences", tags=["notifications"])
 
-_prefs: dict = {}
 
 class NotificationPrefs(BaseModel):
     ad_mandatory: bool = Field(True, description="Обязательные ДЛГ")
@@ -26,13 +30,24 @@ class NotificationPrefs(BaseModel):
     channels_push: bool = Field(False, description="Push уведомления")
     channels_ws: bool = Field(True, description="WebSocket real-time")
 
+
 @router.get("/")
-def get_preferences(user=Depends(get_current_user)):
-    uid = getattr(user, 'sub', 'default')
-    return _prefs.get(uid, NotificationPrefs().dict())
+def get_preferences(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    row = db.get(NotificationPreference, user.id)
+    if row is None:
+        return dict(PREFERENCE_DEFAULTS)
+    return {name: getattr(row, name) for name in PREFERENCE_DEFAULTS}
+
 
 @router.put("/")
-def update_preferences(data: NotificationPrefs, user=Depends(get_current_user)):
-    uid = getattr(user, 'sub', 'default')
-    _prefs[uid] = data.dict()
-    return _prefs[uid]
+def update_preferences(data: NotificationPrefs, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    values = data.model_dump()
+    table = NotificationPreference.__table__
+    insert = _upsert(db.get_bind().dialect.name)
+    db.execute(
+        insert(table)
+        .values(user_id=user.id, **values)
+        .on_conflict_do_update(index_elements=[table.c.user_id], set_={**values, "updated_at": func.now()})
+    )
+    db.commit()
+    return values
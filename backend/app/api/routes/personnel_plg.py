@@ -14,7 +14,7 @@
 """
 import logging
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from typing import Optional, List
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -24,6 +24,7 @@ from sqlalchemy import func
 
 from app.api.deps import get_db, get_current_user, require_roles
 from app.api.helpers import audit
+from app.services.personnel_compliance import KINDS as DUE_KINDS, PersonnelComplianceEngine, parse_due
 
 logger = logging.getLogger(__name__)
 
@@ -92,6 +93,9 @@ _specialists: dict = {}
 _attestations: dict = {}
 _qualifications: dict = {}
 
+# Индексы по специалисту и срокам — обновляются при каждой записи
+compliance_engine = PersonnelComplianceEngine(_specialists, _attestations, _qualifications)
+
 # Pre-built training programs per regulatory framework
 TRAINING_PROGRAMS = {
     # ============================================
@@ -342,6 +346,7 @@ def create_specialist(
         "qualifications": [],
     }
     _specialists[sid] = specialist
+    compliance_engine.on_specialist(specialist)
     audit(db, user, "create", "personnel_plg", entity_id=sid, description=f"Создан специалист: {data.full_name}")
     db.commit()
     return specialist
@@ -354,23 +359,17 @@ def get_specialist(specialist_id: str, user=Depends(get_current_user)):
     if not spec:
         raise HTTPException(status_code=404, detail="Specialist not found")
 
-    # Attach attestations and qualifications
-    spec["attestations"] = [a for a in _attestations.values() if a["specialist_id"] == specialist_id]
-    spec["qualifications"] = [q for q in _qualifications.values() if q["specialist_id"] == specialist_id]
-
-    # Calculate compliance status
     now = datetime.now(timezone.utc)
-    overdue = []
-    for q in spec["qualifications"]:
-        if q.get("next_due"):
-            due = datetime.fromisoformat(q["next_due"])
-            if due < now:
-                overdue.append(q["program_name"])
-    spec["compliance"] = {
-        "status": "non_compliant" if overdue else "compliant",
-        "overdue_items": overdue,
+    overdue = compliance_engine.overdue_qualifications(specialist_id, now)
+    return {
+        **spec,
+        "attestations": compliance_engine.attestations_of(specialist_id),
+        "qualifications": compliance_engine.qualifications_of(specialist_id),
+        "compliance": {
+            "status": "non_compliant" if overdue else "compliant",
+            "overdue_items": [i.label for i in overdue],
+        },
     }
-    return spec
 
 
 @router.post("/attestations", tags=["personnel-plg"])
@@ -388,6 +387,7 @@ def record_attestation(
     aid = str(uuid.uuid4())
     record = {"id": aid, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
     _attestations[aid] = record
+    compliance_engine.on_attestation(record)
     audit(db, user, "attestation", "personnel_plg", entity_id=data.specialist_id,
           description=f"Аттестация {data.attestation_type}: {data.program_name} — {data.result}")
     db.commit()
@@ -407,6 +407,7 @@ def record_qualification(
     qid = str(uuid.uuid4())
     record = {"id": qid, **data.dict(), "created_at": datetime.now(timezone.utc).isoformat()}
     _qualifications[qid] = record
+    compliance_engine.on_qualification(record)
     audit(db, user, "qualification", "personnel_plg", entity_id=data.specialist_id,
           description=f"ПК {data.program_type}: {data.program_name} — {data.result}")
     db.commit()
@@ -423,35 +424,32 @@ def compliance_report(user=Depends(get_current_user)):
 
 
 def _compliance_report_data():
-    now = datetime.now(timezone.utc)
-    soon = now + timedelta(days=90)
-    report = {"total_specialists": len(_specialists), "compliant": 0, "non_compliant": 0, "expiring_soon": [], "overdue": []}
-
-    for sid, spec in _specialists.items():
-        quals = [q for q in _qualifications.values() if q["specialist_id"] == sid]
-        is_overdue = False
-        for q in quals:
-            if q.get("next_due"):
-                due = datetime.fromisoformat(q["next_due"])
-                if due < now:
-                    report["overdue"].append({"specialist": spec["full_name"], "program": q["program_name"], "due": q["next_due"]})
-                    is_overdue = True
-                elif due < soon:
-                    report["expiring_soon"].append({"specialist": spec["full_name"], "program": q["program_name"], "due": q["next_due"]})
-
-        if spec.get("license_expires"):
-            lic_exp = datetime.fromisoformat(spec["license_expires"])
-            if lic_exp < soon:
-                report["expiring_soon"].append({"specialist": spec["full_name"], "item": "Свидетельство", "due": spec["license_expires"]})
-
-        if is_overdue:
-            report["non_compliant"] += 1
-        else:
-            report["compliant"] += 1
-
-    return report
+    return compliance_engine.compliance_report(horizon_days=90)
 
 
+@router.get("/due", tags=["personnel-plg"])
+def list_due_items(
+    date_from: Optional[str] = Query(None, description="Срок >= date_from (ISO)"),
+    date_to: Optional[str] = Query(None, description="Срок < date_to (ISO)"),
+    kind: Optional[str] = Query(None, description="qualification | license | medical"),
+    user=Depends(get_current_user),
+):
+    """Сроки ПК / свидетельств / медзаключений в диапазоне дат (по индексу сроков)."""
+    if kind and kind not in DUE_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown kind: {kind} (expected {' | '.join(DUE_KINDS)})")
+    bounds = {}
+    for name, value in (("date_from", date_from), ("date_to", date_to)):
+        bounds[name] = parse_due(value)
+        if value and bounds[name] is None:
+            raise HTTPException(status_code=400, detail=f"Invalid {name}: {value!r} (expected ISO date)")
+    items = compliance_engine.due_between(bounds["date_from"], bounds["date_to"], (kind,) if kind else None)
+    return {
+        "items": [
+            {"kind": i.kind, "specialist_id": i.specialist_id, "specialist": compliance_engine.name_of(i.specialist_id),
+             "ref_id": i.ref_id, "item": i.label, "due": i.raw}
+            for i in items
+        ],
+    }
 
 
 # ===================================================================
@@ -469,68 +467,7 @@ def check_expiring_qualifications(db_session=None):
     - ФАП-145 п.145.A.30(e): организация обязана иметь квалифицированный персонал
     - EASA Part-145.A.30: personnel requirements
     """
-    now = datetime.now(timezone.utc)
-    soon = now + timedelta(days=30)
-    alerts = []
-
-    for sid, spec in _specialists.items():
-        # Check license expiry
-        if spec.get("license_expires"):
-            try:
-                exp = datetime.fromisoformat(spec["license_expires"]).replace(tzinfo=timezone.utc)
-                if exp < now:
-                    alerts.append({
-                        "type": "personnel_license_expired",
-                        "severity": "critical",
-                        "specialist_id": sid,
-                        "message": f"Свидетельство {spec.get('license_number', '?')} просрочено",
-                    })
-                elif exp < soon:
-                    alerts.append({
-                        "type": "personnel_license_expiring",
-                        "severity": "high",
-                        "specialist_id": sid,
-                        "message": f"Свидетельство {spec.get('license_number', '?')} истекает {exp.strftime('%d.%m.%Y')}",
-                    })
-            except (ValueError, TypeError):
-                pass
-
-        # Check qualification expiry
-        quals = [q for q in _qualifications.values() if q["specialist_id"] == sid]
-        for q in quals:
-            if q.get("next_due"):
-                try:
-                    due = datetime.fromisoformat(q["next_due"]).replace(tzinfo=timezone.utc)
-                    if due < now:
-                        alerts.append({
-                            "type": "qualification_expired",
-                            "severity": "high",
-                            "specialist_id": sid,
-                            "message": f"ПК просрочена: {q['program_name']}",
-                        })
-                    elif due < soon:
-                        alerts.append({
-                            "type": "qualification_expiring",
-                            "severity": "medium",
-                            "specialist_id": sid,
-                            "message": f"ПК истекает: {q['program_name']} — до {due.strftime('%d.%m.%Y')}",
-                        })
-                except (ValueError, TypeError):
-                    pass
-
-        # Check medical certificate
-        if spec.get("medical_certificate_expires"):
-            try:
-                med = datetime.fromisoformat(spec["medical_certificate_expires"]).replace(tzinfo=timezone.utc)
-                if med < now:
-                    alerts.append({
-                        "type": "medical_expired",
-                        "severity": "critical",
-                        "specialist_id": sid,
-                        "message": "Медицинское заключение просрочено",
-                    })
-            except (ValueError, TypeError):
-                pass
+    alerts = compliance_engine.expiry_alerts(horizon_days=30)
 
     logger.info("Personnel PLG check: %d alerts generated", len(alerts))
     return alerts
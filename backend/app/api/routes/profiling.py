@@ -0,0 +1,58 @@
+"""
+Профилирование запросов API — только администратор.
+
+Профили снимает ProfilingMiddleware (app.services.profiler); здесь — настройка
+выборки и выдача агрегированных collapsed-стеков по шаблону маршрута.
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from app.api.deps import require_roles
+from app.services.profiler import profiler, to_collapsed, top_functions
+
+router = APIRouter(prefix="/profiling", tags=["monitoring"], dependencies=[Depends(require_roles("admin"))])
+
+
+class ProfilingConfig(BaseModel):
+    routes: Optional[List[str]] = Field(None, description="Шаблоны маршрутов, напр. /api/v1/aircraft/{aircraft_id}")
+    sample_rate: Optional[float] = Field(None, ge=0, le=1, description="Доля случайно профилируемых запросов")
+
+
+@router.get("/config")
+def get_config():
+    return profiler.configure()
+
+
+@router.post("/config")
+def set_config(data: ProfilingConfig):
+    return profiler.configure(routes=data.routes, sample_rate=data.sample_rate)
+
+
+@router.get("/routes")
+def list_profiled_routes(minutes: int = Query(60, ge=1, le=1440)):
+    """Маршруты с профилями за окно: число профилей, семплов, суммарное время."""
+    return {"minutes": minutes, "items": profiler.summary(minutes)}
+
+
+@router.get("/profiles")
+def get_profiles(route: Optional[str] = None, minutes: int = Query(60, ge=1, le=1440),
+                 format: str = Query("json", pattern="^(json|collapsed)$"), top: int = Query(30, ge=1, le=500)):
+    """Агрегированный профиль маршрута (или всех) за окно. format=collapsed — для flamegraph.pl / speedscope."""
+    samples, profiles = profiler.aggregate(route, minutes)
+    if format == "collapsed":
+        return PlainTextResponse(to_collapsed(samples))
+    return {
+        "route": route,
+        "minutes": minutes,
+        "profiles": profiles,
+        "samples": sum(samples.values()),
+        "top": [{"function": f, "self": s, "inclusive": i} for f, s, i in top_functions(samples, top)],
+    }
+
+
+@router.delete("/profiles")
+def clear_profiles():
+    return {"cleared": profiler.clear()}
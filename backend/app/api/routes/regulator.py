@@ -366,103 +366,28 @@ def generate_pdf_report(
     Генерация PDF отчёта для ФАВТ.
     Структура: титульный лист, сводка, реестр ВС, безопасность.
     """
-    from io import BytesIO
-    from fastapi.responses import StreamingResponse
+    from fastapi.responses import Response
     from app.api.helpers import audit
+    from app.services.pdf_renderer import pdf_service, utc_stamp
 
+    overview = regulator_overview(db)
+    payload = {
+        "overview": {k: v for k, v in overview.items() if k != "generated_at"},
+        "generated_by": user.display_name,
+        "generated_at": utc_stamp(),
+    }
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.units import mm
-        from reportlab.pdfgen import canvas
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
+        pdf = pdf_service.render("regulator_report", payload)
     except ImportError:
         return {"error": "reportlab not installed. Install with: pip install reportlab"}
 
-    buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    w, h = A4
-
-    # Try to register Cyrillic font
-    try:
-        pdfmetrics.registerFont(TTFont("DejaVu", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"))
-        font = "DejaVu"
-    except Exception:
-        font = "Helvetica"
-
-    # Title page
-    c.setFont(font, 24)
-    c.drawCentredString(w / 2, h - 80 * mm, "ОТЧЁТ")
-    c.setFont(font, 14)
-    c.drawCentredString(w / 2, h - 95 * mm, "для Федерального агентства воздушного транспорта")
-    c.drawCentredString(w / 2, h - 105 * mm, "(Росавиация)")
-    c.setFont(font, 10)
-    c.drawCentredString(w / 2, h - 125 * mm, f"Дата формирования: {datetime.now(timezone.utc).strftime('%d.%m.%Y %H:%M UTC')}")
-    c.drawCentredString(w / 2, h - 135 * mm, f"Сформировал: {user.display_name}")
-    c.setFont(font, 8)
-    c.drawCentredString(w / 2, h - 160 * mm, "Правовые основания: ВК РФ ст. 8, 24.1, 28, 33, 36, 37, 67, 68;")
-    c.drawCentredString(w / 2, h - 168 * mm, "ФАП-246, ФАП-285; ICAO Annex 6, 7, 8, 19; EASA Part-M, Part-ARO")
-    c.drawCentredString(w / 2, h - 185 * mm, "АСУ ТК КЛГ — АО «REFLY»")
-    c.showPage()
-
-    # Overview page
-    overview = regulator_overview(db)
-    c.setFont(font, 16)
-    c.drawString(20 * mm, h - 20 * mm, "1. Сводные показатели")
-    c.setFont(font, 10)
-    y = h - 40 * mm
-    sections = [
-        ("Парк ВС", [
-            f"Всего: {overview['aircraft']['total']}",
-            f"Годные к полётам: {overview['aircraft']['airworthy']}",
-            f"На ТО: {overview['aircraft']['in_maintenance']}",
-            f"Приостановлены: {overview['aircraft']['grounded']}",
-            f"Списаны: {overview['aircraft']['decommissioned']}",
-        ]),
-        ("Сертификация", [
-            f"Всего заявок: {overview['certification']['total_applications']}",
-            f"На рассмотрении: {overview['certification']['pending']}",
-            f"Одобрено: {overview['certification']['approved']}",
-            f"Отклонено: {overview['certification']['rejected']}",
-        ]),
-        ("Безопасность полётов", [
-            f"Всего рисков: {overview['safety']['total_risks']}",
-            f"Критические: {overview['safety']['critical']}",
-            f"Высокие: {overview['safety']['high']}",
-            f"Не устранены: {overview['safety']['unresolved']}",
-        ]),
-        ("Надзор", [
-            f"Аудитов за 30 дней: {overview['audits_last_30d']}",
-            f"Организации: {overview['organizations']['total']}",
-        ]),
-    ]
-    for title, items in sections:
-        c.setFont(font, 12)
-        c.drawString(20 * mm, y, title)
-        y -= 6 * mm
-        c.setFont(font, 9)
-        for item in items:
-            c.drawString(25 * mm, y, f"• {item}")
-            y -= 5 * mm
-        y -= 4 * mm
-        if y < 30 * mm:
-            c.showPage()
-            y = h - 20 * mm
-
-    # Footer
-    c.setFont(font, 7)
-    c.drawCentredString(w / 2, 10 * mm, "Документ сформирован автоматически. Персональные данные не раскрываются.")
-    c.showPage()
-    c.save()
-    buf.seek(0)
-
     audit(db, user, "regulator_pdf_report", "system",
           description="Сформирован PDF отчёт для ФАВТ")
     db.commit()
 
     filename = f"favt_report_{datetime.now(timezone.utc).strftime('%Y%m%d')}.pdf"
-    return StreamingResponse(
-        buf,
+    return Response(
+        pdf,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -480,29 +405,13 @@ def personnel_summary():
     Показываются: количество специалистов, категории, compliance.
     НЕ показываются: ФИО, табельные номера, персональные данные.
     """
-    from app.api.routes.personnel_plg import _specialists, _qualifications
-    from datetime import datetime, timezone, timedelta
+    from app.api.routes.personnel_plg import compliance_engine
 
-    now = datetime.now(timezone.utc)
-    total = len(_specialists)
-    by_category = {}
-    compliant = 0
-    non_compliant = 0
-
-    for sid, spec in _specialists.items():
-        cat = spec.get("category", "?")
-        by_category[cat] = by_category.get(cat, 0) + 1
-        quals = [q for q in _qualifications.values() if q["specialist_id"] == sid]
-        is_ok = True
-        for q in quals:
-            if q.get("next_due"):
-                due = datetime.fromisoformat(q["next_due"])
-                if due.replace(tzinfo=timezone.utc) < now:
-                    is_ok = False
-        if is_ok:
-            compliant += 1
-        else:
-            non_compliant += 1
+    snap = compliance_engine.snapshot()
+    total = snap["total_specialists"]
+    by_category = snap["by_category"]
+    compliant = snap["compliant"]
+    non_compliant = snap["non_compliant"]
 
     return {
         "legal_basis": "ВК РФ ст. 52-54; ФАП-147; ICAO Annex 1",
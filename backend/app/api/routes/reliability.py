@@ -0,0 +1,44 @@
+"""
+Программа надёжности: показатели дефектов на 1000 ч по главам ATA / типам / бортам
+(EASA Part-M.A.301, AMC M.A.708(b)(8)). Расчёт — app.services.reliability.
+"""
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, get_db, require_roles
+from app.api.helpers import audit, is_operator
+from app.services.reliability import DIMENSIONS, defect_rates, refresh_rollups
+
+router = APIRouter(prefix="/reliability", tags=["reliability"])
+
+
+@router.get("/rates")
+def get_rates(
+    by: list[str] = Query(["ata"], description=f"Срез: {' / '.join(DIMENSIONS)}, можно несколько"),
+    as_of: date | None = Query(None, description="Конец периода; пусто — сегодня"),
+    k: float = Query(2.0, gt=0, le=5, description="Alert level = mean + k·σ"),
+    aircraft_type_id: str | None = None,
+    aircraft_id: str | None = None,
+    db: Session = Depends(get_db), user=Depends(get_current_user),
+):
+    """Показатели за 1/3/12 мес, alert level и помесячный тренд; сначала превышения."""
+    operator_id = user.organization_id if is_operator(user) and user.organization_id else None
+    try:
+        return defect_rates(db, by=by, as_of=as_of, k=k, operator_id=operator_id,
+                            aircraft_type_id=aircraft_type_id, aircraft_id=aircraft_id)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+
+
+@router.post("/rollups/refresh", dependencies=[Depends(require_roles("admin", "authority_inspector"))])
+def refresh(
+    since: date | None = Query(None, description="Пересчитать с даты; пусто — полностью"),
+    db: Session = Depends(get_db), user=Depends(get_current_user),
+):
+    result = refresh_rollups(db, since)
+    audit(db, user, "update", "reliability_rollup",
+          description=f"Пересчёт свёрток надёжности с {since or 'начала'}: {result}")
+    db.commit()
+    return result
@@ -0,0 +1,121 @@
+"""
+Возобновляемая загрузка (tus 1.0) для вложений и inbox — app.services.resumable.
+
+Клиент (tus-js-client, Uppy) создаёт загрузку, отправляет части PATCH'ами и после
+обрыва продолжает с Upload-Offset из HEAD. Готовый файл забирает потребитель:
+POST /attachments/{owner_kind}/{owner_id}/uploads/{id} или POST /inbox/uploads/{id}.
+"""
+from email.utils import format_datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.services import resumable
+from app.services.resumable import UploadError
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+TUS_HEADERS = {"Tus-Resumable": resumable.TUS_VERSION}
+
+
+def _raise(e: UploadError):
+    raise HTTPException(status_code=e.status_code, detail=e.detail, headers=TUS_HEADERS)
+
+
+def _check_version(tus_resumable: str | None) -> None:
+    if tus_resumable is not None and tus_resumable != resumable.TUS_VERSION:
+        raise HTTPException(status_code=412, detail="Unsupported tus version",
+                            headers={"Tus-Version": resumable.TUS_VERSION})
+
+
+def _session_headers(session: resumable.UploadSession, offset: int) -> dict:
+    return {
+        **TUS_HEADERS,
+        "Upload-Offset": str(offset),
+        "Upload-Expires": format_datetime(session.expires, usegmt=True),
+        "Cache-Control": "no-store",
+    }
+
+
+async def _append(request: Request, session: resumable.UploadSession, offset: int, checksum: str | None) -> int:
+    try:
+        return await resumable.append(session, offset, request.stream(), checksum)
+    except UploadError as e:
+        _raise(e)
+
+
+@router.options("")
+def tus_options():
+    return Response(status_code=204, headers={
+        **TUS_HEADERS,
+        "Tus-Version": resumable.TUS_VERSION,
+        "Tus-Extension": resumable.TUS_EXTENSIONS,
+        "Tus-Max-Size": str(settings.STORAGE_UPLOAD_MAX_MB * 1024 * 1024),
+        "Tus-Checksum-Algorithm": ",".join(resumable.CHECKSUM_ALGORITHMS),
+    })
+
+
+@router.post("", status_code=201)
+async def create_upload(
+    request: Request,
+    upload_length: int = Header(..., alias="Upload-Length"),
+    upload_metadata: str | None = Header(None, alias="Upload-Metadata"),
+    upload_checksum: str | None = Header(None, alias="Upload-Checksum"),
+    tus_resumable: str | None = Header(None, alias="Tus-Resumable"),
+    user=Depends(get_current_user),
+):
+    """Создать загрузку; тело с Content-Type application/offset+octet-stream — первая часть."""
+    _check_version(tus_resumable)
+    try:
+        session = resumable.create(user.id, upload_length, resumable.parse_metadata(upload_metadata))
+    except UploadError as e:
+        _raise(e)
+    offset = 0
+    if request.headers.get("content-type") == "application/offset+octet-stream":
+        offset = await _append(request, session, 0, upload_checksum)
+    headers = _session_headers(session, offset)
+    headers["Location"] = f"{request.url.path.rstrip('/')}/{session.id}"
+    return Response(status_code=201, headers=headers)
+
+
+@router.head("/{upload_id}")
+def upload_status(upload_id: str, user=Depends(get_current_user)):
+    try:
+        session = resumable.get(upload_id, user.id)
+    except UploadError as e:
+        _raise(e)
+    headers = _session_headers(session, session.offset)
+    headers["Upload-Length"] = str(session.length)
+    return Response(status_code=200, headers=headers)
+
+
+@router.patch("/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: str | None = Header(None, alias="Upload-Checksum"),
+    tus_resumable: str | None = Header(None, alias="Tus-Resumable"),
+    user=Depends(get_current_user),
+):
+    """Дописать часть с позиции Upload-Offset."""
+    _check_version(tus_resumable)
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type must be application/offset+octet-stream",
+                            headers=TUS_HEADERS)
+    try:
+        session = resumable.get(upload_id, user.id)
+    except UploadError as e:
+        _raise(e)
+    offset = await _append(request, session, upload_offset, upload_checksum)
+    return Response(status_code=204, headers=_session_headers(session, offset))
+
+
+@router.delete("/{upload_id}", status_code=204)
+def terminate_upload(upload_id: str, user=Depends(get_current_user)):
+    try:
+        resumable.terminate(resumable.get(upload_id, user.id))
+    except UploadError as e:
+        _raise(e)
+    return Response(status_code=204, headers=TUS_HEADERS)
@@ -0,0 +1,38 @@
+"""
+Налёт по журналу полётов: приём рейсов NDJSON потоком (app.services.utilization).
+
+Наработка ВС, LLP и шасси обновляется одной транзакцией на запрос; пересчёт рисков —
+после commit в фоне и только по ВС из запроса.
+"""
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import get_current_user, get_db, require_roles
+from app.api.helpers import audit, is_operator
+from app.services.utilization import UtilizationIngest, rescan_aircraft
+
+router = APIRouter(prefix="/utilization", tags=["utilization"])
+
+
+@router.post(
+    "/legs",
+    dependencies=[Depends(require_roles("admin", "operator_user", "operator_manager"))],
+)
+async def ingest_flight_legs(
+    request: Request, background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db), user=Depends(get_current_user),
+):
+    """Рейсы application/x-ndjson (строка — рейс); ошибочные строки пропускаются и перечисляются в errors."""
+    operator_id = user.organization_id if is_operator(user) and user.organization_id else None
+    ingest = UtilizationIngest(db, operator_id=operator_id)
+    async for chunk in request.stream():
+        if chunk:
+            await run_in_threadpool(ingest.feed, chunk)
+    result = await run_in_threadpool(ingest.finish)
+    audit(db, user, "update", "utilization",
+          description=f"Журнал полётов: {result.accepted} рейс(ов), {len(result.aircraft_ids)} ВС, "
+                      f"повторов {result.duplicates}, отклонено {result.rejected}")
+    db.commit()
+    background_tasks.add_task(rescan_aircraft, result.aircraft_ids)
+    return result.as_dict()
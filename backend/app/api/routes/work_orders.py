@@ -16,6 +16,7 @@ from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from app.api.deps import get_db, get_current_user
 from app.api.helpers import audit
+from app.services.numbering import next_number
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -24,7 +25,7 @@ router = APIRouter(prefix="/work-orders", tags=["work-orders"])
 _work_orders: dict = {}
 
 class WorkOrderCreate(BaseModel):
-    wo_number: str = Field(..., description="Номер наряда")
+    wo_number: Optional[str] = Field(None, description="Номер наряда; пусто — WO-YYYYMMDD-NNNN")
     aircraft_reg: str
     wo_type: str = Field(..., description="scheduled | unscheduled | ad_compliance | sb_compliance | defect_rectification | modification")
     title: str
@@ -68,6 +69,8 @@ def list_work_orders(
 @router.post("/")
 def create_work_order(data: WorkOrderCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     wid = str(uuid.uuid4())
+    if not data.wo_number:
+        data.wo_number = next_number(db, "work_order")
     wo = {"id": wid, **data.dict(), "status": "draft", "created_at": datetime.now(timezone.utc).isoformat()}
     _work_orders[wid] = wo
     if data.priority == "aog":
@@ -156,17 +159,28 @@ def work_order_stats(user=Depends(get_current_user)):
 # ===================================================================
 
 @router.post("/from-directive/{directive_id}")
-def create_wo_from_directive(directive_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    """Создать наряд на выполнение ДЛГ."""
-    from app.api.routes.airworthiness_core import _directives
+def create_wo_from_directive(directive_id: str, aircraft_reg: Optional[str] = None,
+                             db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Создать наряд на выполнение ДЛГ: для указанного борта или для всех бортов, к которым она применима."""
+    from app.api.routes.airworthiness_core import _directives, applicability_engine, resolve_aircraft
     ad = _directives.get(directive_id)
     if not ad:
         raise HTTPException(404, "Directive not found")
+    engine = applicability_engine()
+    if aircraft_reg:
+        aircraft_id = resolve_aircraft(db, aircraft_reg)
+        if aircraft_id not in engine.aircraft_for("ad", directive_id):
+            raise HTTPException(400, f"ДЛГ {ad['number']} не применима к {aircraft_reg}")
+        affected = [aircraft_reg]
+    else:
+        engine.sync_fleet(db)
+        affected = sorted(filter(None, map(engine.registration_of, engine.aircraft_for("ad", directive_id))))
     wid = str(uuid.uuid4())
     wo = {
         "id": wid,
         "wo_number": f"WO-AD-{ad['number'][:20]}",
-        "aircraft_reg": ", ".join(ad.get("aircraft_types", [])),
+        "aircraft_reg": ", ".join(affected) or ", ".join(ad.get("aircraft_types", [])),
+        "affected_aircraft": affected,
         "wo_type": "ad_compliance",
         "title": f"Выполнение ДЛГ {ad['number']}: {ad.get('title', '')}",
         "description": ad.get("description", ""),
@@ -249,107 +263,70 @@ def generate_wo_pdf(wo_id: str, db: Session = Depends(get_db), user=Depends(get_
     Генерация PDF отчёта по наряду на ТО (включая CRS).
     ФАП-145 п.145.A.55: документация о выполненном ТО.
     """
-    from io import BytesIO
-    from datetime import datetime as dt
-    from fastapi.responses import StreamingResponse
+    from fastapi.responses import Response
+    from app.services.pdf_renderer import pdf_service, utc_date
 
     wo = _work_orders.get(wo_id)
     if not wo:
         raise HTTPException(404, "Work Order not found")
 
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib import colors
-
-        buf = BytesIO()
-        doc = SimpleDocTemplate(buf, pagesize=A4, topMargin=30, bottomMargin=30)
-        styles = getSampleStyleSheet()
-        elements = []
-
-        # Title
-        elements.append(Paragraph(f"НАРЯД НА ТО / WORK ORDER", styles["Title"]))
-        elements.append(Paragraph(f"No: {wo.get('wo_number', '?')}", styles["Heading2"]))
-        elements.append(Spacer(1, 12))
-
-        # Main info table
-        data = [
-            ["Борт / Aircraft:", wo.get("aircraft_reg", "")],
-            ["Тип работ / Type:", wo.get("wo_type", "")],
-            ["Наименование / Title:", wo.get("title", "")],
-            ["Приоритет / Priority:", wo.get("priority", "")],
-            ["Статус / Status:", wo.get("status", "")],
-            ["План. ч/ч / Est. MH:", str(wo.get("estimated_manhours", 0))],
-            ["Факт. ч/ч / Actual MH:", str(wo.get("actual_manhours", "—"))],
-        ]
-        t = Table(data, colWidths=[180, 340])
-        t.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (0, -1), colors.Color(0.9, 0.9, 0.9)),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-            ("FONTSIZE", (0, 0), (-1, -1), 9),
-            ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ]))
-        elements.append(t)
-        elements.append(Spacer(1, 16))
-
-        # Description
-        if wo.get("description"):
-            elements.append(Paragraph("Описание работ:", styles["Heading4"]))
-            elements.append(Paragraph(wo["description"], styles["Normal"]))
-            elements.append(Spacer(1, 12))
-
-        # Findings
-        if wo.get("findings"):
-            elements.append(Paragraph("Замечания / Findings:", styles["Heading4"]))
-            elements.append(Paragraph(wo["findings"], styles["Normal"]))
-            elements.append(Spacer(1, 12))
-
-        # CRS block
-        if wo.get("crs_signed_by"):
-            elements.append(Spacer(1, 20))
-            elements.append(Paragraph("CERTIFICATE OF RELEASE TO SERVICE (CRS)", styles["Heading3"]))
-            elements.append(Paragraph(
-                f"Certifies that the work specified was carried out in accordance with "
-                f"Part-145 and the aircraft/component is considered ready for release to service.",
-                styles["Normal"]
-            ))
-            elements.append(Spacer(1, 8))
-            crs_data = [
-                ["CRS подписал / Signed by:", wo["crs_signed_by"]],
-                ["Дата / Date:", wo.get("crs_date", "")],
-                ["Основание / Ref:", "ФАП-145 п.145.A.50; EASA Part-145.A.50"],
-            ]
-            ct = Table(crs_data, colWidths=[180, 340])
-            ct.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (0, -1), colors.Color(0.85, 0.95, 0.85)),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("FONTSIZE", (0, 0), (-1, -1), 9),
-            ]))
-            elements.append(ct)
-
-        # Footer
-        elements.append(Spacer(1, 30))
-        elements.append(Paragraph(
-            f"Сформировано: {dt.now().strftime('%d.%m.%Y %H:%M')} | АСУ ТК КЛГ",
-            styles["Normal"]
-        ))
-
-        doc.build(elements)
-        buf.seek(0)
-
-        audit(db, user, "pdf_export", "work_order", entity_id=wo_id,
-              description=f"PDF WO {wo.get('wo_number', '?')}")
-        db.commit()
-
-        return StreamingResponse(
-            buf,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=WO_{wo.get('wo_number', 'report')}.pdf"},
-        )
+        pdf = pdf_service.render("work_order", {**wo, "generated_at": utc_date()})
     except ImportError:
         raise HTTPException(500, "ReportLab not installed")
 
+    audit(db, user, "pdf_export", "work_order", entity_id=wo_id,
+          description=f"PDF WO {wo.get('wo_number', '?')}")
+    db.commit()
+
+    return Response(
+        pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=WO_{wo.get('wo_number', 'report')}.pdf"},
+    )
+
+
+class WorkOrderPdfBatch(BaseModel):
+    ids: List[str] = Field(default=[], description="ID нарядов; пусто — все наряды со статусом status")
+    status: Optional[str] = Field("closed", description="Фильтр, если ids не заданы (закрытие месяца)")
+
+
+@router.post("/report/pdf/batch")
+def generate_wo_pdf_batch(data: WorkOrderPdfBatch, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    Пакетная генерация PDF (CRS) по нарядам — один ZIP-поток.
+    PDF рендерятся в пуле процессов и отдаются по мере готовности.
+    """
+    from fastapi.responses import StreamingResponse
+    from app.core.config import settings
+    from app.services.pdf_renderer import pdf_service, render_zip_stream, utc_date
+
+    if data.ids:
+        ids = list(dict.fromkeys(data.ids))  # повторы в запросе — один PDF
+        missing = [i for i in ids if i not in _work_orders]
+        if missing:
+            raise HTTPException(404, f"Work Orders not found: {', '.join(missing[:10])}")
+        wos = [_work_orders[i] for i in ids]
+    else:
+        wos = [w for w in _work_orders.values() if not data.status or w.get("status") == data.status]
+    if not wos:
+        raise HTTPException(404, "No work orders to render")
+    if len(wos) > settings.PDF_BATCH_MAX:
+        raise HTTPException(400, f"Слишком много нарядов: {len(wos)} > {settings.PDF_BATCH_MAX}")
+
+    audit(db, user, "pdf_export_batch", "work_order",
+          description=f"PDF ZIP: {len(wos)} WO")
+    db.commit()
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M")
+    generated_at = utc_date()
+    return StreamingResponse(
+        render_zip_stream(pdf_service, "work_order", [{**wo, "generated_at": generated_at} for wo in wos],
+                          lambda wo: f"WO_{wo.get('wo_number', wo['id'])}.pdf"),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=WO_batch_{stamp}.zip"},
+    )
+
 
 
 @router.post("/batch-from-program/{program_id}")
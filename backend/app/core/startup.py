@@ -0,0 +1,54 @@
+"""
+Замер холодного старта процесса API.
+
+Точка отсчёта — импорт этого модуля (первая строка app.main); фазы lifespan
+замеряются через phase(). Итог отдаётся в /health (checks["startup"]).
+"""
+import os
+import time
+from contextlib import contextmanager
+
+_T0 = time.monotonic()
+_phases: dict[str, float] = {}
+_ready_ms: float | None = None
+
+
+def _process_age_ms() -> float | None:
+    """Время от запуска процесса до импорта модуля (Linux: /proc/self/stat)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000 - (time.monotonic() - _T0) * 1000)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_PRE_IMPORT_MS = _process_age_ms()
+
+
+@contextmanager
+def phase(name: str):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        _phases[name] = round((time.monotonic() - started) * 1000, 1)
+
+
+def mark_ready() -> None:
+    global _ready_ms
+    _ready_ms = round((time.monotonic() - _T0) * 1000, 1)
+
+
+def report() -> dict:
+    from app.core.config import settings
+    return {
+        "mode": settings.STARTUP_MODE,
+        "ready": _ready_ms is not None,
+        "cold_start_ms": None if _ready_ms is None else round(_ready_ms + (_PRE_IMPORT_MS or 0), 1),
+        "import_to_ready_ms": _ready_ms,
+        "interpreter_ms": None if _PRE_IMPORT_MS is None else round(_PRE_IMPORT_MS, 1),
+        "phases": dict(_phases),
+    }
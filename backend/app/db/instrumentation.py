@@ -0,0 +1,233 @@
+"""
+Инструментирование SQL: запросы, время БД и строки на HTTP-запрос.
+
+События SQLAlchemy before/after_cursor_execute на engine складывают статистику в
+RequestQueryStats текущего запроса (ContextVar, ставит QueryStatsMiddleware):
+- число запросов, суммарное время БД, число строк → заголовок Server-Timing
+  и гистограммы Prometheus по шаблону маршрута (/metrics);
+- медленные запросы (>= SQL_SLOW_QUERY_MS) → лог klg.sql.slow с нормализованным
+  текстом (литералы и параметры заменены на ?), агрегаты по форме запроса;
+- SQL_N_PLUS_ONE=warn|raise (dev/test): одна и та же форма запроса, выполненная
+  >= SQL_N_PLUS_ONE_THRESHOLD раз за запрос, помечается как N+1
+  (warn — лог и заголовок X-N-Plus-One, raise — NPlusOneError).
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger("klg.sql")
+slow_logger = logging.getLogger("klg.sql.slow")
+
+
+class NPlusOneError(RuntimeError):
+    """Повторяющаяся форма запроса в пределах одного HTTP-запроса (SQL_N_PLUS_ONE=raise)."""
+
+
+@dataclass
+class RequestQueryStats:
+    scope: dict | None = field(default=None, repr=False)
+    count: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    shapes: Counter = field(default_factory=Counter)
+    n_plus_one: list[str] = field(default_factory=list)
+
+    @property
+    def route(self) -> str:
+        """Шаблон маршрута из ASGI scope: маршрутизация заполняет его до вызова обработчика."""
+        return getattr((self.scope or {}).get("route"), "path", None) or "unmatched"
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries, {self.rows} rows"'
+
+
+_current: ContextVar[RequestQueryStats | None] = ContextVar("klg_sql_stats", default=None)
+
+
+def begin_request(scope: dict | None = None) -> tuple[RequestQueryStats, object]:
+    stats = RequestQueryStats(scope=scope)
+    return stats, _current.set(stats)
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def current_stats() -> RequestQueryStats | None:
+    return _current.get()
+
+
+# ---------------------------------------------------------------------------
+# Нормализация текста запроса
+# ---------------------------------------------------------------------------
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_PARAM = re.compile(r"%\(\w+\)s|%s|\?|:\w+|\$\d+")
+_RE_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_statement(sql: str) -> str:
+    """SELECT ... WHERE id = %(id_1)s / 'abc' / 42 / IN (1, 2, 3) → единая форма с ?."""
+    s = _RE_STRING.sub("?", sql)
+    s = _RE_PARAM.sub("?", s)
+    s = _RE_NUMBER.sub("?", s)
+    s = _RE_IN_LIST.sub("(?, ...)", s)
+    return _RE_SPACE.sub(" ", s).strip()
+
+
+# ---------------------------------------------------------------------------
+# Гистограммы (in-memory, текстовый формат Prometheus — как в metrics.py)
+# ---------------------------------------------------------------------------
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counts: dict[str, list[int]] = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self._sum: dict[str, float] = defaultdict(float)
+
+    def observe(self, label: str, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[label][i] += 1
+            self._sum[label] += value
+
+    def render(self, label_name: str = "route") -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v), self._sum[k]) for k, v in self._counts.items())
+        for label, counts, total in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_name}="{label}"}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label_name}="{label}"}} {cumulative}')
+        return lines
+
+
+queries_per_request = Histogram(
+    "klg_db_queries_per_request", "SQL statements per HTTP request",
+    (1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+db_seconds_per_request = Histogram(
+    "klg_db_seconds_per_request", "Total DB time per HTTP request",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+rows_per_request = Histogram(
+    "klg_db_rows_per_request", "Rows returned/affected per HTTP request",
+    (1, 10, 100, 1000, 10000, 100000),
+)
+
+# Медленные запросы: последние N и агрегаты по форме
+_slow_recent: deque = deque(maxlen=200)
+_slow_by_shape: dict[str, dict] = {}
+_slow_lock = threading.Lock()
+n_plus_one_total = 0
+
+
+def record_request(stats: RequestQueryStats) -> None:
+    if not stats.count:
+        return
+    queries_per_request.observe(stats.route, stats.count)
+    db_seconds_per_request.observe(stats.route, stats.seconds)
+    rows_per_request.observe(stats.route, stats.rows)
+
+
+def slow_queries(limit: int = 50) -> dict:
+    with _slow_lock:
+        recent = list(_slow_recent)[-limit:]
+        shapes = sorted(_slow_by_shape.values(), key=lambda s: s["total_ms"], reverse=True)[:limit]
+    return {"recent": recent[::-1], "by_shape": shapes}
+
+
+def render_prometheus() -> list[str]:
+    lines = queries_per_request.render() + db_seconds_per_request.render() + rows_per_request.render()
+    lines += [
+        "# HELP klg_db_slow_queries_total Statements slower than SQL_SLOW_QUERY_MS",
+        "# TYPE klg_db_slow_queries_total counter",
+        f"klg_db_slow_queries_total {sum(s['count'] for s in _slow_by_shape.values())}",
+        "# HELP klg_db_n_plus_one_total Statement shapes flagged as N+1 within a request",
+        "# TYPE klg_db_n_plus_one_total counter",
+        f"klg_db_n_plus_one_total {n_plus_one_total}",
+    ]
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# События engine
+# ---------------------------------------------------------------------------
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("klg_query_start", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    global n_plus_one_total
+    starts = conn.info.get("klg_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    slow_ms = settings.SQL_SLOW_QUERY_MS
+    mode = settings.SQL_N_PLUS_ONE
+    need_shape = (stats is not None and mode != "off") or (slow_ms and elapsed * 1000 >= slow_ms)
+    shape = normalize_statement(statement) if need_shape else None
+
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        rc = getattr(cursor, "rowcount", -1)
+        if rc is not None and rc > 0:
+            stats.rows += rc
+        if mode != "off":
+            stats.shapes[shape] += 1
+            if stats.shapes[shape] == settings.SQL_N_PLUS_ONE_THRESHOLD:
+                stats.n_plus_one.append(shape)
+                n_plus_one_total += 1
+                logger.warning("N+1 suspected on %s: %d× %s", stats.route, stats.shapes[shape], shape[:300])
+                if mode == "raise":
+                    raise NPlusOneError(f"{stats.route}: {shape[:300]}")
+
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        ms = round(elapsed * 1000, 1)
+        route = stats.route if stats is not None else "-"
+        slow_logger.warning("slow query %.1f ms route=%s: %s", ms, route, shape[:1000])
+        with _slow_lock:
+            _slow_recent.append({"ms": ms, "route": route, "statement": shape[:1000], "at": time.time()})
+            agg = _slow_by_shape.setdefault(shape, {"statement": shape[:1000], "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            agg["count"] += 1
+            agg["total_ms"] = round(agg["total_ms"] + ms, 1)
+            agg["max_ms"] = max(agg["max_ms"], ms)
+
+
+def _on_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("klg_query_start"):
+        conn.info["klg_query_start"].pop()
+
+
+def install(engine: Engine) -> None:
+    """Подключить события к engine (идемпотентно)."""
+    if not settings.SQL_INSTRUMENTATION or event.contains(engine, "before_cursor_execute", _before):
+        return
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    event.listen(engine, "handle_error", _on_error)
@@ -0,0 +1,188 @@
+"""
+Маршрутизация сессий: primary (запись) и read-реплика (чтение).
+
+RoutingSession.get_bind выбирает engine на каждый оператор:
+- запись (flush ORM, INSERT/UPDATE/DELETE, не-SELECT text()) — всегда primary,
+  после неё сессия «прилипает» к primary до конца (read-your-writes);
+- чтение — реплика, если сессия помечена use_replica (GET-запросы, отчёты), а
+  реплика доступна и отстаёт не больше DB_REPLICA_MAX_LAG_S; иначе — primary;
+- после commit с записью ключ клиента (Authorization / IP) держится на primary
+  DB_REPLICA_STICKY_S секунд — следующий GET видит свои же изменения.
+
+Отставание реплики проверяется не чаще DB_REPLICA_LAG_CHECK_S (pg_last_xact_replay_timestamp);
+ошибка проверки — откат на primary. Счётчики маршрутизации, откатов и пулов
+по engine — в /metrics (render_prometheus).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class EngineRouter:
+    """Пара engine + состояние реплики (отставание, sticky-окна, счётчики)."""
+
+    def __init__(self, primary: Engine, replica: Engine | None = None):
+        self.primary = primary
+        self.replica = replica if replica is not None and replica is not primary else None
+        self._lock = threading.Lock()
+        self._lag: float | None = 0.0
+        self._lag_checked = 0.0
+        self._sticky: dict[str, float] = {}
+        self.routed: Counter = Counter()
+        self.fallbacks: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica is not None
+
+    # ------------------------------------------------------------------
+    # Отставание реплики
+    # ------------------------------------------------------------------
+    def _probe_lag(self) -> float | None:
+        if self.replica.dialect.name != "postgresql":
+            return 0.0
+        try:
+            with self.replica.connect() as conn:
+                return float(conn.execute(_LAG_SQL).scalar() or 0.0)
+        except Exception as e:
+            logger.warning("replica lag probe failed: %s", e)
+            return None
+
+    def replica_lag(self) -> float | None:
+        """Отставание, с; None — реплика недоступна. Кэшируется на DB_REPLICA_LAG_CHECK_S."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._lag_checked < settings.DB_REPLICA_LAG_CHECK_S:
+                return self._lag
+            self._lag_checked = now
+        lag = self._probe_lag()
+        with self._lock:
+            self._lag = lag
+        return lag
+
+    def replica_usable(self) -> bool:
+        lag = self.replica_lag()
+        if lag is None:
+            self.fallbacks["unavailable"] += 1
+            return False
+        if lag > settings.DB_REPLICA_MAX_LAG_S:
+            self.fallbacks["lag"] += 1
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Read-your-writes между запросами
+    # ------------------------------------------------------------------
+    def mark_write(self, key: str | None) -> None:
+        if not key or not self.enabled:
+            return
+        until = time.monotonic() + settings.DB_REPLICA_STICKY_S
+        with self._lock:
+            self._sticky[key] = until
+            if len(self._sticky) > 10000:
+                now = time.monotonic()
+                self._sticky = {k: t for k, t in self._sticky.items() if t > now}
+
+    def is_sticky(self, key: str | None) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            until = self._sticky.get(key)
+        return until is not None and until > time.monotonic()
+
+    # ------------------------------------------------------------------
+    def render_prometheus(self) -> list[str]:
+        lines = [
+            "# HELP klg_db_routed_total Statements routed per engine",
+            "# TYPE klg_db_routed_total counter",
+        ]
+        lines += [f'klg_db_routed_total{{engine="{name}"}} {self.routed[name]}' for name in ("primary", "replica")]
+        lines += [
+            "# HELP klg_db_replica_fallback_total Reads sent to primary instead of replica",
+            "# TYPE klg_db_replica_fallback_total counter",
+        ]
+        lines += [f'klg_db_replica_fallback_total{{reason="{r}"}} {self.fallbacks[r]}'
+                  for r in ("sticky", "lag", "unavailable")]
+        if self.enabled:
+            lag = self._lag
+            lines += [
+                "# HELP klg_db_replica_lag_seconds Last measured replica lag (-1 unavailable)",
+                "# TYPE klg_db_replica_lag_seconds gauge",
+                f"klg_db_replica_lag_seconds {lag if lag is not None else -1:.3f}",
+            ]
+        lines += [
+            "# HELP klg_db_pool_checked_out Connections checked out per engine pool",
+            "# TYPE klg_db_pool_checked_out gauge",
+        ]
+        for name, eng in (("primary", self.primary), ("replica", self.replica)):
+            if eng is None:
+                continue
+            checked_out = getattr(eng.pool, "checkedout", None)
+            size = getattr(eng.pool, "size", None)
+            if callable(checked_out):
+                lines.append(f'klg_db_pool_checked_out{{engine="{name}"}} {checked_out()}')
+            if callable(size):
+                lines.append(f'klg_db_pool_size{{engine="{name}"}} {size()}')
+        return lines
+
+
+def sticky_key(authorization: str | None, client_host: str | None) -> str | None:
+    raw = authorization or client_host
+    return hashlib.sha1(raw.encode()).hexdigest() if raw else None
+
+
+def _is_write(clause) -> bool:
+    if clause is None:
+        return False
+    if getattr(clause, "is_dml", False):
+        return True
+    if isinstance(clause, TextClause):
+        head = clause.text.lstrip()[:10].upper()
+        return not head.startswith(("SELECT", "WITH", "SHOW", "SET", "EXPLAIN"))
+    return False
+
+
+class RoutingSession(Session):
+    """Session с выбором engine на оператор (см. модуль). info: use_replica, sticky_key, wrote."""
+
+    def __init__(self, *args, router: EngineRouter | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        router = self.router
+        if router is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+        if router.enabled and self.info.get("use_replica") and not self.info.get("wrote"):
+            if router.replica_usable():
+                router.routed["replica"] += 1
+                return router.replica
+        router.routed["primary"] += 1
+        return router.primary
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session: RoutingSession) -> None:
+    if session.info.get("wrote") and session.router is not None:
+        session.router.mark_write(session.info.get("sticky_key"))
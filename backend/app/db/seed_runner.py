@@ -0,0 +1,235 @@
+"""
+Одноразовая загрузка начальных / демо-данных (вынесено из lifespan).
+
+Запуск (job / initContainer / docker-compose demo-seed):
+    python -m app.db.seed_runner run [--schema] [--force]
+    python -m app.db.seed_runner snapshot --out ./data/seed-snapshot
+    python -m app.db.seed_runner status
+
+- Версия данных хранится в seed_versions; при совпадении SEED_VERSION job
+  завершается после одного SELECT.
+- Параллельные запуски сериализуются pg_advisory_lock — N воркеров/подов не
+  гоняются за одними и теми же сидами.
+- Если есть снапшот с той же версией и целевые таблицы пусты, данные грузятся
+  COPY FROM из CSV (одна транзакция, порядок по FK); иначе выполняются
+  seed-функции (идемпотентные, как и раньше).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SEED_NAME = "demo"
+# Увеличить при изменении любой seed-функции — снапшот нужно пересобрать
+SEED_VERSION = 1
+ADVISORY_LOCK_KEY = 0x4B4C4753  # "KLGS"
+
+# Порядок важен: типы/организации раньше ВС, ВС раньше полного демо
+SEED_STEPS = (
+    ("checklists", "app.demo.seed_checklists:seed_checklists"),
+    ("document_templates", "app.demo.seed_document_templates:seed_document_templates"),
+    ("organizations", "app.db.seed_organizations:seed_organizations"),
+    ("aircraft_types", "app.db.seed_aircraft_types:seed_aircraft_types"),
+    ("aircraft_demo", "app.db.seed_aircraft_demo:seed_aircraft_demo"),
+    ("full_demo", "app.demo.seed_full_demo:seed_full_demo"),
+)
+
+# Не входят в снапшот: журнал аудита и сам маркер версии
+SNAPSHOT_EXCLUDE = {"audit_log", "seed_versions"}
+MANIFEST = "manifest.json"
+
+
+def prepare_schema() -> None:
+    """create_all + партиции audit_log (dev / demo без Alembic)."""
+    from app import models  # noqa: F401
+    from app.db.base import Base
+    from app.db.session import engine
+    from app.services.audit_partitions import ensure_partitions
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        ensure_partitions(conn)
+
+
+@contextmanager
+def advisory_lock(conn: Connection):
+    """Сессионная advisory-блокировка PostgreSQL (SQLite — без блокировки)."""
+    if conn.dialect.name != "postgresql":
+        yield
+        return
+    conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY})
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+        conn.commit()
+
+
+def current_version(conn: Connection) -> int | None:
+    from app.models.seed_version import SeedVersion
+    SeedVersion.__table__.create(conn, checkfirst=True)
+    conn.commit()
+    return conn.execute(select(SeedVersion.version).where(SeedVersion.name == SEED_NAME)).scalar()
+
+
+def _record_version(conn: Connection, source: str, duration_ms: int) -> None:
+    from app.models.seed_version import SeedVersion
+    table = SeedVersion.__table__
+    conn.execute(table.delete().where(table.c.name == SEED_NAME))
+    conn.execute(table.insert().values(
+        name=SEED_NAME, version=SEED_VERSION, source=source, duration_ms=duration_ms,
+        applied_at=datetime.now(timezone.utc),
+    ))
+    conn.commit()
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_manifest(snapshot_dir: str | Path) -> dict | None:
+    path = Path(snapshot_dir) / MANIFEST
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _snapshot_usable(conn: Connection, snapshot_dir: Path) -> dict | None:
+    if conn.dialect.name != "postgresql":
+        return None
+    manifest = read_manifest(snapshot_dir)
+    if not manifest or manifest.get("seed_version") != SEED_VERSION:
+        return None
+    for entry in manifest["tables"]:
+        if _sha256(snapshot_dir / entry["file"]) != entry["sha256"]:
+            logger.warning("Seed snapshot %s: checksum mismatch, falling back to routines", entry["file"])
+            return None
+        if conn.execute(text(f'SELECT EXISTS (SELECT 1 FROM "{entry["table"]}")')).scalar():
+            return None
+    return manifest
+
+
+def load_snapshot(conn: Connection, snapshot_dir: Path, manifest: dict) -> int:
+    """COPY FROM CSV в одной транзакции; таблицы — в порядке FK из манифеста."""
+    raw = conn.connection.dbapi_connection
+    rows = 0
+    with raw.cursor() as cur:
+        for entry in manifest["tables"]:
+            with open(snapshot_dir / entry["file"], "rb") as f:
+                cur.copy_expert(f'COPY "{entry["table"]}" FROM STDIN WITH (FORMAT csv, HEADER true)', f)
+            rows += entry["rows"]
+    conn.commit()
+    return rows
+
+
+def run_routines() -> None:
+    for name, target in SEED_STEPS:
+        module, func_name = target.split(":")
+        started = time.monotonic()
+        getattr(importlib.import_module(module), func_name)()
+        logger.info("seed %s: %.0f ms", name, (time.monotonic() - started) * 1000)
+
+
+def run_seeds(snapshot_dir: str | None = None, force: bool = False) -> dict:
+    """Применить начальные данные, если версия в БД отстаёт. Безопасно для параллельного запуска."""
+    from app.db.session import engine
+
+    snapshot = Path(snapshot_dir or settings.SEED_SNAPSHOT_DIR)
+    with engine.connect() as conn, advisory_lock(conn):
+        version = current_version(conn)
+        if version is not None and version >= SEED_VERSION and not force:
+            return {"status": "up_to_date", "version": version}
+        started = time.monotonic()
+        manifest = _snapshot_usable(conn, snapshot)
+        conn.commit()
+        if manifest:
+            rows = load_snapshot(conn, snapshot, manifest)
+            source = "snapshot"
+        else:
+            run_routines()
+            rows = None
+            source = "routines"
+        duration_ms = int((time.monotonic() - started) * 1000)
+        _record_version(conn, source, duration_ms)
+    logger.info("Seed v%s applied from %s in %s ms", SEED_VERSION, source, duration_ms)
+    return {"status": "applied", "version": SEED_VERSION, "source": source, "rows": rows, "duration_ms": duration_ms}
+
+
+def write_snapshot(out_dir: str | Path) -> dict:
+    """Выгрузить заполненные таблицы (COPY TO CSV) + manifest.json. Только PostgreSQL."""
+    from app import models  # noqa: F401
+    from app.db.base import Base
+    from app.db.session import engine
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    tables = []
+    with engine.connect() as conn:
+        if conn.dialect.name != "postgresql":
+            raise RuntimeError("seed snapshot requires PostgreSQL (COPY)")
+        raw = conn.connection.dbapi_connection
+        for table in Base.metadata.sorted_tables:
+            if table.name in SNAPSHOT_EXCLUDE:
+                continue
+            count = conn.execute(select(func.count()).select_from(table)).scalar()
+            if not count:
+                continue
+            path = out / f"{table.name}.csv"
+            with raw.cursor() as cur, open(path, "wb") as f:
+                cur.copy_expert(f'COPY "{table.name}" TO STDOUT WITH (FORMAT csv, HEADER true)', f)
+            tables.append({"table": table.name, "file": path.name, "rows": count, "sha256": _sha256(path)})
+    manifest = {
+        "seed_version": SEED_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "tables": tables,
+    }
+    (out / MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description="KLG seed job")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="применить начальные данные")
+    p_run.add_argument("--schema", action="store_true", help="create_all перед загрузкой (без Alembic)")
+    p_run.add_argument("--force", action="store_true", help="игнорировать версию в seed_versions")
+    p_run.add_argument("--snapshot", default=None, help="каталог снапшота (по умолчанию SEED_SNAPSHOT_DIR)")
+    p_snap = sub.add_parser("snapshot", help="собрать снапшот из текущей БД")
+    p_snap.add_argument("--out", default=settings.SEED_SNAPSHOT_DIR)
+    sub.add_parser("status", help="версия в БД и снапшота")
+    args = parser.parse_args()
+
+    if args.cmd == "run":
+        if args.schema:
+            prepare_schema()
+        print(json.dumps(run_seeds(args.snapshot, force=args.force), ensure_ascii=False))
+    elif args.cmd == "snapshot":
+        m = write_snapshot(args.out)
+        print(json.dumps({"tables": len(m["tables"]), "rows": sum(t["rows"] for t in m["tables"])}))
+    else:
+        from app.db.session import engine
+        with engine.connect() as c:
+            db_version = current_version(c)
+        manifest = read_manifest(settings.SEED_SNAPSHOT_DIR)
+        print(json.dumps({"code": SEED_VERSION, "database": db_version,
+                          "snapshot": manifest and manifest["seed_version"]}))
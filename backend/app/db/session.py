@@ -2,61 +2,91 @@
 Database session management.
 Sync engine for Alembic migrations + async-compatible session for routes.
 Production: use connection pool with proper limits.
+Read-реплика (DATABASE_REPLICA_URL): GET-запросы и отчёты читают с неё — app.db.routing.
 """
-from sqlalchemy import create_engine, event, text
+from fastapi import Request
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.core.config import settings
+from app.db.routing import EngineRouter, RoutingSession, sticky_key
 
 # ---------------------------------------------------------------------------
 # Engine configuration
 # ---------------------------------------------------------------------------
 _is_sqlite = "sqlite" in (settings.database_url or "")
-_connect_args = {"check_same_thread": False} if _is_sqlite else {}
-
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=not _is_sqlite,
-    connect_args=_connect_args,
-    # Production pool settings for multi-user
-    pool_size=20 if not _is_sqlite else 5,
-    max_overflow=10 if not _is_sqlite else 0,
-    pool_timeout=30,
-    pool_recycle=1800,  # recycle connections every 30 min
-    echo=False,
+
+
+def _make_engine(url: str, pool_size: int, max_overflow: int):
+    sqlite = "sqlite" in url
+    return create_engine(
+        url,
+        pool_pre_ping=not sqlite,
+        connect_args={"check_same_thread": False} if sqlite else {},
+        # Production pool settings for multi-user
+        pool_size=pool_size if not sqlite else 5,
+        max_overflow=max_overflow if not sqlite else 0,
+        pool_timeout=30,
+        pool_recycle=1800,  # recycle connections every 30 min
+        echo=False,
+    )
+
+
+engine = _make_engine(settings.database_url, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+replica_engine = (
+    _make_engine(settings.database_replica_url, settings.DB_REPLICA_POOL_SIZE, settings.DB_REPLICA_MAX_OVERFLOW)
+    if settings.database_replica_url else None
 )
+db_router = EngineRouter(engine, replica_engine)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, router=db_router)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Счётчики запросов / время БД на HTTP-запрос, медленные запросы, N+1
+from app.db.instrumentation import install as _install_instrumentation  # noqa: E402
+_install_instrumentation(engine)
+if replica_engine is not None:
+    _install_instrumentation(replica_engine)
 
 
 # ---------------------------------------------------------------------------
-# Multi-tenancy: set current org_id on connection (for RLS)
+# Multi-tenancy: app.current_org_id на транзакцию (RLS) — app.db.tenant
 # ---------------------------------------------------------------------------
-@event.listens_for(engine, "checkout")
-def _reset_tenant(dbapi_conn, connection_record, connection_proxy):
-    """Reset tenant context on connection checkout from pool."""
-    cursor = dbapi_conn.cursor()
-    try:
-        cursor.execute("SET LOCAL app.current_org_id = ''")
-    except Exception:
-        pass  # SQLite doesn't support SET LOCAL
-    finally:
-        cursor.close()
+from app.db import tenant as _tenant  # noqa: E402
+
+_tenant.install(engine)
+if replica_engine is not None:
+    _tenant.install(replica_engine)
+_tenant.install_session(RoutingSession)
 
 
 def set_tenant(db: Session, org_id: str | None):
-    """Set the current tenant for RLS policies. Uses bound parameter to avoid SQL injection."""
-    if org_id is not None and not _is_sqlite:
-        db.execute(text("SET LOCAL app.current_org_id = :org_id").bindparams(org_id=org_id or ""))
+    """Явно задать арендатора сессии (фоновые задачи). Применяется со следующей транзакции;
+    в уже открытой — сразу, параметром set_config."""
+    db.info["tenant"] = org_id or ""
+    if not _is_sqlite and settings.ENABLE_RLS and db.in_transaction():
+        db.execute(text("SELECT set_config('app.current_org_id', :org_id, true)"), {"org_id": org_id or ""})
 
 
 # ---------------------------------------------------------------------------
 # Dependency injection
 # ---------------------------------------------------------------------------
-def get_db():
-    """FastAPI dependency: yields a DB session, closes on exit."""
+def get_db(request: Request = None):
+    """FastAPI dependency: yields a DB session, closes on exit.
+
+    GET/HEAD читают с реплики, если клиент не писал в последние DB_REPLICA_STICKY_S секунд.
+    Организация пользователя (RLS) подклеивается к первому оператору каждой транзакции.
+    """
     db = SessionLocal()
+    if request is not None and db_router.enabled:
+        key = sticky_key(request.headers.get("authorization"), request.client.host if request.client else None)
+        db.info["sticky_key"] = key
+        if request.method in ("GET", "HEAD"):
+            if db_router.is_sticky(key):
+                db_router.fallbacks["sticky"] += 1
+            else:
+                db.info["use_replica"] = True
     try:
         yield db
     finally:
         db.close()
+
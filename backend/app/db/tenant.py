@@ -0,0 +1,108 @@
+"""
+Контекст арендатора (организации) для RLS — без лишних обращений к БД.
+
+Политики RLS (alembic 0005) сравнивают строки с current_setting('app.current_org_id').
+Значение задаётся на транзакцию через set_config(..., true) и «подклеивается» к
+первому оператору транзакции (один round-trip вместо двух):
+
+    SELECT set_config('app.current_org_id', '<org>', true); SELECT ... FROM aircraft ...
+
+- get_current_user кладёт организацию пользователя в ContextVar (bind_user):
+  эксплуатанты — свой organization_id, остальные роли — '' (без ограничения,
+  как filter_by_org);
+- get_db помечает сессию; при старте транзакции (after_begin) значение ставится
+  в очередь на соединении, before_cursor_execute дописывает set_config к оператору;
+- вне HTTP-запроса (планировщик, сиды) контекст пуст — политики пропускают всё.
+
+Только PostgreSQL и ENABLE_RLS=true; для SQLite — no-op.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+SETTING = "app.current_org_id"
+_PENDING = "klg_tenant_pending"
+
+_current_org: ContextVar[str | None] = ContextVar("klg_tenant_org", default=None)
+
+
+def tenant_for(user) -> str:
+    """Значение app.current_org_id для пользователя: '' — без ограничения (не эксплуатант)."""
+    role = getattr(user, "role", "") or ""
+    if role.startswith("operator") and getattr(user, "organization_id", None):
+        return str(user.organization_id)
+    return ""
+
+
+def bind_user(user) -> None:
+    _current_org.set(tenant_for(user))
+
+
+def current_tenant() -> str | None:
+    return _current_org.get()
+
+
+@contextmanager
+def tenant_scope(org_id: str | None):
+    """Фоновый код от имени организации: with tenant_scope(org_id): ..."""
+    token = _current_org.set(org_id or "")
+    try:
+        yield
+    finally:
+        _current_org.reset(token)
+
+
+def _literal(value: str, has_params: bool) -> str:
+    value = value.replace("'", "''")
+    return value.replace("%", "%%") if has_params else value
+
+
+def set_config_sql(org_id: str, has_params: bool = False) -> str:
+    return f"SELECT set_config('{SETTING}', '{_literal(org_id, has_params)}', true)"
+
+
+# ---------------------------------------------------------------------------
+# События
+# ---------------------------------------------------------------------------
+def _after_begin(session: Session, transaction, connection) -> None:
+    if not settings.ENABLE_RLS or connection.dialect.name != "postgresql":
+        return
+    org = session.info.get("tenant")
+    if org is None:
+        org = current_tenant()
+    connection.info[_PENDING] = org or ""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    org = conn.info.pop(_PENDING, None)
+    if org is None:
+        return statement, parameters
+    if executemany:
+        cursor.execute(set_config_sql(org))
+        return statement, parameters
+    return f"{set_config_sql(org, bool(parameters))}; {statement}", parameters
+
+
+def _on_end(conn) -> None:
+    conn.info.pop(_PENDING, None)
+
+
+def install(engine: Engine) -> None:
+    """Подключить подклейку set_config к engine (идемпотентно)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute, retval=True)
+    event.listen(engine, "commit", _on_end)
+    event.listen(engine, "rollback", _on_end)
+
+
+def install_session(session_cls) -> None:
+    if not event.contains(session_cls, "after_begin", _after_begin):
+        event.listen(session_cls, "after_begin", _after_begin)
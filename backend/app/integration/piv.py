@@ -18,8 +18,6 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any
 
-import httpx
-
 from app.core.config import settings
 
 
@@ -41,6 +39,8 @@ async def push_event(event_type: str, payload: dict[str, Any]) -> PIVResult:
     url = f"{settings.piv_base_url.rstrip('/')}/events"
     body = {"type": event_type, "payload": payload}
     try:
+        import httpx
+
         async with httpx.AsyncClient(timeout=settings.piv_timeout_s) as client:
             r = await client.post(url, json=body)
         if 200 <= r.status_code < 300:
@@ -3,6 +3,7 @@
 Серверное многопользовательское решение.
 Разработчик: АО «REFLY»
 """
+from app.core import startup  # noqa: I001 — первым: точка отсчёта холодного старта
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, status
@@ -10,89 +11,69 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
-from app.db.session import engine
-from app.db.base import Base
 from app.services.risk_scheduler import setup_scheduler
-from app.api.routes import (
-    health_router,
-    stats_router,
-    organizations_router,
-    aircraft_router,
-    cert_applications_router,
-    attachments_router,
-    notifications_router,
-    ingest_router,
-    airworthiness_router,
-    modifications_router,
-    users_router,
-    legal_router,
-    risk_alerts_router,
-    checklists_router,
-    checklist_audits_router,
-    inbox_router,
-    tasks_router,
-    audit_router,
-    ai_router,
-    document_templates_router,
-)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup / shutdown events."""
-    # Create tables if they don't exist (dev only; production uses Alembic)
-    Base.metadata.create_all(bind=engine)
-    try:
-        from app.demo.seed_checklists import seed_checklists
-        seed_checklists()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Checklist seed skipped: %s", e)
-    try:
-        from app.demo.seed_document_templates import seed_document_templates
-        seed_document_templates()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Document templates seed skipped: %s", e)
-    try:
-        from app.db.seed_organizations import seed_organizations
-        seed_organizations()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Organizations seed skipped: %s", e)
-    try:
-        from app.db.seed_aircraft_types import seed_aircraft_types
-        seed_aircraft_types()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Aircraft types seed skipped: %s", e)
-    try:
-        from app.db.seed_aircraft_demo import seed_aircraft_demo
-        seed_aircraft_demo()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Aircraft demo seed skipped: %s", e)
-    try:
-        from app.demo.seed_full_demo import seed_full_demo
-        seed_full_demo()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Full demo seed skipped: %s", e)
+    """Startup / shutdown events.
+
+    STARTUP_MODE=serve — только обслуживание запросов: схема (Alembic) и начальные
+    данные (python -m app.db.seed_runner run) готовятся отдельным job до выката.
+    STARTUP_MODE=dev — create_all + seed job в процессе (под advisory lock и seed_versions).
+    """
+    import logging
+    if settings.STARTUP_MODE == "dev":
+        try:
+            from app.db.seed_runner import prepare_schema, run_seeds
+            with startup.phase("schema"):
+                prepare_schema()
+            with startup.phase("seed"):
+                run_seeds()
+        except Exception as e:
+            logging.getLogger(__name__).warning("Schema/seed skipped: %s", e)
     try:
+        # In-memory хранилища ядра ПЛГ — состояние процесса, заполняется в каждом воркере
         from app.db.session import SessionLocal
         from app.models.aircraft_db import Aircraft
         from app.api.routes.airworthiness_core import seed_airworthiness_core_demo
-        db = SessionLocal()
-        ac = db.query(Aircraft).filter(Aircraft.registration_number == "RA-89060").first() or db.query(Aircraft).first()
-        aircraft_id = str(ac.id) if ac else None
-        db.close()
-        seed_airworthiness_core_demo(aircraft_id)
+        with startup.phase("inmemory_demo"):
+            db = SessionLocal()
+            ac = db.query(Aircraft).filter(Aircraft.registration_number == "RA-89060").first() or db.query(Aircraft).first()
+            aircraft_id = str(ac.id) if ac else None
+            db.close()
+            seed_airworthiness_core_demo(aircraft_id)
     except Exception as e:
-        import logging
         logging.getLogger(__name__).warning("Airworthiness core demo seed skipped: %s", e)
+    # Реестр inbox: схема и индексы SQLite — один раз на процесс, далее пул соединений
+    try:
+        from app.services.inbox_store import inbox_store
+        with startup.phase("inbox_store"):
+            inbox_store().init()
+    except Exception as e:
+        logging.getLogger(__name__).warning("Inbox store init skipped: %s", e)
+    # Конвейер извлечения данных из документов inbox (фоновый поток + пулы)
+    if settings.ENABLE_AI and settings.INBOX_EXTRACT_ENABLED:
+        from app.services.inbox_extraction import extraction_pipeline
+        with startup.phase("inbox_extraction"):
+            extraction_pipeline.start()
     # Планировщик рисков (передаём app для shutdown hook)
-    setup_scheduler(app)
+    with startup.phase("scheduler"):
+        setup_scheduler(app)
+    startup.mark_ready()
     yield
+    # Дренировать буфер журнала аудита (AUDIT_MODE=buffered)
+    from app.services.audit_writer import audit_writer
+    audit_writer.stop()
+    # Дослать очередь писем; не успевшее — в email_outbox
+    from app.services.email_service import email_service
+    email_service.delivery.stop()
+    from app.services.pdf_renderer import pdf_service
+    pdf_service.shutdown()
+    from app.services.inbox_extraction import extraction_pipeline
+    extraction_pipeline.stop()
+    from app.services.inbox_store import inbox_store
+    inbox_store().close()
 
 
 from app.middleware.request_logger import RequestLoggerMiddleware
@@ -157,8 +138,12 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Докачка: tus (app.services.resumable) и Range-ответы (app.services.file_responses)
+    expose_headers=["Location", "Tus-Resumable", "Tus-Version", "Tus-Extension", "Tus-Max-Size",
+                    "Tus-Checksum-Algorithm", "Upload-Offset", "Upload-Length", "Upload-Expires",
+                    "ETag", "Accept-Ranges", "Content-Range", "Content-Disposition"],
 )
 
 # ---------------------------------------------------------------------------
@@ -176,34 +161,17 @@ AUTH_DEPENDENCY = [Depends(get_current_user)]
 # ---------------------------------------------------------------------------
 # Prometheus metrics
 # ---------------------------------------------------------------------------
-from app.api.routes.fgis_revs import router as fgis_revs_router
-from app.api.routes.notification_prefs import router as notification_prefs_router
-from app.api.routes.import_export import router as import_export_router
-from app.api.routes.global_search import router as global_search_router
-from app.api.routes.work_orders import router as work_orders_router
-from app.api.routes.defects import router as defects_router
-from app.api.routes.airworthiness_core import router as airworthiness_core_router
-from app.api.routes.personnel_plg import router as personnel_plg_router
-from app.api.routes.regulator import router as regulator_router
-from app.api.routes.backup import router as backup_router
-from app.api.routes.batch import router as batch_router
-from app.api.routes.export import router as export_router
-from app.api.routes.metrics import router as metrics_router, MetricsMiddleware
-app.include_router(fgis_revs_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(notification_prefs_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(import_export_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(global_search_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(work_orders_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(defects_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(airworthiness_core_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(personnel_plg_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(regulator_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(backup_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(batch_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(export_router, prefix=settings.API_V1_PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(metrics_router, prefix=settings.API_V1_PREFIX)
+from app.api.routes.metrics import MetricsMiddleware
 app.add_middleware(MetricsMiddleware)
 
+# SQL на запрос: Server-Timing, гистограммы по шаблону маршрута, детектор N+1
+from app.middleware.query_stats import QueryStatsMiddleware
+app.add_middleware(QueryStatsMiddleware)
+
+# Профилирование выбранных запросов (заголовок X-Profile / маршруты / доля) — /profiling
+from app.middleware.profiling import ProfilingMiddleware
+app.add_middleware(ProfilingMiddleware)
+
 
 # ---------------------------------------------------------------------------
 # Rate limiting
@@ -237,27 +205,8 @@ app.add_exception_handler(Exception, general_exception_handler)
 # ---------------------------------------------------------------------------
 PREFIX = settings.API_V1_PREFIX
 
-app.include_router(health_router, prefix=PREFIX)
-app.include_router(stats_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(organizations_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(aircraft_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(cert_applications_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(attachments_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(notifications_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(ingest_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(airworthiness_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(modifications_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(users_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(legal_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(risk_alerts_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(checklists_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(checklist_audits_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(inbox_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(tasks_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(audit_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(ai_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-app.include_router(document_templates_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY)
-
-# WebSocket (no prefix — direct path)
-from app.api.routes.ws_notifications import router as ws_router
-app.include_router(ws_router, prefix=PREFIX, dependencies=[])
+# Порядок и флаги функций — app.api.routes.ROUTER_MODULES; модули отключённых
+# функций (ENABLE_AI / ENABLE_FGIS / ENABLE_LEGAL) не импортируются
+from app.api.routes import iter_routers
+for _module, _router, _auth in iter_routers(settings):
+    app.include_router(_router, prefix=PREFIX, dependencies=AUTH_DEPENDENCY if _auth else [])
@@ -0,0 +1,23 @@
+"""Семплирующее профилирование выбранных запросов (app.services.profiler)."""
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.services.profiler import profiler
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        reason = profiler.wants(request.headers.get("x-profile"))
+        if reason is None:
+            return await call_next(request)
+        profile = profiler.start(request.scope, reason)
+        try:
+            response = await call_next(request)
+        except Exception:
+            profiler.finish(profile, "unmatched", keep=False)
+            raise
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        profiler.finish(profile, route)
+        if not profile.dropped:
+            response.headers["X-Profile-Samples"] = str(sum(profile.samples.values()))
+        return response
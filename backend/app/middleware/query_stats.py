@@ -0,0 +1,23 @@
+"""SQL-статистика на запрос: Server-Timing, гистограммы по шаблону маршрута, N+1 (app.db.instrumentation)."""
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.db import instrumentation
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        stats, token = instrumentation.begin_request(request.scope)
+        try:
+            response = await call_next(request)
+        finally:
+            instrumentation.end_request(token)
+        instrumentation.record_request(stats)
+        app_ms = (time.perf_counter() - start) * 1000
+        response.headers["Server-Timing"] = f'{stats.server_timing()}, app;dur={app_ms:.1f}'
+        if stats.n_plus_one:
+            response.headers["X-N-Plus-One"] = str(len(stats.n_plus_one))
+        return response
@@ -18,6 +18,13 @@ from app.models.personnel_plg import PLGSpecialist, PLGAttestation, PLGQualifica
 from app.models.airworthiness_core import ADDirective, ServiceBulletin, LifeLimit, MaintenanceProgram, AircraftComponent
 from app.models.work_orders import WorkOrder
 from app.models.document_template import DocumentTemplate
+from app.models.seed_version import SeedVersion
+from app.models.number_counter import NumberCounter
+from app.models.storage_blob import StorageBlob
+from app.models.email_outbox import EmailOutbox
+from app.models.notification_preference import NotificationPreference
+from app.models.reliability import DefectDaily, UtilizationDaily
+from app.models.flight_log import FlightLeg
 from app.models.legal import (
     DocumentType,
     Jurisdiction,
@@ -69,4 +76,12 @@ __all__ = [
     "AircraftComponent",
     "WorkOrder",
     "DocumentTemplate",
+    "SeedVersion",
+    "NumberCounter",
+    "StorageBlob",
+    "EmailOutbox",
+    "NotificationPreference",
+    "DefectDaily",
+    "UtilizationDaily",
+    "FlightLeg",
 ]
@@ -16,6 +16,9 @@ class Aircraft(Base):
     status = Column(String(50), default="active")
     is_active = Column(Boolean, default=True)
     notes = Column(Text)
+    # Наработка ВС (TTSN / TCSN): журнал полётов (app.services.utilization); NULL — не введена
+    total_time = Column(Float)
+    total_cycles = Column(Integer)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
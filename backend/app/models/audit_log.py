@@ -1,10 +1,14 @@
 """
 Audit log for multi-tenant tracking: who changed what, when.
 Part-M-RU M.A.305-306 compliance: all changes to airworthiness data must be logged.
+
+PostgreSQL: table is RANGE-partitioned by month on created_at (alembic 0003,
+partitions maintained by app.services.audit_partitions). Indexes are composite
+and match /audit/events query shapes: filter + ORDER BY created_at DESC.
 """
 from datetime import datetime, timezone
 
-from sqlalchemy import String, DateTime, Text, JSON
+from sqlalchemy import String, DateTime, Text, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -14,29 +18,36 @@ from app.models.common import uuid4_str
 class AuditLog(Base):
     """Immutable audit trail entry."""
     __tablename__ = "audit_log"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid4_str)
     
     # Who
-    user_id: Mapped[str] = mapped_column(String(36), nullable=False, index=True)
+    user_id: Mapped[str] = mapped_column(String(36), nullable=False)
     user_email: Mapped[str | None] = mapped_column(String(255), nullable=True)
     user_role: Mapped[str | None] = mapped_column(String(64), nullable=True)
-    organization_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)
+    organization_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
     
     # What
-    action: Mapped[str] = mapped_column(String(32), nullable=False, index=True, doc="create|update|delete|read|login|export")
-    entity_type: Mapped[str] = mapped_column(String(64), nullable=False, index=True, doc="Table name / entity type")
-    entity_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)
+    action: Mapped[str] = mapped_column(String(50), nullable=False, doc="create|update|delete|read|login|export")
+    entity_type: Mapped[str] = mapped_column(String(100), nullable=False, doc="Table name / entity type")
+    entity_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
     
     # Details
     changes: Mapped[dict | None] = mapped_column(JSON, nullable=True, doc="JSON diff: {field: {old, new}}")
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     ip_address: Mapped[str | None] = mapped_column(String(64), nullable=True)
     
-    # When
+    # When (входит в PK — требование PostgreSQL к ключу партиционирования)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
-        index=True,
+        primary_key=True,
     )
+
+
+Index("ix_audit_log_entity_created", AuditLog.entity_type, AuditLog.entity_id, AuditLog.created_at.desc())
+Index("ix_audit_log_user_created", AuditLog.user_id, AuditLog.created_at.desc())
+Index("ix_audit_log_org_created", AuditLog.organization_id, AuditLog.created_at.desc())
+Index("ix_audit_log_created", AuditLog.created_at.desc())
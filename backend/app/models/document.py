@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import BigInteger, String, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -15,5 +15,7 @@ class Attachment(Base, TimestampMixin):
     owner_id: Mapped[str] = mapped_column(String(36), nullable=False, index=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     content_type: Mapped[str | None] = mapped_column(String(128), nullable=True)
-    storage_path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    storage_path: Mapped[str] = mapped_column(String(1024), nullable=False, doc="Ключ объекта (sha256); для старых записей — путь на диске")
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     uploaded_by_user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False)
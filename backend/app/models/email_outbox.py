@@ -0,0 +1,22 @@
+"""Очередь повторной отправки писем (app.services.email_service): временные отказы SMTP, остаток очереди при остановке."""
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.common import TimestampMixin, uuid4_str
+
+
+class EmailOutbox(Base, TimestampMixin):
+    __tablename__ = "email_outbox"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid4_str)
+    to_addr: Mapped[str] = mapped_column(String(320), nullable=False)
+    subject: Mapped[str] = mapped_column(String(998), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    html: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True,
+                                                      doc="Не раньше — следующая попытка; при выборке сдвигается (аренда)")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -0,0 +1,24 @@
+"""Журнал полётов: принятые рейсы (app.services.utilization) — ключ повторной доставки и источник налёта."""
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class FlightLeg(Base):
+    """Рейс ВС: налёт и циклы. Повторно присланный рейс (тот же leg_key) не учитывается."""
+
+    __tablename__ = "flight_legs"
+
+    aircraft_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    leg_key: Mapped[str] = mapped_column(String(96), primary_key=True,
+                                         doc="leg_id системы планирования или «рейс|взлёт»")
+    day: Mapped[date] = mapped_column(Date, nullable=False, index=True, doc="Дата рейса (UTC)")
+    flight_no: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    takeoff: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    landing: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    flight_hours: Mapped[float] = mapped_column(Float, nullable=False)
+    cycles: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    ingested_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
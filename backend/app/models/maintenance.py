@@ -6,16 +6,31 @@ from datetime import datetime, date
 - Статус выполненного технического обслуживания
 - Статус компонентов с ограниченным межремонтным ресурсом/сроком службы (LLP, HT)
 - Комплектующие изделия с ограниченным ресурсом (шасси)
+
+Строковые поля интервалов и счётчиков дублируются типизированными теневыми
+колонками (IntervalShadowMixin), которые заполняются при записи разбором строк
+(app.services.intervals) — по ним идут фильтры и сортировка в SQL.
 """
 
-from sqlalchemy import String, ForeignKey, Integer, DateTime, Text, Numeric
+from sqlalchemy import String, ForeignKey, Integer, DateTime, Date, Float, Text, Numeric, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
 from app.models.common import TimestampMixin, uuid4_str
 
 
-class MaintenanceTask(Base, TimestampMixin):
+class IntervalShadowMixin:
+    """Разобранный интервал («что наступит раньше»), остаток и календарный срок."""
+    interval_fh: Mapped[float | None] = mapped_column(Float, nullable=True, doc="Интервал, ч (FH)")
+    interval_fc: Mapped[float | None] = mapped_column(Float, nullable=True, doc="Интервал, циклы (FC)")
+    interval_months: Mapped[int | None] = mapped_column(Integer, nullable=True, doc="Интервал, календарные месяцы")
+    interval_days: Mapped[int | None] = mapped_column(Integer, nullable=True, doc="Интервал, дни")
+    remaining_fh: Mapped[float | None] = mapped_column(Float, nullable=True, index=True, doc="Остаток, ч (FH)")
+    remaining_fc: Mapped[float | None] = mapped_column(Float, nullable=True, index=True, doc="Остаток, циклы (FC)")
+    calendar_due: Mapped[date | None] = mapped_column(Date, nullable=True, index=True, doc="Календарный срок")
+
+
+class MaintenanceTask(IntervalShadowMixin, Base, TimestampMixin):
     """Статус выполненного технического обслуживания.
     
     Соответствует форме из ТЗ: Статус выполненного технического обслуживания.
@@ -41,7 +56,7 @@ class MaintenanceTask(Base, TimestampMixin):
     time_remaining: Mapped[str | None] = mapped_column(String(64), nullable=True, doc="Остаток до наступления Dead-line по таску")
 
 
-class LimitedLifeComponent(Base, TimestampMixin):
+class LimitedLifeComponent(IntervalShadowMixin, Base, TimestampMixin):
     """Компоненты с ограниченным межремонтным ресурсом/сроком службы (LLP, HT).
     
     Соответствует форме из ТЗ: Статус компонентов с ограниченным межремонтным ресурсом/сроком службы (LLP, HT).
@@ -70,8 +85,13 @@ class LimitedLifeComponent(Base, TimestampMixin):
     tsn: Mapped[str | None] = mapped_column(String(32), nullable=True, doc="Текущее значение счётчика FH компонента")
     csn: Mapped[str | None] = mapped_column(String(32), nullable=True, doc="Текущее значение счётчика FC компонента")
 
+    tsn_fh: Mapped[float | None] = mapped_column(Float, nullable=True, doc="tsn, ч")
+    csn_fc: Mapped[float | None] = mapped_column(Float, nullable=True, doc="csn, циклы")
+    tah_inst_fh: Mapped[float | None] = mapped_column(Float, nullable=True, doc="tah_inst, ч")
+    tac_inst_fc: Mapped[float | None] = mapped_column(Float, nullable=True, doc="tac_inst, циклы")
 
-class LandingGearComponent(Base, TimestampMixin):
+
+class LandingGearComponent(IntervalShadowMixin, Base, TimestampMixin):
     """Комплектующие изделия с ограниченным ресурсом (шасси).
     
     Соответствует форме из ТЗ: Комплектующие изделия с ограниченным ресурсом (шасси).
@@ -98,3 +118,24 @@ class LandingGearComponent(Base, TimestampMixin):
     tsr: Mapped[str | None] = mapped_column(String(32), nullable=True, doc="Значение, прошедшее с момента крайнего выполнения требования")
     expected: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True, doc="Ожидаемая дата")
     to_go: Mapped[str | None] = mapped_column(String(64), nullable=True, doc="Остаток до наступления требования")
+
+    tsn_fh: Mapped[float | None] = mapped_column(Float, nullable=True, doc="tsn, ч")
+    csn_fc: Mapped[float | None] = mapped_column(Float, nullable=True, doc="csn, циклы")
+    tsr_value: Mapped[float | None] = mapped_column(Float, nullable=True, doc="tsr в единицах dim")
+
+
+_SHADOW_SYNC = {
+    MaintenanceTask: "sync_maintenance_task",
+    LimitedLifeComponent: "sync_limited_life",
+    LandingGearComponent: "sync_landing_gear",
+}
+
+
+def _sync_shadows(mapper, connection, target) -> None:
+    from app.services import intervals  # numpy — только при записи
+    getattr(intervals, _SHADOW_SYNC[mapper.class_])(target)
+
+
+for _model in _SHADOW_SYNC:
+    event.listen(_model, "before_insert", _sync_shadows)
+    event.listen(_model, "before_update", _sync_shadows)
@@ -0,0 +1,41 @@
+"""Настройки уведомлений пользователя (app.services.notifications): типы событий и каналы доставки."""
+from sqlalchemy import Boolean, String, true, false
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.common import TimestampMixin
+
+
+def _flag(default: bool, doc: str) -> Mapped[bool]:
+    return mapped_column(Boolean, nullable=False, default=default, server_default=true() if default else false(),
+                         doc=doc)
+
+
+class NotificationPreference(Base, TimestampMixin):
+    """Нет строки — действуют значения по умолчанию (PREFERENCE_DEFAULTS)."""
+
+    __tablename__ = "notification_preferences"
+
+    user_id: Mapped[str] = mapped_column(
+        String(255), primary_key=True,
+        doc="users.external_subject — sub токена (UserInfo.id), как notifications.recipient_user_id",
+    )
+    ad_mandatory: Mapped[bool] = _flag(True, "Обязательные ДЛГ")
+    ad_recommended: Mapped[bool] = _flag(False, "Рекомендательные ДЛГ")
+    defect_critical: Mapped[bool] = _flag(True, "Критические дефекты")
+    defect_major: Mapped[bool] = _flag(True, "Значительные дефекты")
+    defect_minor: Mapped[bool] = _flag(False, "Незначительные дефекты")
+    wo_aog: Mapped[bool] = _flag(True, "AOG наряды")
+    wo_closed: Mapped[bool] = _flag(True, "Закрытие нарядов (CRS)")
+    life_limit_critical: Mapped[bool] = _flag(True, "Критические ресурсы")
+    personnel_expiry: Mapped[bool] = _flag(True, "Просрочка квалификации")
+    channels_email: Mapped[bool] = _flag(True, "Email уведомления")
+    channels_push: Mapped[bool] = _flag(False, "Push уведомления")
+    channels_ws: Mapped[bool] = _flag(True, "WebSocket real-time")
+
+
+PREFERENCE_DEFAULTS: dict[str, bool] = {
+    column.name: column.default.arg
+    for column in NotificationPreference.__table__.columns
+    if isinstance(column.type, Boolean)
+}
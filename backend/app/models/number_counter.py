@@ -0,0 +1,13 @@
+"""Счётчики номеров документов (app.services.numbering): заявки, наряды, дефекты."""
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class NumberCounter(Base):
+    __tablename__ = "number_counters"
+
+    scope: Mapped[str] = mapped_column(String(32), primary_key=True, doc="cert_application | work_order | defect")
+    period: Mapped[str] = mapped_column(String(16), primary_key=True, doc="YYYYMMDD")
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
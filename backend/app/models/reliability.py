@@ -0,0 +1,33 @@
+"""Суточные свёртки для программы надёжности (app.services.reliability): дефекты по ATA и налёт по ВС."""
+from datetime import date
+
+from sqlalchemy import Date, Float, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class DefectDaily(Base):
+    """Число дефектов ВС за сутки по главе ATA (defect_reports + реестр дефектов API)."""
+
+    __tablename__ = "reliability_defect_daily"
+    __table_args__ = (Index("ix_reliability_defect_daily_day", "day"),)
+
+    aircraft_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    ata_chapter: Mapped[str] = mapped_column(String(2), primary_key=True, doc="Глава ATA, «00» — не указана")
+    defects: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class UtilizationDaily(Base):
+    """Налёт ВС за сутки: из журнала полётов (flight_log) или по счётчикам aircraft_history (history)."""
+
+    __tablename__ = "reliability_utilization_daily"
+    __table_args__ = (Index("ix_reliability_utilization_daily_day", "day"),)
+
+    aircraft_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    flight_hours: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    cycles: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    source: Mapped[str] = mapped_column(String(16), nullable=False, default="history",
+                                        doc="flight_log — по фактическим полётам, приоритетнее history")
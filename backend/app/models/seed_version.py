@@ -0,0 +1,19 @@
+"""Версии применённых начальных данных (app.db.seed_runner)."""
+from datetime import datetime, timezone
+
+from sqlalchemy import String, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class SeedVersion(Base):
+    __tablename__ = "seed_versions"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    source: Mapped[str] = mapped_column(String(16), nullable=False, doc="snapshot|routines")
+    duration_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
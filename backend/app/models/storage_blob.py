@@ -0,0 +1,16 @@
+"""Объекты хранилища вложений (app.services.storage): sha256 содержимого и счётчик ссылок."""
+from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.common import TimestampMixin
+
+
+class StorageBlob(Base, TimestampMixin):
+    __tablename__ = "storage_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, index=True,
+                                           doc="Число вложений (attachments) с этим содержимым; 0 — кандидат на GC")
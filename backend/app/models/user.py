@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -14,6 +14,7 @@ class User(Base, TimestampMixin):
     """
 
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_organization_id_role", "organization_id", "role"),)
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=uuid4_str)
     external_subject: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
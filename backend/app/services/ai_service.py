@@ -2,6 +2,7 @@
 AI-сервис КЛГ АСУ ТК — использует исключительно Anthropic Claude API.
 Все AI-функции системы проходят через этот модуль.
 """
+import importlib.util
 import logging
 import os
 from typing import Any
@@ -29,6 +30,15 @@ def _get_client():
     return _client
 
 
+def is_available() -> bool:
+    """Настроен ли AI (ключ задан, пакет установлен) — без обращения к API."""
+    if _client is not None:
+        return True
+    if not os.getenv("ANTHROPIC_API_KEY", ""):
+        return False
+    return importlib.util.find_spec("anthropic") is not None
+
+
 def chat(
     prompt: str,
     system: str = "Ты — AI-ассистент системы КЛГ АСУ ТК (контроль лётной годности). Отвечай на русском языке, точно и по делу.",
@@ -0,0 +1,345 @@
+"""
+Применимость ДЛГ (AD) и сервисных бюллетеней (SB) к конкретным ВС
+(ВК РФ ст. 37; ФАП-148 п.4.3, 4.5; EASA Part-M.A.301).
+
+Директива применима к борту, если:
+    типы заданы  → один из типов — префикс токена типа ВС (ICAO, модель, производитель+модель, двигатель);
+    P/N заданы   → на борту установлен компонент с одним из P/N (карточки компонентов, Life Limits);
+    заданы оба   → оба условия.
+
+Обратные индексы «токен типа → директивы» и «P/N → директивы» хранятся как битовые
+множества (int), у каждого борта — своя строка матрицы применимости (int, бит на
+директиву). Статус борта — popcount(строка & маска открытых): микросекунды при
+тысячах директив. Пересчёт инкрементальный: изменение директивы трогает только
+борта с её типами / P/N, перемещение компонента — два борта, смена типа — один.
+
+Директивы и компоненты живут в хранилищах airworthiness_core (в памяти процесса);
+парк ВС берётся из БД — sync_fleet сверяет отпечаток (count, max(updated_at)) и
+перечитывает только изменённые борта.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+# Статусы, при которых директива требует выполнения
+OUTSTANDING = {"ad": frozenset({"open", "overdue"}), "sb": frozenset({"open"})}
+MIN_PREFIX = 2
+
+_NON_ALNUM = re.compile(r"[^0-9A-ZА-ЯЁ]")
+
+
+def norm(value) -> str:
+    """«SSJ-100» → «SSJ100», «cfm56-7b» → «CFM567B»."""
+    return _NON_ALNUM.sub("", str(value or "").upper())
+
+
+def aircraft_tokens(manufacturer=None, model=None, icao_code=None, engine_type=None) -> frozenset[str]:
+    tokens = {norm(icao_code), norm(model), norm(f"{manufacturer or ''}{model or ''}"),
+              norm(engine_type), norm(f"{(manufacturer or ' ')[0]}{model or ''}")}
+    return frozenset(t for t in tokens if len(t) >= MIN_PREFIX)
+
+
+class ApplicabilityEngine:
+    """Матрица «парк × директивы» (строка борта — int-битсет)."""
+
+    def __init__(self, directives: dict, bulletins: dict, components: dict, life_limits: dict):
+        self.stores = {"ad": directives, "sb": bulletins}
+        self.components = components
+        self.life_limits = life_limits
+        self._lock = threading.RLock()
+        self.rebuild()
+
+    # ------------------------------------------------------------------
+    # Построение
+    # ------------------------------------------------------------------
+    def rebuild(self) -> None:
+        with self._lock:
+            self._keys: list[tuple[str, str] | None] = []      # бит → (вид, id)
+            self._row: dict[tuple[str, str], int] = {}
+            self._free: list[int] = []
+            self._dir_types: dict[int, frozenset[str]] = {}
+            self._dir_parts: dict[int, frozenset[str]] = {}
+            self._type_bits: dict[str, int] = {}
+            self._pn_bits: dict[str, int] = {}
+            self._needs_type = 0
+            self._needs_part = 0
+            self._outstanding = 0
+            self._mandatory = 0
+            self._ad_rows = 0
+            # Парк
+            self._ac_tokens: dict[str, frozenset[str]] = {}
+            self._ac_reg: dict[str, str] = {}
+            self._reg_ac: dict[str, str] = {}
+            self._ac_parts: dict[str, Counter] = {}
+            self._part_of: dict[str, tuple[str | None, str]] = {}  # id записи → (борт, P/N)
+            self._token_ac: dict[str, set[str]] = {}
+            self._pn_ac: dict[str, set[str]] = {}
+            self._matrix: dict[str, int] = {}
+            for kind, store in self.stores.items():
+                for d in store.values():
+                    self._index_directive(kind, d)
+            for source in (self.components, self.life_limits):
+                for rec in source.values():
+                    self._index_part(rec)
+            for aircraft_id in list(self._ac_parts):
+                self._recompute(aircraft_id)
+            self._fleet_stamp = None  # парк перечитывается при следующем sync_fleet
+
+    # ------------------------------------------------------------------
+    # Директивы
+    # ------------------------------------------------------------------
+    def _index_directive(self, kind: str, d: dict) -> tuple[frozenset[str], frozenset[str]]:
+        """(Пере)индексировать директиву; возвращает (типы, P/N) до изменения."""
+        key = (kind, d["id"])
+        row = self._row.get(key)
+        if row is None:
+            row = self._free.pop() if self._free else len(self._keys)
+            if row == len(self._keys):
+                self._keys.append(key)
+            else:
+                self._keys[row] = key
+            self._row[key] = row
+        old_types = self._dir_types.get(row, frozenset())
+        old_parts = self._dir_parts.get(row, frozenset())
+        self._unindex_row(row)
+        types = frozenset(t for t in map(norm, d.get("aircraft_types") or []) if t)
+        parts = frozenset(p for p in map(norm, d.get("affected_parts") or []) if p)
+        bit = 1 << row
+        self._dir_types[row], self._dir_parts[row] = types, parts
+        for t in types:
+            self._type_bits[t] = self._type_bits.get(t, 0) | bit
+        for p in parts:
+            self._pn_bits[p] = self._pn_bits.get(p, 0) | bit
+        if types:
+            self._needs_type |= bit
+        if parts:
+            self._needs_part |= bit
+        if kind == "ad":
+            self._ad_rows |= bit
+        self._set_status_bit(kind, d, row)
+        return old_types, old_parts
+
+    def _unindex_row(self, row: int) -> None:
+        mask = ~(1 << row)
+        for t in self._dir_types.pop(row, ()):
+            self._type_bits[t] &= mask
+        for p in self._dir_parts.pop(row, ()):
+            self._pn_bits[p] &= mask
+        self._needs_type &= mask
+        self._needs_part &= mask
+        self._outstanding &= mask
+        self._mandatory &= mask
+        self._ad_rows &= mask
+
+    def _set_status_bit(self, kind: str, d: dict, row: int) -> None:
+        bit = 1 << row
+        if d.get("status") in OUTSTANDING[kind]:
+            self._outstanding |= bit
+        else:
+            self._outstanding &= ~bit
+        mandatory = d.get("compliance_type", "mandatory") == "mandatory" if kind == "ad" else d.get("category") == "mandatory"
+        self._mandatory = self._mandatory | bit if mandatory else self._mandatory & ~bit
+
+    def upsert_directive(self, kind: str, d: dict) -> None:
+        """Создание / изменение AD или SB: пересчёт бортов со старыми и новыми типами / P/N."""
+        with self._lock:
+            old_types, old_parts = self._index_directive(kind, d)
+            row = self._row[(kind, d["id"])]
+            # старые типы / P/N — борта, которым директива перестала быть применима
+            for aircraft_id in self._aircraft_matching(old_types | self._dir_types[row], old_parts | self._dir_parts[row]):
+                self._recompute(aircraft_id)
+
+    def set_status(self, kind: str, d: dict) -> None:
+        """Выполнение / отмена: меняется только маска открытых, строки бортов не трогаются."""
+        with self._lock:
+            row = self._row.get((kind, d["id"]))
+            if row is None:
+                self.upsert_directive(kind, d)
+            else:
+                self._set_status_bit(kind, d, row)
+
+    def remove_directive(self, kind: str, directive_id: str) -> None:
+        with self._lock:
+            row = self._row.pop((kind, directive_id), None)
+            if row is None:
+                return
+            self._unindex_row(row)
+            self._keys[row] = None
+            self._free.append(row)
+            mask = ~(1 << row)
+            for aircraft_id in self._matrix:
+                self._matrix[aircraft_id] &= mask
+
+    def _aircraft_matching(self, types: Iterable[str], parts: Iterable[str]) -> set[str]:
+        found: set[str] = set()
+        types = tuple(types)
+        if types:
+            for token, aircraft in self._token_ac.items():
+                if any(token.startswith(t) for t in types):
+                    found |= aircraft
+        for p in parts:
+            found |= self._pn_ac.get(p, set())
+        return found
+
+    # ------------------------------------------------------------------
+    # Компоненты (карточки, Life Limits)
+    # ------------------------------------------------------------------
+    def _index_part(self, rec: dict) -> tuple[str | None, ...]:
+        """Учесть установку записи; возвращает затронутые борта (старый, новый)."""
+        old = self._part_of.pop(rec["id"], None)
+        if old is not None:
+            old_ac, old_pn = old
+            if old_ac:
+                parts = self._ac_parts[old_ac]
+                parts[old_pn] -= 1
+                if parts[old_pn] <= 0:
+                    del parts[old_pn]
+                    self._pn_ac.get(old_pn, set()).discard(old_ac)
+        aircraft_id, pn = rec.get("aircraft_id"), norm(rec.get("part_number"))
+        if rec.get("condition") == "scrapped":
+            aircraft_id = None
+        self._part_of[rec["id"]] = (aircraft_id, pn)
+        if aircraft_id and pn:
+            self._ac_parts.setdefault(aircraft_id, Counter())[pn] += 1
+            self._pn_ac.setdefault(pn, set()).add(aircraft_id)
+        return (old[0] if old else None), aircraft_id
+
+    def upsert_part(self, rec: dict) -> None:
+        """Установка / перемещение компонента (Part-M.A.501): пересчёт старого и нового борта."""
+        with self._lock:
+            for aircraft_id in set(self._index_part(rec)):
+                if aircraft_id:
+                    self._recompute(aircraft_id)
+
+    # ------------------------------------------------------------------
+    # Парк
+    # ------------------------------------------------------------------
+    def set_aircraft(self, aircraft_id: str, registration: str | None, tokens: frozenset[str]) -> None:
+        """Новый борт или смена типа / регистрации — пересчёт одной строки."""
+        with self._lock:
+            for t in self._ac_tokens.get(aircraft_id, ()):
+                self._token_ac.get(t, set()).discard(aircraft_id)
+            old_reg = self._ac_reg.get(aircraft_id)
+            if old_reg:
+                self._reg_ac.pop(norm(old_reg), None)
+            self._ac_tokens[aircraft_id] = tokens
+            for t in tokens:
+                self._token_ac.setdefault(t, set()).add(aircraft_id)
+            if registration:
+                self._ac_reg[aircraft_id] = registration
+                self._reg_ac[norm(registration)] = aircraft_id
+            self._recompute(aircraft_id)
+
+    def remove_aircraft(self, aircraft_id: str) -> None:
+        with self._lock:
+            for t in self._ac_tokens.pop(aircraft_id, ()):
+                self._token_ac.get(t, set()).discard(aircraft_id)
+            reg = self._ac_reg.pop(aircraft_id, None)
+            if reg:
+                self._reg_ac.pop(norm(reg), None)
+            self._matrix.pop(aircraft_id, None)
+
+    def sync_fleet(self, db: Session) -> None:
+        """Сверить парк с БД по отпечатку; перечитать и пересчитать только изменённые борта."""
+        from app.models import Aircraft, AircraftType
+
+        stamp = tuple(db.query(func.count(Aircraft.id), func.max(Aircraft.updated_at)).one()) + \
+            tuple(db.query(func.count(AircraftType.id), func.max(AircraftType.updated_at)).one())
+        if stamp == self._fleet_stamp:
+            return
+        rows = (db.query(Aircraft.id, Aircraft.registration_number, AircraftType.manufacturer,
+                         AircraftType.model, AircraftType.icao_code, AircraftType.engine_type)
+                .outerjoin(AircraftType, Aircraft.aircraft_type_id == AircraftType.id).all())
+        with self._lock:
+            seen = set()
+            for aircraft_id, reg, manufacturer, model, icao, engine_type in rows:
+                seen.add(aircraft_id)
+                tokens = aircraft_tokens(manufacturer, model, icao, engine_type)
+                if self._ac_tokens.get(aircraft_id) != tokens or self._ac_reg.get(aircraft_id) != reg:
+                    self.set_aircraft(aircraft_id, reg, tokens)
+            for aircraft_id in [a for a in self._ac_tokens if a not in seen]:
+                self.remove_aircraft(aircraft_id)
+            self._fleet_stamp = stamp
+
+    # ------------------------------------------------------------------
+    # Матрица
+    # ------------------------------------------------------------------
+    def _type_match(self, tokens: Iterable[str]) -> int:
+        bits = 0
+        for token in tokens:
+            for end in range(MIN_PREFIX, len(token) + 1):
+                bits |= self._type_bits.get(token[:end], 0)
+        return bits
+
+    def _recompute(self, aircraft_id: str) -> None:
+        t = self._type_match(self._ac_tokens.get(aircraft_id, ()))
+        p = 0
+        for pn in self._ac_parts.get(aircraft_id, ()):
+            p |= self._pn_bits.get(pn, 0)
+        bits = (t & ~self._needs_part) | (p & ~self._needs_type) | (t & p)
+        if aircraft_id in self._ac_tokens or bits:
+            self._matrix[aircraft_id] = bits
+
+    # ------------------------------------------------------------------
+    # Запросы
+    # ------------------------------------------------------------------
+    def aircraft_id_for(self, registration: str) -> str | None:
+        return self._reg_ac.get(norm(registration))
+
+    def registration_of(self, aircraft_id: str) -> str | None:
+        return self._ac_reg.get(aircraft_id)
+
+    def _expand(self, bits: int) -> list[tuple[str, str]]:
+        keys = []
+        while bits:
+            low = bits & -bits
+            keys.append(self._keys[low.bit_length() - 1])
+            bits ^= low
+        return keys
+
+    def applicable(self, aircraft_id: str, outstanding_only: bool = False) -> list[dict]:
+        with self._lock:
+            bits = self._matrix.get(aircraft_id, 0)
+            if outstanding_only:
+                bits &= self._outstanding
+            return [self.stores[kind][did] for kind, did in self._expand(bits) if did in self.stores[kind]]
+
+    def summary(self, aircraft_id: str) -> dict:
+        """Счётчики для статуса ЛГ борта — только битовые операции."""
+        with self._lock:
+            bits = self._matrix.get(aircraft_id, 0)
+            ad_mask = self._ad_rows
+            open_bits = bits & self._outstanding
+            return {
+                "applicable_directives": (bits & ad_mask).bit_count(),
+                "applicable_bulletins": (bits & ~ad_mask).bit_count(),
+                "open_directives": (open_bits & ad_mask).bit_count(),
+                "open_mandatory_directives": (open_bits & ad_mask & self._mandatory).bit_count(),
+                "open_bulletins": (open_bits & ~ad_mask).bit_count(),
+            }
+
+    def aircraft_for(self, kind: str, directive_id: str) -> list[str]:
+        """Борта, к которым применима директива (столбец матрицы)."""
+        with self._lock:
+            row = self._row.get((kind, directive_id))
+            if row is None:
+                return []
+            bit = 1 << row
+            return [a for a, bits in self._matrix.items() if bits & bit]
+
+    def matrix(self, outstanding_only: bool = True) -> dict[str, list[str]]:
+        """Разреженная матрица: борт → id применимых (открытых) директив."""
+        with self._lock:
+            out = {}
+            for aircraft_id, bits in self._matrix.items():
+                if outstanding_only:
+                    bits &= self._outstanding
+                if bits:
+                    out[aircraft_id] = [did for _, did in self._expand(bits)]
+            return out
@@ -0,0 +1,225 @@
+"""
+Обслуживание партиций audit_log (PostgreSQL, RANGE по created_at, помесячно).
+
+Уровни хранения (M.A.305 — записи не удаляются, только переносятся):
+- hot: присоединённые партиции за AUDIT_HOT_RETENTION_MONTHS месяцев — доступны /audit/events;
+- archive: старые партиции отсоединяются (DETACH), выгружаются COPY в
+  AUDIT_ARCHIVE_DIR/audit_log_YYYY_MM.csv.gz (+ .sha256) и удаляются из БД.
+
+Если обслуживание не запускалось дольше AUDIT_PARTITION_MONTHS_AHEAD, строки месяца
+без партиции попадают в audit_log_default, и CREATE … PARTITION OF для этого месяца
+падает (строки default нарушают новую границу). Перед созданием такого месяца его
+строки переносятся из default: DETACH default → CREATE партиции → INSERT строк
+месяца через родителя → DELETE из default → ATTACH default. Каждый месяц — в своём
+SAVEPOINT: сбой логируется, месяц пропускается, остальное обслуживание продолжается.
+
+Запуск: ежедневно из планировщика (risk_scheduler) или вручную:
+    python -m app.services.audit_partitions [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT = "audit_log"
+DEFAULT = f"{PARENT}_default"
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :t"
+    ), {"t": PARENT}).scalar())
+
+
+def list_partitions(conn: Connection) -> list[str]:
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :t ORDER BY c.relname"
+    ), {"t": PARENT}).scalars().all()
+    return list(rows)
+
+
+def default_months(conn: Connection, before: date) -> list[date]:
+    """Месяцы (до before), строки которых лежат в default-партиции."""
+    if DEFAULT not in set(list_partitions(conn)):
+        return []
+    rows = conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', created_at)::date FROM \"{DEFAULT}\" "
+        "WHERE created_at < :before ORDER BY 1"
+    ), {"before": before}).scalars().all()
+    return list(rows)
+
+
+def _create_month(conn: Connection, month: date) -> int:
+    """CREATE партиции месяца; строки месяца из default — в неё. Возвращает число перенесённых строк."""
+    name = partition_name(month)
+    bounds = {"lo": month, "hi": add_months(month, 1)}
+    create = (f'CREATE TABLE "{name}" PARTITION OF {PARENT} '
+              f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+    in_month = "created_at >= :lo AND created_at < :hi"
+    has_default = DEFAULT in set(list_partitions(conn))
+    if not has_default or not conn.execute(
+            text(f'SELECT 1 FROM "{DEFAULT}" WHERE {in_month} LIMIT 1'), bounds).scalar():
+        conn.execute(text(create))
+        return 0
+    conn.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION "{DEFAULT}"'))
+    conn.execute(text(create))
+    moved = conn.execute(text(f'INSERT INTO {PARENT} SELECT * FROM "{DEFAULT}" WHERE {in_month}'), bounds).rowcount
+    conn.execute(text(f'DELETE FROM "{DEFAULT}" WHERE {in_month}'), bounds)
+    conn.execute(text(f'ALTER TABLE {PARENT} ATTACH PARTITION "{DEFAULT}" DEFAULT'))
+    logger.warning("audit_log: moved %d rows of %s out of %s", moved, month.strftime("%Y-%m"), DEFAULT)
+    return moved
+
+
+def create_months(conn: Connection, months: list[date]) -> list[str]:
+    """Создать партиции месяцев (каждую в SAVEPOINT); сбой — лог и пропуск месяца."""
+    existing = set(list_partitions(conn))
+    created = []
+    for month in months:
+        name = partition_name(month)
+        if name in existing:
+            continue
+        try:
+            with conn.begin_nested():
+                _create_month(conn, month)
+        except DBAPIError:
+            logger.exception("audit_log: cannot create partition %s, skipped", name)
+            continue
+        existing.add(name)
+        created.append(name)
+    return created
+
+
+def ensure_partitions(conn: Connection, months_ahead: int | None = None, start: date | None = None) -> list[str]:
+    """Создать помесячные партиции от start (по умолчанию — текущий месяц) на months_ahead вперёд.
+
+    Прошедшие месяцы, строки которых попали в default, тоже получают партиции.
+    """
+    if not is_partitioned(conn):
+        return []
+    months_ahead = settings.AUDIT_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    first = month_start(start or datetime.now(timezone.utc).date())
+    months = default_months(conn, first) + [add_months(first, i) for i in range(months_ahead + 1)]
+    created = create_months(conn, months)
+    if DEFAULT not in set(list_partitions(conn)):
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{DEFAULT}" PARTITION OF {PARENT} DEFAULT'))
+    if created:
+        logger.info("audit_log: created partitions %s", ", ".join(created))
+    return created
+
+
+def _partition_month(name: str) -> date | None:
+    try:
+        y, m = name[len(PARENT) + 1:].split("_")
+        return date(int(y), int(m), 1)
+    except ValueError:
+        return None
+
+
+def archive_old_partitions(
+    conn: Connection,
+    retention_months: int | None = None,
+    archive_dir: str | None = None,
+    dry_run: bool = False,
+) -> list[dict]:
+    """DETACH + COPY в gzip + DROP для партиций старше retention_months.
+
+    Старые строки из default сначала переносятся в партиции своих месяцев (create_months).
+    """
+    if not is_partitioned(conn):
+        return []
+    retention_months = settings.AUDIT_HOT_RETENTION_MONTHS if retention_months is None else retention_months
+    out_dir = Path(archive_dir or settings.AUDIT_ARCHIVE_DIR)
+    cutoff = add_months(month_start(datetime.now(timezone.utc).date()), -retention_months)
+    archived = []
+    if dry_run:
+        archived += [{"partition": partition_name(m), "dry_run": True, "from_default": True}
+                     for m in default_months(conn, cutoff)]
+    else:
+        create_months(conn, default_months(conn, cutoff))
+    for name in list_partitions(conn):
+        month = _partition_month(name)
+        if month is None or month >= cutoff:
+            continue
+        if dry_run:
+            archived.append({"partition": name, "dry_run": True})
+            continue
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{name}.csv.gz"
+        conn.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION "{name}"'))
+        rows = _copy_to_gzip(conn, name, path)
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        (out_dir / f"{name}.csv.gz.sha256").write_text(f"{digest}  {path.name}\n")
+        conn.execute(text(f'DROP TABLE "{name}"'))
+        logger.info("audit_log: archived %s (%d rows) → %s", name, rows, path)
+        archived.append({"partition": name, "rows": rows, "file": str(path), "sha256": digest})
+    return archived
+
+
+def _copy_to_gzip(conn: Connection, table: str, path: Path) -> int:
+    """COPY TO STDOUT через psycopg2 (copy_expert) со сжатием на лету."""
+    raw = conn.connection.dbapi_connection
+    tmp = path.with_suffix(".tmp")
+    with raw.cursor() as cur, gzip.open(tmp, "wb", compresslevel=6) as gz:
+        cur.copy_expert(f'COPY "{table}" TO STDOUT WITH (FORMAT csv, HEADER true)', gz)
+        rows = cur.rowcount
+    os.replace(tmp, path)
+    return rows
+
+
+def run_maintenance(dry_run: bool = False) -> dict:
+    """Создать партиции наперёд и архивировать старые — отдельными транзакциями:
+    сбой создания не останавливает архивирование."""
+    from app.db.session import engine
+
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False}
+    created: list[str] = []
+    if not dry_run:
+        try:
+            with engine.begin() as conn:
+                created = ensure_partitions(conn)
+        except DBAPIError:
+            logger.exception("audit_log: partition creation failed")
+    with engine.begin() as conn:
+        archived = archive_old_partitions(conn, dry_run=dry_run)
+    return {"partitioned": True, "created": created, "archived": archived}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="audit_log partition maintenance")
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет архивировано")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(run_maintenance(dry_run=args.dry_run))
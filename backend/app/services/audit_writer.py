@@ -0,0 +1,264 @@
+"""
+Фоновая пакетная запись журнала аудита (AUDIT_MODE=buffered).
+
+Part-M-RU M.A.305: записи не теряются — очередь ограничена, при переполнении
+запрос ждёт (backpressure), при остановке очередь дренируется.
+
+Поток записей:
+  audit() → session.info["audit_pending"] → after_commit → очередь → writer-поток
+  → multi-row INSERT (executemany, psycopg2 execute_values) пачками AUDIT_BATCH_SIZE.
+Откат транзакции запроса отбрасывает её записи — как и в transactional режиме.
+Порядок — FIFO одного потока-потребителя; записи параллельных транзакций в очереди
+могут чередоваться.
+
+Недоступность БД (OperationalError / InterfaceError) — пачка повторяется до успеха.
+Иную ошибку (битая строка) пачка получает AUDIT_WRITE_ATTEMPTS раз, затем делится
+пополам до отвергнутых строк; они уходят в AUDIT_DEAD_LETTER_PATH, остальные пишутся —
+одна строка не останавливает журнал.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import event, insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "audit_pending"
+_STOP = object()
+
+
+class AuditWriter:
+    """Однопоточный фоновый писатель audit_log с ограниченной очередью."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] | None = None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        max_queue: int | None = None,
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.AUDIT_FLUSH_INTERVAL_MS / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue or settings.AUDIT_QUEUE_MAX)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # Наблюдаемость
+        self.written_total = 0
+        self.batches_total = 0
+        self.errors_total = 0
+        self.dead_letter_total = 0
+        self.last_flush_seconds = 0.0
+        self.flush_seconds_sum = 0.0
+        self.max_flush_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            logger.info("Audit writer started (batch=%d, interval=%.3fs)", self.batch_size, self.flush_interval)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Дренировать очередь и остановить поток (graceful shutdown)."""
+        with self._lock:
+            if not self.running:
+                return
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.error("Audit writer did not drain in %.0fs, %d entries left", timeout, self.depth)
+            else:
+                logger.info("Audit writer stopped, %d entries written", self.written_total)
+            self._thread = None
+
+    def submit(self, rows: list[dict]) -> None:
+        """Поставить записи в очередь. Блокирует при переполнении — записи не отбрасываются."""
+        if not rows:
+            return
+        if not self.running:
+            self.start()
+        for row in rows:
+            self._queue.put(row)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Дождаться записи всего, что уже в очереди (для тестов и CLI)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "mode": settings.AUDIT_MODE,
+            "running": self.running,
+            "queue_depth": self.depth,
+            "written_total": self.written_total,
+            "batches_total": self.batches_total,
+            "errors_total": self.errors_total,
+            "dead_letter_total": self.dead_letter_total,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+        }
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: list[dict] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                stopping = True
+                self._queue.task_done()
+            else:
+                batch.append(item)
+            # Добрать пачку без ожидания
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                    continue
+                batch.append(item)
+            if batch:
+                self._write_with_retry(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_with_retry(self, batch: list[dict]) -> None:
+        """Повторять пачку: при недоступности БД — до успеха, иначе AUDIT_WRITE_ATTEMPTS раз, затем делить."""
+        delay = 0.1
+        attempts = 0
+        while True:
+            try:
+                self._write(batch)
+                return
+            except Exception as e:
+                self.errors_total += 1
+                attempts += 1
+                if not _is_outage(e) and attempts >= settings.AUDIT_WRITE_ATTEMPTS:
+                    logger.error("Audit batch write failed %d times (%d rows), isolating bad rows: %s",
+                                 attempts, len(batch), e)
+                    self._isolate(batch, e)
+                    return
+                logger.error("Audit batch write failed (%d rows), retry in %.1fs: %s", len(batch), delay, e)
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+
+    def _isolate(self, batch: list[dict], error: Exception) -> None:
+        """Деление пополам до строк, которые БД отвергает по одной; порядок остальных сохраняется."""
+        if len(batch) == 1:
+            self._dead_letter(batch[0], error)
+            return
+        mid = len(batch) // 2
+        for part in (batch[:mid], batch[mid:]):
+            try:
+                self._write(part)
+            except Exception as e:
+                self.errors_total += 1
+                if _is_outage(e):
+                    self._write_with_retry(part)
+                else:
+                    self._isolate(part, e)
+
+    def _dead_letter(self, row: dict, error: Exception) -> None:
+        self.dead_letter_total += 1
+        logger.error("Audit entry %s rejected, moved to %s: %s", row.get("id"), settings.AUDIT_DEAD_LETTER_PATH, error)
+        try:
+            path = settings.AUDIT_DEAD_LETTER_PATH
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"row": row, "error": str(error)[:500]}, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.critical("Audit dead-letter write failed, entry lost: %r (%s)", row, e)
+
+    def _write(self, batch: list[dict]) -> None:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        start = time.perf_counter()
+        db = self._session_factory()
+        try:
+            db.execute(insert(AuditLog.__table__), batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - start
+        self.written_total += len(batch)
+        self.batches_total += 1
+        self.last_flush_seconds = elapsed
+        self.flush_seconds_sum += elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+
+def _is_outage(e: Exception) -> bool:
+    """БД недоступна (соединение, рестарт) — пачка не виновата, повтор без деления."""
+    return isinstance(e, (OperationalError, InterfaceError)) or getattr(e, "connection_invalidated", False)
+
+
+audit_writer = AuditWriter()
+
+
+def is_buffered() -> bool:
+    return settings.AUDIT_MODE == "buffered"
+
+
+def hold(session: Session, row: dict) -> None:
+    """Привязать запись к текущей транзакции сессии до её commit."""
+    if not session.in_transaction():
+        session.begin()
+    session.info.setdefault(PENDING_KEY, []).append(row)
+
+
+# ---------------------------------------------------------------------------
+# Session hooks: записи уходят в очередь только после успешного commit
+# ---------------------------------------------------------------------------
+@event.listens_for(Session, "after_commit")
+def _enqueue_on_commit(session: Session):
+    rows = session.info.pop(PENDING_KEY, None)
+    if rows:
+        audit_writer.submit(rows)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_end(session: Session, transaction):
+    """Rollback / close без commit: записи транзакции отбрасываются."""
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,197 @@
+"""
+Пакетные операции над сущностями: set-based UPDATE/DELETE … RETURNING.
+
+Вместо SELECT + изменение объекта на каждый id — один оператор на пачку
+BULK_CHUNK_SIZE id (PostgreSQL: id = ANY(:ids) — один параметр-массив,
+иначе IN (...)), без загрузки ORM-объектов и каскадов. RETURNING даёт
+затронутые id; остальные классифицируются одним запросом на пачку:
+not_found / forbidden (чужая организация — тот же фильтр, что filter_by_org).
+DELETE пачки выполняется в SAVEPOINT: при нарушении FK пачка делится пополам,
+пока не останутся id, на которые ссылаются другие записи, — только они
+помечаются conflict, остальные удаляются. Аудит (M.A.305) — запись на каждую сущность,
+одним multi-row INSERT (app.api.helpers.audit_many).
+
+Сущности в памяти (наряды, дефекты) обрабатываются тем же интерфейсом; смена
+статуса — только по допустимым переходам.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import String, any_, bindparam, delete, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.tenant import tenant_for
+
+
+@dataclass
+class BulkResult:
+    requested: int = 0
+    affected: list[str] = field(default_factory=list)
+    not_found: list[str] = field(default_factory=list)
+    forbidden: list[str] = field(default_factory=list)
+    conflict: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+    def as_dict(self, verb: str) -> dict:
+        out = {verb: len(self.affected), "total_requested": self.requested}
+        for key in ("not_found", "forbidden", "conflict", "skipped"):
+            values = getattr(self, key)
+            if values:
+                out[key] = values
+        return out
+
+
+@dataclass(frozen=True)
+class BulkEntity:
+    """Описание сущности: модель, тип для аудита, фильтр арендатора."""
+    model: Any
+    audit_type: str
+    tenant: Callable[[Any, str], Any] | None = None  # (model, org_id) → условие WHERE
+
+
+def chunked(ids: list[str], size: int | None = None) -> Iterable[list[str]]:
+    size = size or settings.BULK_CHUNK_SIZE
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def dedupe(ids: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+def tenant_org(user) -> str | None:
+    """Организация для фильтра (эксплуатанты), None — без ограничения. Правило filter_by_org."""
+    return tenant_for(user) or None
+
+
+def _id_match(db: Session, column, chunk: list[str]):
+    if db.get_bind().dialect.name == "postgresql":
+        return column == any_(bindparam("bulk_ids", chunk, type_=ARRAY(String)))
+    return column.in_(chunk)
+
+
+def _where(db: Session, entity: BulkEntity, chunk: list[str], org: str | None) -> list:
+    model = entity.model
+    conds = [_id_match(db, model.id, chunk)]
+    if org and entity.tenant is not None:
+        conds.append(entity.tenant(model, org))
+    return conds
+
+
+def _classify(db: Session, entity: BulkEntity, chunk: list[str], done: set[str], org: str | None, result: BulkResult):
+    missing = [i for i in chunk if i not in done]
+    if not missing:
+        return
+    if org and entity.tenant is not None:
+        model = entity.model
+        existing = set(db.execute(select(model.id).where(_id_match(db, model.id, missing))).scalars())
+        result.forbidden += [i for i in missing if i in existing]
+        result.not_found += [i for i in missing if i not in existing]
+    else:
+        result.not_found += missing
+
+
+def bulk_update(db: Session, entity: BulkEntity, ids: list[str], values: dict, user,
+                extra_where: list | None = None) -> BulkResult:
+    """UPDATE … WHERE id = ANY(:ids) [AND tenant] RETURNING id — пачками."""
+    ids = dedupe(ids)
+    result = BulkResult(requested=len(ids))
+    org = tenant_org(user)
+    model = entity.model
+    for chunk in chunked(ids):
+        stmt = (update(model).where(*_where(db, entity, chunk, org), *(extra_where or []))
+                .values(**values).returning(model.id)
+                .execution_options(synchronize_session=False))
+        done = set(db.execute(stmt).scalars())
+        result.affected += [i for i in chunk if i in done]
+        if extra_where:
+            # отфильтрованы условием (например, уже закрыты) — не ошибка
+            existing = set(db.execute(select(model.id).where(*_where(db, entity, chunk, org))).scalars())
+            result.skipped += [i for i in chunk if i in existing and i not in done]
+            done |= existing
+        _classify(db, entity, chunk, done, org, result)
+    return result
+
+
+def _delete_isolating(db: Session, entity: BulkEntity, chunk: list[str], org: str | None,
+                      conflict: list[str]) -> set[str]:
+    """DELETE пачки в SAVEPOINT; при нарушении FK — пополам, до id, на которые ссылаются."""
+    model = entity.model
+    stmt = (delete(model).where(*_where(db, entity, chunk, org)).returning(model.id)
+            .execution_options(synchronize_session=False))
+    try:
+        with db.begin_nested():
+            return set(db.execute(stmt).scalars())
+    except IntegrityError:
+        if len(chunk) == 1:
+            conflict += chunk
+            return set()
+    mid = len(chunk) // 2
+    return (_delete_isolating(db, entity, chunk[:mid], org, conflict)
+            | _delete_isolating(db, entity, chunk[mid:], org, conflict))
+
+
+def bulk_delete(db: Session, entity: BulkEntity, ids: list[str], user) -> BulkResult:
+    """DELETE … WHERE id = ANY(:ids) [AND tenant] RETURNING id — пачками, каждая в SAVEPOINT."""
+    ids = dedupe(ids)
+    result = BulkResult(requested=len(ids))
+    org = tenant_org(user)
+    for chunk in chunked(ids):
+        conflict: list[str] = []
+        done = _delete_isolating(db, entity, chunk, org, conflict)
+        result.affected += [i for i in chunk if i in done]
+        result.conflict += conflict  # на них ссылаются другие записи
+        _classify(db, entity, chunk, done | set(conflict), org, result)
+    return result
+
+
+def resolve_where(db: Session, entity: BulkEntity, user, conditions: list, values: dict) -> list[str]:
+    """UPDATE … WHERE <условия> [AND tenant] RETURNING id — «закрыть все» без списка id."""
+    model = entity.model
+    org = tenant_org(user)
+    if org and entity.tenant is not None:
+        conditions = [*conditions, entity.tenant(model, org)]
+    stmt = (update(model).where(*conditions).values(**values).returning(model.id)
+            .execution_options(synchronize_session=False))
+    return list(db.execute(stmt).scalars())
+
+
+# ---------------------------------------------------------------------------
+# Сущности в памяти (наряды, дефекты)
+# ---------------------------------------------------------------------------
+def bulk_update_memory(store: dict, ids: list[str], status: str, transitions: dict[str, frozenset[str]],
+                       apply: Callable[[dict], None] | None = None) -> BulkResult:
+    """Смена статуса: переход obj["status"] → status должен быть в transitions, иначе skipped.
+
+    apply(obj) — дополнительные поля перехода (отметки времени), после смены статуса.
+    """
+    ids = dedupe(ids)
+    result = BulkResult(requested=len(ids))
+    for i in ids:
+        obj = store.get(i)
+        if obj is None:
+            result.not_found.append(i)
+        elif status in transitions.get(obj.get("status"), ()):
+            obj["status"] = status
+            if apply is not None:
+                apply(obj)
+            result.affected.append(i)
+        else:
+            result.skipped.append(i)
+    return result
+
+
+def bulk_delete_memory(store: dict, ids: list[str]) -> BulkResult:
+    ids = dedupe(ids)
+    result = BulkResult(requested=len(ids))
+    for i in ids:
+        if store.pop(i, None) is None:
+            result.not_found.append(i)
+        else:
+            result.affected.append(i)
+    return result
@@ -0,0 +1,103 @@
+"""
+Кэш гидратированных шаблонов чек-листов (шаблон + пункты), ключ — (id, version).
+
+Снимок по ключу неизменяем: любое изменение шаблона или его пунктов повышает
+version (bump_version), поэтому инвалидация между воркерами не нужна —
+достаточно узнать текущие версии (один лёгкий SELECT id, version) и догрузить
+отсутствующие снимки одним запросом с selectinload(items). Возвращаемые объекты
+общие для всех запросов — не изменять.
+
+Экраны аудита (checklist_audits) берут пункты из того же кэша.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.models import ChecklistTemplate
+from app.schemas.audit import ChecklistItemOut, ChecklistTemplateOut
+
+
+class TemplateCache:
+    def __init__(self, max_size: int | None = None):
+        self.max_size = max_size or settings.CHECKLIST_TEMPLATE_CACHE_SIZE
+        self._data: OrderedDict[tuple[str, int], ChecklistTemplateOut] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: tuple[str, int]) -> ChecklistTemplateOut | None:
+        with self._lock:
+            out = self._data.get(key)
+            if out is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return out
+
+    def _put(self, out: ChecklistTemplateOut) -> ChecklistTemplateOut:
+        with self._lock:
+            self._data[(out.id, out.version)] = out
+            self._data.move_to_end((out.id, out.version))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return out
+
+    @staticmethod
+    def snapshot(template: ChecklistTemplate) -> ChecklistTemplateOut:
+        """ORM-шаблон с загруженными items → неизменяемый снимок."""
+        out = ChecklistTemplateOut.model_validate(template)
+        out.items = [ChecklistItemOut.model_validate(i) for i in sorted(template.items, key=lambda i: i.sort_order)]
+        return out
+
+    def hydrate(self, db: Session, templates: Iterable[ChecklistTemplate]) -> list[ChecklistTemplateOut]:
+        """Снимки для уже загруженных шаблонов (версия известна) — пункты одним запросом для промахов."""
+        templates = list(templates)
+        found = {t.id: self._get((t.id, t.version)) for t in templates}
+        missing = [t.id for t in templates if found[t.id] is None]
+        if missing:
+            for t in self._load(db, missing):
+                found[t.id] = self._put(self.snapshot(t))
+        return [found[t.id] for t in templates if found.get(t.id) is not None]
+
+    def get_many(self, db: Session, ids: list[str]) -> dict[str, ChecklistTemplateOut]:
+        """По id: текущие версии одним SELECT, промахи — одним selectinload-запросом."""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        versions = dict(db.query(ChecklistTemplate.id, ChecklistTemplate.version).filter(ChecklistTemplate.id.in_(ids)))
+        found = {tid: self._get((tid, v)) for tid, v in versions.items()}
+        missing = [tid for tid, out in found.items() if out is None]
+        if missing:
+            for t in self._load(db, missing):
+                found[t.id] = self._put(self.snapshot(t))
+        return {tid: found[tid] for tid in ids if found.get(tid) is not None}
+
+    def get(self, db: Session, template_id: str) -> ChecklistTemplateOut | None:
+        return self.get_many(db, [template_id]).get(template_id)
+
+    @staticmethod
+    def _load(db: Session, ids: list[str]) -> list[ChecklistTemplate]:
+        return (db.query(ChecklistTemplate).options(selectinload(ChecklistTemplate.items))
+                .filter(ChecklistTemplate.id.in_(ids)).populate_existing().all())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+def bump_version(template: ChecklistTemplate) -> None:
+    """Любое изменение содержимого шаблона — новая версия (новый ключ кэша).
+    Инкремент в SQL: параллельные правки получают разные версии."""
+    template.version = ChecklistTemplate.version + 1
+
+
+template_cache = TemplateCache()
@@ -1,13 +1,47 @@
 """
-Email notification service — stub for production.
-Replace SMTP settings with real credentials.
-Production: use SendGrid, Mailgun, or AWS SES.
+Почтовые уведомления: фоновая отправка через пул постоянных SMTP-соединений.
+
+- send() / send_many() ставят письма в очередь и сразу возвращают управление;
+  SMTP_HOST не задан — письма только логируются (dev).
+- SMTP_POOL_SIZE потоков отправки, у каждого своё соединение: EHLO / STARTTLS / AUTH
+  один раз, затем из очереди берётся до SMTP_BATCH_SIZE писем и уходит по нему подряд.
+  Обрыв (сервер закрыл простаивающее соединение, 421) — переподключение и повтор
+  письма; соединение старше SMTP_CONN_MAX_AGE_S пересоздаётся.
+- Временный отказ (4xx, сеть) — письмо в email_outbox с задержкой
+  SMTP_RETRY_BASE_S · 2^n; retry_due() (планировщик, раз в минуту) возвращает
+  созревшие письма в очередь. Постоянный отказ (5xx) и исчерпанные попытки — в лог.
+- При остановке очередь дренируется; что не успело уйти — в email_outbox.
+
+CRITICAL_TEMPLATES компилируются при импорте: неизвестный параметр в шаблоне —
+ошибка загрузки модуля, а не письма; рассылка одному списку рендерится один раз.
 """
+from __future__ import annotations
+
 import logging
+import queue
+import smtplib
+import string
+import threading
+import time
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage as MimeMessage
+from email.utils import make_msgid
+from typing import Callable
+
+import anyio
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.email_outbox import EmailOutbox
 
 logger = logging.getLogger(__name__)
 
+_STOP = object()
+RETRY_LEASE = timedelta(minutes=15)  # взятое из email_outbox письмо не выдаётся повторно до истечения аренды
+RETRY_MAX_DELAY = timedelta(hours=6)
+
 
 @dataclass
 class EmailMessage:
@@ -15,54 +49,360 @@ class EmailMessage:
     subject: str
     body: str
     html: bool = True
+    attempts: int = 0
+    outbox_id: str | None = None
 
 
-class EmailService:
-    """Email notification service. Stub implementation — logs instead of sending."""
-
-    def __init__(self, smtp_host: str = "", smtp_port: int = 587,
-                 username: str = "", password: str = "", from_addr: str = "noreply@klg.refly.ru"):
-        self.smtp_host = smtp_host
-        self.smtp_port = smtp_port
-        self.username = username
-        self.password = password
+def _is_reconnectable(e: Exception) -> bool:
+    if isinstance(e, smtplib.SMTPResponseException):
+        return e.smtp_code == 421
+    return isinstance(e, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError))
+
+
+def _is_permanent(e: Exception) -> bool:
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in e.recipients.values())
+    if isinstance(e, smtplib.SMTPResponseException):
+        return e.smtp_code >= 500
+    return False
+
+
+class SmtpConnection:
+    """Постоянное SMTP-соединение одного потока отправки."""
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 starttls: bool = True, timeout: float = 30.0, max_age: float = 300.0):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls, self.timeout, self.max_age = starttls, timeout, max_age
+        self._smtp: smtplib.SMTP | None = None
+        self._opened_at = 0.0
+        self.opened_total = 0
+
+    def _open(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.starttls and smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self._smtp, self._opened_at = smtp, time.monotonic()
+        self.opened_total += 1
+        return smtp
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+    def send(self, message: MimeMessage) -> None:
+        if self._smtp is not None and time.monotonic() - self._opened_at > self.max_age:
+            self.close()
+        smtp = self._smtp or self._open()
+        try:
+            smtp.send_message(message)
+        except Exception as e:
+            if not _is_reconnectable(e):
+                raise
+            self._smtp.close()
+            self._smtp = None
+            self._open().send_message(message)
+
+
+def build_mime(msg: EmailMessage, from_addr: str) -> MimeMessage:
+    message = MimeMessage()
+    message["Subject"] = msg.subject
+    message["From"] = from_addr
+    message["To"] = msg.to
+    message["Message-ID"] = make_msgid(domain=from_addr.rpartition("@")[2] or None)
+    message.set_content(msg.body, subtype="html" if msg.html else "plain")
+    return message
+
+
+class EmailDelivery:
+    """Очередь писем и пул потоков отправки с постоянными соединениями."""
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], SmtpConnection],
+        from_addr: str,
+        session_factory: Callable[[], Session] | None = None,
+        pool_size: int | None = None,
+        batch_size: int | None = None,
+        max_queue: int | None = None,
+    ):
+        self._connection_factory = connection_factory
         self.from_addr = from_addr
-        self._enabled = bool(smtp_host)
+        self._session_factory = session_factory
+        self.pool_size = pool_size or settings.SMTP_POOL_SIZE
+        self.batch_size = batch_size or settings.SMTP_BATCH_SIZE
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue or settings.SMTP_QUEUE_MAX)
+        self._threads: list[threading.Thread] = []
+        self._connections: list[SmtpConnection] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Наблюдаемость
+        self.sent_total = 0
+        self.failed_total = 0
+        self.deferred_total = 0
+        self.batches_total = 0
+        self.send_seconds_sum = 0.0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._connections = [self._connection_factory() for _ in range(self.pool_size)]
+            self._threads = [
+                threading.Thread(target=self._run, args=(conn,), name=f"smtp-sender-{i}", daemon=True)
+                for i, conn in enumerate(self._connections)
+            ]
+            for t in self._threads:
+                t.start()
+            logger.info("Email delivery started (connections=%d, batch=%d)", self.pool_size, self.batch_size)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Дренировать очередь; не отправленное за timeout — в email_outbox."""
+        with self._lock:
+            if not self._threads:
+                return
+            for _ in self._threads:
+                self._queue.put(_STOP)
+            deadline = time.monotonic() + timeout
+            for t in self._threads:
+                t.join(max(deadline - time.monotonic(), 0))
+            left = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+                if item is not _STOP:
+                    left.append(item)
+            if left:
+                logger.warning("Email delivery stopped with %d messages queued — moved to outbox", len(left))
+                try:
+                    self._settle([], [(m, "shutdown") for m in left], count_attempt=False)
+                except Exception as e:
+                    logger.error("Email outbox unavailable, %d queued messages lost: %s", len(left), e)
+            self._threads = []
+            self._connections = []
+
+    def submit(self, messages: list[EmailMessage]) -> int:
+        """Поставить письма в очередь. Блокирует при переполнении — письма не отбрасываются."""
+        if not self.running:
+            self.start()
+        for msg in messages:
+            self._queue.put(msg)
+        return len(messages)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Дождаться отправки всего, что уже в очереди (для тестов и CLI)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def connections_opened(self) -> int:
+        return sum(c.opened_total for c in self._connections)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self.depth,
+            "connections": len(self._connections),
+            "connections_opened": self.connections_opened,
+            "sent_total": self.sent_total,
+            "failed_total": self.failed_total,
+            "deferred_total": self.deferred_total,
+            "batches_total": self.batches_total,
+            "avg_send_ms": round(self.send_seconds_sum / self.sent_total * 1000, 2) if self.sent_total else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Sender threads
+    # ------------------------------------------------------------------
+    def _run(self, conn: SmtpConnection) -> None:
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                batch: list[EmailMessage] = []
+                if item is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                else:
+                    batch.append(item)
+                # Добрать пачку на это соединение без ожидания
+                while not stopping and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        self._queue.task_done()
+                    else:
+                        batch.append(item)
+                if batch:
+                    try:
+                        self._send_batch(conn, batch)
+                    finally:
+                        for _ in batch:
+                            self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _send_batch(self, conn: SmtpConnection, batch: list[EmailMessage]) -> None:
+        delivered: list[EmailMessage] = []
+        retries: list[tuple[EmailMessage, str]] = []
+        for msg in batch:
+            started = time.perf_counter()
+            try:
+                conn.send(build_mime(msg, self.from_addr))
+            except Exception as e:
+                if _is_permanent(e):
+                    logger.error("Email to %s rejected: %s", msg.to, e)
+                    with self._stats_lock:
+                        self.failed_total += 1
+                    delivered.append(msg)  # не повторять
+                else:
+                    retries.append((msg, str(e) or type(e).__name__))
+                continue
+            with self._stats_lock:
+                self.sent_total += 1
+                self.send_seconds_sum += time.perf_counter() - started
+            delivered.append(msg)
+        with self._stats_lock:
+            self.batches_total += 1
+        if retries or any(m.outbox_id for m in delivered):
+            try:
+                self._settle([m.outbox_id for m in delivered if m.outbox_id], retries)
+            except Exception as e:
+                logger.error("Email outbox update failed (%d retries lost): %s", len(retries), e)
+
+    # ------------------------------------------------------------------
+    # Durable retry queue (email_outbox)
+    # ------------------------------------------------------------------
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _settle(self, done_ids: list[str], retries: list[tuple[EmailMessage, str]], count_attempt: bool = True) -> None:
+        """Одной транзакцией: удалить доставленные из outbox, отложить неудачные с backoff."""
+        now = datetime.now(timezone.utc)
+        db = self._session()
+        try:
+            if done_ids:
+                db.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(done_ids)))
+            for msg, error in retries:
+                attempts = msg.attempts + count_attempt
+                if attempts >= settings.SMTP_RETRY_MAX_ATTEMPTS:
+                    logger.error("Email to %s dropped after %d attempts: %s", msg.to, attempts, error)
+                    with self._stats_lock:
+                        self.failed_total += 1
+                    if msg.outbox_id:
+                        db.execute(delete(EmailOutbox).where(EmailOutbox.id == msg.outbox_id))
+                    continue
+                delay = min(timedelta(seconds=settings.SMTP_RETRY_BASE_S * 2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+                row = db.get(EmailOutbox, msg.outbox_id) if msg.outbox_id else None
+                if row is None:
+                    row = EmailOutbox(to_addr=msg.to, subject=msg.subject, body=msg.body, html=msg.html)
+                    db.add(row)
+                row.attempts, row.next_attempt_at, row.last_error = attempts, now + delay, error[:2000]
+                with self._stats_lock:
+                    self.deferred_total += 1
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def retry_due(self, limit: int = 500) -> int:
+        """Вернуть в очередь письма из email_outbox, у которых наступил срок повтора."""
+        now = datetime.now(timezone.utc)
+        db = self._session()
+        try:
+            due = (
+                select(EmailOutbox)
+                .where(EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(limit)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                due = due.with_for_update(skip_locked=True)
+            rows = db.execute(due).scalars().all()
+            messages = []
+            for row in rows:
+                row.next_attempt_at = now + RETRY_LEASE
+                messages.append(EmailMessage(to=row.to_addr, subject=row.subject, body=row.body, html=row.html,
+                                             attempts=row.attempts, outbox_id=row.id))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return self.submit(messages) if messages else 0
+
+
+class EmailService:
+    """Почтовые уведомления КЛГ. Без SMTP_HOST — письма только логируются."""
+
+    def __init__(self, smtp_host: str | None = None, smtp_port: int | None = None,
+                 username: str | None = None, password: str | None = None, from_addr: str | None = None,
+                 delivery: EmailDelivery | None = None):
+        self.smtp_host = settings.SMTP_HOST if smtp_host is None else smtp_host
+        self.smtp_port = smtp_port or settings.SMTP_PORT
+        self.username = settings.SMTP_USER if username is None else username
+        self.password = settings.SMTP_PASSWORD if password is None else password
+        self.from_addr = from_addr or settings.SMTP_FROM
+        self._enabled = bool(self.smtp_host)
+        self.delivery = delivery or EmailDelivery(self._connect, self.from_addr)
+
+    def _connect(self) -> SmtpConnection:
+        return SmtpConnection(self.smtp_host, self.smtp_port, self.username, self.password,
+                              starttls=settings.SMTP_STARTTLS, timeout=settings.SMTP_TIMEOUT_S,
+                              max_age=settings.SMTP_CONN_MAX_AGE_S)
 
     def send(self, to_or_msg, subject: str | None = None, body: str | None = None) -> bool:
-        """Send email. Сигнатуры: send(EmailMessage) или send(to, subject, body). Returns True if sent/logged."""
+        """Поставить письмо в очередь. Сигнатуры: send(EmailMessage) или send(to, subject, body)."""
         if isinstance(to_or_msg, EmailMessage):
             msg = to_or_msg
         else:
             msg = EmailMessage(to=str(to_or_msg), subject=subject or "", body=body or "")
-        if not self._enabled:
-            logger.info("[EMAIL STUB] To: %s | Subject: %s", msg.to, msg.subject)
-            return True
+        return self.send_many([msg]) == 1
 
-        try:
-            import smtplib
-            from email.mime.text import MIMEText
-            from email.mime.multipart import MIMEMultipart
-
-            message = MIMEMultipart("alternative")
-            message["Subject"] = msg.subject
-            message["From"] = self.from_addr
-            message["To"] = msg.to
-
-            content_type = "html" if msg.html else "plain"
-            message.attach(MIMEText(msg.body, content_type))
-
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                if self.username:
-                    server.login(self.username, self.password)
-                server.sendmail(self.from_addr, msg.to, message.as_string())
-
-            logger.info(f"Email sent to {msg.to}: {msg.subject}")
-            return True
-        except Exception as e:
-            logger.error(f"Email send failed: {e}")
-            return False
+    def send_many(self, messages: list[EmailMessage]) -> int:
+        """Поставить письма в очередь отправки; возвращает число принятых."""
+        if not self._enabled:
+            if messages:
+                logger.info("[EMAIL STUB] %d message(s), To: %s%s | Subject: %s", len(messages), messages[0].to,
+                            " …" if len(messages) > 1 else "", messages[0].subject)
+            return len(messages)
+        return self.delivery.submit(messages)
 
     def send_risk_alert(self, to: str, risk_title: str, risk_level: str, aircraft: str):
         """Send risk alert notification."""
@@ -122,15 +462,55 @@ CRITICAL_TEMPLATES = {
     },
 }
 
+_FORMATTER = string.Formatter()
+
+
+class CompiledTemplate:
+    """Шаблон str.format, разобранный один раз: литералы и имена полей."""
+
+    __slots__ = ("parts", "fields")
+
+    def __init__(self, source: str):
+        self.parts = list(_FORMATTER.parse(source))
+        self.fields = frozenset(name for _, name, _, _ in self.parts if name is not None)
+        bad = [name for name in self.fields if not name.isidentifier()]
+        if bad:
+            raise ValueError(f"Template fields must be plain names: {bad}")
+
+    def render(self, values: dict) -> str:
+        out = []
+        for literal, name, spec, conversion in self.parts:
+            out.append(literal)
+            if name is not None:
+                value = values[name]
+                if conversion:
+                    value = _FORMATTER.convert_field(value, conversion)
+                out.append(format(value, spec or ""))
+        return "".join(out)
+
+
+_COMPILED = {
+    name: (CompiledTemplate(t["subject"]), CompiledTemplate(t["body"])) for name, t in CRITICAL_TEMPLATES.items()
+}
+
+
+def render_critical(alert_type: str, **kwargs) -> tuple[str, str]:
+    """(subject, body) критического уведомления. KeyError — неизвестный шаблон, ValueError — нет параметров."""
+    subject, body = _COMPILED[alert_type]
+    missing = (subject.fields | body.fields) - kwargs.keys()
+    if missing:
+        raise ValueError(f"Missing template parameters for {alert_type}: {sorted(missing)}")
+    return subject.render(kwargs), body.render(kwargs)
+
 
-async def send_critical_alert(alert_type: str, recipients: list, **kwargs):
-    """Send critical alert email using template."""
-    template = CRITICAL_TEMPLATES.get(alert_type)
-    if not template:
-        logger.error("Unknown alert template: %s", alert_type)
+async def send_critical_alert(alert_type: str, recipients: list, **kwargs) -> bool:
+    """Критическое уведомление списку адресатов: шаблон рендерится один раз, письма — в очередь отправки."""
+    try:
+        subject, body = render_critical(alert_type, **kwargs)
+    except (KeyError, ValueError) as e:
+        logger.error("Critical alert %s not sent: %s", alert_type, e)
         return False
-    subject = template["subject"].format(**kwargs)
-    body = template["body"].format(**kwargs)
-    for recipient in recipients:
-        await send_email(recipient, subject, body)
+    messages = [EmailMessage(to=str(r), subject=subject, body=body, html=False) for r in dict.fromkeys(recipients)]
+    # submit блокирует при переполнении очереди — не занимать event loop
+    await anyio.to_thread.run_sync(email_service.send_many, messages)
     return True
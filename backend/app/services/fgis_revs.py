@@ -392,11 +392,11 @@ class FGISREVSClient:
 
     def _upsert_directive(self, ad: FGISDirective):
         """Создать или обновить ДЛГ из ФГИС."""
-        from app.api.routes.airworthiness_core import _directives
+        from app.api.routes.airworthiness_core import _directives, store_directive
         existing = [d for d in _directives.values() if d.get("number") == ad.number]
         if not existing:
             did = str(uuid.uuid4())
-            _directives[did] = {
+            store_directive({
                 "id": did,
                 "number": ad.number,
                 "title": ad.title,
@@ -411,7 +411,7 @@ class FGISREVSClient:
                 "source": "ФГИС РЭВС",
                 "fgis_id": ad.fgis_id,
                 "created_at": datetime.now(timezone.utc).isoformat(),
-            }
+            })
             logger.info("New AD from ФГИС: %s", ad.number)
 
     # --- MOCK данные (тестовая среда) ---
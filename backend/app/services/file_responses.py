@@ -0,0 +1,179 @@
+"""
+Отдача файлов: HTTP Range / 206, ETag и условные запросы (RFC 9110 §13–14).
+
+Докачка: клиент (станция с плохим каналом) повторяет GET с Range: bytes=N- и
+If-Range: <ETag> — получает 206 с остатком, а если файл сменился — 200 целиком.
+If-None-Match / If-Modified-Since → 304 без тела. Несколько диапазонов в одном
+запросе (multipart/byteranges) не поддерживаются — отдаётся весь файл, что RFC допускает.
+
+Локальные файлы читаются частями в пуле потоков. Zero-copy (ASGI-расширения
+http.response.pathsend / zerocopysend, sendfile на стороне сервера) включается
+STORAGE_ZERO_COPY: uvicorn их не реализует, а BaseHTTPMiddleware в цепочке
+пропускает только http.response.body — включать под Granian/Hypercorn без таких middleware.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.core.config import settings
+
+CHUNK_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Один диапазон bytes=a-b → (start, end) включительно; None — отдать целиком."""
+    if not header or not header.startswith("bytes="):
+        return None
+    specs = header[len("bytes="):].split(",")
+    if len(specs) != 1:
+        return None
+    first, sep, last = specs[0].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+            end = min(end, size - 1)
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'{disposition}; filename="{filename}"'
+    return f"{disposition}; filename*=utf-8''{quoted}"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_applies(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    """If-Range: диапазон — только если представление не изменилось, иначе полный ответ."""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag  # слабые ETag для If-Range не годятся
+    try:
+        return last_modified is not None and last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+
+
+class RangeFileResponse(Response):
+    """Участок файла [offset, offset + length) с диска."""
+
+    def __init__(self, path: str | Path, offset: int, length: int, status_code: int, headers: dict,
+                 media_type: str | None = None):
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+        self.path, self.offset, self.length = Path(path), offset, length
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        extensions = scope.get("extensions") or {}
+        whole = self.offset == 0 and self.length == self.path.stat().st_size
+        if settings.STORAGE_ZERO_COPY and whole and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        with open(self.path, "rb") as f:
+            if settings.STORAGE_ZERO_COPY and "http.response.zerocopysend" in extensions:
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": self.offset,
+                            "count": self.length})
+                return
+            f.seek(self.offset)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def ranged_response(
+    request: Request,
+    *,
+    size: int,
+    etag: str,
+    filename: str,
+    media_type: str | None = None,
+    last_modified: datetime | None = None,
+    path: str | Path | None = None,
+    read_range: Callable[[int, int], Iterator[bytes]] | None = None,
+) -> Response:
+    """Ответ на GET файла с учётом Range / If-Range / If-None-Match.
+
+    path — локальный файл; read_range(offset, length) — поток частей из хранилища.
+    """
+    etag = f'"{etag}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header and _range_applies(request, etag, last_modified):
+        try:
+            parsed = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if parsed is not None:
+            (start, end), status = parsed, 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+    headers["Content-Disposition"] = content_disposition(filename)
+    media_type = media_type or "application/octet-stream"
+    if path is not None:
+        return RangeFileResponse(path, start, length, status, headers, media_type)
+    return StreamingResponse(read_range(start, length), status_code=status, headers=headers, media_type=media_type)
@@ -0,0 +1,417 @@
+"""
+Извлечение данных из документов inbox: очередь → текст → поля (AI) → запись пачками.
+
+- Очередь — file_registry.status = 'pending' (индекс status, created_at). Конвейер
+  забирает пачку INBOX_EXTRACT_BATCH (pending → processing, claimed_at); взятые
+  воркером, который не завершился за INBOX_EXTRACT_STALE_S, возвращаются в очередь.
+- Текст PDF (pypdf) / DOCX извлекается в пуле процессов INBOX_EXTRACT_WORKERS
+  (0 — в текущем процессе), с маркерами страниц для provenance.
+- Поля — ai_service.chat, не более INBOX_AI_CONCURRENCY запросов одновременно.
+  Бюджет на файл INBOX_AI_TOKEN_BUDGET (промпты + текст + ответ): длинный текст
+  усекается, run.truncated = 1. confidence хранится по каждому полю.
+- Результаты пачки — одной транзакцией (ai_extraction_run / ai_extraction_field).
+
+Идемпотентность: извлечение ключуется (sha256 файла, версия промптов). Повторная
+обработка того же содержимого копирует готовые поля без запроса к AI; «с нуля» —
+reprocess(force=True). Наблюдаемость: stats(), klg_inbox_* в /metrics.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+from xml.etree import ElementTree
+
+from app.core.config import settings
+from app.services.inbox_store import InboxStore, inbox_store
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("queue", "text", "ai", "write")
+CHARS_PER_TOKEN = 3  # оценка для смешанного русского / английского текста
+PROMPT_OVERHEAD_TOKENS = 200
+PROMPTS_DIR = Path(__file__).resolve().parents[3] / "prompts"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+DEFAULT_SYSTEM = (
+    "Ты — ассистент извлечения структурированных данных из документов КЛГ. Для каждого поля укажи "
+    "field_code, value, confidence (0–1) и provenance (страница, блок). Не выдумывай: нет значения — null."
+)
+INSTRUCTION = (
+    "Извлеки поля из документа ниже. Ответ — только JSON-массив объектов "
+    "{\"field_code\", \"value\", \"confidence\", \"provenance\"}.\n\n"
+)
+
+
+@lru_cache(maxsize=1)
+def load_prompts() -> tuple[str, str]:
+    """(системный промпт: system.md + policy.md + domain/*.md, версия — хэш текста)."""
+    root = Path(settings.INBOX_PROMPTS_DIR) if settings.INBOX_PROMPTS_DIR else PROMPTS_DIR
+    paths = [root / "system.md", root / "policy.md", *sorted((root / "domain").glob("*.md"))]
+    system = "\n\n".join(p.read_text(encoding="utf-8") for p in paths if p.is_file()) or DEFAULT_SYSTEM
+    return system, hashlib.sha256(system.encode()).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Этапы (функции уровня модуля — передаются в пул процессов)
+# ---------------------------------------------------------------------------
+def extract_text(path: str, mime: str) -> str:
+    if mime == "application/pdf" or path.lower().endswith(".pdf"):
+        from pypdf import PdfReader
+
+        pages = PdfReader(path).pages
+        return "\n\n".join(f"[стр. {i}]\n{page.extract_text() or ''}" for i, page in enumerate(pages, 1))
+    if mime == DOCX_MIME or path.lower().endswith(".docx"):
+        with zipfile.ZipFile(path) as z:
+            root = ElementTree.fromstring(z.read("word/document.xml"))
+        paragraphs = ("".join(t.text or "" for t in p.iter(f"{_W}t")) for p in root.iter(f"{_W}p"))
+        return "\n".join(p for p in paragraphs if p)
+    raise ValueError(f"Извлечение текста не поддерживается для {mime}")
+
+
+def _timed_extract_text(path: str, mime: str) -> tuple[str, float]:
+    started = time.perf_counter()
+    return extract_text(path, mime), time.perf_counter() - started
+
+
+def fit_budget(text: str, system: str, budget: int, max_output: int) -> tuple[str, bool, int]:
+    """Усечь текст под бюджет токенов файла. (текст, усечён ли, оценка токенов запроса)."""
+    prompt_tokens = (len(system) + len(INSTRUCTION)) // CHARS_PER_TOKEN + PROMPT_OVERHEAD_TOKENS
+    available = budget - max_output - prompt_tokens
+    if available <= 0:
+        raise ValueError(f"Бюджет {budget} токенов меньше промптов и ответа")
+    max_chars = available * CHARS_PER_TOKEN
+    fitted = text[:max_chars]
+    return fitted, len(text) > max_chars, prompt_tokens + len(fitted) // CHARS_PER_TOKEN + max_output
+
+
+def parse_fields(answer: str) -> list[dict]:
+    """Ответ AI → поля {field_code, value, confidence, provenance}; confidence в [0, 1]."""
+    start, end = answer.find("["), answer.rfind("]")
+    data = json.loads(answer[start:end + 1] if 0 <= start < end else answer)
+    if isinstance(data, dict):
+        data = data.get("fields", [])
+    fields = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict) or not item.get("field_code"):
+            continue
+        try:
+            confidence = min(max(float(item["confidence"]), 0.0), 1.0)
+        except (KeyError, TypeError, ValueError):
+            confidence = None
+        value = item.get("value")
+        if value is not None and not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+        provenance = item.get("provenance")
+        fields.append({
+            "field_code": str(item["field_code"]),
+            "value": value,
+            "confidence": confidence,
+            "provenance": provenance if provenance is None or isinstance(provenance, str)
+            else json.dumps(provenance, ensure_ascii=False),
+        })
+    return fields
+
+
+def ai_extract_fields(text: str, system: str, max_tokens: int) -> str | None:
+    from app.services.ai_service import chat
+
+    return chat(prompt=INSTRUCTION + text, system=system, max_tokens=max_tokens, temperature=0.0)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.rstrip("Z"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# Наблюдаемость
+# ---------------------------------------------------------------------------
+class PipelineStats:
+    """Счётчики конвейера: документы в минуту, задержки этапов, исходы."""
+
+    def __init__(self, window_s: float = 300.0):
+        self.window_s = window_s
+        self._done: deque[float] = deque()
+        self._lock = threading.Lock()
+        self.stage_sum: dict[str, float] = defaultdict(float)
+        self.stage_count: dict[str, int] = defaultdict(int)
+        self.stage_max: dict[str, float] = defaultdict(float)
+        self.outcomes: dict[str, int] = defaultdict(int)
+        self.tokens_total = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stage_sum[stage] += seconds
+            self.stage_count[stage] += 1
+            self.stage_max[stage] = max(self.stage_max[stage], seconds)
+
+    def done(self, outcome: str, tokens: int = 0) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.tokens_total += tokens
+            self._done.append(now)
+            while self._done and self._done[0] < now - self.window_s:
+                self._done.popleft()
+
+    def per_minute(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(1 for t in self._done if t >= now - self.window_s)
+        return round(recent * 60 / self.window_s, 2)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {
+                s: {
+                    "count": self.stage_count[s],
+                    "avg_ms": round(self.stage_sum[s] / self.stage_count[s] * 1000, 1) if self.stage_count[s] else None,
+                    "max_ms": round(self.stage_max[s] * 1000, 1),
+                }
+                for s in STAGES
+            }
+            outcomes = dict(self.outcomes)
+        return {"docs_per_minute": self.per_minute(), "stages": stages, "outcomes": outcomes,
+                "tokens_total": self.tokens_total}
+
+
+# ---------------------------------------------------------------------------
+# Конвейер
+# ---------------------------------------------------------------------------
+class ExtractionPipeline:
+    """Фоновый поток: забирает пачки из очереди inbox и извлекает поля."""
+
+    def __init__(
+        self,
+        store: InboxStore | None = None,
+        workers: int | None = None,
+        ai_concurrency: int | None = None,
+        token_budget: int | None = None,
+        batch_size: int | None = None,
+        extract_fields: Callable[[str, str, int], str | None] | None = None,
+    ):
+        self._store = store
+        self.workers = settings.INBOX_EXTRACT_WORKERS if workers is None else workers
+        self.ai_concurrency = ai_concurrency or settings.INBOX_AI_CONCURRENCY
+        self.token_budget = token_budget or settings.INBOX_AI_TOKEN_BUDGET
+        self.batch_size = batch_size or settings.INBOX_EXTRACT_BATCH
+        self._extract_fields = extract_fields
+        self._text_pool: Executor | None = None
+        self._ai_pool: ThreadPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = PipelineStats()
+
+    @property
+    def store(self) -> InboxStore:
+        return self._store or inbox_store()
+
+    # -- lifecycle ------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="inbox-extraction", daemon=True)
+            self._thread.start()
+            logger.info("Inbox extraction started (workers=%d, ai=%d, budget=%d)",
+                        self.workers, self.ai_concurrency, self.token_budget)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        with self._lock:
+            if self._thread is not None:
+                self._stop.set()
+                self._wake.set()
+                self._thread.join(timeout)
+                self._thread = None
+            for pool in (self._text_pool, self._ai_pool):
+                if pool is not None:
+                    pool.shutdown(wait=True)
+            self._text_pool = self._ai_pool = None
+
+    def wake(self) -> None:
+        """Новый файл в очереди — не ждать следующего опроса."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                stale = datetime.now(timezone.utc) - timedelta(seconds=settings.INBOX_EXTRACT_STALE_S)
+                self.store.reset_stale(stale.isoformat())
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Inbox extraction batch failed")
+                processed = 0
+            if not processed:
+                self._wake.wait(settings.INBOX_EXTRACT_POLL_S)
+                self._wake.clear()
+
+    def _pools(self) -> tuple[Executor | None, ThreadPoolExecutor]:
+        with self._lock:
+            if self._text_pool is None and self.workers > 0:
+                self._text_pool = ProcessPoolExecutor(max_workers=self.workers)
+            if self._ai_pool is None:
+                self._ai_pool = ThreadPoolExecutor(max_workers=self.ai_concurrency, thread_name_prefix="inbox-ai")
+            return self._text_pool, self._ai_pool
+
+    # -- processing -----------------------------------------------------
+    def run_once(self) -> int:
+        """Обработать одну пачку из очереди. Возвращает число взятых файлов."""
+        if self._extract_fields is None:
+            from app.services.ai_service import is_available
+
+            if not is_available():
+                return 0  # AI не настроен — файлы остаются в очереди
+        claimed_at = datetime.now(timezone.utc)
+        files = self.store.claim_pending(self.batch_size, claimed_at.isoformat())
+        if not files:
+            return 0
+        system, version = load_prompts()
+        text_pool, ai_pool = self._pools()
+        results: list[tuple[dict, list[dict]]] = []
+        text_futures: dict[Future, dict] = {}
+        for f in files:
+            self.stats.observe("queue", max((claimed_at - _parse_ts(f["created_at"])).total_seconds(), 0.0))
+            cached = self.store.find_completed_run(f["sha256"], version)
+            if cached:
+                results.append(self._reuse(f, *cached))
+                continue
+            path = str(self._file_path(f["stored_path"]))
+            if text_pool is not None:
+                text_futures[text_pool.submit(_timed_extract_text, path, f["mime"])] = f
+            else:
+                future: Future = Future()
+                try:
+                    future.set_result(_timed_extract_text(path, f["mime"]))
+                except Exception as e:
+                    future.set_exception(e)
+                text_futures[future] = f
+
+        ai_futures = []
+        for future in as_completed(text_futures):
+            f = text_futures[future]
+            started = _now()
+            try:
+                text, seconds = future.result()
+            except Exception as e:
+                results.append(self._record(f, version, started, "failed", error=f"Текст: {e}"))
+                continue
+            self.stats.observe("text", seconds)
+            ai_futures.append(ai_pool.submit(self._fields, f, text, system, version, started))
+        results += [future.result() for future in as_completed(ai_futures)]
+
+        write_started = time.perf_counter()
+        self.store.write_runs(results)
+        self.stats.observe("write", time.perf_counter() - write_started)
+        for run, _ in results:
+            self.stats.done(run["status"] if run.get("tokens") != 0 else "reused", run.get("tokens") or 0)
+        return len(files)
+
+    def _fields(self, f: dict, text: str, system: str, version: str, started: str) -> tuple[dict, list[dict]]:
+        max_output = settings.INBOX_AI_MAX_OUTPUT_TOKENS
+        try:
+            fitted, truncated, tokens = fit_budget(text, system, self.token_budget, max_output)
+            call_started = time.perf_counter()
+            answer = (self._extract_fields or ai_extract_fields)(fitted, system, max_output)
+            self.stats.observe("ai", time.perf_counter() - call_started)
+            if answer is None:
+                raise RuntimeError("AI не вернул ответ")
+            fields = parse_fields(answer)
+        except Exception as e:
+            return self._record(f, version, started, "failed", error=f"AI: {e}")
+        return self._record(f, version, started, "completed", fields=fields, tokens=tokens, truncated=truncated)
+
+    def _reuse(self, f: dict, run: dict, fields: list[dict]) -> tuple[dict, list[dict]]:
+        copied = [{k: field[k] for k in ("field_code", "value", "confidence", "provenance")} for field in fields]
+        return self._record(f, run["prompt_version"], _now(), "completed", fields=copied, tokens=0,
+                            truncated=bool(run.get("truncated")))
+
+    @staticmethod
+    def _record(f: dict, version: str, started: str, status: str, fields: list[dict] | None = None,
+                error: str | None = None, tokens: int | None = None, truncated: bool = False):
+        run_id = str(uuid.uuid4())
+        run = {"id": run_id, "file_id": f["id"], "started_at": started, "completed_at": _now(), "status": status,
+               "error": error, "sha256": f["sha256"], "prompt_version": version, "tokens": tokens,
+               "truncated": int(truncated)}
+        return run, [{**field, "id": str(uuid.uuid4()), "run_id": run_id} for field in fields or ()]
+
+    @staticmethod
+    def _file_path(stored_path: str) -> Path:
+        data_dir = Path(settings.INBOX_DATA_DIR).resolve()
+        return data_dir / stored_path if not str(stored_path).startswith("/") else Path(stored_path)
+
+    # -- API ------------------------------------------------------------
+    def reprocess(self, file_id: str, force: bool = False) -> bool:
+        """Поставить файл в очередь повторно; force — не переиспользовать прежний результат."""
+        f = self.store.get_file(file_id)
+        if f is None:
+            return False
+        if force:
+            self.store.supersede_runs(f["sha256"], load_prompts()[1])
+        queued = self.store.requeue(file_id)
+        self.wake()
+        return queued
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "ai_concurrency": self.ai_concurrency,
+            "token_budget": self.token_budget,
+            "prompt_version": load_prompts()[1],
+            "backlog": self.store.count_by_status(),
+            **self.stats.snapshot(),
+        }
+
+    def render_prometheus(self) -> list[str]:
+        snap = self.stats.snapshot()
+        lines = [
+            "# HELP klg_inbox_extraction_docs_per_minute Inbox documents processed per minute (5 min window)",
+            "# TYPE klg_inbox_extraction_docs_per_minute gauge",
+            f"klg_inbox_extraction_docs_per_minute {snap['docs_per_minute']}",
+            "# HELP klg_inbox_extraction_total Inbox extraction outcomes",
+            "# TYPE klg_inbox_extraction_total counter",
+        ]
+        lines += [f'klg_inbox_extraction_total{{outcome="{k}"}} {v}' for k, v in sorted(snap["outcomes"].items())]
+        lines += [
+            "# HELP klg_inbox_extraction_stage_seconds Inbox extraction stage latency",
+            "# TYPE klg_inbox_extraction_stage_seconds summary",
+        ]
+        for stage in STAGES:
+            lines.append(f'klg_inbox_extraction_stage_seconds_sum{{stage="{stage}"}} {self.stats.stage_sum[stage]:.4f}')
+            lines.append(f'klg_inbox_extraction_stage_seconds_count{{stage="{stage}"}} {self.stats.stage_count[stage]}')
+        try:
+            backlog = self.store.count_by_status()
+        except Exception:
+            backlog = {}
+        lines += [
+            "# HELP klg_inbox_files Inbox files by status (pending — backlog)",
+            "# TYPE klg_inbox_files gauge",
+        ]
+        lines += [f'klg_inbox_files{{status="{k}"}} {v}' for k, v in sorted(backlog.items())]
+        return lines
+
+
+extraction_pipeline = ExtractionPipeline()
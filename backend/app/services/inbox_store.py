@@ -0,0 +1,322 @@
+"""
+Реестр inbox (COD-004): SQLite data/db/inbox.db — общий формат с inbox-server (Express).
+
+Пул соединений вместо подключения и DDL на каждый запрос: схема и индексы
+создаются один раз (init() при старте), соединения живут в пуле. WAL —
+читатели не блокируют писателя (и inbox-server на том же файле), synchronous=NORMAL
+в WAL не теряет целостность при сбое процесса. busy_timeout — ожидание
+блокировки записи вместо немедленного «database is locked».
+
+Список — постранично по статусу и дате по индексу (status, created_at);
+повторно присланный документ находится по sha256 и не сохраняется второй раз.
+Статусы файла: pending → processing → extracted | failed (app.services.inbox_extraction).
+"""
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.core.config import settings
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS file_registry (
+        id TEXT PRIMARY KEY,
+        original_name TEXT NOT NULL,
+        stored_path TEXT NOT NULL,
+        mime TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        status TEXT DEFAULT 'pending'
+    );
+    CREATE TABLE IF NOT EXISTS ai_extraction_run (
+        id TEXT PRIMARY KEY,
+        file_id TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        completed_at TEXT,
+        status TEXT DEFAULT 'running',
+        error TEXT,
+        FOREIGN KEY (file_id) REFERENCES file_registry(id)
+    );
+    CREATE TABLE IF NOT EXISTS ai_extraction_field (
+        id TEXT PRIMARY KEY,
+        run_id TEXT NOT NULL,
+        field_code TEXT NOT NULL,
+        value TEXT,
+        confidence REAL,
+        provenance TEXT,
+        FOREIGN KEY (run_id) REFERENCES ai_extraction_run(id)
+    );
+    CREATE TABLE IF NOT EXISTS tmc_request_draft (
+        id TEXT PRIMARY KEY,
+        file_id TEXT NOT NULL,
+        extraction_run_id TEXT,
+        status TEXT DEFAULT 'draft',
+        data TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT,
+        FOREIGN KEY (file_id) REFERENCES file_registry(id),
+        FOREIGN KEY (extraction_run_id) REFERENCES ai_extraction_run(id)
+    );
+    CREATE INDEX IF NOT EXISTS ix_file_registry_status_created ON file_registry (status, created_at);
+    CREATE INDEX IF NOT EXISTS ix_file_registry_created ON file_registry (created_at);
+    CREATE INDEX IF NOT EXISTS ix_file_registry_sha256 ON file_registry (sha256);
+    CREATE INDEX IF NOT EXISTS ix_ai_extraction_run_file ON ai_extraction_run (file_id);
+    CREATE INDEX IF NOT EXISTS ix_ai_extraction_field_run ON ai_extraction_field (run_id);
+"""
+
+# Колонки, добавленные после схемы inbox-server: ALTER TABLE при init()
+ADDED_COLUMNS = {
+    "file_registry": (("claimed_at", "TEXT"),),
+    "ai_extraction_run": (("sha256", "TEXT"), ("prompt_version", "TEXT"), ("tokens", "INTEGER"),
+                          ("truncated", "INTEGER")),
+}
+ADDED_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_ai_extraction_run_sha ON ai_extraction_run (sha256, prompt_version, status)",
+)
+
+FILE_COLUMNS = "id, original_name, stored_path, mime, size, sha256, created_at, status"
+RUN_COLUMNS = "id, file_id, started_at, completed_at, status, error, sha256, prompt_version, tokens, truncated"
+
+
+class InboxStore:
+    """Пул соединений SQLite к реестру inbox."""
+
+    def __init__(self, path: str | Path, pool_size: int = 4, busy_timeout_ms: int = 5000):
+        self.path = Path(path)
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._pool: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None — транзакции явно (BEGIN / BEGIN IMMEDIATE в transaction())
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                               timeout=self.busy_timeout_ms / 1000)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def init(self) -> None:
+        """Создать каталог, схему и индексы — один раз на процесс."""
+        with self._lock:
+            if self._ready:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.executescript(SCHEMA)
+                for table, columns in ADDED_COLUMNS.items():
+                    existing = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+                    for name, type_ in columns:
+                        if name not in existing:
+                            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {type_}")
+                for ddl in ADDED_INDEXES:
+                    conn.execute(ddl)
+            finally:
+                conn.close()
+            self._ready = True
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        if not self._ready:
+            self.init()
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.pool_size
+                if grow:
+                    self._created += 1
+            conn = self._connect() if grow else self._pool.get(timeout=self.busy_timeout_ms / 1000)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """BEGIN … COMMIT; immediate — блокировка записи сразу (проверка + вставка без гонки)."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._created = 0
+            self._ready = False
+
+    # --- file_registry ---------------------------------------------------------------
+
+    def list_files(self, status: str | None = None, created_from: str | None = None,
+                   created_to: str | None = None, limit: int = 50, offset: int = 0) -> tuple[list[dict], int]:
+        """Страница реестра (новые сверху) и общее число по фильтру."""
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if created_from:
+            where.append("created_at >= ?")
+            params.append(created_from)
+        if created_to:
+            where.append("created_at < ?")
+            params.append(created_to)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        with self.connection() as conn:
+            total = conn.execute(f"SELECT count(*) FROM file_registry{clause}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {FILE_COLUMNS} FROM file_registry{clause} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [dict(r) for r in rows], total
+
+    def get_file(self, file_id: str) -> dict | None:
+        with self.connection() as conn:
+            row = conn.execute(f"SELECT {FILE_COLUMNS} FROM file_registry WHERE id = ?", (file_id,)).fetchone()
+        return dict(row) if row else None
+
+    def register_file(self, record: dict) -> tuple[dict, bool]:
+        """Добавить файл, если такого содержимого ещё нет. (запись, создана ли новая)."""
+        with self.transaction(immediate=True) as conn:
+            row = conn.execute(
+                f"SELECT {FILE_COLUMNS} FROM file_registry WHERE sha256 = ? ORDER BY created_at LIMIT 1",
+                (record["sha256"],),
+            ).fetchone()
+            if row:
+                return dict(row), False
+            conn.execute(
+                f"INSERT INTO file_registry ({FILE_COLUMNS}) VALUES (?,?,?,?,?,?,?,?)",
+                tuple(record.get(c) for c in FILE_COLUMNS.split(", ")),
+            )
+        return record, True
+
+    def delete_file(self, file_id: str) -> dict | None:
+        """Удалить запись (и результаты извлечения по ней); возвращает удалённую запись."""
+        with self.transaction(immediate=True) as conn:
+            row = conn.execute(f"SELECT {FILE_COLUMNS} FROM file_registry WHERE id = ?", (file_id,)).fetchone()
+            if not row:
+                return None
+            runs = "SELECT id FROM ai_extraction_run WHERE file_id = ?"
+            conn.execute(f"DELETE FROM ai_extraction_field WHERE run_id IN ({runs})", (file_id,))
+            conn.execute("DELETE FROM tmc_request_draft WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM ai_extraction_run WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM file_registry WHERE id = ?", (file_id,))
+        return dict(row)
+
+    # --- извлечение данных (app.services.inbox_extraction) -------------------------------
+
+    def count_by_status(self) -> dict[str, int]:
+        with self.connection() as conn:
+            return {r[0] or "pending": r[1] for r in
+                    conn.execute("SELECT status, count(*) FROM file_registry GROUP BY status")}
+
+    def reset_stale(self, claimed_before: str) -> int:
+        """Вернуть в очередь файлы, взятые в обработку раньше claimed_before (воркер остановлен)."""
+        with self.transaction(immediate=True) as conn:
+            return conn.execute(
+                "UPDATE file_registry SET status = 'pending' WHERE status = 'processing' "
+                "AND (claimed_at IS NULL OR claimed_at < ?)",
+                (claimed_before,),
+            ).rowcount
+
+    def claim_pending(self, limit: int, claimed_at: str) -> list[dict]:
+        """Взять до limit файлов из очереди (старые первыми) и пометить processing."""
+        with self.transaction(immediate=True) as conn:
+            rows = [dict(r) for r in conn.execute(
+                f"SELECT {FILE_COLUMNS} FROM file_registry WHERE status = 'pending' ORDER BY created_at LIMIT ?",
+                (limit,),
+            )]
+            conn.executemany("UPDATE file_registry SET status = 'processing', claimed_at = ? WHERE id = ?",
+                             [(claimed_at, r["id"]) for r in rows])
+        return rows
+
+    def supersede_runs(self, sha256: str, prompt_version: str) -> int:
+        """Повторное извлечение «с нуля»: прежние результаты по содержимому не переиспользуются."""
+        with self.transaction(immediate=True) as conn:
+            return conn.execute(
+                "UPDATE ai_extraction_run SET status = 'superseded' "
+                "WHERE sha256 = ? AND prompt_version = ? AND status = 'completed'",
+                (sha256, prompt_version),
+            ).rowcount
+
+    def requeue(self, file_id: str) -> bool:
+        with self.transaction(immediate=True) as conn:
+            return conn.execute("UPDATE file_registry SET status = 'pending' WHERE id = ? AND status != 'processing'",
+                                (file_id,)).rowcount > 0
+
+    def find_completed_run(self, sha256: str, prompt_version: str) -> tuple[dict, list[dict]] | None:
+        """Завершённое извлечение того же содержимого той же версией промптов."""
+        with self.connection() as conn:
+            run = conn.execute(
+                f"SELECT {RUN_COLUMNS} FROM ai_extraction_run WHERE sha256 = ? AND prompt_version = ? "
+                "AND status = 'completed' ORDER BY completed_at DESC LIMIT 1",
+                (sha256, prompt_version),
+            ).fetchone()
+            if not run:
+                return None
+            fields = conn.execute("SELECT * FROM ai_extraction_field WHERE run_id = ?", (run["id"],)).fetchall()
+        return dict(run), [dict(f) for f in fields]
+
+    def latest_run(self, file_id: str) -> tuple[dict, list[dict]] | None:
+        with self.connection() as conn:
+            run = conn.execute(
+                f"SELECT {RUN_COLUMNS} FROM ai_extraction_run WHERE file_id = ? ORDER BY started_at DESC LIMIT 1",
+                (file_id,),
+            ).fetchone()
+            if not run:
+                return None
+            fields = conn.execute("SELECT * FROM ai_extraction_field WHERE run_id = ? ORDER BY field_code",
+                                  (run["id"],)).fetchall()
+        return dict(run), [dict(f) for f in fields]
+
+    def write_runs(self, runs: list[tuple[dict, list[dict]]]) -> None:
+        """Пачка результатов одной транзакцией: запуски, поля, статусы файлов."""
+        if not runs:
+            return
+        run_cols = RUN_COLUMNS.split(", ")
+        field_cols = ("id", "run_id", "field_code", "value", "confidence", "provenance")
+        with self.transaction(immediate=True) as conn:
+            conn.executemany(
+                f"INSERT INTO ai_extraction_run ({RUN_COLUMNS}) VALUES ({', '.join('?' * len(run_cols))})",
+                [tuple(run.get(c) for c in run_cols) for run, _ in runs],
+            )
+            conn.executemany(
+                f"INSERT INTO ai_extraction_field ({', '.join(field_cols)}) VALUES ({', '.join('?' * len(field_cols))})",
+                [tuple(f.get(c) for c in field_cols) for _, fields in runs for f in fields],
+            )
+            conn.executemany(
+                "UPDATE file_registry SET status = ? WHERE id = ?",
+                [("extracted" if run["status"] == "completed" else "failed", run["file_id"]) for run, _ in runs],
+            )
+
+
+_store: InboxStore | None = None
+
+
+def inbox_store() -> InboxStore:
+    global _store
+    if _store is None:
+        _store = InboxStore(Path(settings.INBOX_DATA_DIR).resolve() / "db" / "inbox.db",
+                            pool_size=settings.INBOX_DB_POOL_SIZE)
+    return _store
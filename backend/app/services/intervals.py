@@ -0,0 +1,233 @@
+"""
+Интервалы и счётчики наработки (программа ТО, LLP/HT, шасси — ФАП-148 п.4.2; EASA Part-M.A.302).
+
+Строковые поля форм ТЗ («6000 FH / 24 MO», «12 345:30», «120 FC») разбираются один
+раз при записи (before_insert / before_update моделей app.models.maintenance) в
+типизированные теневые колонки:
+
+    interval_fh / interval_fc / interval_months / interval_days  — интервал («что наступит раньше»)
+    remaining_fh / remaining_fc                                  — остаток (B-tree, фильтры в SQL)
+    calendar_due                                                 — календарный срок (B-tree)
+
+Исходные строки не меняются — это по-прежнему данные формы. Прогноз даты
+исполнения по налёту ВС считается векторно (project_due), как в life_limit_forecast.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from app.services.life_limit_forecast import add_months
+
+# Обозначения единиц (верхний регистр) → измерение; множитель для лет/недель
+_UNITS: dict[str, tuple[str, int]] = {}
+for _names, _dim, _mult in (
+    (("FH", "H", "HR", "HRS", "HOURS", "FLH", "Ч", "ЧАС", "ЧАСОВ", "ЛЧ"), "fh", 1),
+    (("FC", "C", "CY", "CYC", "CYCLE", "CYCLES", "LDG", "LANDINGS", "Ц", "ЦИКЛ", "ЦИКЛОВ", "ПОС"), "fc", 1),
+    (("MO", "MOS", "M", "MON", "MONTH", "MONTHS", "МЕС", "MES"), "months", 1),
+    (("YR", "YRS", "Y", "YE", "YEAR", "YEARS", "Г", "ГОД", "ЛЕТ"), "months", 12),
+    (("DY", "D", "DAY", "DAYS", "ДН", "ДНЕЙ", "Д", "СУТ"), "days", 1),
+    (("WK", "W", "WEEK", "WEEKS", "НЕД"), "days", 7),
+):
+    for _name in _names:
+        _UNITS[_name] = (_dim, _mult)
+
+# Разряды — пробелом («12 000») или запятой перед тремя цифрами («1,200», «20,000.5»)
+_NUMBER = r"-?\d(?:[\d \u00a0]*\d)?(?:,\d{3}(?!\d))*(?:[.,]\d+)?(?::\d{2})?"
+_GROUPED = re.compile(r"-?\d+(?:,\d{3})+")
+_TOKEN = re.compile(rf"({_NUMBER})[ \t\u00a0]*([A-Za-zА-Яа-яЁё]+)?")
+
+
+@dataclass(frozen=True)
+class Interval:
+    """Интервал / остаток по измерениям; None — измерение не задано."""
+    fh: float | None = None
+    fc: float | None = None
+    months: int | None = None
+    days: int | None = None
+
+    @property
+    def empty(self) -> bool:
+        return self.fh is None and self.fc is None and self.months is None and self.days is None
+
+    def calendar_from(self, start: date | datetime | None) -> date | None:
+        """Календарный срок от даты (месяцы — календарные); None без даты или календарной части."""
+        if start is None or (self.months is None and self.days is None):
+            return None
+        d = _date(start)
+        if self.months:
+            d = add_months(d, self.months)
+        return d + timedelta(days=self.days or 0)
+
+
+def _number(text: str) -> float:
+    text = text.replace(" ", "").replace("\u00a0", "")
+    if "," in text:
+        # «1,200», «1,234.5» — разряды; «2000,5» — десятичная запятая
+        grouped = "." in text or _GROUPED.fullmatch(text.split(":")[0])
+        text = text.replace(",", "" if grouped else ".")
+    if ":" in text:  # ЧЧЧЧ:ММ
+        hours, minutes = text.split(":")
+        sign = -1 if hours.startswith("-") else 1
+        return sign * (abs(float(hours)) + float(minutes) / 60)
+    return float(text)
+
+
+def parse_counter(value) -> float | None:
+    """Значение счётчика: «12345», «12 345,5», «1,234.5», «12345:30», «12345 FH» → float."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _TOKEN.search(str(value))
+    if not m:
+        return None
+    try:
+        return _number(m.group(1).strip())
+    except ValueError:
+        return None
+
+
+def parse_interval(text, default_unit: str | None = None) -> Interval:
+    """«6000 FH / 24 MO», «12000 FC or 10 YR», «1500» (+ default_unit) → Interval.
+
+    Несколько измерений — «что наступит раньше»; повтор измерения — берётся меньшее.
+    Число без единицы — default_unit (например, LandingGearComponent.dim), иначе игнорируется.
+    """
+    if text is None or str(text).strip() == "":
+        return Interval()
+    values: dict[str, float] = {}
+    for number, unit in _TOKEN.findall(str(text)):
+        dim_mult = _UNITS.get(unit.upper()) or _UNITS.get((default_unit or "").upper())
+        if dim_mult is None:
+            continue
+        dim, mult = dim_mult
+        try:
+            value = _number(number.strip()) * mult
+        except ValueError:
+            continue
+        values[dim] = min(values[dim], value) if dim in values else value
+    return Interval(
+        fh=values.get("fh"),
+        fc=values.get("fc"),
+        months=int(values["months"]) if "months" in values else None,
+        days=int(values["days"]) if "days" in values else None,
+    )
+
+
+def _format_number(value: float) -> str:
+    return f"{round(value, 2):.2f}".rstrip("0").rstrip(".")
+
+
+def format_interval(iv: Interval) -> str | None:
+    """Interval → строка формы («100 FH / 50 FC / 6 MO»); разбирается parse_interval обратно."""
+    parts = []
+    if iv.fh is not None:
+        parts.append(f"{_format_number(iv.fh)} FH")
+    if iv.fc is not None:
+        parts.append(f"{_format_number(iv.fc)} FC")
+    if iv.months is not None:
+        parts.append(f"{iv.months} MO")
+    if iv.days is not None:
+        parts.append(f"{iv.days} DY")
+    return " / ".join(parts) or None
+
+
+def _date(value) -> date | None:
+    """datetime / date / ISO-строка (сырые строки SQLite) → date."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _sub(limit: float | None, used: float | None) -> float | None:
+    return None if limit is None or used is None else limit - used
+
+
+def _set_interval(target, iv: Interval) -> None:
+    target.interval_fh, target.interval_fc = iv.fh, iv.fc
+    target.interval_months, target.interval_days = iv.months, iv.days
+
+
+# ---------------------------------------------------------------------------
+# Теневые колонки по моделям (вызываются из событий before_insert / before_update)
+# ---------------------------------------------------------------------------
+def sync_maintenance_task(task, today: date | None = None) -> None:
+    iv = parse_interval(task.interval)
+    if iv.empty:
+        iv = parse_interval(task.threshold)
+    _set_interval(task, iv)
+    remaining = parse_interval(task.time_remaining)
+    task.remaining_fh, task.remaining_fc = remaining.fh, remaining.fc
+    task.calendar_due = (
+        _date(task.next_due)
+        or iv.calendar_from(task.last_accomplished)
+        or remaining.calendar_from(today or datetime.now(timezone.utc).date())
+    )
+
+
+def sync_limited_life(comp) -> None:
+    comp.tsn_fh, comp.csn_fc = parse_counter(comp.tsn), parse_counter(comp.csn)
+    comp.tah_inst_fh, comp.tac_inst_fc = parse_counter(comp.tah_inst), parse_counter(comp.tac_inst)
+    iv = parse_interval(comp.interval)
+    _set_interval(comp, iv)
+    to_go = parse_interval(comp.to_go)
+    comp.remaining_fh = to_go.fh if to_go.fh is not None else _sub(iv.fh, comp.tsn_fh)
+    comp.remaining_fc = to_go.fc if to_go.fc is not None else _sub(iv.fc, comp.csn_fc)
+    comp.calendar_due = _date(comp.expected_date) or iv.calendar_from(comp.install_date)
+
+
+def sync_landing_gear(comp) -> None:
+    comp.tsn_fh, comp.csn_fc = parse_counter(comp.tsn), parse_counter(comp.csn)
+    comp.tsr_value = parse_counter(comp.tsr)
+    unit = (comp.dim or "").strip() or None
+    iv = parse_interval(comp.interval, default_unit=unit)
+    _set_interval(comp, iv)
+    to_go = parse_interval(comp.to_go, default_unit=unit)
+    dim = _UNITS.get((unit or "").upper(), ("", 1))[0]
+    comp.remaining_fh = to_go.fh if to_go.fh is not None else (_sub(iv.fh, comp.tsr_value) if dim == "fh" else None)
+    comp.remaining_fc = to_go.fc if to_go.fc is not None else (_sub(iv.fc, comp.tsr_value) if dim == "fc" else None)
+    comp.calendar_due = _date(comp.due_at) or _date(comp.expected) or iv.calendar_from(comp.install_date)
+
+
+# ---------------------------------------------------------------------------
+# Векторный прогноз
+# ---------------------------------------------------------------------------
+DRIVERS = ("flight_hours", "cycles", "calendar")
+
+
+def project_due(
+    remaining_fh, remaining_fc, calendar_due, fh_per_day, fc_per_day, today: date | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Дни до исполнения = min(остаток ч / налёт, остаток ц / налёт, дни до календарного срока).
+
+    Аргументы — последовательности одной длины (None → нет измерения); налёт — скаляр
+    или массив по строкам. Возвращает (дни, индекс DRIVERS или -1); просрочено → 0, нет данных → inf.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    rem_h = np.array([np.nan if v is None else float(v) for v in remaining_fh], dtype=float)
+    rem_c = np.array([np.nan if v is None else float(v) for v in remaining_fc], dtype=float)
+    due = np.array([np.datetime64(_date(v), "D") if v else np.datetime64("NaT") for v in calendar_due],
+                   dtype="datetime64[D]")
+    rem_d = (due - np.datetime64(today, "D")).astype("float64")
+    rem_d[np.isnat(due)] = np.nan
+    fh_rate = np.broadcast_to(np.asarray(fh_per_day, dtype=float), rem_h.shape)
+    fc_rate = np.broadcast_to(np.asarray(fc_per_day, dtype=float), rem_c.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_h = np.where(rem_h <= 0, 0.0, rem_h / fh_rate)
+        days_c = np.where(rem_c <= 0, 0.0, rem_c / fc_rate)
+    days_h[np.isnan(rem_h) | ~np.isfinite(days_h)] = np.nan
+    days_c[np.isnan(rem_c) | ~np.isfinite(days_c)] = np.nan
+    stacked = np.vstack([days_h, days_c, np.maximum(rem_d, 0)])
+    has_any = ~np.all(np.isnan(stacked), axis=0)
+    days = np.full(rem_h.size, np.inf)
+    driver = np.full(rem_h.size, -1)
+    if has_any.any():
+        days[has_any] = np.nanmin(stacked[:, has_any], axis=0)
+        driver[has_any] = np.nanargmin(stacked[:, has_any], axis=0)
+    return days, driver
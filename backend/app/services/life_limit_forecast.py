@@ -0,0 +1,325 @@
+"""
+Прогноз выработки ресурсов и сроков службы (ФАП-148 п.4.2; EASA Part-M.A.302).
+
+Хранилище airworthiness_core._life_limits остаётся источником истины; движок держит
+его колоночную копию (NumPy) и считает остаток и прогнозную дату исчерпания для
+всего парка за один векторный проход:
+
+    остаток ч / ц / дни  →  дни до исчерпания = остаток / налёт ВС в сутки
+    прогноз = min(по часам, по циклам, по календарю)  («что наступит раньше»)
+
+Налёт ВС (ч/сут, цикл/сут) выводится из обновлений наработки (update-usage) —
+скользящее среднее по приращениям; для ВС без истории берётся среднее по парку.
+Календарный срок считается по календарным месяцам от install_date (не 30 дней/мес).
+
+Результаты по ВС кэшируются (LRU на CACHE_SIZE записей (ВС, сутки); прошедшие сутки
+вытесняются при смене даты) и сбрасываются при update-usage / создании записи этого ВС;
+запросы «что истекает в ближайшие N дней» идут по вектору прогноза парка.
+"""
+from __future__ import annotations
+
+import calendar
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+# Минимальный интервал между наблюдениями для оценки налёта (сутки) и вес EWMA
+MIN_RATE_INTERVAL_DAYS = 1.0 / 24
+RATE_ALPHA = 0.3
+# ВС без привязки (склад) — отдельный «борт» без налёта
+NO_AIRCRAFT = ""
+# Записей (ВС, сутки) в кэше прогноза
+CACHE_SIZE = 4096
+
+
+def add_months(d: date, months: int) -> date:
+    """Календарное прибавление месяцев (31.01 + 1 мес → 28/29.02)."""
+    m = d.month - 1 + months
+    year, month = d.year + m // 12, m % 12 + 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def calendar_expiry(install_date, months) -> date | None:
+    if not install_date or not months:
+        return None
+    try:
+        installed = datetime.fromisoformat(str(install_date)).date()
+    except (ValueError, TypeError):
+        return None
+    return add_months(installed, int(months))
+
+
+def _num(value) -> float:
+    return float(value) if value not in (None, "") else np.nan
+
+
+def _copy_items(items: list[dict]) -> list[dict]:
+    """Записи из кэша наружу — копиями: вызывающий код не должен менять кэш."""
+    return [{**item, "remaining": dict(item["remaining"])} for item in items]
+
+
+class LifeLimitForecaster:
+    """Колоночный индекс Life Limits + прогноз по налёту ВС."""
+
+    def __init__(self, store: dict, capacity: int = 1024, cache_size: int = CACHE_SIZE):
+        self.store = store
+        self._lock = threading.RLock()
+        self._capacity = capacity
+        self._cache_size = cache_size
+        self.rebuild()
+
+    # ------------------------------------------------------------------
+    # Колонки
+    # ------------------------------------------------------------------
+    def rebuild(self) -> None:
+        with self._lock:
+            n = max(self._capacity, len(self.store))
+            self._ids: list[str] = []
+            self._row: dict[str, int] = {}
+            self._aircraft_codes: dict[str, int] = {}
+            self._aircraft_ids: list[str] = []
+            self._rows_of_aircraft: dict[int, list[int]] = {}
+            self._hours_limit = np.full(n, np.nan)
+            self._cycles_limit = np.full(n, np.nan)
+            self._hours = np.zeros(n)
+            self._cycles = np.zeros(n)
+            self._cal_expiry = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+            self._aircraft = np.zeros(n, dtype=np.int32)
+            self._alive = np.zeros(n, dtype=bool)
+            # Налёт по ВС: ч/сут, цикл/сут (NaN — нет данных)
+            self._fh_rate = np.full(16, np.nan)
+            self._fc_rate = np.full(16, np.nan)
+            self._last_obs: dict[str, tuple[datetime, float, float]] = {}
+            self._cache: OrderedDict[tuple[str, date], list[dict]] = OrderedDict()
+            self._cache_day: date | None = None
+            self._fleet: tuple[date, int, np.ndarray] | None = None
+            self._version = 0
+            for ll in self.store.values():
+                self.upsert(ll)
+
+    def _aircraft_code(self, aircraft_id: str | None) -> int:
+        key = aircraft_id or NO_AIRCRAFT
+        code = self._aircraft_codes.get(key)
+        if code is None:
+            code = len(self._aircraft_ids)
+            self._aircraft_codes[key] = code
+            self._aircraft_ids.append(key)
+            if code >= len(self._fh_rate):
+                grow = len(self._fh_rate)
+                self._fh_rate = np.concatenate([self._fh_rate, np.full(grow, np.nan)])
+                self._fc_rate = np.concatenate([self._fc_rate, np.full(grow, np.nan)])
+        return code
+
+    def _grow(self) -> None:
+        extra = len(self._hours)
+        self._hours_limit = np.concatenate([self._hours_limit, np.full(extra, np.nan)])
+        self._cycles_limit = np.concatenate([self._cycles_limit, np.full(extra, np.nan)])
+        self._hours = np.concatenate([self._hours, np.zeros(extra)])
+        self._cycles = np.concatenate([self._cycles, np.zeros(extra)])
+        self._cal_expiry = np.concatenate([self._cal_expiry, np.full(extra, np.datetime64("NaT"), dtype="datetime64[D]")])
+        self._aircraft = np.concatenate([self._aircraft, np.zeros(extra, dtype=np.int32)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+
+    def _invalidate(self, aircraft_id: str | None) -> None:
+        key = aircraft_id or NO_AIRCRAFT
+        for cached in [k for k in self._cache if k[0] == key]:
+            del self._cache[cached]
+        self._version += 1
+
+    def _invalidate_rates(self) -> None:
+        """Налёт ВС изменился — меняется и среднее по парку для ВС без истории: сброс всего кэша."""
+        self._cache.clear()
+        self._version += 1
+        self._fleet = None
+
+    def upsert(self, ll: dict) -> None:
+        """Создание / изменение записи Life Limit."""
+        lid = ll["id"]
+        with self._lock:
+            row = self._row.get(lid)
+            if row is None:
+                row = len(self._ids)
+                if row >= len(self._hours):
+                    self._grow()
+                self._ids.append(lid)
+                self._row[lid] = row
+            else:
+                old_code = int(self._aircraft[row])
+                self._rows_of_aircraft[old_code].remove(row)
+                self._invalidate(self._aircraft_ids[old_code])
+            code = self._aircraft_code(ll.get("aircraft_id"))
+            self._rows_of_aircraft.setdefault(code, []).append(row)
+            self._aircraft[row] = code
+            self._hours_limit[row] = _num(ll.get("flight_hours_limit")) or np.nan
+            self._cycles_limit[row] = _num(ll.get("cycles_limit")) or np.nan
+            self._hours[row] = _num(ll.get("current_hours")) if ll.get("current_hours") is not None else 0.0
+            self._cycles[row] = _num(ll.get("current_cycles")) if ll.get("current_cycles") is not None else 0.0
+            expiry = calendar_expiry(ll.get("install_date"), ll.get("calendar_limit_months"))
+            self._cal_expiry[row] = np.datetime64(expiry, "D") if expiry else np.datetime64("NaT")
+            self._alive[row] = True
+            self._invalidate(ll.get("aircraft_id"))
+
+    def record_usage(self, ll: dict, at: datetime | None = None) -> None:
+        """update-usage: обновить колонки и оценку налёта ВС по приращению наработки."""
+        at = at or datetime.now(timezone.utc)
+        lid = ll["id"]
+        hours = float(ll.get("current_hours") or 0)
+        cycles = float(ll.get("current_cycles") or 0)
+        with self._lock:
+            prev = self._last_obs.get(lid)
+            code = self._aircraft_code(ll.get("aircraft_id"))
+            if prev is not None and ll.get("aircraft_id"):
+                prev_at, prev_hours, prev_cycles = prev
+                days = (at - prev_at).total_seconds() / 86400
+                if days >= MIN_RATE_INTERVAL_DAYS and hours >= prev_hours and cycles >= prev_cycles:
+                    self._observe_rate(code, (hours - prev_hours) / days, (cycles - prev_cycles) / days)
+            self._last_obs[lid] = (at, hours, cycles)
+            self.upsert(ll)
+
+    def _observe_rate(self, code: int, fh_per_day: float, fc_per_day: float) -> None:
+        for rates, sample in ((self._fh_rate, fh_per_day), (self._fc_rate, fc_per_day)):
+            current = rates[code]
+            rates[code] = sample if np.isnan(current) else (1 - RATE_ALPHA) * current + RATE_ALPHA * sample
+        self._invalidate_rates()
+
+    def set_utilization(self, aircraft_id: str, fh_per_day: float | None, fc_per_day: float | None) -> None:
+        """Задать налёт ВС явно (план полётов / импорт)."""
+        with self._lock:
+            code = self._aircraft_code(aircraft_id)
+            self._fh_rate[code] = np.nan if fh_per_day is None else fh_per_day
+            self._fc_rate[code] = np.nan if fc_per_day is None else fc_per_day
+            self._invalidate_rates()
+
+    def utilization(self, aircraft_id: str) -> dict:
+        code = self._aircraft_codes.get(aircraft_id)
+        fh, fc = (np.nan, np.nan) if code is None else (self._fh_rate[code], self._fc_rate[code])
+        return {"fh_per_day": None if np.isnan(fh) else round(float(fh), 2),
+                "fc_per_day": None if np.isnan(fc) else round(float(fc), 2)}
+
+    # ------------------------------------------------------------------
+    # Векторный расчёт
+    # ------------------------------------------------------------------
+    def _rates(self) -> tuple[np.ndarray, np.ndarray]:
+        """Налёт по ВС; без истории — среднее по парку (склад — без налёта)."""
+        n = len(self._aircraft_ids)
+        fh, fc = self._fh_rate[:n].copy(), self._fc_rate[:n].copy()
+        for rates in (fh, fc):
+            known = rates[~np.isnan(rates)]
+            if known.size:
+                rates[np.isnan(rates)] = known.mean()
+        no_aircraft = self._aircraft_codes.get(NO_AIRCRAFT)
+        if no_aircraft is not None:
+            fh[no_aircraft] = fc[no_aircraft] = np.nan
+        return fh, fc
+
+    def _compute(self, rows: np.ndarray, today: date) -> dict[str, np.ndarray]:
+        fh_rate, fc_rate = self._rates()
+        ac = self._aircraft[rows]
+        rem_h = self._hours_limit[rows] - self._hours[rows]
+        rem_c = self._cycles_limit[rows] - self._cycles[rows]
+        rem_d = (self._cal_expiry[rows] - np.datetime64(today, "D")).astype("float64")
+        rem_d[np.isnat(self._cal_expiry[rows])] = np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            days_h = np.where(rem_h <= 0, 0.0, rem_h / fh_rate[ac])
+            days_c = np.where(rem_c <= 0, 0.0, rem_c / fc_rate[ac])
+        days_h[np.isnan(rem_h) | ~np.isfinite(days_h)] = np.nan
+        days_c[np.isnan(rem_c) | ~np.isfinite(days_c)] = np.nan
+        stacked = np.vstack([days_h, days_c, np.maximum(rem_d, 0)])
+        has_any = ~np.all(np.isnan(stacked), axis=0)
+        days = np.full(rows.size, np.inf)
+        days[has_any] = np.nanmin(stacked[:, has_any], axis=0)
+        driver = np.full(rows.size, -1)
+        driver[has_any] = np.nanargmin(stacked[:, has_any], axis=0)
+        critical = (rem_h <= 0) | (rem_c <= 0) | (rem_d <= 0)
+        return {"rem_h": rem_h, "rem_c": rem_c, "rem_d": rem_d, "days": days,
+                "driver": driver, "critical": critical}
+
+    def _fleet_days(self, today: date) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Прогноз по всему парку (кэш до следующего изменения / смены суток)."""
+        with self._lock:
+            if self._fleet is None or self._fleet[0] != today or self._fleet[1] != self._version:
+                rows = np.flatnonzero(self._alive[:len(self._ids)])
+                res = self._compute(rows, today)
+                self._fleet = (today, self._version, (rows, res["days"], res["critical"]))
+            return self._fleet[2]
+
+    # ------------------------------------------------------------------
+    # Запросы
+    # ------------------------------------------------------------------
+    _DRIVERS = ("flight_hours", "cycles", "calendar")
+
+    def _rows_to_items(self, rows: np.ndarray, res: dict, today: date) -> list[dict]:
+        items = []
+        for i, row in enumerate(rows.tolist()):
+            remaining = {}
+            if not np.isnan(res["rem_h"][i]):
+                remaining["hours"] = round(float(res["rem_h"][i]), 1)
+            if not np.isnan(res["rem_c"][i]):
+                remaining["cycles"] = int(res["rem_c"][i])
+            if not np.isnan(res["rem_d"][i]):
+                remaining["days"] = int(res["rem_d"][i])
+            days = res["days"][i]
+            projected = None
+            if np.isfinite(days):
+                projected = (np.datetime64(today, "D") + np.timedelta64(int(days), "D")).astype(date).isoformat()
+            items.append({
+                **self.store[self._ids[row]],
+                "remaining": remaining,
+                "critical": bool(res["critical"][i]),
+                "projected_exhaustion_date": projected,
+                "projected_days": None if not np.isfinite(days) else int(days),
+                "limiting_factor": self._DRIVERS[res["driver"][i]] if res["driver"][i] >= 0 else None,
+            })
+        return items
+
+    def for_aircraft(self, aircraft_id: str | None, today: date | None = None) -> list[dict]:
+        """Остаток и прогноз по ВС (кэш до изменения записей ВС или налёта парка); копии записей кэша."""
+        today = today or datetime.now(timezone.utc).date()
+        key = (aircraft_id or NO_AIRCRAFT, today)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return _copy_items(cached)
+            if self._cache_day is None or today > self._cache_day:
+                # Сменились сутки — прогнозы на прошедшие больше не запрашиваются
+                for stale in [k for k in self._cache if k[1] < today]:
+                    del self._cache[stale]
+                self._cache_day = today
+            code = self._aircraft_codes.get(key[0])
+            rows = np.array(sorted(self._rows_of_aircraft.get(code, [])), dtype=np.int64)
+            cached = self._rows_to_items(rows, self._compute(rows, today), today) if rows.size else []
+            self._cache[key] = cached
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return _copy_items(cached)
+
+    def all_items(self, today: date | None = None) -> list[dict]:
+        today = today or datetime.now(timezone.utc).date()
+        items = []
+        for aircraft_id in list(self._aircraft_ids):
+            items.extend(self.for_aircraft(aircraft_id, today))
+        return items
+
+    def expiring_within(self, days: int, today: date | None = None, aircraft_id: str | None = None) -> list[dict]:
+        """Что исчерпается в ближайшие N дней (включая уже исчерпанные), по дате прогноза."""
+        today = today or datetime.now(timezone.utc).date()
+        rows, proj, _ = self._fleet_days(today)
+        mask = proj <= days
+        if aircraft_id is not None:
+            code = self._aircraft_codes.get(aircraft_id)
+            mask &= self._aircraft[rows] == (code if code is not None else -1)
+        hit = np.flatnonzero(mask)
+        hit = hit[np.argsort(proj[hit], kind="stable")]
+        selected = rows[hit]
+        return self._rows_to_items(selected, self._compute(selected, today), today) if selected.size else []
+
+    def critical_count(self, today: date | None = None, aircraft_id: str | None = None) -> int:
+        today = today or datetime.now(timezone.utc).date()
+        rows, _, critical = self._fleet_days(today)
+        if aircraft_id is None:
+            return int(critical.sum())
+        code = self._aircraft_codes.get(aircraft_id)
+        return int((critical & (self._aircraft[rows] == (code if code is not None else -1))).sum())
@@ -1,6 +1,54 @@
+"""
+Уведомления: in-app (таблица notifications) и доставка по каналам email / WS / push.
+
+dispatch(event, audience) — рассылка за один проход:
+  1. получатели и их настройки — один SELECT users LEFT JOIN notification_preferences
+     по аудитории (пользователи, организации, роли, типы ВС в парке организации);
+     отключившие этот тип события отфильтровываются в том же запросе;
+  2. строки notifications — одним multi-row INSERT, одна транзакция;
+  3. после commit — по каналу на пачку: email (очередь app.services.email_service),
+     WS (ws_manager.publish_to_users, одно сериализованное сообщение), push
+     (отправитель регистрируется register_channel; без него канал пропускается).
+Рассылка по организации — не N commit'ов, а 2 запроса к БД при любом N.
+
+Пользователь везде — sub токена (UserInfo.id = users.external_subject): по нему хранятся
+настройки, адресуются notifications.recipient_user_id и соединения WS.
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+from sqlalchemy import and_, exists, false, func, insert, literal, or_, select
 from sqlalchemy.orm import Session
 
 from app.models import Notification
+from app.models.aircraft_db import Aircraft
+from app.models.aircraft_type import AircraftType
+from app.models.notification_preference import PREFERENCE_DEFAULTS, NotificationPreference
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("email", "ws", "push")
+# Тип события → флаг в notification_preferences (имена событий ws_manager / CRITICAL_TEMPLATES — синонимы)
+EVENT_PREFERENCES = {
+    "ad_mandatory": "ad_mandatory",
+    "ad_new_mandatory": "ad_mandatory",
+    "ad_recommended": "ad_recommended",
+    "defect_critical": "defect_critical",
+    "defect_major": "defect_major",
+    "defect_minor": "defect_minor",
+    "wo_aog": "wo_aog",
+    "wo_closed": "wo_closed",
+    "wo_closed_crs": "wo_closed",
+    "life_limit_critical": "life_limit_critical",
+    "personnel_expiry": "personnel_expiry",
+    "personnel_expired": "personnel_expiry",
+}
 
 
 def notify(db: Session, recipient_user_id: str, title: str, body: str | None = None) -> Notification:
@@ -9,3 +57,153 @@ def notify(db: Session, recipient_user_id: str, title: str, body: str | None = N
     db.commit()
     db.refresh(n)
     return n
+
+
+@dataclass(frozen=True)
+class Audience:
+    """Кому: явные пользователи ∪ пользователи, подходящие под все заданные фильтры (организация, роль, тип ВС)."""
+    user_ids: tuple[str, ...] = ()  # sub токена (users.external_subject)
+    org_ids: tuple[str, ...] = ()
+    roles: tuple[str, ...] = ()
+    aircraft_type_ids: tuple[str, ...] = ()  # организации, эксплуатирующие ВС этих типов
+
+    def condition(self):
+        filters = []
+        if self.org_ids:
+            filters.append(User.organization_id.in_(self.org_ids))
+        if self.roles:
+            filters.append(User.role.in_(self.roles))
+        if self.aircraft_type_ids:
+            filters.append(exists().where(Aircraft.operator_id == User.organization_id,
+                                          Aircraft.aircraft_type_id.in_(self.aircraft_type_ids)))
+        group = and_(*filters) if filters else false()
+        return or_(User.external_subject.in_(self.user_ids), group) if self.user_ids else group
+
+
+def aircraft_type_ids(db: Session, names: Iterable[str]) -> list[str]:
+    """Типы ВС по обозначению из ДЛГ / бюллетеня: модель или код ИКАО."""
+    names = [n for n in names if n]
+    if not names:
+        return []
+    return list(db.execute(
+        select(AircraftType.id).where(or_(AircraftType.model.in_(names), AircraftType.icao_code.in_(names)))
+    ).scalars())
+
+
+@dataclass
+class Recipient:
+    user_id: str  # sub токена (users.external_subject)
+    email: str | None
+    channels: frozenset[str]
+
+
+@dataclass
+class DispatchResult:
+    event: str
+    recipients: int = 0
+    channels: dict[str, int] = field(default_factory=dict)  # канал → адресатов, переданных отправителю
+    notification_ids: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {"event": self.event, "recipients": self.recipients, "channels": self.channels}
+
+
+def _pref(column: str):
+    return func.coalesce(getattr(NotificationPreference, column), literal(PREFERENCE_DEFAULTS[column]))
+
+
+def resolve_recipients(db: Session, event: str, audience: Audience) -> list[Recipient]:
+    """Получатели события с учётом настроек — один запрос."""
+    stmt = (
+        select(User.external_subject.label("user_id"), User.email,
+               *(_pref(f"channels_{c}").label(f"channels_{c}") for c in CHANNELS))
+        .select_from(User)
+        .outerjoin(NotificationPreference, NotificationPreference.user_id == User.external_subject)
+        .where(audience.condition())
+    )
+    column = EVENT_PREFERENCES.get(event)
+    if column is not None:
+        stmt = stmt.where(_pref(column) == literal(True))
+    return [
+        Recipient(row.user_id, row.email, frozenset(c for c in CHANNELS if getattr(row, f"channels_{c}")))
+        for row in db.execute(stmt)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Каналы доставки: sender(recipients, event, title, body, payload) → число принятых
+# ---------------------------------------------------------------------------
+ChannelSender = Callable[[list[Recipient], str, str, "str | None", dict], int]
+
+
+def _send_email(recipients: list[Recipient], event: str, title: str, body: str | None, payload: dict) -> int:
+    from app.services.email_service import EmailMessage, email_service
+    return email_service.send_many([
+        EmailMessage(to=r.email, subject=title, body=body or title, html=False) for r in recipients if r.email
+    ])
+
+
+def _send_ws(recipients: list[Recipient], event: str, title: str, body: str | None, payload: dict) -> int:
+    from app.services.ws_manager import ws_manager
+    message = {"type": event, "data": {**payload, "title": title, "body": body},
+               "timestamp": datetime.now(timezone.utc).isoformat()}
+    return ws_manager.publish_to_users([r.user_id for r in recipients], message)
+
+
+_senders: dict[str, ChannelSender] = {"email": _send_email, "ws": _send_ws}
+
+
+def register_channel(channel: str, sender: ChannelSender | None) -> None:
+    """Подключить (None — отключить) отправителя канала: push-шлюз, замена email/WS в тестах."""
+    if channel not in CHANNELS:
+        raise ValueError(f"Unknown channel {channel}; expected one of {CHANNELS}")
+    if sender is None:
+        _senders.pop(channel, None)
+    else:
+        _senders[channel] = sender
+
+
+def deliver(recipients: Iterable[Recipient], event: str, title: str, body: str | None = None,
+            payload: dict | None = None) -> dict[str, int]:
+    """Передать уведомление отправителям каналов — одна пачка на канал."""
+    by_channel: dict[str, list[Recipient]] = {c: [] for c in CHANNELS}
+    for r in recipients:
+        for c in r.channels:
+            by_channel[c].append(r)
+    sent = {}
+    for channel, group in by_channel.items():
+        if not group:
+            continue
+        sender = _senders.get(channel)
+        if sender is None:
+            logger.debug("Channel %s has no sender, %d recipients skipped", channel, len(group))
+            sent[channel] = 0
+            continue
+        try:
+            sent[channel] = sender(group, event, title, body, payload or {})
+        except Exception as e:
+            logger.error("Notification channel %s failed for %s (%d recipients): %s", channel, event, len(group), e)
+            sent[channel] = 0
+    return sent
+
+
+def dispatch(db: Session, event: str, audience: Audience, title: str, body: str | None = None,
+             payload: dict | None = None) -> DispatchResult:
+    """Уведомить аудиторию о событии: in-app строки одним INSERT, затем каналы. Коммитит сессию."""
+    result = DispatchResult(event=event)
+    recipients = resolve_recipients(db, event, audience)
+    if not recipients:
+        return result
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"id": str(uuid.uuid4()), "recipient_user_id": r.user_id, "title": title[:255], "body": body,
+         "is_read": False, "created_at": now, "updated_at": now}
+        for r in recipients
+    ]
+    db.execute(insert(Notification.__table__), rows)
+    db.commit()
+    result.recipients = len(recipients)
+    result.notification_ids = [row["id"] for row in rows]
+    result.channels = deliver(recipients, event, title, body, payload)
+    logger.info("Dispatched %s to %d recipients: %s", event, result.recipients, result.channels)
+    return result
@@ -0,0 +1,390 @@
+"""
+Сервис формирования PDF (ReportLab) — наряды на ТО (CRS) и отчёт для ФАВТ.
+
+- Шрифт DejaVu (кириллица) и стили регистрируются один раз на процесс.
+- Рендер выполняется в пуле процессов (PDF_RENDER_WORKERS; 0 — в текущем процессе),
+  API-воркер только ждёт результат.
+- Готовые PDF кэшируются по хэшу версии (sha256 от канонического JSON всего payload,
+  включая дату формирования — она печатается на странице), LRU с ограничением по объёму
+  (PDF_CACHE_MAX_MB). Рендер не читает часы сам: дата приходит в payload (generated_at).
+- render_zip_stream() — пакетный рендер в потоковый ZIP (закрытие месяца).
+
+Функции render_* принимают только сериализуемые dict — их можно передавать в пул.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from io import BytesIO
+from typing import Callable, Iterable, Iterator
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Per-process resources (fonts, styles)
+# ---------------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def base_font() -> str:
+    """Зарегистрировать DejaVu один раз на процесс; fallback — Helvetica (без кириллицы)."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    try:
+        pdfmetrics.registerFont(TTFont("DejaVu", settings.PDF_FONT_PATH))
+        return "DejaVu"
+    except Exception as e:
+        logger.warning("PDF font %s not available, using Helvetica: %s", settings.PDF_FONT_PATH, e)
+        return "Helvetica"
+
+
+@lru_cache(maxsize=1)
+def stylesheet():
+    """Стили ReportLab с кириллическим шрифтом — собираются один раз на процесс."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    font = base_font()
+    styles = getSampleStyleSheet()
+    for name in ("Normal", "Title", "Heading2", "Heading3", "Heading4"):
+        styles[name].fontName = font
+    return styles
+
+
+def _init_worker() -> None:
+    base_font()
+    stylesheet()
+
+
+# ---------------------------------------------------------------------------
+# Renderers (pure: dict → bytes)
+# ---------------------------------------------------------------------------
+def render_work_order(wo: dict) -> bytes:
+    """Наряд на ТО + CRS. ФАП-145 п.145.A.50, A.55."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    font = base_font()
+    styles = stylesheet()
+    buf = BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, topMargin=30, bottomMargin=30)
+    elements = []
+
+    elements.append(Paragraph("НАРЯД НА ТО / WORK ORDER", styles["Title"]))
+    elements.append(Paragraph(f"No: {wo.get('wo_number', '?')}", styles["Heading2"]))
+    elements.append(Spacer(1, 12))
+
+    data = [
+        ["Борт / Aircraft:", wo.get("aircraft_reg", "")],
+        ["Тип работ / Type:", wo.get("wo_type", "")],
+        ["Наименование / Title:", wo.get("title", "")],
+        ["Приоритет / Priority:", wo.get("priority", "")],
+        ["Статус / Status:", wo.get("status", "")],
+        ["План. ч/ч / Est. MH:", str(wo.get("estimated_manhours", 0))],
+        ["Факт. ч/ч / Actual MH:", str(wo.get("actual_manhours", "—"))],
+    ]
+    t = Table(data, colWidths=[180, 340])
+    t.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (0, -1), colors.Color(0.9, 0.9, 0.9)),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ]))
+    elements.append(t)
+    elements.append(Spacer(1, 16))
+
+    if wo.get("description"):
+        elements.append(Paragraph("Описание работ:", styles["Heading4"]))
+        elements.append(Paragraph(wo["description"], styles["Normal"]))
+        elements.append(Spacer(1, 12))
+
+    if wo.get("findings"):
+        elements.append(Paragraph("Замечания / Findings:", styles["Heading4"]))
+        elements.append(Paragraph(wo["findings"], styles["Normal"]))
+        elements.append(Spacer(1, 12))
+
+    if wo.get("crs_signed_by"):
+        elements.append(Spacer(1, 20))
+        elements.append(Paragraph("CERTIFICATE OF RELEASE TO SERVICE (CRS)", styles["Heading3"]))
+        elements.append(Paragraph(
+            "Certifies that the work specified was carried out in accordance with "
+            "Part-145 and the aircraft/component is considered ready for release to service.",
+            styles["Normal"],
+        ))
+        elements.append(Spacer(1, 8))
+        crs_data = [
+            ["CRS подписал / Signed by:", wo["crs_signed_by"]],
+            ["Дата / Date:", wo.get("crs_date", "")],
+            ["Основание / Ref:", "ФАП-145 п.145.A.50; EASA Part-145.A.50"],
+        ]
+        ct = Table(crs_data, colWidths=[180, 340])
+        ct.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (0, -1), colors.Color(0.85, 0.95, 0.85)),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("FONTNAME", (0, 0), (-1, -1), font),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ]))
+        elements.append(ct)
+
+    elements.append(Spacer(1, 30))
+    footer = f"Сформировано: {wo['generated_at']} | АСУ ТК КЛГ" if wo.get("generated_at") else "АСУ ТК КЛГ"
+    elements.append(Paragraph(footer, styles["Normal"]))
+
+    doc.build(elements)
+    return buf.getvalue()
+
+
+def render_regulator_report(payload: dict) -> bytes:
+    """Отчёт для ФАВТ: титульный лист + сводные показатели. payload: overview, generated_by, generated_at."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    font = base_font()
+    overview = payload["overview"]
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    w, h = A4
+
+    c.setFont(font, 24)
+    c.drawCentredString(w / 2, h - 80 * mm, "ОТЧЁТ")
+    c.setFont(font, 14)
+    c.drawCentredString(w / 2, h - 95 * mm, "для Федерального агентства воздушного транспорта")
+    c.drawCentredString(w / 2, h - 105 * mm, "(Росавиация)")
+    c.setFont(font, 10)
+    c.drawCentredString(w / 2, h - 125 * mm, f"Дата формирования: {payload['generated_at']}")
+    c.drawCentredString(w / 2, h - 135 * mm, f"Сформировал: {payload['generated_by']}")
+    c.setFont(font, 8)
+    c.drawCentredString(w / 2, h - 160 * mm, "Правовые основания: ВК РФ ст. 8, 24.1, 28, 33, 36, 37, 67, 68;")
+    c.drawCentredString(w / 2, h - 168 * mm, "ФАП-246, ФАП-285; ICAO Annex 6, 7, 8, 19; EASA Part-M, Part-ARO")
+    c.drawCentredString(w / 2, h - 185 * mm, "АСУ ТК КЛГ — АО «REFLY»")
+    c.showPage()
+
+    c.setFont(font, 16)
+    c.drawString(20 * mm, h - 20 * mm, "1. Сводные показатели")
+    c.setFont(font, 10)
+    y = h - 40 * mm
+    sections = [
+        ("Парк ВС", [
+            f"Всего: {overview['aircraft']['total']}",
+            f"Годные к полётам: {overview['aircraft']['airworthy']}",
+            f"На ТО: {overview['aircraft']['in_maintenance']}",
+            f"Приостановлены: {overview['aircraft']['grounded']}",
+            f"Списаны: {overview['aircraft']['decommissioned']}",
+        ]),
+        ("Сертификация", [
+            f"Всего заявок: {overview['certification']['total_applications']}",
+            f"На рассмотрении: {overview['certification']['pending']}",
+            f"Одобрено: {overview['certification']['approved']}",
+            f"Отклонено: {overview['certification']['rejected']}",
+        ]),
+        ("Безопасность полётов", [
+            f"Всего рисков: {overview['safety']['total_risks']}",
+            f"Критические: {overview['safety']['critical']}",
+            f"Высокие: {overview['safety']['high']}",
+            f"Не устранены: {overview['safety']['unresolved']}",
+        ]),
+        ("Надзор", [
+            f"Аудитов за 30 дней: {overview['audits_last_30d']}",
+            f"Организации: {overview['organizations']['total']}",
+        ]),
+    ]
+    for title, items in sections:
+        c.setFont(font, 12)
+        c.drawString(20 * mm, y, title)
+        y -= 6 * mm
+        c.setFont(font, 9)
+        for item in items:
+            c.drawString(25 * mm, y, f"• {item}")
+            y -= 5 * mm
+        y -= 4 * mm
+        if y < 30 * mm:
+            c.showPage()
+            y = h - 20 * mm
+
+    c.setFont(font, 7)
+    c.drawCentredString(w / 2, 10 * mm, "Документ сформирован автоматически. Персональные данные не раскрываются.")
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+RENDERERS: dict[str, Callable[[dict], bytes]] = {
+    "work_order": render_work_order,
+    "regulator_report": render_regulator_report,
+}
+
+def _render(kind: str, payload: dict) -> bytes:
+    return RENDERERS[kind](payload)
+
+
+def version_hash(kind: str, payload: dict) -> str:
+    """Хэш версии документа: канонический JSON всего, что выводится на страницу (и даты формирования)."""
+    raw = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(f"{kind}:{raw}".encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Service: pool + cache
+# ---------------------------------------------------------------------------
+class PdfRenderService:
+    """Пул процессов для рендера + LRU-кэш готовых PDF по хэшу версии."""
+
+    def __init__(self, workers: int | None = None, cache_max_bytes: int | None = None):
+        self.workers = settings.PDF_RENDER_WORKERS if workers is None else workers
+        self.cache_max_bytes = (settings.PDF_CACHE_MAX_MB * 1024 * 1024) if cache_max_bytes is None else cache_max_bytes
+        self._executor: Executor | None = None
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+
+    def _pool(self) -> Executor | None:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+                logger.info("PDF render pool started: %d workers", self.workers)
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    # -- cache ---------------------------------------------------------
+    def _cache_get(self, key: str) -> bytes | None:
+        with self._lock:
+            pdf = self._cache.get(key)
+            if pdf is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return pdf
+
+    def _cache_put(self, key: str, pdf: bytes) -> None:
+        if len(pdf) > self.cache_max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = pdf
+            self._cache_bytes += len(pdf)
+            while self._cache_bytes > self.cache_max_bytes:
+                _, old = self._cache.popitem(last=False)
+                self._cache_bytes -= len(old)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "cached": len(self._cache),
+            "cache_bytes": self._cache_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rendered": self.rendered,
+        }
+
+    # -- rendering -----------------------------------------------------
+    def render(self, kind: str, payload: dict) -> bytes:
+        key = version_hash(kind, payload)
+        pdf = self._cache_get(key)
+        if pdf is not None:
+            return pdf
+        pool = self._pool()
+        pdf = pool.submit(_render, kind, payload).result() if pool else _render(kind, payload)
+        self.rendered += 1
+        self._cache_put(key, pdf)
+        return pdf
+
+    def render_many(self, kind: str, payloads: Iterable[dict]) -> Iterator[tuple[dict, bytes]]:
+        """Рендер пачки: кэшированные отдаются сразу, остальные — параллельно в пуле, в исходном порядке."""
+        payloads = list(payloads)
+        keys = [version_hash(kind, p) for p in payloads]
+        pool = self._pool()
+        ready: dict[str, bytes] = {}
+        futures = {}
+        for p, key in zip(payloads, keys):
+            if key in ready or key in futures:
+                continue
+            pdf = self._cache_get(key)
+            if pdf is not None:
+                ready[key] = pdf
+            elif pool is not None:
+                futures[key] = pool.submit(_render, kind, p)
+        for p, key in zip(payloads, keys):
+            pdf = ready.get(key)
+            if pdf is None:
+                pdf = futures[key].result() if key in futures else _render(kind, p)
+                self.rendered += 1
+                self._cache_put(key, pdf)
+                ready[key] = pdf
+            yield p, pdf
+
+
+class _ZipSink:
+    """Неперематываемый приёмник для zipfile: накапливает байты для отдачи в StreamingResponse."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def render_zip_stream(
+    service: PdfRenderService, kind: str, payloads: Iterable[dict], filename: Callable[[dict], str],
+) -> Iterator[bytes]:
+    """Потоковый ZIP: каждый PDF уходит клиенту сразу после рендера. Совпавшие имена — с суффиксом _2, _3…"""
+    sink = _ZipSink()
+    used: set[str] = set()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for payload, pdf in service.render_many(kind, payloads):
+            name = filename(payload)
+            stem, dot, ext = name.rpartition(".") if "." in name else (name, "", "")
+            n = 1
+            while name in used:
+                n += 1
+                name = f"{stem}_{n}{dot}{ext}"
+            used.add(name)
+            zf.writestr(name, pdf)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def utc_stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%d.%m.%Y %H:%M UTC")
+
+
+def utc_date() -> str:
+    """Дата формирования нарядов: с точностью до суток — повторная выгрузка за день берётся из кэша."""
+    return datetime.now(timezone.utc).strftime("%d.%m.%Y")
+
+
+pdf_service = PdfRenderService()
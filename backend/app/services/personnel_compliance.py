@@ -0,0 +1,244 @@
+"""
+Индексированный движок соответствия персонала ПЛГ (ФАП-147 п.17.8; ФАП-145 п.145.A.30(e)).
+
+Работает поверх хранилищ personnel_plg (_specialists / _attestations / _qualifications)
+и обновляется инкрементально при каждой записи:
+- квалификации и аттестации индексированы по specialist_id;
+- сроки (next_due ПК, license_expires, medical_certificate_expires) разобраны один раз
+  и лежат в отсортированном индексе → запросы «что истекает в [from, to)» через bisect;
+- для каждого специалиста хранится ближайший срок ПК в отсортированном индексе →
+  число несоответствующих на момент now = bisect, без обхода всех специалистов.
+
+Семантика совпадает с прежними отчётами: специалист не соответствует, если хотя бы
+одна ПК просрочена (next_due < now).
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+KIND_QUALIFICATION = "qualification"
+KIND_LICENSE = "license"
+KIND_MEDICAL = "medical"
+KINDS = (KIND_QUALIFICATION, KIND_LICENSE, KIND_MEDICAL)
+
+
+def parse_due(value) -> datetime | None:
+    """ISO-дата/время → aware UTC datetime; некорректные значения пропускаются."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except (ValueError, TypeError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class DueItem:
+    due: datetime
+    kind: str
+    specialist_id: str
+    ref_id: str
+    label: str
+    raw: str
+
+    @property
+    def key(self) -> tuple:
+        return (self.due, self.kind, self.specialist_id, self.ref_id)
+
+
+class PersonnelComplianceEngine:
+    def __init__(self, specialists: dict, attestations: dict, qualifications: dict):
+        self.specialists = specialists
+        self.attestations = attestations
+        self.qualifications = qualifications
+        self._lock = threading.RLock()
+        self.rebuild()
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+    def rebuild(self) -> None:
+        with self._lock:
+            self._quals_by_spec: dict[str, list[str]] = {}
+            self._atts_by_spec: dict[str, list[str]] = {}
+            self._due: list[tuple] = []
+            self._items: dict[tuple, DueItem] = {}
+            self._spec_items: dict[str, list[tuple]] = {}
+            self._min_qual_due: dict[str, datetime] = {}
+            self._min_due_index: list[tuple] = []
+            self._by_category: Counter = Counter()
+            self._category_of: dict[str, str] = {}
+            for spec in self.specialists.values():
+                self.on_specialist(spec)
+            for a in self.attestations.values():
+                self.on_attestation(a)
+            for q in self.qualifications.values():
+                self.on_qualification(q)
+
+    def _add_item(self, item: DueItem) -> None:
+        self._items[item.key] = item
+        bisect.insort(self._due, item.key)
+        self._spec_items.setdefault(item.specialist_id, []).append(item.key)
+
+    def _remove_spec_items(self, sid: str, kinds: tuple[str, ...]) -> None:
+        keep = []
+        for key in self._spec_items.get(sid, []):
+            if key[1] in kinds:
+                i = bisect.bisect_left(self._due, key)
+                if i < len(self._due) and self._due[i] == key:
+                    del self._due[i]
+                self._items.pop(key, None)
+            else:
+                keep.append(key)
+        self._spec_items[sid] = keep
+
+    def on_specialist(self, spec: dict) -> None:
+        """Создание / обновление карточки (в т.ч. импорт): пересчитать свидетельство и медзаключение."""
+        sid = spec["id"]
+        with self._lock:
+            old_cat = self._category_of.get(sid)
+            if old_cat is not None:
+                self._by_category[old_cat] -= 1
+            cat = spec.get("category", "?")
+            self._category_of[sid] = cat
+            self._by_category[cat] += 1
+            self._quals_by_spec.setdefault(sid, [])
+            self._atts_by_spec.setdefault(sid, [])
+
+            self._remove_spec_items(sid, (KIND_LICENSE, KIND_MEDICAL))
+            lic = parse_due(spec.get("license_expires"))
+            if lic:
+                self._add_item(DueItem(lic, KIND_LICENSE, sid, sid, spec.get("license_number") or "?", spec["license_expires"]))
+            med = parse_due(spec.get("medical_certificate_expires"))
+            if med:
+                self._add_item(DueItem(med, KIND_MEDICAL, sid, sid, "Медицинское заключение", spec["medical_certificate_expires"]))
+
+    def on_attestation(self, record: dict) -> None:
+        with self._lock:
+            self._atts_by_spec.setdefault(record["specialist_id"], []).append(record["id"])
+
+    def on_qualification(self, record: dict) -> None:
+        sid = record["specialist_id"]
+        with self._lock:
+            self._quals_by_spec.setdefault(sid, []).append(record["id"])
+            due = parse_due(record.get("next_due"))
+            if not due:
+                return
+            self._add_item(DueItem(due, KIND_QUALIFICATION, sid, record["id"], record.get("program_name", ""), record["next_due"]))
+            current = self._min_qual_due.get(sid)
+            if current is None or due < current:
+                if current is not None:
+                    i = bisect.bisect_left(self._min_due_index, (current, sid))
+                    if i < len(self._min_due_index) and self._min_due_index[i] == (current, sid):
+                        del self._min_due_index[i]
+                self._min_qual_due[sid] = due
+                bisect.insort(self._min_due_index, (due, sid))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def qualifications_of(self, sid: str) -> list[dict]:
+        return [self.qualifications[q] for q in self._quals_by_spec.get(sid, []) if q in self.qualifications]
+
+    def attestations_of(self, sid: str) -> list[dict]:
+        return [self.attestations[a] for a in self._atts_by_spec.get(sid, []) if a in self.attestations]
+
+    def due_between(self, start: datetime | None, end: datetime | None, kinds: tuple[str, ...] | None = None) -> Iterator[DueItem]:
+        """Сроки в [start, end) по возрастанию; None — без границы."""
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_left(self._due, (start,))
+            hi = len(self._due) if end is None else bisect.bisect_left(self._due, (end,))
+            keys = self._due[lo:hi]
+        for key in keys:
+            if kinds is None or key[1] in kinds:
+                item = self._items.get(key)
+                if item is not None:
+                    yield item
+
+    def overdue_qualifications(self, sid: str, now: datetime) -> list[DueItem]:
+        min_due = self._min_qual_due.get(sid)
+        if min_due is None or min_due >= now:
+            return []
+        items = (self._items.get(k) for k in self._spec_items.get(sid, []) if k[1] == KIND_QUALIFICATION)
+        return sorted((i for i in items if i is not None and i.due < now), key=lambda i: i.key)
+
+    def non_compliant_count(self, now: datetime) -> int:
+        with self._lock:
+            return bisect.bisect_left(self._min_due_index, (now,))
+
+    def snapshot(self, now: datetime | None = None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        total = len(self.specialists)
+        non_compliant = self.non_compliant_count(now)
+        return {
+            "total_specialists": total,
+            "compliant": total - non_compliant,
+            "non_compliant": non_compliant,
+            "by_category": {k: v for k, v in self._by_category.items() if v > 0},
+        }
+
+    def name_of(self, sid: str) -> str:
+        spec = self.specialists.get(sid)
+        return spec.get("full_name", "?") if spec else "?"
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+    def compliance_report(self, now: datetime | None = None, horizon_days: int = 90) -> dict:
+        now = now or datetime.now(timezone.utc)
+        soon = now + timedelta(days=horizon_days)
+        snap = self.snapshot(now)
+        report = {
+            "total_specialists": snap["total_specialists"],
+            "compliant": snap["compliant"],
+            "non_compliant": snap["non_compliant"],
+            "expiring_soon": [],
+            "overdue": [],
+        }
+        for item in self.due_between(None, soon, (KIND_QUALIFICATION, KIND_LICENSE)):
+            name = self.name_of(item.specialist_id)
+            if item.kind == KIND_LICENSE:
+                report["expiring_soon"].append({"specialist": name, "item": "Свидетельство", "due": item.raw})
+            elif item.due < now:
+                report["overdue"].append({"specialist": name, "program": item.label, "due": item.raw})
+            else:
+                report["expiring_soon"].append({"specialist": name, "program": item.label, "due": item.raw})
+        return report
+
+    def expiry_alerts(self, now: datetime | None = None, horizon_days: int = 30) -> list[dict]:
+        now = now or datetime.now(timezone.utc)
+        soon = now + timedelta(days=horizon_days)
+        alerts = []
+        for item in self.due_between(None, soon):
+            sid = item.specialist_id
+            expired = item.due < now
+            if item.kind == KIND_LICENSE:
+                alerts.append({
+                    "type": "personnel_license_expired" if expired else "personnel_license_expiring",
+                    "severity": "critical" if expired else "high",
+                    "specialist_id": sid,
+                    "message": f"Свидетельство {item.label} просрочено" if expired
+                    else f"Свидетельство {item.label} истекает {item.due.strftime('%d.%m.%Y')}",
+                })
+            elif item.kind == KIND_QUALIFICATION:
+                alerts.append({
+                    "type": "qualification_expired" if expired else "qualification_expiring",
+                    "severity": "high" if expired else "medium",
+                    "specialist_id": sid,
+                    "message": f"ПК просрочена: {item.label}" if expired
+                    else f"ПК истекает: {item.label} — до {item.due.strftime('%d.%m.%Y')}",
+                })
+            elif item.kind == KIND_MEDICAL and expired:
+                alerts.append({
+                    "type": "medical_expired",
+                    "severity": "critical",
+                    "specialist_id": sid,
+                    "message": "Медицинское заключение просрочено",
+                })
+        return alerts
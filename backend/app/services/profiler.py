@@ -0,0 +1,309 @@
+"""
+Семплирующий профайлер запросов API (по требованию, для администраторов).
+
+Какие запросы профилируются (ProfilingMiddleware):
+- заголовок X-Profile: <PROFILER_HEADER_TOKEN> (токен задаётся в ENV, пустой — выключено);
+- шаблоны маршрутов из конфигурации (POST /profiling/config);
+- случайная выборка sample_rate (0..1).
+
+Один фоновый поток раз в PROFILER_INTERVAL_MS снимает sys._current_frames() и для
+каждого активного профиля берёт стеки потоков, в которых выполняется обработчик
+маршрута (код endpoint'а в стеке) — sync-обработчики в пуле потоков и async в
+цикле событий. Кадр обработчика привязывается к запросу по контексту
+(contextvars), в котором он выполняется: ctx.run пула потоков или шаг задачи
+asyncio. Параллельные запросы к тому же маршруту, не выбранные для профилирования,
+в профиль не попадают. Стеки складываются в формате collapsed («a;b;c N») — вход для
+flamegraph.pl / speedscope. Хранятся последние PROFILER_MAX_PROFILES профилей,
+агрегируются по шаблону маршрута и окну времени.
+
+CLI:
+    python -m app.services.profiler --url http://localhost:8000 --token $T --route "/api/v1/aircraft" --minutes 60
+    python -m app.services.profiler --file profile.folded --top 30
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+
+MAX_DEPTH = 128
+
+# Профиль текущего запроса: задаётся в start() и наследуется задачами и пулом потоков
+_current: contextvars.ContextVar[Profile | None] = contextvars.ContextVar("klg_profile", default=None)
+
+
+def frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def collapse(frame, stop_codes=()) -> tuple[str | None, list]:
+    """Стек от корня к листу «mod:func;mod:func»; второй элемент — кадры с кодом из stop_codes."""
+    labels = []
+    found = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        if frame.f_code in stop_codes:
+            found.append(frame)
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return (";".join(reversed(labels)) if labels else None), found
+
+
+def frame_owner(frame) -> Profile | None:
+    """Профиль запроса, в контексте которого выполняется кадр.
+
+    Ближайший к кадру contextvars.Context в стеке: локальная переменная ctx.run
+    рабочего потока (sync-обработчик) или asyncio.Handle шага задачи (async).
+    """
+    depth = 0
+    while frame is not None and depth < MAX_DEPTH:
+        for value in frame.f_locals.values():
+            if isinstance(value, asyncio.Handle):
+                value = getattr(value, "_context", None)
+            if isinstance(value, contextvars.Context):
+                return value.get(_current)
+        frame = frame.f_back
+        depth += 1
+    return None
+
+
+@dataclass
+class Profile:
+    route: str = "unmatched"
+    method: str = ""
+    started_at: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    samples: Counter = field(default_factory=Counter)
+    endpoint_code: object = None
+    reason: str = ""
+    scope: dict | None = field(default=None, repr=False)
+    dropped: bool = False
+    token: object = field(default=None, repr=False)
+
+    def resolve(self, routes: set[str]) -> bool:
+        """После маршрутизации: код обработчика; для выбора по маршруту — проверка шаблона."""
+        if self.endpoint_code is not None:
+            return True
+        scope = self.scope or {}
+        endpoint, route = scope.get("endpoint"), scope.get("route")
+        if endpoint is None:
+            return False
+        if self.reason == "route" and getattr(route, "path", None) not in routes:
+            self.dropped = True
+            return False
+        self.endpoint_code = getattr(endpoint, "__code__", None)
+        return self.endpoint_code is not None
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: float | None = None, max_profiles: int | None = None):
+        self.interval = (interval_ms or settings.PROFILER_INTERVAL_MS) / 1000
+        self._active: set[int] = set()
+        self._profiles: dict[int, Profile] = {}
+        self._store: deque[Profile] = deque(maxlen=max_profiles or settings.PROFILER_MAX_PROFILES)
+        self._owners: dict[int, tuple[object, Profile | None]] = {}  # id(кадр обработчика) → (кадр, профиль)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._wake = threading.Event()
+        self.routes: set[str] = set()
+        self.sample_rate: float = settings.PROFILER_SAMPLE_RATE
+        self.samples_total = 0
+
+    # ------------------------------------------------------------------
+    # Выбор запросов
+    # ------------------------------------------------------------------
+    def wants(self, header: str | None) -> str | None:
+        token = settings.PROFILER_HEADER_TOKEN
+        if token and header == token:
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        if self.routes:
+            return "route"  # шаблон проверяется после маршрутизации (Profile.resolve)
+        return None
+
+    def configure(self, routes: list[str] | None = None, sample_rate: float | None = None) -> dict:
+        if routes is not None:
+            self.routes = set(routes)
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        return {"routes": sorted(self.routes), "sample_rate": self.sample_rate,
+                "header_enabled": bool(settings.PROFILER_HEADER_TOKEN),
+                "interval_ms": self.interval * 1000}
+
+    # ------------------------------------------------------------------
+    # Сессии
+    # ------------------------------------------------------------------
+    def start(self, scope: dict, reason: str) -> Profile:
+        profile = Profile(method=scope.get("method", ""), reason=reason, scope=scope)
+        profile.token = _current.set(profile)
+        with self._lock:
+            self._profiles[id(profile)] = profile
+            self._active.add(id(profile))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="klg-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return profile
+
+    def finish(self, profile: Profile, route: str, keep: bool = True) -> None:
+        with self._lock:
+            self._active.discard(id(profile))
+            self._profiles.pop(id(profile), None)
+        try:
+            _current.reset(profile.token)
+        except ValueError:  # finish() из другого контекста
+            pass
+        profile.scope = profile.token = None
+        profile.route = route
+        profile.duration_ms = round((time.time() - profile.started_at) * 1000, 1)
+        if keep and not profile.dropped and profile.samples:
+            with self._lock:
+                self._store.append(profile)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                profiles = [self._profiles[i] for i in self._active]
+                for p in profiles:
+                    if not p.resolve(self.routes) and p.dropped:
+                        self._active.discard(id(p))
+                pending = bool(self._active)
+                profiles = [p for p in profiles if p.endpoint_code is not None]
+            if not profiles and pending:
+                time.sleep(self.interval)  # запросы ещё не дошли до обработчика
+                continue
+            if not profiles:
+                self._owners.clear()
+                self._wake.clear()
+                if not self._wake.wait(timeout=30):
+                    with self._lock:
+                        if not self._active:
+                            self._thread = None
+                            return
+                continue
+            codes = {p.endpoint_code for p in profiles}
+            active = {id(p) for p in profiles}
+            owners: dict[int, tuple[object, Profile | None]] = {}
+            frames = sys._current_frames()
+            for tid, frame in frames.items():
+                if tid == me:
+                    continue
+                stack, found = collapse(frame, codes)
+                for f in found:
+                    _, owner = owners[id(f)] = self._owners.get(id(f)) or (f, frame_owner(f))
+                    if stack and id(owner) in active and owner.endpoint_code is f.f_code:
+                        owner.samples[stack] += 1
+                        self.samples_total += 1
+                        break
+            # Привязка живёт, пока кадр в стеке; кадры хранятся, чтобы id не переиспользовался
+            self._owners = owners
+            del frames, owners
+            time.sleep(self.interval)
+
+    # ------------------------------------------------------------------
+    # Выдача
+    # ------------------------------------------------------------------
+    def summary(self, minutes: int = 60) -> list[dict]:
+        since = time.time() - minutes * 60
+        by_route: dict[str, dict] = {}
+        with self._lock:
+            items = [p for p in self._store if p.started_at >= since]
+        for p in items:
+            r = by_route.setdefault(p.route, {"route": p.route, "profiles": 0, "samples": 0, "total_ms": 0.0})
+            r["profiles"] += 1
+            r["samples"] += sum(p.samples.values())
+            r["total_ms"] = round(r["total_ms"] + p.duration_ms, 1)
+        return sorted(by_route.values(), key=lambda r: r["samples"], reverse=True)
+
+    def aggregate(self, route: str | None = None, minutes: int = 60) -> tuple[Counter, int]:
+        since = time.time() - minutes * 60
+        total: Counter = Counter()
+        n = 0
+        with self._lock:
+            items = [p for p in self._store if p.started_at >= since and (route is None or p.route == route)]
+        for p in items:
+            total.update(p.samples)
+            n += 1
+        return total, n
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._store)
+            self._store.clear()
+        return n
+
+
+def to_collapsed(samples: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def parse_collapsed(text: str) -> Counter:
+    samples: Counter = Counter()
+    for line in text.splitlines():
+        stack, _, count = line.rstrip().rpartition(" ")
+        if stack and count.isdigit():
+            samples[stack] += int(count)
+    return samples
+
+
+def top_functions(samples: Counter, limit: int = 25) -> list[tuple[str, int, int]]:
+    """(функция, self-семплы, inclusive-семплы) — по убыванию inclusive."""
+    self_c: Counter = Counter()
+    incl: Counter = Counter()
+    for stack, count in samples.items():
+        frames = stack.split(";")
+        self_c[frames[-1]] += count
+        for f in set(frames):
+            incl[f] += count
+    return [(f, self_c[f], n) for f, n in incl.most_common(limit)]
+
+
+def render_text(samples: Counter, limit: int = 25) -> str:
+    total = sum(samples.values()) or 1
+    lines = [f"{'incl%':>7} {'self%':>7}  function  ({total} samples)"]
+    for func, self_n, incl_n in top_functions(samples, limit):
+        lines.append(f"{incl_n * 100 / total:>6.1f}% {self_n * 100 / total:>6.1f}%  {func}")
+    return "\n".join(lines)
+
+
+profiler = SamplingProfiler()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render aggregated route profiles (collapsed stacks)")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--url", help="базовый URL API, напр. http://localhost:8000")
+    src.add_argument("--file", help="файл collapsed-стеков")
+    parser.add_argument("--token", default="", help="Bearer-токен администратора")
+    parser.add_argument("--route", default=None, help="шаблон маршрута, напр. /api/v1/aircraft/{aircraft_id}")
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--out", default=None, help="сохранить collapsed-стеки (для flamegraph.pl / speedscope)")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        import httpx
+        params = {"minutes": args.minutes, "format": "collapsed"}
+        if args.route:
+            params["route"] = args.route
+        resp = httpx.get(f"{args.url.rstrip('/')}{settings.API_V1_PREFIX}/profiling/profiles", params=params,
+                         headers={"Authorization": f"Bearer {args.token}"}, timeout=30)
+        resp.raise_for_status()
+        text = resp.text
+    samples = parse_collapsed(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(to_collapsed(samples))
+    print(render_text(samples, args.top))
@@ -0,0 +1,350 @@
+"""
+Программа надёжности (EASA Part-M.A.301, AMC M.A.708(b)(8); ФАП-148 п.4.2): показатели
+дефектов на 1000 лётных часов по главам ATA, типам ВС и бортам.
+
+Источник — суточные свёртки (app.models.reliability), а не сырые отчёты:
+  reliability_defect_daily       (ВС, сутки, глава ATA) → число дефектов;
+                                 defect_reports + реестр дефектов API (refresh_defect_rollup)
+  reliability_utilization_daily  (ВС, сутки) → налёт ч / циклы; журнал полётов (flight_log)
+                                 или приращения счётчиков aircraft_history, разнесённые
+                                 по суткам между отметками (history; flight_log приоритетнее;
+                                 отметки «utilization» самого журнала не разносятся — их налёт
+                                 уже учтён построчно)
+Свёртки обновляются планировщиком за последние сутки и по запросу (refresh_rollups).
+
+Расчёт (defect_rates) — векторные группировки NumPy по 12 календарным месяцам до as_of:
+  rate_W = дефекты за W мес · 1000 / налёт за W мес (W = 1, 3, 12);
+  налёт — того же среза: борт (tail), тип (type) или весь парк (только ATA);
+  alert level = mean + k·σ помесячных показателей за 12 месяцев, предшествующих текущему
+  3-мес окну (иначе устойчивый рост поднимает собственный порог);
+  status: alert — скользящий 3-мес показатель выше alert level, watch — выше только месячный.
+"""
+from __future__ import annotations
+
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import bindparam, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Aircraft, AircraftHistory, AircraftType, DefectReport
+from app.models.reliability import DefectDaily, UtilizationDaily
+from app.services.intervals import parse_counter
+from app.services.life_limit_forecast import add_months
+from app.services.numbering import _upsert
+from app.services.utilization import HISTORY_EVENT_TYPE
+
+WINDOWS = (1, 3, 12)
+BASELINE_MONTHS = 12
+CURRENT_MONTHS = 3  # текущее окно, не входящее в базу alert level
+DIMENSIONS = ("ata", "type", "tail")
+NO_CHAPTER = "00"
+_CHAPTER = re.compile(r"(\d{2})")
+_INSERT_CHUNK = 2000
+
+
+def ata_chapter(code) -> str:
+    """«32-41-00», «ATA 32», «32 Landing Gear» → «32»."""
+    m = _CHAPTER.search(str(code or ""))
+    return m.group(1) if m else NO_CHAPTER
+
+
+def _day(value) -> date | None:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return _day(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Свёртки
+# ---------------------------------------------------------------------------
+def _memory_defects() -> list[dict]:
+    from app.api.routes.defects import _defects
+    return list(_defects.values())
+
+
+def refresh_defect_rollup(db: Session, since: date | None = None,
+                          memory_defects: Iterable[dict] | None = None) -> int:
+    """Пересчитать reliability_defect_daily начиная с since (None — целиком). Не коммитит."""
+    counts: Counter = Counter()
+    when = func.coalesce(DefectReport.incident_date, DefectReport.created_at)
+    stmt = select(DefectReport.aircraft_id, when, DefectReport.ata_code)
+    if since is not None:
+        stmt = stmt.where(when >= datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc))
+    for aircraft_id, at, code in db.execute(stmt):
+        day = _day(at)
+        if day is not None:
+            counts[(aircraft_id, day, ata_chapter(code))] += 1
+
+    memory = list(_memory_defects() if memory_defects is None else memory_defects)
+    regs = {d.get("aircraft_reg") for d in memory if d.get("aircraft_reg")}
+    if regs:
+        ids = dict(db.execute(select(Aircraft.registration_number, Aircraft.id)
+                              .where(Aircraft.registration_number.in_(regs))).all())
+        for d in memory:
+            day, aircraft_id = _day(d.get("created_at")), ids.get(d.get("aircraft_reg"))
+            if day is not None and aircraft_id and (since is None or day >= since):
+                counts[(aircraft_id, day, ata_chapter(d.get("ata_chapter")))] += 1
+
+    table = DefectDaily.__table__
+    db.execute(delete(table).where(table.c.day >= since) if since is not None else delete(table))
+    rows = [{"aircraft_id": a, "day": d, "ata_chapter": c, "defects": n} for (a, d, c), n in counts.items()]
+    for i in range(0, len(rows), _INSERT_CHUNK):
+        db.execute(insert(table), rows[i:i + _INSERT_CHUNK])
+    return len(rows)
+
+
+def _spread(aircraft: np.ndarray, days: np.ndarray, values: np.ndarray):
+    """Один счётчик: приращения между соседними известными отметками ВС → (ВС, сутки, приращение/сутки)."""
+    known = ~np.isnan(values)
+    aircraft, days, values = aircraft[known], days[known], values[known]
+    same = aircraft[1:] == aircraft[:-1]
+    start, end, seg_ac = days[:-1][same], days[1:][same], aircraft[1:][same]
+    delta = values[1:][same] - values[:-1][same]
+    keep = delta > 0  # сброс счётчика (замена ВС / ошибка ввода) — интервал пропускается
+    start, end, seg_ac, delta = start[keep], end[keep], seg_ac[keep], delta[keep]
+    span = np.maximum((end - start).astype(np.int64), 1)
+    # Сутки сегмента: start + 1 … end; отметки в один день — на этот день
+    first = np.where(end > start, start + 1, end)
+    offsets = np.arange(span.sum()) - np.repeat(np.cumsum(span) - span, span)
+    return (np.repeat(seg_ac, span), np.repeat(first, span) + offsets.astype("timedelta64[D]"),
+            np.repeat(delta / span, span))
+
+
+def spread_counters(aircraft: np.ndarray, days: np.ndarray, hours: np.ndarray, cycles: np.ndarray):
+    """Приращения счётчиков между отметками ВС → налёт по суткам (поровну на интервал).
+
+    Вход отсортирован по (ВС, дата); пропуск (NaN) — отметка не учитывается для этого счётчика.
+    Выход: (ВС, сутки, ч, циклы) — по строке на ВС-сутки.
+    """
+    h_ac, h_days, h_val = _spread(aircraft, days, hours)
+    c_ac, c_days, c_val = _spread(aircraft, days, cycles)
+    out_ac, out_days = np.concatenate([h_ac, c_ac]), np.concatenate([h_days, c_days])
+    if not len(out_days):
+        return out_ac, out_days, np.zeros(0), np.zeros(0)
+    keys = np.stack([out_ac.astype(np.int64), out_days.astype(np.int64)], axis=1)
+    uniq, inv = np.unique(keys, axis=0, return_inverse=True)
+    inv = inv.ravel()
+    return (uniq[:, 0], uniq[:, 1].astype("datetime64[D]"),
+            np.bincount(inv[:len(h_val)], weights=h_val, minlength=len(uniq)),
+            np.bincount(inv[len(h_val):], weights=c_val, minlength=len(uniq)))
+
+
+def refresh_utilization_rollup(db: Session, since: date | None = None) -> int:
+    """Налёт по счётчикам aircraft_history → reliability_utilization_daily (source=history). Не коммитит.
+
+    Суточные строки журнала полётов (source=flight_log) не затираются. С since пересчёт по каждому
+    ВС начинается с его последней отметки до since: новая отметка разносит приращение назад до
+    предыдущей, и сутки до since иначе потеряли бы свою долю.
+    """
+    rows = db.execute(
+        select(AircraftHistory.aircraft_id, AircraftHistory.event_date,
+               AircraftHistory.hours_at_event, AircraftHistory.cycles_at_event)
+        .where(AircraftHistory.hours_at_event.isnot(None) | AircraftHistory.cycles_at_event.isnot(None))
+        .where(AircraftHistory.event_type != HISTORY_EVENT_TYPE)
+        .order_by(AircraftHistory.aircraft_id, AircraftHistory.event_date)
+    ).all()
+    ids: dict[str, int] = {}
+    ac, days, hours, cycles = [], [], [], []
+    for aircraft_id, at, h, c in rows:
+        day = _day(at)
+        if day is None:
+            continue
+        h, c = parse_counter(h), parse_counter(c)
+        ac.append(ids.setdefault(aircraft_id, len(ids)))
+        days.append(day)
+        hours.append(np.nan if h is None else h)
+        cycles.append(np.nan if c is None else c)
+    table = UtilizationDaily.__table__
+    names = list(ids)
+    cleanup = delete(table).where(table.c.source == "history")
+    if since is None:
+        db.execute(cleanup)
+    else:
+        # Граница по ВС — последняя отметка до since (нет такой — весь ряд ВС)
+        cutoff = [date.min] * len(names)
+        for a, day in zip(ac, days):
+            if day < since:
+                cutoff[a] = day
+        db.execute(cleanup.where(table.c.day >= since))
+        if names:
+            db.execute(
+                cleanup.where(table.c.aircraft_id == bindparam("b_aircraft"), table.c.day > bindparam("b_cutoff")),
+                [{"b_aircraft": name, "b_cutoff": cut} for name, cut in zip(names, cutoff)],
+            )
+    if len(ac) < 2:
+        return 0
+    out_ac, out_days, out_h, out_c = spread_counters(
+        np.array(ac), np.array(days, dtype="datetime64[D]"),
+        np.array(hours, dtype=float), np.array(cycles, dtype=float),
+    )
+    if since is not None:
+        mask = out_days > np.array(cutoff, dtype="datetime64[D]")[out_ac]
+        out_ac, out_days, out_h, out_c = out_ac[mask], out_days[mask], out_h[mask], out_c[mask]
+    values = [
+        {"aircraft_id": names[a], "day": d, "flight_hours": round(float(h), 4), "cycles": round(float(c), 4),
+         "source": "history"}
+        for a, d, h, c in zip(out_ac.tolist(), out_days.tolist(), out_h, out_c)
+    ]
+    stmt = _upsert(db.get_bind().dialect.name)(table).on_conflict_do_nothing(index_elements=[table.c.aircraft_id, table.c.day])
+    for i in range(0, len(values), _INSERT_CHUNK):
+        db.execute(stmt, values[i:i + _INSERT_CHUNK])
+    return len(values)
+
+
+def refresh_rollups(db: Session, since: date | None = None) -> dict:
+    """Обе свёртки одной транзакцией."""
+    try:
+        result = {"defect_rows": refresh_defect_rollup(db, since),
+                  "utilization_rows": refresh_utilization_rollup(db, since)}
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Показатели
+# ---------------------------------------------------------------------------
+def _month_edges(as_of: date, months: int) -> np.ndarray:
+    """Границы календарных месяцев назад от as_of по возрастанию: [as_of − months мес, …, as_of]."""
+    return np.array([add_months(as_of, -b) for b in range(months, -1, -1)], dtype="datetime64[D]")
+
+
+def _bucket(days: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Месяц назад (0 — последний) для суток из (edges[0], edges[-1]]."""
+    return (len(edges) - 1) - np.searchsorted(edges, days, side="left")
+
+
+def _codes(values: list) -> tuple[np.ndarray, list]:
+    labels: dict = {}
+    codes = np.fromiter((labels.setdefault(v, len(labels)) for v in values), dtype=np.int64, count=len(values))
+    return codes, list(labels)
+
+
+def defect_rates(
+    db: Session,
+    by: Iterable[str] = ("ata",),
+    as_of: date | None = None,
+    k: float = 2.0,
+    operator_id: str | None = None,
+    aircraft_type_id: str | None = None,
+    aircraft_id: str | None = None,
+) -> dict:
+    """Показатели дефектов на 1000 ч за 1/3/12 мес и alert level (mean + k·σ) по срезу by."""
+    by = tuple(dict.fromkeys(by))
+    unknown = set(by) - set(DIMENSIONS)
+    if not by or unknown:
+        raise ValueError(f"by must be a subset of {DIMENSIONS}, got {by}")
+    as_of = as_of or datetime.now(timezone.utc).date()
+    months = CURRENT_MONTHS + BASELINE_MONTHS
+    edges = _month_edges(as_of, months)
+    first_day, last_day = add_months(as_of, -months) + timedelta(days=1), as_of
+
+    fleet = select(Aircraft.id, Aircraft.aircraft_type_id, Aircraft.registration_number)
+    if operator_id:
+        fleet = fleet.where(Aircraft.operator_id == operator_id)
+    if aircraft_type_id:
+        fleet = fleet.where(Aircraft.aircraft_type_id == aircraft_type_id)
+    if aircraft_id:
+        fleet = fleet.where(Aircraft.id == aircraft_id)
+    fleet_rows = db.execute(fleet).all()
+    aircraft_index = {row.id: i for i, row in enumerate(fleet_rows)}
+    type_of, type_ids = _codes([row.aircraft_type_id for row in fleet_rows])
+    tails = [row.registration_number for row in fleet_rows]
+    fleet_ids = fleet.with_only_columns(Aircraft.id).scalar_subquery()
+
+    defects = db.execute(
+        select(DefectDaily.aircraft_id, DefectDaily.day, DefectDaily.ata_chapter, DefectDaily.defects)
+        .where(DefectDaily.day.between(first_day, last_day), DefectDaily.aircraft_id.in_(fleet_ids))
+    ).all()
+    usage = db.execute(
+        select(UtilizationDaily.aircraft_id, UtilizationDaily.day, UtilizationDaily.flight_hours)
+        .where(UtilizationDaily.day.between(first_day, last_day), UtilizationDaily.aircraft_id.in_(fleet_ids))
+    ).all()
+
+    # Налёт: (ВС, месяц) → часы; срезы налёта — борт / тип / парк
+    u_ac = np.fromiter((aircraft_index[r[0]] for r in usage), dtype=np.int64, count=len(usage))
+    u_bucket = _bucket(np.array([r[1] for r in usage], dtype="datetime64[D]"), edges)
+    u_hours = np.fromiter((r[2] for r in usage), dtype=float, count=len(usage))
+    n_ac = max(len(fleet_rows), 1)
+    hours_ac = np.zeros((n_ac, months))
+    np.add.at(hours_ac, (u_ac, u_bucket), u_hours)
+    if "tail" in by:
+        exposure_of_ac, exposure = np.arange(n_ac), hours_ac
+    elif "type" in by:
+        exposure_of_ac = type_of if len(type_of) else np.zeros(n_ac, dtype=np.int64)
+        exposure = np.zeros((max(len(type_ids), 1), months))
+        np.add.at(exposure, exposure_of_ac, hours_ac[: len(exposure_of_ac)])
+    else:
+        exposure_of_ac, exposure = np.zeros(n_ac, dtype=np.int64), hours_ac.sum(axis=0, keepdims=True)
+
+    # Дефекты: группы по срезу by
+    d_ac = np.fromiter((aircraft_index[r[0]] for r in defects), dtype=np.int64, count=len(defects))
+    d_bucket = _bucket(np.array([r[1] for r in defects], dtype="datetime64[D]"), edges)
+    d_count = np.fromiter((r[3] for r in defects), dtype=float, count=len(defects))
+    chapter, chapters = _codes([r[2] for r in defects])
+    columns = {"ata": chapter, "type": type_of[d_ac] if len(d_ac) else d_ac, "tail": d_ac}
+    fleet_hours = {f"{w}m": round(float(exposure.sum(axis=0)[:w].sum()), 1) for w in WINDOWS}
+    if not len(defects):
+        return {"as_of": as_of.isoformat(), "by": list(by), "k": k, "fleet_hours": fleet_hours, "items": []}
+    keys, group = np.unique(np.stack([columns[dim] for dim in by], axis=1), axis=0, return_inverse=True)
+    group = group.ravel()
+    counts = np.zeros((len(keys), months))
+    np.add.at(counts, (group, d_bucket), d_count)
+    # Срез налёта группы — по любой её строке (внутри группы он один)
+    first_row = np.zeros(len(keys), dtype=np.int64)
+    first_row[group] = np.arange(len(group))
+    hours = exposure[exposure_of_ac[d_ac[first_row]]]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = {w: counts[:, :w].sum(axis=1) * 1000 / hours[:, :w].sum(axis=1) for w in WINDOWS}
+        monthly = np.where(hours > 0, counts * 1000 / hours, np.nan)
+        baseline = monthly[:, CURRENT_MONTHS:]
+        n = np.sum(~np.isnan(baseline), axis=1)
+        mean = np.nansum(baseline, axis=1) / n
+        var = np.nansum((baseline - mean[:, None]) ** 2, axis=1) / (n - 1)
+        alert = np.where(n >= 2, mean + k * np.sqrt(var), np.nan)
+    rates = {w: np.where(np.isfinite(r), r, np.nan) for w, r in rates.items()}
+    status = np.where(rates[3] > alert, "alert", np.where(rates[1] > alert, "watch", "ok"))
+    status = np.where(np.isnan(alert), "insufficient_data", status)
+
+    labels = {"ata": chapters, "type": type_ids, "tail": tails}
+    type_names = dict(db.execute(select(AircraftType.id, AircraftType.model)
+                                 .where(AircraftType.id.in_([t for t in type_ids if t]))).all()) if "type" in by else {}
+
+    def value(x) -> float | None:
+        return None if np.isnan(x) else round(float(x), 3)
+
+    items = []
+    for g, key in enumerate(keys.tolist()):
+        item = {}
+        for dim, code in zip(by, key):
+            item[dim] = labels[dim][code]
+            if dim == "type":
+                item["type_name"] = type_names.get(labels[dim][code])
+        item.update({
+            "defects": {f"{w}m": int(counts[g, :w].sum()) for w in WINDOWS},
+            "flight_hours": {f"{w}m": round(float(hours[g, :w].sum()), 1) for w in WINDOWS},
+            "rate_per_1000fh": {f"{w}m": value(rates[w][g]) for w in WINDOWS},
+            "mean": value(mean[g]),
+            "alert_level": value(alert[g]),
+            "status": str(status[g]),
+            # Помесячные показатели от старых к новым — для графика тренда
+            "trend": [value(x) for x in monthly[g, :BASELINE_MONTHS][::-1]],
+        })
+        items.append(item)
+    order = {"alert": 0, "watch": 1, "ok": 2, "insufficient_data": 3}
+    items.sort(key=lambda i: (order[i["status"]], -(i["rate_per_1000fh"]["3m"] or 0)))
+    return {"as_of": as_of.isoformat(), "by": list(by), "k": k, "fleet_hours": fleet_hours, "items": items}
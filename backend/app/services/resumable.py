@@ -0,0 +1,226 @@
+"""
+Возобновляемая загрузка файлов — протокол tus 1.0 (core, creation, checksum, termination, expiration).
+
+POST /uploads (Upload-Length, Upload-Metadata) → Location; HEAD → Upload-Offset;
+PATCH с Upload-Offset дописывает часть: 409 при расхождении смещения, 460 при
+неверном Upload-Checksum (часть отбрасывается). После обрыва связи клиент делает
+HEAD и продолжает с полученного смещения — 200 МБ скан бортового журнала не
+передаётся заново. Завершённую загрузку забирает потребитель (вложения, inbox)
+через finish(): проверка sha256 всего файла → SpooledUpload (app.services.storage).
+
+Состояние — на диске (storage_dir/uploads: <id>.part + <id>.json), общее для
+воркеров узла; параллельный PATCH одной загрузки отклоняется (423, flock).
+sha256 файла считается по мере приёма частей; если часть принял другой воркер —
+пересчитывается с диска в finish().
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import fcntl
+import hashlib
+import json
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.storage import CHUNK_SIZE, SpooledUpload, ensure_storage_dir
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,creation-with-upload,checksum,termination,expiration"
+CHECKSUM_ALGORITHMS = ("sha1", "sha256", "md5")
+
+# upload_id → (смещение, sha256 принятого) — кэш процесса
+_hashers: dict[str, tuple[int, "hashlib._Hash"]] = {}
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class UploadSession:
+    id: str
+    user_id: str
+    length: int
+    created_at: str
+    expires_at: str
+    metadata: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def part_path(self) -> Path:
+        return _paths(self.id)[0]
+
+    @property
+    def offset(self) -> int:
+        return self.part_path.stat().st_size
+
+    @property
+    def expires(self) -> datetime:
+        return datetime.fromisoformat(self.expires_at)
+
+
+def _dir() -> Path:
+    path = ensure_storage_dir() / "uploads"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def _paths(upload_id: str) -> tuple[Path, Path]:
+    try:
+        name = uuid.UUID(upload_id).hex
+    except (ValueError, AttributeError):
+        raise UploadError(404, "Upload not found")
+    return _dir() / f"{name}.part", _dir() / f"{name}.json"
+
+
+def parse_metadata(header: str | None) -> dict[str, str]:
+    """Upload-Metadata: «ключ base64,ключ base64» → dict."""
+    result: dict[str, str] = {}
+    for pair in (header or "").split(","):
+        if not pair.strip():
+            continue
+        key, _, value = pair.strip().partition(" ")
+        try:
+            result[key] = base64.b64decode(value, validate=True).decode() if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(400, f"Invalid Upload-Metadata value for {key!r}")
+    return result
+
+
+def _parse_checksum(header: str | None):
+    """Upload-Checksum: «алгоритм base64» → (hash-объект, ожидаемый digest)."""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f"Unsupported checksum algorithm: {algorithm}")
+    try:
+        return hashlib.new(algorithm), base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise UploadError(400, "Invalid Upload-Checksum value")
+
+
+def create(user_id: str, length: int, metadata: dict[str, str] | None = None) -> UploadSession:
+    if length < 0:
+        raise UploadError(400, "Invalid Upload-Length")
+    if length > settings.STORAGE_UPLOAD_MAX_MB * 1024 * 1024:
+        raise UploadError(413, f"Файл превышает {settings.STORAGE_UPLOAD_MAX_MB} МБ")
+    now = datetime.now(timezone.utc)
+    session = UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        length=length,
+        created_at=now.isoformat(),
+        expires_at=(now + timedelta(hours=settings.STORAGE_UPLOAD_EXPIRE_H)).isoformat(),
+        metadata=metadata or {},
+    )
+    part, meta = _paths(session.id)
+    part.touch()
+    meta.write_text(json.dumps(asdict(session)))
+    _hashers[session.id] = (0, hashlib.sha256())
+    return session
+
+
+def get(upload_id: str, user_id: str) -> UploadSession:
+    """Сессия загрузки владельца; чужая или истёкшая — 404."""
+    part, meta = _paths(upload_id)
+    try:
+        session = UploadSession(**json.loads(meta.read_text()))
+    except FileNotFoundError:
+        raise UploadError(404, "Upload not found")
+    if session.user_id != user_id or not part.exists():
+        raise UploadError(404, "Upload not found")
+    if session.expires <= datetime.now(timezone.utc):
+        terminate(session)
+        raise UploadError(410, "Upload expired")
+    return session
+
+
+async def append(session: UploadSession, offset: int, chunks: AsyncIterator[bytes],
+                 checksum: str | None = None) -> int:
+    """Дописать часть с позиции offset; возвращает новое смещение."""
+    verifier = _parse_checksum(checksum)
+    with open(session.part_path, "r+b") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError(423, "Upload is locked by another request")
+        f.seek(0, 2)
+        if f.tell() != offset:
+            raise UploadError(409, f"Upload-Offset mismatch: expected {f.tell()}")
+        cached = _hashers.pop(session.id, None)
+        hasher = cached[1] if cached and cached[0] == offset else None
+        written = 0
+        try:
+            async for chunk in chunks:
+                if offset + written + len(chunk) > session.length:
+                    raise UploadError(413, "Chunk exceeds Upload-Length")
+                f.write(chunk)
+                written += len(chunk)
+                if verifier is not None:
+                    verifier[0].update(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+            if verifier is not None and verifier[0].digest() != verifier[1]:
+                raise UploadError(460, "Checksum mismatch")
+        except BaseException as exc:
+            # Без контрольной суммы принятое при обрыве сохраняется; проверенная часть — целиком или никак
+            if verifier is not None or isinstance(exc, UploadError):
+                f.truncate(offset)
+            raise
+        if hasher is not None:
+            _hashers[session.id] = (offset + written, hasher)
+    return offset + written
+
+
+def finish(session: UploadSession, sha256: str | None = None) -> SpooledUpload:
+    """Забрать завершённую загрузку: проверить sha256, передать файл потребителю."""
+    size = session.offset
+    if size != session.length:
+        raise UploadError(409, f"Upload incomplete: {size} of {session.length} bytes")
+    cached = _hashers.pop(session.id, None)
+    if cached and cached[0] == size:
+        digest = cached[1].hexdigest()
+    else:
+        hasher = hashlib.sha256()
+        with open(session.part_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+    if sha256 and sha256.lower() != digest:
+        raise UploadError(460, "Checksum mismatch")
+    tmp_dir = ensure_storage_dir() / "tmp"
+    tmp_dir.mkdir(exist_ok=True)
+    dest = tmp_dir / f"upload-{session.id}"
+    part, meta = _paths(session.id)
+    part.replace(dest)
+    meta.unlink(missing_ok=True)
+    return SpooledUpload(dest, digest, size)
+
+
+def terminate(session: UploadSession) -> None:
+    _hashers.pop(session.id, None)
+    for path in _paths(session.id):
+        path.unlink(missing_ok=True)
+
+
+def expire(now: datetime | None = None) -> int:
+    """Удалить незавершённые загрузки с истёкшим сроком. Возвращает число удалённых."""
+    now = now or datetime.now(timezone.utc)
+    removed = 0
+    for meta in _dir().glob("*.json"):
+        try:
+            session = UploadSession(**json.loads(meta.read_text()))
+        except (OSError, ValueError, TypeError):
+            continue
+        if session.expires <= now:
+            terminate(session)
+            removed += 1
+    return removed
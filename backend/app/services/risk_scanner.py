@@ -1,24 +1,60 @@
-"""Сервис автоматического сканирования рисков на основе данных о ВС."""
+"""Сервис автоматического сканирования рисков на основе данных о ВС.
+
+Окна по датам и остатку наработки (FH / FC, теневые колонки app.services.intervals)
+отбираются в SQL — в Python приходят только кандидаты.
+"""
 
 from datetime import datetime, timezone, timedelta
+from typing import Iterable
+
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+
 from app.models import (
     RiskAlert, MaintenanceTask, LimitedLifeComponent, LandingGearComponent,
     DefectReport, AirworthinessCertificate, Aircraft
 )
 
 
-def scan_risks(db: Session) -> int:
-    """Сканирует все ВС и создаёт предупреждения о рисках. Возвращает количество созданных предупреждений."""
+def remaining_severity(remaining_fh: float | None, remaining_fc: float | None) -> tuple[str, str]:
+    """Серьёзность по остатку наработки и его текстовое описание («что наступит раньше»)."""
+    critical = (
+        (remaining_fh is not None and remaining_fh <= settings.RISK_REMAINING_FH_CRITICAL)
+        or (remaining_fc is not None and remaining_fc <= settings.RISK_REMAINING_FC_CRITICAL)
+    )
+    parts = []
+    if remaining_fh is not None:
+        parts.append(f"{remaining_fh:g} FH")
+    if remaining_fc is not None:
+        parts.append(f"{remaining_fc:g} FC")
+    return ("critical" if critical else "high"), " / ".join(parts)
+
+
+def scan_risks(db: Session, aircraft_ids: Iterable[str] | None = None) -> int:
+    """Сканирует ВС и создаёт предупреждения о рисках. Возвращает количество созданных предупреждений.
+
+    aircraft_ids — только эти ВС (пересчёт после изменения наработки); None — весь парк.
+    """
+    if aircraft_ids is not None:
+        aircraft_ids = list(aircraft_ids)
+        if not aircraft_ids:
+            return 0
+
+    def scoped(query):
+        return query.filter(Aircraft.id.in_(aircraft_ids)) if aircraft_ids is not None else query
+
     created = 0
     now = datetime.now(timezone.utc)
     warning_days = 7
     critical_days = 3
     
     # 1. MaintenanceTask: next_due в прошлом или скоро
-    tasks = db.query(MaintenanceTask).join(Aircraft).filter(
-        MaintenanceTask.next_due.isnot(None)
+    horizon = now + timedelta(days=warning_days + 1)  # days_until <= warning_days
+    tasks = scoped(db.query(MaintenanceTask).join(Aircraft)).filter(
+        MaintenanceTask.next_due.isnot(None),
+        MaintenanceTask.next_due < horizon,
     ).all()
     
     for task in tasks:
@@ -60,8 +96,9 @@ def scan_risks(db: Session) -> int:
                 created += 1
     
     # 2. LimitedLifeComponent: expected_date
-    components = db.query(LimitedLifeComponent).join(Aircraft).filter(
-        LimitedLifeComponent.expected_date.isnot(None)
+    components = scoped(db.query(LimitedLifeComponent).join(Aircraft)).filter(
+        LimitedLifeComponent.expected_date.isnot(None),
+        LimitedLifeComponent.expected_date < horizon,
     ).all()
     
     for comp in components:
@@ -102,8 +139,9 @@ def scan_risks(db: Session) -> int:
                 created += 1
     
     # 3. LandingGearComponent: due_at
-    landing_gear = db.query(LandingGearComponent).join(Aircraft).filter(
-        LandingGearComponent.due_at.isnot(None)
+    landing_gear = scoped(db.query(LandingGearComponent).join(Aircraft)).filter(
+        LandingGearComponent.due_at.isnot(None),
+        LandingGearComponent.due_at < horizon,
     ).all()
     
     for lg in landing_gear:
@@ -143,8 +181,42 @@ def scan_risks(db: Session) -> int:
                 db.add(alert)
                 created += 1
     
+    # 3a. Остаток по наработке (FH / FC) — ТО, LLP, шасси
+    fh_warning, fc_warning = settings.RISK_REMAINING_FH_WARNING, settings.RISK_REMAINING_FC_WARNING
+    for model, entity_type, label in (
+        (MaintenanceTask, "maintenance_task", "ТО"),
+        (LimitedLifeComponent, "limited_life", "компонента"),
+        (LandingGearComponent, "landing_gear", "шасси"),
+    ):
+        candidates = scoped(db.query(model).join(Aircraft)).filter(
+            or_(model.remaining_fh <= fh_warning, model.remaining_fc <= fc_warning)
+        ).all()
+
+        for obj in candidates:
+            severity, remaining = remaining_severity(obj.remaining_fh, obj.remaining_fc)
+            name = obj.task_number if model is MaintenanceTask else obj.part_number
+
+            existing = db.query(RiskAlert).filter(
+                RiskAlert.entity_type == entity_type,
+                RiskAlert.entity_id == obj.id,
+                RiskAlert.is_resolved == False
+            ).first()
+
+            if not existing:
+                alert = RiskAlert(
+                    entity_type=entity_type,
+                    entity_id=obj.id,
+                    aircraft_id=obj.aircraft_id,
+                    severity=severity,
+                    title=f"Исчерпание ресурса {label}: {name}",
+                    message=f"Остаток до выполнения {name}: {remaining}",
+                    due_at=None
+                )
+                db.add(alert)
+                created += 1
+
     # 4. DefectReport: limit_date
-    defects = db.query(DefectReport).join(Aircraft).filter(
+    defects = scoped(db.query(DefectReport).join(Aircraft)).filter(
         DefectReport.limit_date.isnot(None)
     ).all()
     
@@ -186,7 +258,7 @@ def scan_risks(db: Session) -> int:
                 created += 1
     
     # 5. AirworthinessCertificate: expiry_date (60 дней предупреждение)
-    certs = db.query(AirworthinessCertificate).join(Aircraft).filter(
+    certs = scoped(db.query(AirworthinessCertificate).join(Aircraft)).filter(
         AirworthinessCertificate.expiry_date.isnot(None),
         AirworthinessCertificate.status == "valid"
     ).all()
@@ -4,7 +4,7 @@ Uses APScheduler for lightweight background scheduling.
 Production: migrate to Celery + Redis for distributed workers.
 """
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from contextlib import contextmanager
 
 from app.db.session import SessionLocal
@@ -43,6 +43,48 @@ def run_scheduled_scan():
     return total_created
 
 
+def run_audit_partition_maintenance():
+    """Партиции audit_log: создать наперёд, архивировать старше hot-периода."""
+    from app.services.audit_partitions import run_maintenance
+    try:
+        result = run_maintenance()
+        logger.info("Audit partition maintenance: %s", result)
+    except Exception as e:
+        logger.error("Audit partition maintenance error: %s", e)
+
+
+def run_storage_gc():
+    """Хранилище вложений: объекты без ссылок старше STORAGE_GC_GRACE_S, истёкшие загрузки tus."""
+    from app.services import resumable
+    from app.services.storage import collect_garbage
+    with _get_db() as db:
+        try:
+            collect_garbage(db)
+            resumable.expire()
+        except Exception as e:
+            logger.error("Storage GC error: %s", e)
+
+
+def run_email_retry():
+    """Письма из email_outbox, у которых наступил срок повтора, — обратно в очередь отправки."""
+    from app.services.email_service import email_service
+    try:
+        email_service.delivery.retry_due()
+    except Exception as e:
+        logger.error("Email retry error: %s", e)
+
+
+def run_reliability_rollups():
+    """Свёртки программы надёжности (дефекты по ATA, налёт) за последние сутки — с запасом на поздний ввод."""
+    from app.services.reliability import refresh_rollups
+    with _get_db() as db:
+        try:
+            result = refresh_rollups(db, since=datetime.now(timezone.utc).date() - timedelta(days=3))
+            logger.info("Reliability rollups refreshed: %s", result)
+        except Exception as e:
+            logger.error("Reliability rollup error: %s", e)
+
+
 def get_last_scan_time() -> datetime | None:
     return _last_scan
 
@@ -56,6 +98,10 @@ def setup_scheduler(app=None):
         from apscheduler.schedulers.background import BackgroundScheduler
         scheduler = BackgroundScheduler()
         scheduler.add_job(run_scheduled_scan, 'interval', hours=6, id='risk_scan', next_run_time=None)
+        scheduler.add_job(run_audit_partition_maintenance, 'interval', hours=24, id='audit_partitions')
+        scheduler.add_job(run_storage_gc, 'interval', hours=1, id='storage_gc')
+        scheduler.add_job(run_email_retry, 'interval', minutes=1, id='email_retry')
+        scheduler.add_job(run_reliability_rollups, 'interval', hours=24, id='reliability_rollups')
         scheduler.start()
         logger.info("Risk scanner scheduler started (interval: 6h)")
 
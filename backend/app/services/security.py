@@ -4,7 +4,6 @@ import os
 from dataclasses import dataclass
 from typing import Any
 
-import httpx
 from jose import jwt
 from jose.exceptions import JWTError
 
@@ -45,6 +44,8 @@ async def _get_jwks() -> dict[str, Any]:
     if not jwks_url:
         raise AuthError("OIDC_JWKS_URL not configured")
     timeout = getattr(settings, "OIDC_TIMEOUT_S", 20)
+    import httpx  # отложенный импорт: тяжёлый, нужен только при загрузке JWKS
+
     async with httpx.AsyncClient(timeout=timeout) as client:
         r = await client.get(jwks_url)
         r.raise_for_status()
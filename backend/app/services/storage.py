@@ -1,12 +1,46 @@
+"""
+Хранилище вложений с адресацией по содержимому (SHA-256) и дедупликацией.
+
+Ключ объекта — sha256 содержимого, считается при потоковом приёме: файл один раз
+проходит через hashlib во временный файл и целиком в память не читается. Один и тот
+же АММ, приложенный к сотне нарядов, хранится один раз: строки attachments ссылаются
+на storage_blobs, счётчик ссылок меняется атомарным upsert'ом (как number_counters).
+Объекты без ссылок старше STORAGE_GC_GRACE_S удаляет collect_garbage (планировщик).
+
+Бэкенды (STORAGE_BACKEND): local — каталог storage_dir; s3 — MinIO или любой
+S3-совместимый (настройки MINIO_*, boto3), общий для всех узлов. Файлы больше
+STORAGE_MULTIPART_THRESHOLD_MB загружаются multipart частями STORAGE_PART_SIZE_MB;
+LocalBackend реализует тот же протокол и заменяет S3 в тестах.
+"""
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
+import re
+import shutil
+import tempfile
 import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import BinaryIO
 
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.models.storage_blob import StorageBlob
+from app.services.numbering import _upsert
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+_KEY = re.compile(r"^[0-9a-f]{64}$")
 
 
 def ensure_storage_dir() -> Path:
@@ -15,21 +49,340 @@ def ensure_storage_dir() -> Path:
     return base
 
 
-async def save_upload(owner_kind: str, owner_id: str, file: UploadFile) -> tuple[str, str]:
-    """Save uploaded file and return (storage_path, filename)."""
-    base = ensure_storage_dir() / owner_kind / owner_id
-    base.mkdir(parents=True, exist_ok=True)
+def _check_key(key: str) -> str:
+    # Ключ — только hex sha256: из него строится путь на диске
+    if not _KEY.match(key):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+
+class StorageBackend(ABC):
+    """Объектное хранилище: ключ — sha256, содержимое неизменяемо."""
+
+    name: str
+    min_part_size: int = 1
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def put(self, key: str, fileobj: BinaryIO, size: int, content_type: str | None = None) -> None: ...
+
+    @abstractmethod
+    def begin_multipart(self, key: str, content_type: str | None = None) -> str: ...
+
+    @abstractmethod
+    def put_part(self, key: str, upload_id: str, number: int, data: bytes) -> str: ...
+
+    @abstractmethod
+    def complete_multipart(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None: ...
+
+    @abstractmethod
+    def abort_multipart(self, key: str, upload_id: str) -> None: ...
+
+    @abstractmethod
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE, offset: int = 0,
+                    length: int | None = None) -> Iterator[bytes]:
+        """Содержимое частями; offset / length — диапазон (HTTP Range)."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Удалить объект; отсутствующий ключ — не ошибка."""
+
+    def local_path(self, key: str) -> Path | None:
+        """Путь на диске, если бэкенд локальный (отдача через FileResponse)."""
+        return None
+
+    def put_file(self, key: str, path: str | Path, size: int, content_type: str | None = None,
+                 threshold: int | None = None, part_size: int | None = None) -> None:
+        """Загрузить файл: до порога — одним запросом, больше — multipart."""
+        threshold = settings.STORAGE_MULTIPART_THRESHOLD_MB * 1024 * 1024 if threshold is None else threshold
+        part_size = max(part_size or settings.STORAGE_PART_SIZE_MB * 1024 * 1024, self.min_part_size)
+        with open(path, "rb") as f:
+            if size <= threshold:
+                self.put(key, f, size, content_type)
+                return
+            upload_id = self.begin_multipart(key, content_type)
+            parts: list[tuple[int, str]] = []
+            try:
+                while data := f.read(part_size):
+                    number = len(parts) + 1
+                    parts.append((number, self.put_part(key, upload_id, number, data)))
+                self.complete_multipart(key, upload_id, parts)
+            except BaseException:
+                self.abort_multipart(key, upload_id)
+                raise
+
+
+class LocalBackend(StorageBackend):
+    """Каталог на диске: objects/ab/cd/<sha256>; части multipart — в multipart/<upload_id>/."""
+
+    name = "local"
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        _check_key(key)
+        return self.root / "objects" / key[:2] / key[2:4] / key
+
+    def _upload_dir(self, upload_id: str) -> Path:
+        return self.root / "multipart" / uuid.UUID(upload_id).hex
+
+    def _write_atomic(self, key: str, chunks) -> None:
+        dest = self._path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=".part-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            os.replace(tmp, dest)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def put(self, key: str, fileobj: BinaryIO, size: int, content_type: str | None = None) -> None:
+        self._write_atomic(key, iter(lambda: fileobj.read(CHUNK_SIZE), b""))
+
+    def begin_multipart(self, key: str, content_type: str | None = None) -> str:
+        _check_key(key)
+        upload_id = str(uuid.uuid4())
+        self._upload_dir(upload_id).mkdir(parents=True)
+        return upload_id
+
+    def put_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        (self._upload_dir(upload_id) / f"{number:05d}").write_bytes(data)
+        return hashlib.md5(data).hexdigest()
+
+    def complete_multipart(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        upload_dir = self._upload_dir(upload_id)
+
+        def chunks():
+            for number, _ in sorted(parts):
+                with open(upload_dir / f"{number:05d}", "rb") as part:
+                    yield from iter(lambda: part.read(CHUNK_SIZE), b"")
+
+        self._write_atomic(key, chunks())
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE, offset: int = 0,
+                    length: int | None = None) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            f.seek(offset)
+            remaining = float("inf") if length is None else length
+            while remaining > 0 and (chunk := f.read(int(min(chunk_size, remaining)))):
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Path | None:
+        return self._path(key)
+
+
+class S3Backend(StorageBackend):
+    """S3-совместимое хранилище (MinIO): объекты sha256/<ключ> в бакете MINIO_BUCKET."""
+
+    name = "s3"
+    min_part_size = 5 * 1024 * 1024  # минимум S3 для всех частей, кроме последней
+
+    def __init__(self, endpoint: str, access_key: str, secret_key: str, bucket: str, secure: bool = False):
+        import boto3
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
+
+        self._client_error = ClientError
+        self.bucket = bucket
+        self._s3 = boto3.client(
+            "s3",
+            endpoint_url=f"{'https' if secure else 'http'}://{endpoint}",
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+        try:
+            self._s3.head_bucket(Bucket=bucket)
+        except ClientError:
+            self._s3.create_bucket(Bucket=bucket)
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"sha256/{_check_key(key)}"
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._s3.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, key: str, fileobj: BinaryIO, size: int, content_type: str | None = None) -> None:
+        extra = {"ContentType": content_type} if content_type else {}
+        self._s3.put_object(Bucket=self.bucket, Key=self._key(key), Body=fileobj, ContentLength=size, **extra)
+
+    def begin_multipart(self, key: str, content_type: str | None = None) -> str:
+        extra = {"ContentType": content_type} if content_type else {}
+        return self._s3.create_multipart_upload(Bucket=self.bucket, Key=self._key(key), **extra)["UploadId"]
+
+    def put_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        return self._s3.upload_part(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                                    PartNumber=number, Body=data)["ETag"]
+
+    def complete_multipart(self, key: str, upload_id: str, parts: list[tuple[int, str]]) -> None:
+        self._s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": etag} for n, etag in sorted(parts)]},
+        )
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self._s3.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE, offset: int = 0,
+                    length: int | None = None) -> Iterator[bytes]:
+        extra = {}
+        if offset or length is not None:
+            extra["Range"] = f"bytes={offset}-{'' if length is None else offset + length - 1}"
+        body = self._s3.get_object(Bucket=self.bucket, Key=self._key(key), **extra)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> None:
+        self._s3.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+_backend: StorageBackend | None = None
+
+
+def get_backend() -> StorageBackend:
+    """Бэкенд процесса по STORAGE_BACKEND (local | s3)."""
+    global _backend
+    if _backend is None:
+        if settings.STORAGE_BACKEND == "s3":
+            _backend = S3Backend(settings.MINIO_ENDPOINT, settings.MINIO_ACCESS_KEY, settings.MINIO_SECRET_KEY,
+                                 settings.MINIO_BUCKET, settings.MINIO_SECURE)
+        elif settings.STORAGE_BACKEND == "local":
+            _backend = LocalBackend(ensure_storage_dir())
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND!r}")
+    return _backend
+
+
+@dataclass
+class SpooledUpload:
+    """Принятый файл во временном каталоге: путь, sha256 и размер посчитаны при приёме."""
+
+    path: Path
+    sha256: str
+    size: int
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def spool_file(fileobj: BinaryIO, max_bytes: int | None = None, chunk_size: int = CHUNK_SIZE) -> SpooledUpload:
+    """Принять поток: хэш и запись во временный файл за один проход."""
+    tmp_dir = ensure_storage_dir() / "tmp"
+    tmp_dir.mkdir(exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir, prefix="upload-")
+    digest, size = hashlib.sha256(), 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := fileobj.read(chunk_size):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return SpooledUpload(Path(tmp), digest.hexdigest(), size)
+
+
+async def spool_upload(file: UploadFile, max_bytes: int | None = None, chunk_size: int = CHUNK_SIZE) -> SpooledUpload:
+    """spool_file для UploadFile — в пуле потоков, не блокируя event loop."""
+    return await run_in_threadpool(spool_file, file.file, max_bytes, chunk_size)
+
+
+def store(db: Session, upload: SpooledUpload, content_type: str | None = None,
+          backend: StorageBackend | None = None) -> int:
+    """Добавить ссылку на объект; загрузить содержимое, если его ещё нет. Возвращает ref_count.
+
+    Upsert блокирует строку blob до commit — параллельная сборка мусора по этому ключу
+    ждёт, а объект, удалённый ею до upsert, загружается заново (ref_count == 1).
+    """
+    backend = backend or get_backend()
+    table = StorageBlob.__table__
+    insert = _upsert(db.get_bind(clause=table.insert()).dialect.name)
+    now = datetime.now(timezone.utc)
+    stmt = (
+        insert(table)
+        .values(sha256=upload.sha256, size=upload.size, content_type=content_type, ref_count=1,
+                created_at=now, updated_at=now)
+        .on_conflict_do_update(index_elements=[table.c.sha256],
+                               set_={"ref_count": table.c.ref_count + 1, "updated_at": now})
+        .returning(table.c.ref_count)
+    )
+    refs = int(db.execute(stmt).scalar_one())
+    if refs == 1 or not backend.exists(upload.sha256):
+        backend.put_file(upload.sha256, upload.path, upload.size, content_type)
+    return refs
+
+
+def release(db: Session, sha256: str) -> None:
+    """Снять ссылку; объект удалит collect_garbage после периода ожидания."""
+    db.execute(
+        update(StorageBlob)
+        .where(StorageBlob.sha256 == sha256)
+        .values(ref_count=StorageBlob.ref_count - 1, updated_at=datetime.now(timezone.utc))
+    )
 
-    safe_name = os.path.basename(file.filename or "file")
-    uid = str(uuid.uuid4())
-    stored_name = f"{uid}_{safe_name}"
-    dest = base / stored_name
 
-    with dest.open("wb") as f:
-        while True:
-            chunk = await file.read(1024 * 1024)
-            if not chunk:
-                break
-            f.write(chunk)
+def collect_garbage(db: Session, grace_s: int | None = None, limit: int = 500,
+                    backend: StorageBackend | None = None) -> int:
+    """Удалить объекты без ссылок старше grace_s. Возвращает число удалённых.
 
-    return str(dest), safe_name
+    Строки удаляются первыми (DELETE … RETURNING держит блокировку до commit), объекты —
+    до commit: upload того же содержимого дождётся конца транзакции и загрузит заново.
+    """
+    backend = backend or get_backend()
+    grace_s = settings.STORAGE_GC_GRACE_S if grace_s is None else grace_s
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_s)
+    candidates = (
+        select(StorageBlob.sha256)
+        .where(StorageBlob.ref_count <= 0, StorageBlob.updated_at < cutoff)
+        .limit(limit)
+    )
+    if db.get_bind(clause=StorageBlob.__table__.select()).dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    try:
+        keys = db.execute(
+            delete(StorageBlob)
+            .where(StorageBlob.sha256.in_(candidates.scalar_subquery()), StorageBlob.ref_count <= 0)
+            .returning(StorageBlob.sha256)
+        ).scalars().all()
+        for key in keys:
+            backend.delete(key)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if keys:
+        logger.info("Storage GC: removed %d unreferenced objects", len(keys))
+    return len(keys)
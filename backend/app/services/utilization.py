@@ -0,0 +1,436 @@
+"""
+Налёт по журналу полётов (ФАП-148 п.4.2; EASA Part-M.A.305(c) — учёт наработки ВС и компонентов).
+
+Система планирования присылает рейсы пачками NDJSON (строка — рейс):
+
+    {"registration": "RA-89001", "leg_id": "SU1402-20260601", "takeoff": "2026-06-01T06:10Z",
+     "landing": "2026-06-01T08:05Z", "cycles": 1}
+
+ВС — registration или aircraft_id; налёт — flight_hours («1.9», «1:55») или landing − takeoff;
+циклов по умолчанию 1. Ключ повторной доставки — leg_id, иначе «рейс|взлёт»: рейс,
+присланный ещё раз, уже есть в flight_legs и не учитывается.
+
+UtilizationIngest принимает поток частями; каждые UTILIZATION_CHUNK_LEGS рейсов — одна
+многострочная вставка в flight_legs (ON CONFLICT DO NOTHING … RETURNING), в Python
+остаются только суммы по ВС и суткам. finish() применяет их наборными UPDATE — по
+оператору на таблицу (executemany по ВС), без загрузки компонентов в ORM:
+  aircraft                  total_time / total_cycles;
+  limited_life_components   tsn/csn (+ строки формы), remaining_fh / remaining_fc;
+  landing_gear_components   то же и tsr по единице dim;
+  to_go (остаток в форме)   переписывается по новому остатку — иначе разбор при следующем
+                            редактировании компонента вернул бы израсходованный ресурс;
+  aircraft_history          строка «utilization» с новыми TTSN / TCSN;
+  reliability_utilization_daily (source=flight_log) — налёт для программы надёжности.
+Неизвестная наработка (NULL) не выдумывается — приращение к ней не прибавляется.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import Numeric, String, bindparam, case, cast, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Aircraft, AircraftHistory, LandingGearComponent, LimitedLifeComponent
+from app.models.flight_log import FlightLeg
+from app.models.reliability import UtilizationDaily
+from app.services.intervals import _UNITS, format_interval, parse_counter, parse_interval
+from app.services.numbering import _upsert
+
+logger = logging.getLogger(__name__)
+
+MAX_LEG_HOURS = 24.0
+MAX_LEG_CYCLES = 50
+# Статусы снятого LLP: наработка ВС к нему больше не относится
+REMOVED_STATUSES = ("removed", "scrapped", "снят", "списан")
+# Тип строки aircraft_history, которую пишет журнал; налёт по ней уже в reliability_utilization_daily
+HISTORY_EVENT_TYPE = "utilization"
+_FH_UNITS = [name for name, (dim, _) in _UNITS.items() if dim == "fh"]
+_FC_UNITS = [name for name, (dim, _) in _UNITS.items() if dim == "fc"]
+
+
+def _literals(values):
+    # Списки IN — отдельными параметрами: «expanding» IN несовместим с executemany
+    return [literal(v, String) for v in values]
+
+
+class LegError(ValueError):
+    """Строка журнала не принята (пропускается, попадает в errors ответа)."""
+
+
+@dataclass(slots=True)
+class Leg:
+    aircraft_id: str
+    leg_key: str
+    day: date
+    flight_no: str | None
+    takeoff: datetime | None
+    landing: datetime | None
+    flight_hours: float
+    cycles: int
+
+
+def _datetime(value, name: str) -> datetime | None:
+    if value in (None, ""):
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise LegError(f"{name}: not an ISO 8601 datetime")
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def parse_leg(obj: dict, aircraft_id: str) -> Leg:
+    """Рейс из объекта NDJSON; ВС уже определено вызывающим."""
+    takeoff, landing = _datetime(obj.get("takeoff"), "takeoff"), _datetime(obj.get("landing"), "landing")
+    if obj.get("flight_hours") is not None:
+        hours = parse_counter(obj["flight_hours"])
+        if hours is None:
+            raise LegError("flight_hours: not a number")
+    elif takeoff and landing:
+        hours = (landing - takeoff).total_seconds() / 3600
+    else:
+        raise LegError("flight_hours or takeoff/landing required")
+    if not 0 <= hours <= MAX_LEG_HOURS:
+        raise LegError(f"flight_hours out of range 0..{MAX_LEG_HOURS:g}")
+    cycles = obj.get("cycles", 1)
+    if not isinstance(cycles, int) or isinstance(cycles, bool) or not 0 <= cycles <= MAX_LEG_CYCLES:
+        raise LegError(f"cycles must be an integer 0..{MAX_LEG_CYCLES}")
+    flight_no = str(obj["flight_no"])[:16] if obj.get("flight_no") else None
+    if obj.get("leg_id"):
+        key = str(obj["leg_id"])
+    elif takeoff:
+        key = f"{flight_no or ''}|{takeoff.isoformat()}"
+    else:
+        raise LegError("leg_id or takeoff required")
+    if obj.get("date"):
+        try:
+            day = date.fromisoformat(str(obj["date"]))
+        except ValueError:
+            raise LegError("date: not an ISO 8601 date")
+    elif takeoff or landing:
+        day = (takeoff or landing).date()
+    else:
+        raise LegError("date or takeoff required")
+    return Leg(aircraft_id, key[:96], day, flight_no, takeoff, landing, round(hours, 4), cycles)
+
+
+@dataclass
+class IngestResult:
+    lines: int = 0
+    accepted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    flight_hours: float = 0.0
+    cycles: int = 0
+    errors: list[dict] = field(default_factory=list)
+    aircraft_ids: list[str] = field(default_factory=list)
+    components: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "lines": self.lines, "accepted": self.accepted, "duplicates": self.duplicates,
+            "rejected": self.rejected, "flight_hours": round(self.flight_hours, 2), "cycles": self.cycles,
+            "aircraft": len(self.aircraft_ids), "components_updated": self.components, "errors": self.errors,
+        }
+
+
+class UtilizationIngest:
+    """Приём одного потока рейсов: feed(bytes)… → finish(). Не коммитит — транзакция вызывающего."""
+
+    def __init__(self, db: Session, operator_id: str | None = None, chunk_size: int | None = None):
+        self.db = db
+        self.operator_id = operator_id
+        self.chunk_size = chunk_size or settings.UTILIZATION_CHUNK_LEGS
+        self.result = IngestResult()
+        self._tail = b""
+        self._pending: list[tuple[int, dict]] = []
+        self._aircraft: dict[str, str | None] = {}  # registration / id → aircraft.id (None — не найдено)
+        # ВС → [ч, циклы, рейсов, последняя посадка]; (ВС, сутки) → [ч, циклы]
+        self._by_aircraft: dict[str, list] = {}
+        self._by_day: dict[tuple[str, date], list] = {}
+        self._now = datetime.now(timezone.utc)
+
+    # -- приём -----------------------------------------------------------------
+    def feed(self, data: bytes) -> None:
+        """Часть тела запроса; строка может быть разрезана между частями."""
+        lines = (self._tail + data).split(b"\n")
+        self._tail = lines.pop()
+        for line in lines:
+            self._line(line)
+        if len(self._pending) >= self.chunk_size:
+            self._flush()
+
+    def add(self, legs: Iterable[dict]) -> None:
+        """Уже разобранные рейсы (JSON-массив, импорт)."""
+        for obj in legs:
+            self.result.lines += 1
+            if not isinstance(obj, dict):
+                self._reject(self.result.lines, "expected a JSON object")
+                continue
+            self._pending.append((self.result.lines, obj))
+            if len(self._pending) >= self.chunk_size:
+                self._flush()
+
+    def _line(self, line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        self.result.lines += 1
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            self._reject(self.result.lines, "invalid JSON")
+            return
+        if not isinstance(obj, dict):
+            self._reject(self.result.lines, "expected a JSON object")
+            return
+        self._pending.append((self.result.lines, obj))
+
+    def _reject(self, line_no: int, error: str) -> None:
+        self.result.rejected += 1
+        if len(self.result.errors) < settings.UTILIZATION_MAX_ERRORS:
+            self.result.errors.append({"line": line_no, "error": error})
+
+    def _resolve(self, refs: set[str]) -> None:
+        """registration / aircraft_id → aircraft.id одним запросом на пачку; оператор — только свои ВС."""
+        refs -= self._aircraft.keys()
+        if not refs:
+            return
+        stmt = select(Aircraft.id, Aircraft.registration_number).where(
+            Aircraft.registration_number.in_(refs) | Aircraft.id.in_(refs))
+        if self.operator_id:
+            stmt = stmt.where(Aircraft.operator_id == self.operator_id)
+        for aircraft_id, registration in self.db.execute(stmt):
+            self._aircraft[aircraft_id] = self._aircraft[registration] = aircraft_id
+        for ref in refs:
+            self._aircraft.setdefault(ref, None)
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self._resolve({str(obj.get("registration") or obj.get("aircraft_id") or "") for _, obj in pending})
+        legs: dict[tuple[str, str], Leg] = {}
+        for line_no, obj in pending:
+            ref = str(obj.get("registration") or obj.get("aircraft_id") or "")
+            aircraft_id = self._aircraft.get(ref)
+            if aircraft_id is None:
+                self._reject(line_no, f"unknown aircraft {ref!r}" if ref else "registration or aircraft_id required")
+                continue
+            try:
+                leg = parse_leg(obj, aircraft_id)
+            except LegError as e:
+                self._reject(line_no, str(e))
+                continue
+            if (leg.aircraft_id, leg.leg_key) in legs:
+                self.result.duplicates += 1
+                continue
+            legs[(leg.aircraft_id, leg.leg_key)] = leg
+        if not legs:
+            return
+        table = FlightLeg.__table__
+        stmt = (_upsert(self.db.get_bind().dialect.name)(table).on_conflict_do_nothing()
+                .returning(table.c.aircraft_id, table.c.day, table.c.landing, table.c.flight_hours, table.c.cycles))
+        inserted = self.db.execute(stmt, [
+            {"aircraft_id": leg.aircraft_id, "leg_key": leg.leg_key, "day": leg.day, "flight_no": leg.flight_no,
+             "takeoff": leg.takeoff, "landing": leg.landing, "flight_hours": leg.flight_hours,
+             "cycles": leg.cycles, "ingested_at": self._now}
+            for leg in legs.values()
+        ]).all()
+        self.result.duplicates += len(legs) - len(inserted)
+        self.result.accepted += len(inserted)
+        for aircraft_id, day, landing, hours, cycles in inserted:
+            total = self._by_aircraft.setdefault(aircraft_id, [0.0, 0, 0, None])
+            total[0] += hours
+            total[1] += cycles
+            total[2] += 1
+            if landing is not None:
+                landing = landing.replace(tzinfo=timezone.utc) if landing.tzinfo is None else landing
+                if total[3] is None or landing > total[3]:
+                    total[3] = landing
+            daily = self._by_day.setdefault((aircraft_id, day), [0.0, 0])
+            daily[0] += hours
+            daily[1] += cycles
+
+    # -- применение ------------------------------------------------------------
+    def finish(self) -> IngestResult:
+        """Дописать хвост, применить суммы к ВС, компонентам, истории и суточному налёту."""
+        if self._tail:
+            self._line(self._tail)
+            self._tail = b""
+        self._flush()
+        if self._by_aircraft:
+            deltas = [
+                {"b_aircraft": aircraft_id, "b_fh": round(total[0], 4), "b_fc": total[1]}
+                for aircraft_id, total in self._by_aircraft.items()
+            ]
+            self._update_aircraft(deltas)
+            self.result.components = self._update_components(deltas)
+            self._rewrite_to_go()
+            self._append_history()
+            self._upsert_daily()
+        self.result.aircraft_ids = sorted(self._by_aircraft)
+        self.result.flight_hours = sum(t[0] for t in self._by_aircraft.values())
+        self.result.cycles = sum(t[1] for t in self._by_aircraft.values())
+        return self.result
+
+    def _update_aircraft(self, deltas: list[dict]) -> None:
+        table = Aircraft.__table__
+        self.db.execute(
+            update(table).where(table.c.id == bindparam("b_aircraft")).values(
+                total_time=table.c.total_time + bindparam("b_fh"),
+                total_cycles=table.c.total_cycles + bindparam("b_fc"),
+                updated_at=self._now,
+            ).execution_options(synchronize_session=False),
+            deltas,
+        )
+
+    def _update_components(self, deltas: list[dict]) -> int:
+        fh, fc = bindparam("b_fh"), bindparam("b_fc")
+        updated = 0
+        llp = LimitedLifeComponent.__table__
+        result = self.db.execute(
+            update(llp)
+            .where(llp.c.aircraft_id == bindparam("b_aircraft"),
+                   func.lower(func.coalesce(llp.c.current_status, "")).notin_(_literals(REMOVED_STATUSES)))
+            .values(**_counter_values(llp, fh, fc), updated_at=self._now)
+            .execution_options(synchronize_session=False),
+            deltas,
+        )
+        updated += max(result.rowcount, 0)
+        gear = LandingGearComponent.__table__
+        unit = func.upper(func.trim(func.coalesce(gear.c.dim, "")))
+        tsr_delta = case((unit.in_(_literals(_FH_UNITS)), fh), (unit.in_(_literals(_FC_UNITS)), fc), else_=None)
+        result = self.db.execute(
+            update(gear)
+            .where(gear.c.aircraft_id == bindparam("b_aircraft"))
+            .values(**_counter_values(gear, fh, fc),
+                    tsr_value=gear.c.tsr_value + tsr_delta,
+                    tsr=case((gear.c.tsr_value.is_(None) | tsr_delta.is_(None), gear.c.tsr),
+                             else_=_text(gear.c.tsr_value + tsr_delta)),
+                    updated_at=self._now)
+            .execution_options(synchronize_session=False),
+            deltas,
+        )
+        return updated + max(result.rowcount, 0)
+
+    def _rewrite_to_go(self) -> None:
+        """Остаток в строке формы to_go — по уменьшенным remaining_fh / remaining_fc (календарная часть как есть).
+
+        sync_limited_life / sync_landing_gear берут остаток из to_go: без перезаписи правка любого
+        поля компонента вернула бы ресурс, израсходованный по журналу полётов. Строк с to_go
+        немного — они правятся по id, остальные компоненты уже обновлены наборно.
+        """
+        aircraft_ids = list(self._by_aircraft)
+        llp, gear = LimitedLifeComponent.__table__, LandingGearComponent.__table__
+        for table, unit, condition in (
+            (llp, None, func.lower(func.coalesce(llp.c.current_status, "")).notin_(REMOVED_STATUSES)),
+            (gear, gear.c.dim, None),
+        ):
+            stmt = select(table.c.id, table.c.to_go, table.c.remaining_fh, table.c.remaining_fc,
+                          unit if unit is not None else literal(None)).where(
+                table.c.aircraft_id.in_(aircraft_ids), table.c.to_go.isnot(None))
+            if condition is not None:
+                stmt = stmt.where(condition)
+            rows = []
+            for component_id, to_go, remaining_fh, remaining_fc, dim in self.db.execute(stmt):
+                iv = parse_interval(to_go, default_unit=(dim or "").strip() or None)
+                if iv.fh is None and iv.fc is None:
+                    continue
+                text = format_interval(replace(
+                    iv,
+                    fh=iv.fh if iv.fh is None or remaining_fh is None else remaining_fh,
+                    fc=iv.fc if iv.fc is None or remaining_fc is None else remaining_fc,
+                ))
+                if text != to_go:
+                    rows.append({"b_id": component_id, "b_to_go": text})
+            if rows:
+                self.db.execute(
+                    update(table).where(table.c.id == bindparam("b_id")).values(to_go=bindparam("b_to_go"))
+                    .execution_options(synchronize_session=False),
+                    rows,
+                )
+
+    def _append_history(self) -> None:
+        """Строка «utilization» на ВС с новыми TTSN / TCSN (отметка для прогнозов ресурса)."""
+        totals = dict((row[0], row[1:]) for row in self.db.execute(
+            select(Aircraft.id, Aircraft.total_time, Aircraft.total_cycles)
+            .where(Aircraft.id.in_(list(self._by_aircraft)))
+        ))
+        rows = []
+        for aircraft_id, (hours, cycles, legs, landing) in self._by_aircraft.items():
+            total_time, total_cycles = totals.get(aircraft_id, (None, None))
+            rows.append({
+                "aircraft_id": aircraft_id, "event_type": HISTORY_EVENT_TYPE, "event_date": landing or self._now,
+                "description": f"Журнал полётов: {legs} рейс(ов), +{hours:.2f} ч, +{cycles} цикл(ов)",
+                "hours_at_event": None if total_time is None else f"{total_time:.2f}",
+                "cycles_at_event": None if total_cycles is None else str(total_cycles),
+                "created_at": self._now, "updated_at": self._now,
+            })
+        self.db.execute(insert(AircraftHistory.__table__), rows)
+
+    def _upsert_daily(self) -> None:
+        """Суточный налёт для программы надёжности: flight_log вытесняет оценку по счётчикам (history)."""
+        table = UtilizationDaily.__table__
+        stmt = _upsert(self.db.get_bind().dialect.name)(table)
+        from_log = table.c.source == "flight_log"
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.aircraft_id, table.c.day],
+            set_={
+                "flight_hours": case((from_log, table.c.flight_hours + stmt.excluded.flight_hours),
+                                     else_=stmt.excluded.flight_hours),
+                "cycles": case((from_log, table.c.cycles + stmt.excluded.cycles), else_=stmt.excluded.cycles),
+                "source": "flight_log",
+            },
+        )
+        self.db.execute(stmt, [
+            {"aircraft_id": aircraft_id, "day": day, "flight_hours": round(hours, 4), "cycles": cycles,
+             "source": "flight_log"}
+            for (aircraft_id, day), (hours, cycles) in self._by_day.items()
+        ])
+
+
+def _text(expr, scale: int = 2):
+    """Счётчик → строка формы (округление одинаково в PostgreSQL и SQLite)."""
+    return cast(func.round(cast(expr, Numeric(14, scale)), scale), String)
+
+
+def _counter_values(table, fh, fc) -> dict:
+    """tsn/csn (+ строки формы) растут, остаток убывает; NULL — неизвестно, остаётся NULL."""
+    return {
+        "tsn_fh": table.c.tsn_fh + fh,
+        "csn_fc": table.c.csn_fc + fc,
+        "tsn": case((table.c.tsn_fh.is_(None), table.c.tsn), else_=_text(table.c.tsn_fh + fh)),
+        "csn": case((table.c.csn_fc.is_(None), table.c.csn), else_=_text(table.c.csn_fc + fc, 0)),
+        "remaining_fh": table.c.remaining_fh - fh,
+        "remaining_fc": table.c.remaining_fc - fc,
+    }
+
+
+def ingest_legs(db: Session, legs: Iterable[dict], operator_id: str | None = None) -> IngestResult:
+    """Рейсы из уже разобранных объектов; не коммитит."""
+    ingest = UtilizationIngest(db, operator_id=operator_id)
+    ingest.add(legs)
+    return ingest.finish()
+
+
+def rescan_aircraft(aircraft_ids: list[str]) -> int:
+    """Пересчёт рисков только по ВС, чья наработка изменилась (фоновая задача после commit)."""
+    from app.db.session import SessionLocal
+    from app.services.risk_scanner import scan_risks
+
+    if not aircraft_ids:
+        return 0
+    db = SessionLocal()
+    try:
+        return scan_risks(db, aircraft_ids=aircraft_ids)
+    except Exception as e:
+        logger.error("Risk rescan after utilization ingest failed for %d aircraft: %s", len(aircraft_ids), e)
+        return 0
+    finally:
+        db.close()
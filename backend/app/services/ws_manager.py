@@ -5,6 +5,7 @@ WebSocket Connection Manager — real-time push для критических с
 """
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from datetime import datetime, timezone
@@ -24,9 +25,11 @@ class ConnectionManager:
         # По user_id / org_id для send_to_user, send_to_org
         self._connections: Dict[str, List[WebSocket]] = {}  # user_id -> list[WebSocket]
         self._org_users: Dict[str, Set[str]] = {}  # org_id -> set[user_id]
+        self._loop: asyncio.AbstractEventLoop | None = None  # цикл, в котором живут соединения
 
     async def connect(self, websocket: WebSocket, user_id: str | None = None, org_id: str | None = None, room: str = "global"):
         await websocket.accept()
+        self._loop = asyncio.get_running_loop()
         self._global.add(websocket)
         self.active.setdefault(room, set()).add(websocket)
         if user_id:
@@ -57,6 +60,37 @@ class ConnectionManager:
             except Exception:
                 logger.warning("Failed to send WS to user %s", user_id)
 
+    async def send_to_users(self, user_ids: List[str], data: dict) -> int:
+        """Отправить одно сообщение многим пользователям: JSON сериализуется один раз."""
+        message = json.dumps(data)
+        sent = 0
+        for uid in user_ids:
+            for ws in self._connections.get(uid, ()):
+                try:
+                    await ws.send_text(message)
+                    sent += 1
+                except Exception:
+                    logger.warning("Failed to send WS to user %s", uid)
+        return sent
+
+    def publish_to_users(self, user_ids: List[str], data: dict) -> int:
+        """send_to_users из любого потока (синхронные роуты, фоновые задачи) — без ожидания отправки.
+
+        Возвращает число адресатов с открытым соединением в этом процессе.
+        """
+        online = [uid for uid in user_ids if uid in self._connections]
+        if not online or self._loop is None or self._loop.is_closed():
+            return 0
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            running.create_task(self.send_to_users(online, data))
+        else:
+            asyncio.run_coroutine_threadsafe(self.send_to_users(online, data), self._loop)
+        return len(online)
+
     async def send_to_org(self, org_id: str | None, data: dict) -> None:
         """Отправить данные всем пользователям организации."""
         if not org_id:
@@ -0,0 +1,4 @@
+"""
+Бенчмарки backend (PostgreSQL). Запуск из каталога backend:
+    python -m benchmarks.<name> --help
+"""
@@ -0,0 +1,137 @@
+"""
+Бенчмарк /audit/events на партиционированном audit_log.
+
+Генерирует N строк (по умолчанию 50M) за --months месяцев через generate_series,
+затем измеряет латентность запросов списка (тот же запрос, что и в роуте)
+и печатает p50/p95 и число просканированных партиций (EXPLAIN).
+
+    python -m benchmarks.bench_audit_list --rows 50000000 --months 24
+    python -m benchmarks.bench_audit_list --skip-load          # только замеры
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.audit import audit_events_query
+from app.core.config import settings
+from app.services.audit_partitions import add_months, ensure_partitions, is_partitioned, month_start
+
+ORGS = 50
+USERS = 2000
+ENTITIES = 200_000
+ENTITY_TYPES = ("aircraft", "work_order", "cert_application", "defect", "checklist_audit", "attachment")
+ACTIONS = ("create", "update", "delete", "read", "export", "pdf_export")
+
+
+def load(engine, rows: int, months: int) -> None:
+    now = datetime.now(timezone.utc)
+    start = add_months(month_start(now.date()), -months + 1)
+    per_month = rows // months
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            raise SystemExit("audit_log is not partitioned — run `alembic upgrade head` first")
+        ensure_partitions(conn, months_ahead=months + 3, start=start)
+    for i in range(months):
+        m = add_months(start, i)
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO audit_log (id, user_id, organization_id, action, entity_type, entity_id, description, created_at)
+                SELECT md5(:m || g::text),
+                       'user-' || (g % :users),
+                       'org-' || (g % :orgs),
+                       (ARRAY['create','update','delete','read','export','pdf_export'])[1 + g % 6],
+                       (ARRAY['aircraft','work_order','cert_application','defect','checklist_audit','attachment'])[1 + g % 6],
+                       'ent-' || (g % :entities),
+                       'bench',
+                       CAST(:m AS timestamptz) + (g::double precision / :n) * interval '28 days'
+                FROM generate_series(1, :n) AS g
+            """), {"m": m.isoformat(), "n": per_month, "users": USERS, "orgs": ORGS, "entities": ENTITIES})
+        print(f"  {m:%Y-%m}: {per_month:,} rows in {time.perf_counter() - t0:.1f}s")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE audit_log"))
+
+
+def _partitions_scanned(plan: dict) -> int:
+    count = 0
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if node.get("Relation Name", "").startswith("audit_log_"):
+            count += 1
+        stack.extend(node.get("Plans", []))
+    return count
+
+
+def measure(engine, repeats: int) -> list[dict]:
+    Session = sessionmaker(bind=engine)
+    now = datetime.now(timezone.utc)
+    shapes = {
+        "latest (no filter)": {},
+        "entity history": {"entity_type": "aircraft", "entity_id": "ent-42"},
+        "user activity": {"user_id": "user-7"},
+        "org last 30d": {"organization_id": "org-3", "date_from": now - timedelta(days=30)},
+        "action last 7d": {"action": "delete", "date_from": now - timedelta(days=7)},
+        "entity + month window": {"entity_type": "work_order", "entity_id": "ent-43",
+                                  "date_from": now - timedelta(days=60), "date_to": now - timedelta(days=30)},
+    }
+    results = []
+    for name, filters in shapes.items():
+        db = Session()
+        try:
+            q = audit_events_query(db, **filters).limit(50)
+            compiled = q.statement.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+            plan = plan if isinstance(plan, list) else json.loads(plan)
+            timings = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                q.all()
+                timings.append((time.perf_counter() - t0) * 1000)
+        finally:
+            db.close()
+        timings.sort()
+        results.append({
+            "query": name,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 2),
+            "partitions_scanned": _partitions_scanned(plan[0]["Plan"]),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.database_url)
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--skip-load", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("PostgreSQL required")
+    if not args.skip_load:
+        print(f"Loading {args.rows:,} rows over {args.months} months...")
+        load(engine, args.rows, args.months)
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'audit_log_default'")).scalar()
+        parts = conn.execute(text(
+            "SELECT count(*) FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'audit_log'"
+        )).scalar()
+    print(f"\naudit_log: {parts} partitions (default partition ~{total or 0} rows)\n")
+    print(f"{'query':<26}{'p50 ms':>10}{'p95 ms':>10}{'partitions':>12}")
+    for r in measure(engine, args.repeats):
+        print(f"{r['query']:<26}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['partitions_scanned']:>12}")
+
+
+if __name__ == "__main__":
+    main()
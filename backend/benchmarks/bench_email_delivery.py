@@ -0,0 +1,66 @@
+"""
+Бенчмарк доставки почты (app.services.email_service): пропускная способность пула
+постоянных SMTP-соединений.
+
+Нужен SMTP-приёмник (MailHog, smtp4dev, aiosmtpd): письма реально отправляются.
+Outbox повторов — SQLite в памяти. --min-per-sec — порог (exit 1, если ниже).
+
+    python -m benchmarks.bench_email_delivery --host localhost --port 1025 --count 5000 --min-per-sec 200
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.db.base import Base
+from app.models import EmailOutbox
+from app.services.email_service import EmailDelivery, EmailMessage, SmtpConnection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SMTP_HOST or "localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--starttls", action="store_true")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=settings.SMTP_POOL_SIZE)
+    parser.add_argument("--batch-size", type=int, default=settings.SMTP_BATCH_SIZE)
+    parser.add_argument("--min-per-sec", type=float, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[EmailOutbox.__table__])
+    delivery = EmailDelivery(
+        lambda: SmtpConnection(args.host, args.port, starttls=args.starttls, timeout=settings.SMTP_TIMEOUT_S),
+        settings.SMTP_FROM, session_factory=sessionmaker(bind=engine),
+        pool_size=args.pool_size, batch_size=args.batch_size,
+    )
+    messages = [EmailMessage(to=f"camo{i}@operator.ru", subject="ДЛГ", body="<p>AD</p>") for i in range(args.count)]
+    t0 = time.perf_counter()
+    delivery.submit(messages)
+    if not delivery.flush(600):
+        raise SystemExit("delivery did not drain in 600 s")
+    elapsed = time.perf_counter() - t0
+    stats = delivery.stats()
+    delivery.stop()
+
+    rate = args.count / elapsed
+    print(f"{args.count} messages → {args.host}:{args.port}\n")
+    print(f"{'seconds':>10}{'msg/s':>10}{'sent':>8}{'deferred':>10}{'conns':>8}")
+    print(f"{elapsed:>10.2f}{rate:>10.0f}{stats['sent_total']:>8}{stats['deferred_total']:>10}"
+          f"{stats['connections_opened']:>8}")
+
+    if args.min_per_sec and rate < args.min_per_sec:
+        print(f"\nFAIL: {rate:.0f} msg/s < target {args.min_per_sec}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Бенчмарк рассылки уведомлений (app.services.notifications.dispatch): рассылка на
+организацию из N пользователей — выборка получателей с настройками, INSERT notifications
+и передача каналам (отправители заменены счётчиками: измеряется сама рассылка).
+
+SQLite в памяти по умолчанию; --url — PostgreSQL (таблицы создаются, пользователи
+bench-* удаляются после замера). --max-ms — порог (exit 1, если выше).
+
+    python -m benchmarks.bench_notification_dispatch --users 10000 --max-ms 1000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.models import Notification, NotificationPreference, Organization, User
+from app.services.notifications import CHANNELS, Audience, dispatch, register_channel
+
+ORG_ID = "bench-org"
+
+
+def load(db, users: int) -> None:
+    now = datetime.now(timezone.utc)
+    db.merge(Organization(id=ORG_ID, name="Бенчмарк", kind="operator"))
+    db.flush()
+    db.execute(insert(User.__table__), [
+        {"id": f"bench-{i}", "external_subject": f"bench-sub-{i}", "display_name": f"User {i}",
+         "email": f"bench{i}@klg.ru", "role": "operator_user", "organization_id": ORG_ID,
+         "created_at": now, "updated_at": now}
+        for i in range(users)
+    ])
+    # Каждый десятый — с настройками (отписка от ДЛГ у каждого сотого)
+    db.execute(insert(NotificationPreference.__table__), [
+        {"user_id": f"bench-sub-{i}", "ad_mandatory": i % 100 != 0, "channels_push": True,
+         "created_at": now, "updated_at": now}
+        for i in range(0, users, 10)
+    ])
+    db.commit()
+
+
+def cleanup(db) -> None:
+    db.execute(delete(Notification.__table__).where(Notification.recipient_user_id.like("bench-%")))
+    db.execute(delete(NotificationPreference.__table__).where(NotificationPreference.user_id.like("bench-%")))
+    db.execute(delete(User.__table__).where(User.organization_id == ORG_ID))
+    db.execute(delete(Organization.__table__).where(Organization.id == ORG_ID))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(engine, tables=[Organization.__table__, User.__table__,
+                                             NotificationPreference.__table__, Notification.__table__])
+    for channel in CHANNELS:
+        register_channel(channel, lambda recipients, *_: len(recipients))
+    db = sessionmaker(bind=engine)()
+    try:
+        load(db, args.users)
+        timings = []
+        for i in range(args.repeats):
+            t0 = time.perf_counter()
+            result = dispatch(db, "ad_new_mandatory", Audience(org_ids=(ORG_ID,)), f"ДЛГ AD-{i}", "Требуется выполнение")
+            timings.append((time.perf_counter() - t0) * 1000)
+    finally:
+        cleanup(db)
+        db.close()
+
+    best = min(timings)
+    print(f"{args.users} users, {result.recipients} recipients, channels {result.channels}\n")
+    print(f"{'best ms':>10}{'median ms':>12}{'recipients/s':>14}")
+    print(f"{best:>10.0f}{sorted(timings)[len(timings) // 2]:>12.0f}{result.recipients / best * 1000:>14.0f}")
+
+    if args.max_ms and best > args.max_ms:
+        print(f"\nFAIL: {best:.0f} ms > target {args.max_ms}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
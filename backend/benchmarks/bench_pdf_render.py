@@ -0,0 +1,84 @@
+"""
+Бенчмарк сервиса PDF: пропускная способность рендера нарядов (CRS).
+
+Сравнивает рендер в процессе API (workers=0) и в пуле процессов, а также
+повторную выдачу из кэша по хэшу версии. --min-per-sec — порог (exit 1, если ниже).
+
+    python -m benchmarks.bench_pdf_render --count 300 --workers 4 --min-per-sec 50
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import zipfile
+from io import BytesIO
+
+from app.services.pdf_renderer import PdfRenderService, render_zip_stream
+
+
+def make_work_orders(n: int) -> list[dict]:
+    return [
+        {
+            "id": f"wo-{i}",
+            "wo_number": f"WO-2026-{i:05d}",
+            "aircraft_reg": f"RA-{89000 + i % 200}",
+            "wo_type": "scheduled",
+            "title": f"Периодическое ТО форма А-{i % 4 + 1}",
+            "description": "Выполнить осмотр по карте-наряду. " * 20,
+            "priority": "normal",
+            "status": "closed",
+            "estimated_manhours": 12,
+            "actual_manhours": 11.5,
+            "findings": "Замечаний нет." if i % 3 else "Износ тормозных колодок в пределах допуска.",
+            "crs_signed_by": "Иванов И.И., B1",
+            "crs_date": "2026-10-31",
+        }
+        for i in range(n)
+    ]
+
+
+def run(service: PdfRenderService, wos: list[dict]) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    body = b"".join(render_zip_stream(service, "work_order", wos, lambda w: f"{w['wo_number']}.pdf"))
+    elapsed = time.perf_counter() - t0
+    with zipfile.ZipFile(BytesIO(body)) as zf:
+        assert len(zf.namelist()) == len(wos)
+    return elapsed, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--min-per-sec", type=float, default=0)
+    args = parser.parse_args()
+
+    wos = make_work_orders(args.count)
+    rows = []
+    inline = PdfRenderService(workers=0)
+    elapsed, size = run(inline, wos)
+    rows.append(("inline (API worker)", elapsed, size))
+
+    pooled = PdfRenderService(workers=args.workers)
+    pooled.render("work_order", make_work_orders(1)[0] | {"id": "warmup"})  # старт пула + шрифты
+    elapsed, size = run(pooled, wos)
+    rows.append((f"pool ({args.workers} procs)", elapsed, size))
+    pooled_rate = args.count / elapsed
+
+    elapsed, size = run(pooled, wos)
+    rows.append(("pool, cached", elapsed, size))
+    pooled.shutdown()
+
+    print(f"{args.count} work orders → ZIP\n")
+    print(f"{'mode':<22}{'seconds':>10}{'PDF/s':>10}{'ZIP MB':>10}")
+    for name, secs, size in rows:
+        print(f"{name:<22}{secs:>10.2f}{args.count / secs:>10.1f}{size / 1e6:>10.1f}")
+
+    if args.min_per_sec and pooled_rate < args.min_per_sec:
+        print(f"\nFAIL: {pooled_rate:.1f} PDF/s < target {args.min_per_sec}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Бенчмарк показателей надёжности (app.services.reliability.defect_rates): год парка
+из суточных свёрток — налёт по каждому ВС за 15 месяцев и N дефектов по главам ATA.
+
+SQLite в памяти. --max-ms — порог (exit 1, если выше).
+
+    python -m benchmarks.bench_reliability --aircraft 100 --defects 11000 --max-ms 1000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.models import Aircraft, AircraftType, DefectDaily, UtilizationDaily
+from app.services.life_limit_forecast import add_months
+from app.services.reliability import defect_rates
+
+AS_OF = date(2026, 6, 30)
+
+
+def load(db, aircraft: int, defects: int) -> None:
+    rng = random.Random(7)
+    db.add_all([
+        AircraftType(id="t-ssj", manufacturer="Sukhoi", model="RRJ-95", icao_code="SU95"),
+        AircraftType(id="t-mc21", manufacturer="Irkut", model="MC-21-300", icao_code="MC23"),
+    ])
+    db.flush()
+    db.execute(insert(Aircraft.__table__), [
+        {"id": f"bench-{i}", "registration_number": f"RA-9{i:04d}",
+         "aircraft_type_id": "t-ssj" if i % 2 else "t-mc21", "operator_id": "org-1"}
+        for i in range(aircraft)
+    ])
+    start = add_months(AS_OF, -15) + timedelta(days=1)
+    days = (AS_OF - start).days + 1
+    db.execute(insert(UtilizationDaily.__table__), [
+        {"aircraft_id": f"bench-{i}", "day": start + timedelta(days=d), "flight_hours": 8.0, "cycles": 2.0,
+         "source": "flight_log"}
+        for i in range(aircraft) for d in range(days)
+    ])
+    year = add_months(AS_OF, -12) + timedelta(days=1)
+    counts: dict[tuple, int] = {}
+    for _ in range(defects):
+        key = (f"bench-{rng.randrange(aircraft)}", year + timedelta(days=rng.randrange(365)),
+               f"{rng.randrange(20, 80):02d}")
+        counts[key] = counts.get(key, 0) + 1
+    db.execute(insert(DefectDaily.__table__), [
+        {"aircraft_id": a, "day": d, "ata_chapter": c, "defects": n} for (a, d, c), n in counts.items()
+    ])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aircraft", type=int, default=100)
+    parser.add_argument("--defects", type=int, default=11_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[AircraftType.__table__, Aircraft.__table__,
+                                             DefectDaily.__table__, UtilizationDaily.__table__])
+    db = sessionmaker(bind=engine)()
+    load(db, args.aircraft, args.defects)
+
+    print(f"{args.aircraft} aircraft, {args.defects} defects / 12 months\n")
+    print(f"{'grouping':<14}{'groups':>8}{'best ms':>10}{'median ms':>12}")
+    worst = 0.0
+    for by in (["ata"], ["type", "ata"], ["tail"]):
+        timings = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            result = defect_rates(db, by=by, as_of=AS_OF)
+            timings.append((time.perf_counter() - t0) * 1000)
+        assert sum(i["defects"]["12m"] for i in result["items"]) == args.defects
+        timings.sort()
+        worst = max(worst, timings[0])
+        print(f"{'+'.join(by):<14}{len(result['items']):>8}{timings[0]:>10.0f}{timings[len(timings) // 2]:>12.0f}")
+    db.close()
+
+    if args.max_ms and worst > args.max_ms:
+        print(f"\nFAIL: {worst:.0f} ms > target {args.max_ms}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Бенчмарк изоляции арендаторов: RLS (alembic 0005) против фильтра в приложении.
+
+На данных benchmarks.fleet_generator для горячих списков (ВС, риски, карты ТО,
+журнал аудита) от имени --orgs эксплуатантов сравниваются режимы:
+
+- app        — app.current_org_id = '', WHERE operator_id = :org (filter_by_org);
+- rls        — set_config подклеен к запросу, без WHERE (одна отправка);
+- rls+app    — оба (текущий режим API: политика + filter_by_org);
+- rls-2rt    — set_config отдельным оператором (как было: два round-trip'а).
+
+Печатает p50/p95 на запрос и режим; --json — машиночитаемо.
+
+    python -m benchmarks.fleet_generator --scale 100 --truncate
+    alembic upgrade head
+    python -m benchmarks.bench_tenant_rls --repeats 50 --orgs 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.db.tenant import set_config_sql
+
+# (имя, запрос с фильтром приложения, запрос только под RLS)
+QUERIES = (
+    ("aircraft list",
+     "SELECT id, registration_number, status FROM aircraft WHERE operator_id = %(org)s "
+     "ORDER BY registration_number LIMIT 50",
+     "SELECT id, registration_number, status FROM aircraft ORDER BY registration_number LIMIT 50"),
+    ("aircraft count",
+     "SELECT count(*) FROM aircraft WHERE operator_id = %(org)s",
+     "SELECT count(*) FROM aircraft"),
+    ("risk alerts open",
+     "SELECT r.id, r.severity, r.title FROM risk_alerts r JOIN aircraft a ON a.id = r.aircraft_id "
+     "WHERE a.operator_id = %(org)s AND NOT r.is_resolved ORDER BY r.created_at DESC LIMIT 50",
+     "SELECT r.id, r.severity, r.title FROM risk_alerts r WHERE NOT r.is_resolved "
+     "ORDER BY r.created_at DESC LIMIT 50"),
+    ("maintenance due 30d",
+     "SELECT t.id, t.task_number, t.next_due FROM maintenance_tasks t JOIN aircraft a ON a.id = t.aircraft_id "
+     "WHERE a.operator_id = %(org)s AND t.next_due < now() + interval '30 days' ORDER BY t.next_due LIMIT 100",
+     "SELECT t.id, t.task_number, t.next_due FROM maintenance_tasks t "
+     "WHERE t.next_due < now() + interval '30 days' ORDER BY t.next_due LIMIT 100"),
+    ("audit events",
+     "SELECT id, action, entity_type, created_at FROM audit_log WHERE organization_id = %(org)s "
+     "ORDER BY created_at DESC LIMIT 50",
+     "SELECT id, action, entity_type, created_at FROM audit_log ORDER BY created_at DESC LIMIT 50"),
+)
+MODES = ("app", "rls", "rls+app", "rls-2rt")
+
+
+def _run(cur, mode: str, org: str, app_sql: str, rls_sql: str) -> None:
+    if mode == "app":
+        cur.execute(f"{set_config_sql('', True)}; {app_sql}", {"org": org})
+    elif mode == "rls":
+        cur.execute(f"{set_config_sql(org)}; {rls_sql}")
+    elif mode == "rls+app":
+        cur.execute(f"{set_config_sql(org, True)}; {app_sql}", {"org": org})
+    else:
+        cur.execute(set_config_sql(org))
+        cur.execute(rls_sql)
+    cur.fetchall()
+
+
+def measure(engine, orgs: list[str], repeats: int) -> list[dict]:
+    results = []
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for name, app_sql, rls_sql in QUERIES:
+            for mode in MODES:
+                timings, rows = [], 0
+                for i in range(repeats):
+                    org = orgs[i % len(orgs)]
+                    t0 = time.perf_counter()
+                    _run(cur, mode, org, app_sql, rls_sql)
+                    timings.append((time.perf_counter() - t0) * 1000)
+                    rows += cur.rowcount
+                    raw.rollback()  # set_config(..., true) живёт до конца транзакции
+                timings.sort()
+                results.append({
+                    "query": name, "mode": mode,
+                    "p50_ms": round(statistics.median(timings), 3),
+                    "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 3),
+                    "rows_avg": round(rows / repeats, 1),
+                })
+    finally:
+        raw.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.database_url)
+    parser.add_argument("--orgs", type=int, default=10, help="число эксплуатантов, от имени которых идут запросы")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("PostgreSQL required")
+    with engine.connect() as conn:
+        forced = conn.execute(text("SELECT relforcerowsecurity FROM pg_class WHERE relname = 'aircraft'")).scalar()
+        orgs = [r[0] for r in conn.execute(text(
+            "SELECT id FROM organizations WHERE kind = 'operator' ORDER BY id LIMIT :n"), {"n": args.orgs})]
+    if not forced:
+        raise SystemExit("RLS is not forced on aircraft — run `alembic upgrade head` first")
+    if not orgs:
+        raise SystemExit("no operators — run `python -m benchmarks.fleet_generator` first")
+
+    results = measure(engine, orgs, args.repeats)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'query':<22}{'mode':<10}{'p50 ms':>10}{'p95 ms':>10}{'rows':>8}")
+    for r in results:
+        print(f"{r['query']:<22}{r['mode']:<10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['rows_avg']:>8}")
+
+
+if __name__ == "__main__":
+    main()
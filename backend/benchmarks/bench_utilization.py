@@ -0,0 +1,98 @@
+"""
+Бенчмарк приёма журнала полётов (app.services.utilization): поток NDJSON рейсов парка
+частями по 64 КБ — разбор, вставка flight_legs, наборное обновление наработки ВС и LLP.
+
+SQLite в памяти. --min-per-sec — порог рейсов в секунду (exit 1, если ниже).
+
+    python -m benchmarks.bench_utilization --legs 100000 --aircraft 200 --min-per-sec 1667
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.models import (
+    Aircraft, AircraftHistory, AircraftType, FlightLeg, LandingGearComponent, LimitedLifeComponent, Organization,
+    UtilizationDaily,
+)
+from app.services.utilization import UtilizationIngest
+
+TAKEOFF = datetime(2026, 6, 1, 6, 0, tzinfo=timezone.utc)
+CHUNK = 64 * 1024
+
+
+def load(db, aircraft: int, llp_per_aircraft: int) -> list[str]:
+    db.add(AircraftType(id="t-ssj", manufacturer="Sukhoi", model="RRJ-95", icao_code="SU95"))
+    db.flush()
+    fleet = [f"RA-9{i:04d}" for i in range(aircraft)]
+    db.execute(insert(Aircraft.__table__), [
+        {"id": f"bench-{i}", "registration_number": reg, "aircraft_type_id": "t-ssj", "total_time": 0.0,
+         "total_cycles": 0}
+        for i, reg in enumerate(fleet)
+    ])
+    # Через ORM — теневые колонки ресурса заполняет sync_limited_life
+    db.add_all([LimitedLifeComponent(aircraft_id=f"bench-{i}", ata_code="72", part_number=f"LLP-{k}",
+                                     serial_number=f"{i}-{k}", tsn="0", csn="0", interval="20000 FH / 10000 FC")
+                for i in range(aircraft) for k in range(llp_per_aircraft)])
+    db.commit()
+    return fleet
+
+
+def ndjson(fleet: list[str], legs: int) -> bytes:
+    lines = []
+    for n in range(legs):
+        takeoff = TAKEOFF + timedelta(hours=3 * (n // len(fleet)))
+        lines.append(json.dumps({
+            "registration": fleet[n % len(fleet)], "flight_no": f"SU{n // len(fleet):04d}",
+            "takeoff": takeoff.isoformat(), "landing": (takeoff + timedelta(hours=2)).isoformat(),
+            "flight_hours": 1.5,
+        }).encode() + b"\n")
+    return b"".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--legs", type=int, default=100_000)
+    parser.add_argument("--aircraft", type=int, default=200)
+    parser.add_argument("--llp", type=int, default=10, help="LLP на ВС")
+    parser.add_argument("--min-per-sec", type=float, default=0)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        Organization.__table__, AircraftType.__table__, Aircraft.__table__, LimitedLifeComponent.__table__,
+        LandingGearComponent.__table__, AircraftHistory.__table__, FlightLeg.__table__, UtilizationDaily.__table__,
+    ])
+    db = sessionmaker(bind=engine)()
+    fleet = load(db, args.aircraft, args.llp)
+    body = ndjson(fleet, args.legs)
+
+    t0 = time.perf_counter()
+    ingest = UtilizationIngest(db)
+    for i in range(0, len(body), CHUNK):
+        ingest.feed(body[i:i + CHUNK])
+    result = ingest.finish()
+    db.commit()
+    elapsed = time.perf_counter() - t0
+    db.close()
+
+    rate = result.accepted / elapsed
+    print(f"{args.legs} legs, {args.aircraft} aircraft × {args.llp} LLP, {len(body) / 1e6:.1f} MB NDJSON\n")
+    print(f"{'seconds':>10}{'legs/s':>10}{'accepted':>10}{'rejected':>10}{'components':>12}")
+    print(f"{elapsed:>10.2f}{rate:>10.0f}{result.accepted:>10}{result.rejected:>10}{result.components:>12}")
+
+    if args.min_per_sec and rate < args.min_per_sec:
+        print(f"\nFAIL: {rate:.0f} legs/s < target {args.min_per_sec}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
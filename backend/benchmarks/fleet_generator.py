@@ -0,0 +1,355 @@
+"""
+Синтетический парк для нагрузочных тестов: детерминированный генератор (seed) в
+масштабе 1× / 10× / 100× / 1000× с загрузкой через COPY (PostgreSQL).
+
+1× (SCALE_UNIT): 5 эксплуатантов, 20 ВС; на ВС — 200 карт ТО, 40 LLP, 12 позиций
+шасси, 30 дефектов, 4 аудита, 500 записей audit_log; плюс risk_alerts по просрочкам.
+1000× ≈ 20 000 ВС / 4 млн карт ТО / 10 млн audit_log.
+
+    python -m benchmarks.fleet_generator --scale 10 --seed 42
+    python -m benchmarks.fleet_generator --scale 100 --truncate
+
+Строки генерируются потоково и отправляются пачками (COPY FROM STDIN, CSV);
+на не-PostgreSQL (SQLite в тестах) — executemany INSERT. COPY обходит события
+before_insert моделей, поэтому теневые колонки интервалов (interval_*, remaining_*,
+calendar_due, счётчики) заполняет сам генератор теми же app.services.intervals.sync_*.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+
+@dataclass(frozen=True)
+class ScaleUnit:
+    operators: int = 5
+    aircraft: int = 20
+    tasks_per_aircraft: int = 200
+    llp_per_aircraft: int = 40
+    gear_per_aircraft: int = 12
+    defects_per_aircraft: int = 30
+    audits_per_aircraft: int = 4
+    audit_log_per_aircraft: int = 500
+
+
+SCALE_UNIT = ScaleUnit()
+CHUNK_ROWS = 20_000
+ATA = ["05", "12", "21", "24", "25", "27", "28", "29", "30", "32", "34", "36", "49", "52", "71", "72", "79"]
+TYPES = [
+    ("Sukhoi", "SSJ100", "SU95", "turbofan", 98),
+    ("Airbus", "A320", "A320", "turbofan", 180),
+    ("Boeing", "737-800", "B738", "turbofan", 189),
+    ("ATR", "72-600", "AT76", "turboprop", 72),
+    ("Mil", "Mi-8MTV", "MI8", "turboshaft", 24),
+]
+# Таблицы в порядке FK; truncate — в обратном
+TABLES = (
+    "organizations", "aircraft_types", "aircraft", "maintenance_tasks", "limited_life_components",
+    "landing_gear_components", "defect_reports", "checklist_templates", "checklist_items", "audits",
+    "risk_alerts", "audit_log",
+)
+
+
+# Таблица → функция app.services.intervals, заполняющая теневые колонки
+SHADOW_SYNC = {
+    "maintenance_tasks": "sync_maintenance_task",
+    "limited_life_components": "sync_limited_life",
+    "landing_gear_components": "sync_landing_gear",
+}
+
+
+class _ShadowRow:
+    """Строка генератора как объект модели для sync_*: остальные колонки — None; присвоенное запоминается."""
+
+    def __init__(self, row: dict, columns: Iterable[str]):
+        self.__dict__.update(dict.fromkeys(columns))
+        self.__dict__.update(row)
+        self.__dict__["_assigned"] = {}
+
+    def __setattr__(self, name, value):
+        self.__dict__[name] = value
+        self._assigned[name] = value
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+class FleetGenerator:
+    """Детерминированные строки по таблицам; id зависят только от seed и масштаба."""
+
+    def __init__(self, scale: int = 1, seed: int = 42, now: datetime | None = None, unit: ScaleUnit = SCALE_UNIT):
+        self.scale = scale
+        self.seed = seed
+        self.unit = unit
+        self.now = now or datetime(2026, 10, 1, tzinfo=timezone.utc)
+        self.operator_ids: list[str] = []
+        self.type_ids: list[str] = []
+        self.aircraft_ids: list[str] = []
+        self.template_id: str | None = None
+        self.item_ids: list[str] = []
+
+    def _rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.seed}:{self.scale}:{table}")
+
+    def _ts(self, rng: random.Random, days_back: int, days_fwd: int = 0) -> datetime:
+        return self.now + timedelta(days=rng.randint(-days_back, days_fwd), minutes=rng.randint(0, 1439))
+
+    def _stamp(self, row: dict) -> dict:
+        row.setdefault("created_at", self.now)
+        row.setdefault("updated_at", self.now)
+        return row
+
+    # ------------------------------------------------------------------
+    def organizations(self) -> Iterator[dict]:
+        rng = self._rng("organizations")
+        for i in range(self.unit.operators * self.scale):
+            oid = _uuid(rng)
+            self.operator_ids.append(oid)
+            yield self._stamp({"id": oid, "kind": "operator", "name": f"Авиакомпания Синтетик-{i:05d}",
+                               "inn": f"{7700000000 + i}", "email": f"ops{i}@synthetic.klg"})
+
+    def aircraft_types(self) -> Iterator[dict]:
+        rng = self._rng("aircraft_types")
+        for manufacturer, model, icao, engine, pax in TYPES:
+            tid = _uuid(rng)
+            self.type_ids.append(tid)
+            yield {"id": tid, "manufacturer": manufacturer, "model": f"{model} (synthetic)", "icao_code": icao,
+                   "engine_type": engine, "engine_count": 2, "max_passengers": pax,
+                   "created_at": self.now, "updated_at": self.now}
+
+    def aircraft(self) -> Iterator[dict]:
+        rng = self._rng("aircraft")
+        for i in range(self.unit.aircraft * self.scale):
+            aid = _uuid(rng)
+            self.aircraft_ids.append(aid)
+            yield {"id": aid, "registration_number": f"SY-{i:06d}", "serial_number": f"MSN{100000 + i}",
+                   "aircraft_type_id": rng.choice(self.type_ids), "operator_id": self.operator_ids[i % len(self.operator_ids)],
+                   "year_of_manufacture": rng.randint(1995, 2025), "max_takeoff_weight": round(rng.uniform(20000, 80000), 0),
+                   "status": rng.choices(["active", "maintenance", "storage"], [90, 8, 2])[0], "is_active": True,
+                   "created_at": self.now, "updated_at": self.now}
+
+    def maintenance_tasks(self) -> Iterator[dict]:
+        rng = self._rng("maintenance_tasks")
+        for aid in self.aircraft_ids:
+            for j in range(self.unit.tasks_per_aircraft):
+                next_due = self._ts(rng, 60, 720)
+                yield self._stamp({
+                    "id": _uuid(rng), "aircraft_id": aid, "ata_code": rng.choice(ATA), "task_number": f"{rng.choice(ATA)}-{j:04d}-01",
+                    "rev": "R1", "type": rng.choice(["INSP", "LUB", "OPC", "FNC", "DVI"]),
+                    "status": rng.choices(["open", "done", "deferred"], [70, 25, 5])[0],
+                    "description": f"Synthetic task {j}", "threshold": f"{rng.choice([600, 1200, 3000])} FH",
+                    "interval": rng.choice(["600 FH", "1200 FC", "24 MO", "3000 FH / 24 MO"]),
+                    "last_accomplished": next_due - timedelta(days=365), "next_due": next_due,
+                    "time_remaining": f"{(next_due - self.now).days} DY",
+                })
+
+    def limited_life_components(self) -> Iterator[dict]:
+        rng = self._rng("limited_life_components")
+        for aid in self.aircraft_ids:
+            for j in range(self.unit.llp_per_aircraft):
+                limit = rng.choice([20000, 25000, 30000])
+                csn = rng.randint(0, limit)
+                yield self._stamp({
+                    "id": _uuid(rng), "aircraft_id": aid, "ata_code": rng.choice(["72", "32", "49"]),
+                    "part_number": f"PN-{rng.randint(1000, 9999)}", "serial_number": f"SN-{rng.getrandbits(32):08x}",
+                    "description": f"LLP {j}", "current_status": "installed", "position": rng.choice(["1", "2", "APU"]),
+                    "install_date": self._ts(rng, 3000), "requirement_title": "Life limit", "requirement_type": "HARD",
+                    "interval": f"{limit} FC", "expected_date": self._ts(rng, 30, 1500), "to_go": f"{limit - csn} FC",
+                    "tsn": str(round(csn * 1.6, 1)), "csn": str(csn),
+                })
+
+    def landing_gear_components(self) -> Iterator[dict]:
+        rng = self._rng("landing_gear_components")
+        for aid in self.aircraft_ids:
+            for j in range(self.unit.gear_per_aircraft):
+                yield self._stamp({
+                    "id": _uuid(rng), "aircraft_id": aid, "ata_code": "32", "part_number": f"LG-{rng.randint(100, 999)}",
+                    "serial_number": f"LGSN-{rng.getrandbits(32):08x}", "description": f"Gear item {j}",
+                    "position": rng.choice(["NLG", "MLG L", "MLG R"]), "install_date": self._ts(rng, 3000),
+                    "tsn": str(rng.randint(0, 40000)), "csn": str(rng.randint(0, 30000)), "requirement": "Overhaul",
+                    "dim": "FC", "due_at": self._ts(rng, 30, 2000), "interval": "20000 FC", "to_go": str(rng.randint(-50, 20000)),
+                })
+
+    def defect_reports(self) -> Iterator[dict]:
+        rng = self._rng("defect_reports")
+        for aid in self.aircraft_ids:
+            for j in range(self.unit.defects_per_aircraft):
+                incident = self._ts(rng, 720)
+                yield self._stamp({
+                    "id": _uuid(rng), "aircraft_id": aid, "ata_code": rng.choice(ATA), "wo_number": f"WO-{rng.randint(1, 999999):06d}",
+                    "reference_tlb": f"TLB-{rng.randint(1, 99999)}", "report": f"Synthetic defect {j}",
+                    "mel_cat": rng.choice([None, "A", "B", "C", "D"]), "incident_date": incident,
+                    "limit_date": incident + timedelta(days=rng.choice([3, 10, 120])),
+                })
+
+    def checklist_templates(self) -> Iterator[dict]:
+        rng = self._rng("checklist_templates")
+        self.template_id = _uuid(rng)
+        yield self._stamp({"id": self.template_id, "name": "Синтетический аудит ВС", "version": 1,
+                           "domain": "ФАП-М", "is_active": True})
+
+    def checklist_items(self) -> Iterator[dict]:
+        rng = self._rng("checklist_items")
+        for j in range(25):
+            iid = _uuid(rng)
+            self.item_ids.append(iid)
+            yield self._stamp({"id": iid, "template_id": self.template_id, "code": f"S.{j:03d}",
+                               "text": f"Требование {j}", "sort_order": j})
+
+    def audits(self) -> Iterator[dict]:
+        rng = self._rng("audits")
+        for aid in self.aircraft_ids:
+            for _ in range(self.unit.audits_per_aircraft):
+                planned = self._ts(rng, 720, 90)
+                done = planned < self.now and rng.random() < 0.8
+                yield self._stamp({"id": _uuid(rng), "template_id": self.template_id, "aircraft_id": aid,
+                                   "status": "completed" if done else rng.choice(["draft", "in_progress"]),
+                                   "planned_at": planned, "completed_at": planned if done else None})
+
+    def risk_alerts(self) -> Iterator[dict]:
+        rng = self._rng("risk_alerts")
+        for aid in self.aircraft_ids:
+            for _ in range(rng.randint(0, 6)):
+                yield self._stamp({"id": _uuid(rng), "entity_type": "maintenance_task", "entity_id": _uuid(rng),
+                                   "aircraft_id": aid, "severity": rng.choice(["low", "medium", "high", "critical"]),
+                                   "title": "Просрочка выполнения (synthetic)", "due_at": self._ts(rng, 90),
+                                   "is_resolved": rng.random() < 0.3})
+
+    def audit_log(self) -> Iterator[dict]:
+        rng = self._rng("audit_log")
+        entities = ("aircraft", "maintenance_task", "defect", "work_order", "life_limit")
+        for i, aid in enumerate(self.aircraft_ids):
+            org = self.operator_ids[i % len(self.operator_ids)]
+            for _ in range(self.unit.audit_log_per_aircraft):
+                yield {"id": _uuid(rng), "user_id": f"synthetic-user-{rng.randint(1, 50 * self.scale)}",
+                       "user_email": None, "user_role": rng.choice(["operator_user", "mro_user", "admin"]),
+                       "organization_id": org, "action": rng.choice(["create", "update", "delete", "read"]),
+                       "entity_type": rng.choice(entities), "entity_id": aid, "changes": None,
+                       "description": "synthetic", "ip_address": None, "created_at": self._ts(rng, 730)}
+
+    def _with_shadows(self, table: str, rows: Iterable[dict]) -> Iterator[dict]:
+        import app.models  # noqa: F401 — колонки таблиц
+        from app.db.base import Base
+        from app.services import intervals
+
+        sync = getattr(intervals, SHADOW_SYNC[table])
+        kwargs = {"today": self.now.date()} if table == "maintenance_tasks" else {}
+        columns = Base.metadata.tables[table].columns.keys()
+        for row in rows:
+            obj = _ShadowRow(row, columns)
+            sync(obj, **kwargs)
+            row.update(obj._assigned)
+            yield row
+
+    def tables(self) -> Iterator[tuple[str, Iterable[dict]]]:
+        for table in TABLES:
+            rows = getattr(self, table)()
+            yield table, self._with_shadows(table, rows) if table in SHADOW_SYNC else rows
+
+    def expected_counts(self) -> dict[str, int]:
+        n_ac = self.unit.aircraft * self.scale
+        u = self.unit
+        return {"organizations": u.operators * self.scale, "aircraft": n_ac,
+                "maintenance_tasks": n_ac * u.tasks_per_aircraft, "limited_life_components": n_ac * u.llp_per_aircraft,
+                "landing_gear_components": n_ac * u.gear_per_aircraft, "defect_reports": n_ac * u.defects_per_aircraft,
+                "audits": n_ac * u.audits_per_aircraft, "audit_log": n_ac * u.audit_log_per_aircraft}
+
+
+# ---------------------------------------------------------------------------
+# Загрузка
+# ---------------------------------------------------------------------------
+def _csv_value(v):
+    if v is None:
+        return r"\N"
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, bool):
+        return "t" if v else "f"
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, ensure_ascii=False)
+    return v
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk: list[dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def copy_rows(conn: Connection, table: str, rows: Iterable[dict], chunk_rows: int = CHUNK_ROWS) -> int:
+    """COPY FROM STDIN пачками (PostgreSQL) либо executemany INSERT."""
+    total = 0
+    pg = conn.dialect.name == "postgresql"
+    for chunk in _chunks(rows, chunk_rows):
+        columns = list(chunk[0].keys())
+        if pg:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in chunk:
+                writer.writerow([_csv_value(row[c]) for c in columns])
+            buf.seek(0)
+            cols = ", ".join(f'"{c}"' for c in columns)
+            with conn.connection.dbapi_connection.cursor() as cur:
+                cur.copy_expert(f'COPY "{table}" ({cols}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buf)
+        else:
+            placeholders = ", ".join(f":{c}" for c in columns)
+            conn.execute(text(f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({placeholders})'), chunk)
+        total += len(chunk)
+    return total
+
+
+def truncate(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"TRUNCATE {', '.join(TABLES)} CASCADE"))
+    else:
+        for table in reversed(TABLES):
+            conn.execute(text(f'DELETE FROM "{table}"'))
+
+
+def generate(engine: Engine, scale: int = 1, seed: int = 42, do_truncate: bool = False,
+             unit: ScaleUnit = SCALE_UNIT, verbose: bool = False) -> dict[str, int]:
+    gen = FleetGenerator(scale=scale, seed=seed, unit=unit)
+    counts: dict[str, int] = {}
+    with engine.begin() as conn:
+        if do_truncate:
+            truncate(conn)
+        for table, rows in gen.tables():
+            started = time.perf_counter()
+            counts[table] = copy_rows(conn, table, rows)
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"  {table:<26} {counts[table]:>12,} rows  {elapsed:7.1f} s  "
+                      f"{counts[table] / max(elapsed, 1e-9):>12,.0f} rows/s")
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic fleet generator (COPY)")
+    parser.add_argument("--scale", type=int, default=10, help="1, 10, 100, 1000 (× SCALE_UNIT)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы парка перед загрузкой")
+    args = parser.parse_args()
+
+    from app.db.session import engine
+    print(f"Generating fleet ×{args.scale} (seed {args.seed}) into {engine.url.render_as_string(hide_password=True)}")
+    result = generate(engine, scale=args.scale, seed=args.seed, do_truncate=args.truncate, verbose=True)
+    print(json.dumps(result))
@@ -0,0 +1,119 @@
+"""
+Профиль времени импорта (python -X importtime) — бюджет старта воркера.
+
+Импортирует цель в чистом подпроцессе, разбирает stderr -X importtime и печатает:
+- итог (мс) и топ модулей по собственному / накопленному времени;
+- сводку по пакетам верхнего уровня (fastapi, sqlalchemy, httpx, app.api.routes.* …).
+
+--env задаёт переменные окружения подпроцесса (флаги функций, DATABASE_URL);
+--budget-ms — порог (exit 1, если импорт дольше). Медиана по --repeat запускам.
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --env ENABLE_AI=false ENABLE_FGIS=false ENABLE_LEGAL=false
+    python -m benchmarks.import_profile --target app.api.routes.aircraft --budget-ms 800 --json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    records = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cum_us, indent, module = m.groups()
+            records.append(ImportRecord(module, int(self_us), int(cum_us), (len(indent) - 1) // 2))
+    return records
+
+
+def group_key(module: str) -> str:
+    """app.api.routes.X и app.services.X — по модулю; остальное — по пакету верхнего уровня."""
+    parts = module.split(".")
+    if parts[0] == "app" and len(parts) >= 3:
+        return ".".join(parts[:4] if parts[1] == "api" and parts[2] == "routes" else parts[:3])
+    return parts[0]
+
+
+def summarize(records: list[ImportRecord], top: int = 25) -> dict:
+    total_us = sum(r.self_us for r in records)
+    groups: dict[str, int] = defaultdict(int)
+    for r in records:
+        groups[group_key(r.module)] += r.self_us
+    by_self = sorted(records, key=lambda r: r.self_us, reverse=True)[:top]
+    by_cum = sorted((r for r in records if r.module.startswith("app")), key=lambda r: r.cumulative_us, reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(records),
+        "top_self": [{"module": r.module, "ms": round(r.self_us / 1000, 1)} for r in by_self],
+        "top_app_cumulative": [{"module": r.module, "ms": round(r.cumulative_us / 1000, 1)} for r in by_cum],
+        "groups": [{"group": g, "ms": round(us / 1000, 1)}
+                   for g, us in sorted(groups.items(), key=lambda kv: kv[1], reverse=True)[:top]],
+    }
+
+
+def profile(target: str, env: dict[str, str] | None = None) -> list[ImportRecord]:
+    proc_env = {**os.environ, **(env or {})}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=proc_env,
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"import {target} failed:\n{tail[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    env = dict(item.split("=", 1) for item in args.env)
+    runs = [summarize(profile(args.target, env), args.top) for _ in range(max(1, args.repeat))]
+    report = sorted(runs, key=lambda r: r["total_ms"])[len(runs) // 2]
+    report["runs_ms"] = [r["total_ms"] for r in runs]
+    report["median_ms"] = statistics.median(report["runs_ms"])
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"import {args.target}: median {report['median_ms']} ms over {len(runs)} runs "
+              f"({report['modules']} modules) {report['runs_ms']}")
+        print("\nПо пакетам (собственное время):")
+        for g in report["groups"]:
+            print(f"  {g['ms']:>9.1f} ms  {g['group']}")
+        print("\nМодули app.* (накопленное):")
+        for m in report["top_app_cumulative"]:
+            print(f"  {m['ms']:>9.1f} ms  {m['module']}")
+    if args.budget_ms is not None and report["median_ms"] > args.budget_ms:
+        print(f"FAIL: {report['median_ms']} ms > budget {args.budget_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Нагрузочный сценарий API: p50/p95/p99 по эндпоинтам против зафиксированных базовых значений.
+
+asyncio-клиент (httpx) гоняет набор сценариев с ограниченной конкурентностью —
+в процессе через ASGITransport (по умолчанию) или по сети (--url). Данные —
+benchmarks.fleet_generator (--generate N загрузит парк ×N перед прогоном).
+
+Результат сравнивается с benchmarks/baselines/load_<scale>x.json: перцентиль
+эндпоинта > baseline × (1 + --tolerance) — регрессия, exit 1. Baseline в репозитории
+не хранится: его записывает --record на эталонном стенде; без файла прогон только
+печатает перцентили.
+
+В процессе все запросы идут с одного адреса клиента, поэтому лимит RateLimitMiddleware
+на время прогона заменяется --rate-limit (0 — без ограничения). Ответы 429 считаются
+отдельно (throttled), в перцентили не входят и делают прогон недействительным (exit 1):
+для --url поднимите RATE_LIMIT_PER_MINUTE на стенде.
+
+    python -m benchmarks.load_test --scale 10 --requests 200 --concurrency 16
+    python -m benchmarks.load_test --url http://localhost:8000 --token $T --scale 100
+    python -m benchmarks.load_test --scale 10 --record
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    path: str
+    params: dict = field(default_factory=dict)
+    weight: int = 1
+
+
+SCENARIOS: tuple[Scenario, ...] = (
+    Scenario("stats", "GET", "/stats", weight=4),
+    Scenario("risk_alerts", "GET", "/risk-alerts", {"per_page": 100}, weight=4),
+    Scenario("risk_alerts_critical", "GET", "/risk-alerts", {"severity": "critical", "per_page": 50}, weight=2),
+    Scenario("risk_scan", "POST", "/risk-alerts/scan", weight=1),
+    Scenario("audit_events", "GET", "/audit/events", {"per_page": 50}, weight=3),
+    Scenario("search_global", "GET", "/search/global", {"q": "SY-00"}, weight=3),
+    Scenario("aircraft_list", "GET", "/aircraft", weight=3),
+    Scenario("export_aircraft_csv", "GET", "/export/aircraft", {"format": "csv", "limit": 5000}, weight=1),
+    Scenario("export_risk_alerts_json", "GET", "/export/risk_alerts", {"format": "json", "limit": 5000}, weight=1),
+)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Перцентиль с линейной интерполяцией (как numpy.percentile по умолчанию)."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = (len(s) - 1) * p / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+
+def summarize(latencies: dict[str, list[float]], errors: dict[str, int],
+              throttled: dict[str, int] | None = None) -> dict[str, dict]:
+    throttled = throttled or {}
+    out = {}
+    for name in sorted(set(latencies) | set(throttled)):
+        values = latencies.get(name, [])
+        out[name] = {f"p{p}": round(percentile(values, p), 2) for p in PERCENTILES}
+        out[name]["requests"] = len(values)
+        out[name]["errors"] = errors.get(name, 0)
+        out[name]["throttled"] = throttled.get(name, 0)
+    return out
+
+
+def compare(result: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Регрессии: перцентиль выше baseline × (1 + tolerance); эндпоинты без baseline пропускаются.
+
+    Ошибки и ответы 429 — отказ при любом baseline: замер с ними недействителен.
+    """
+    failures = []
+    for name, stats in result.items():
+        if stats["errors"]:
+            failures.append(f"{name}: {stats['errors']} error responses")
+        if stats.get("throttled"):
+            failures.append(f"{name}: {stats['throttled']} throttled (429) responses")
+        base = baseline.get(name)
+        if not base:
+            continue
+        for p in PERCENTILES:
+            key = f"p{p}"
+            if key in base and stats[key] > base[key] * (1 + tolerance):
+                failures.append(f"{name} {key}: {stats[key]:.1f} ms > {base[key]:.1f} ms (+{tolerance:.0%})")
+    return failures
+
+
+def schedule(requests: int) -> list[Scenario]:
+    """Детерминированная последовательность по весам (round-robin)."""
+    pool = [s for s in SCENARIOS for _ in range(s.weight)]
+    return [pool[i % len(pool)] for i in range(requests)]
+
+
+async def run(client, requests: int, concurrency: int, prefix: str, warmup: int = 1) -> dict[str, dict]:
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    throttled: dict[str, int] = {}
+
+    async def one(s: Scenario, record: bool = True) -> None:
+        started = time.perf_counter()
+        resp = await client.request(s.method, f"{prefix}{s.path}", params=s.params)
+        elapsed = (time.perf_counter() - started) * 1000
+        if not record:
+            return
+        if resp.status_code == 429:
+            throttled[s.name] = throttled.get(s.name, 0) + 1
+            return
+        latencies.setdefault(s.name, []).append(elapsed)
+        if resp.status_code >= 400:
+            errors[s.name] = errors.get(s.name, 0) + 1
+
+    for s in SCENARIOS:
+        for _ in range(warmup):
+            await one(s, record=False)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded(s: Scenario) -> None:
+        async with sem:
+            await one(s)
+
+    await asyncio.gather(*(bounded(s) for s in schedule(requests)))
+    return summarize(latencies, errors, throttled)
+
+
+def baseline_path(scale: int) -> Path:
+    return BASELINE_DIR / f"load_{scale}x.json"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="базовый URL; по умолчанию — ASGI-приложение в процессе")
+    parser.add_argument("--token", default="dev", help="Bearer-токен (admin); 'dev' при ENABLE_DEV_AUTH")
+    parser.add_argument("--scale", type=int, default=10, help="масштаб данных — выбирает файл baseline")
+    parser.add_argument("--generate", action="store_true", help="загрузить парк ×scale перед прогоном")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--rate-limit", type=int, default=0,
+                        help="запросов в минуту для RateLimitMiddleware в процессе; 0 — без ограничения")
+    parser.add_argument("--record", action="store_true", help="перезаписать baseline текущими значениями")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    import httpx
+
+    from app.core.config import settings
+
+    if args.generate:
+        from app.db.session import engine
+        from benchmarks.fleet_generator import generate
+        generate(engine, scale=args.scale, do_truncate=True, verbose=True)
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url.rstrip("/"), headers=headers, timeout=120)
+    else:
+        from app.core import rate_limit
+        from app.main import app
+        rate_limit._limiter = rate_limit._TokenBucket(rate=args.rate_limit or sys.maxsize)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test",
+                                   headers=headers, timeout=120)
+
+    async def _go():
+        async with client:
+            return await run(client, args.requests, args.concurrency, settings.API_V1_PREFIX)
+
+    result = asyncio.run(_go())
+    path = baseline_path(args.scale)
+
+    if args.record:
+        if any(s["errors"] or s["throttled"] for s in result.values()):
+            print("baseline not written: run had error or throttled (429) responses", file=sys.stderr)
+            return 1
+        BASELINE_DIR.mkdir(exist_ok=True)
+        payload = {name: {k: v for k, v in stats.items() if k.startswith("p")} for name, stats in result.items()}
+        path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"baseline written: {path}")
+        return 0
+
+    baseline = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    failures = compare(result, baseline, args.tolerance)
+    if args.json:
+        print(json.dumps({"scale": args.scale, "result": result, "failures": failures}, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'endpoint':<26} {'n':>5} {'err':>4} {'429':>4} {'p50':>9} {'p95':>9} {'p99':>9}   baseline p95")
+        for name, s in result.items():
+            base = baseline.get(name, {}).get("p95")
+            print(f"{name:<26} {s['requests']:>5} {s['errors']:>4} {s['throttled']:>4} {s['p50']:>9.1f}"
+                  f" {s['p95']:>9.1f} {s['p99']:>9.1f}   {base if base is not None else '-'}")
+        if not baseline:
+            print(f"\nno baseline at {path} — run with --record on the reference host")
+    for f in failures:
+        print(f"REGRESSION: {f}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 -- КЛГ АСУ ТК: Row-Level Security (RLS) for multi-tenant isolation
 -- Part-M-RU compliance: data isolation between organizations
--- Run after initial migration: alembic upgrade head
+-- Superseded by alembic revision 0005 (backend/alembic/versions/0005_rls_policies.py)
 -- Разработчик: АО «REFLY»
 
 -- 1. Create app setting for current org
@@ -11,6 +11,7 @@ from sqlalchemy.orm import sessionmaker
 os.environ["DATABASE_URL"] = "sqlite:///test.db"
 os.environ["ENABLE_DEV_AUTH"] = "true"
 os.environ["DEV_TOKEN"] = "test"
+os.environ.setdefault("SQL_N_PLUS_ONE", "warn")
 
 from app.db.base import Base
 from app.api.deps import get_db
@@ -22,6 +23,9 @@ from fastapi.testclient import TestClient
 engine = create_engine("sqlite:///test.db", connect_args={"check_same_thread": False})
 TestSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+from app.db.instrumentation import install as install_sql_instrumentation  # noqa: E402
+install_sql_instrumentation(engine)
+
 
 @pytest.fixture(autouse=True)
 def setup_db():
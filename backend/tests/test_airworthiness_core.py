@@ -123,10 +123,47 @@ class TestComponents:
 
 
 class TestAircraftStatus:
-    def test_status_report(self, client, auth_headers):
-        resp = client.get("/api/v1/airworthiness-core/aircraft-status/RA-12345", headers=auth_headers)
+    def test_status_report(self, client, auth_headers, db):
+        from app.models import Aircraft, AircraftType
+        db.add(AircraftType(id="t-ssj", manufacturer="Sukhoi", model="SSJ-100", icao_code="SU95"))
+        db.add(Aircraft(id="ac-status", registration_number="RA-97042", aircraft_type_id="t-ssj"))
+        db.commit()
+        client.post("/api/v1/airworthiness-core/directives", headers=auth_headers, json={
+            "number": "AD-STATUS-SSJ", "title": "SSJ", "effective_date": "2026-01-01", "aircraft_types": ["SSJ100"]})
+        client.post("/api/v1/airworthiness-core/directives", headers=auth_headers, json={
+            "number": "AD-STATUS-A320", "title": "A320", "effective_date": "2026-01-01", "aircraft_types": ["A320"]})
+        resp = client.get("/api/v1/airworthiness-core/aircraft-status/RA-97042", headers=auth_headers)
         assert resp.status_code == 200
         data = resp.json()
-        assert "summary" in data
-        assert "airworthy" in data
+        assert data["summary"]["open_directives"] >= 1
+        assert data["airworthy"] is False
         assert "legal_basis" in data
+        numbers = {d["number"] for d in client.get("/api/v1/airworthiness-core/applicability/aircraft/RA-97042",
+                                                   headers=auth_headers).json()["items"]}
+        assert "AD-STATUS-SSJ" in numbers and "AD-STATUS-A320" not in numbers
+
+    def test_fgis_sync_indexes_mandatory_ad(self, client, auth_headers, db, monkeypatch):
+        from app.api.routes import airworthiness_core as core
+        from app.models import Aircraft, AircraftType
+        from app.services.fgis_revs import FGISDirective, FGISREVSClient
+        for name in ("_directives", "_bulletins", "_components", "_life_limits"):
+            monkeypatch.setattr(core, name, {})
+        monkeypatch.setattr(core, "_applicability", None)
+        monkeypatch.setattr(core, "_forecaster", None)
+        db.add(AircraftType(id="t-ssj-fgis", manufacturer="Sukhoi", model="SSJ-100", icao_code="SU95"))
+        db.add(Aircraft(id="ac-fgis", registration_number="RA-97043", aircraft_type_id="t-ssj-fgis"))
+        db.commit()
+        assert client.get("/api/v1/airworthiness-core/aircraft-status/RA-97043",
+                          headers=auth_headers).json()["airworthy"] is True  # матрица уже построена
+        fgis = FGISREVSClient()
+        monkeypatch.setattr(fgis, "pull_directives", lambda since=None: [FGISDirective(
+            number="АД-2026-0099", title="Осмотр крепления крыла", effective_date="2026-02-01",
+            aircraft_types=["SSJ-100"], compliance_type="mandatory", fgis_id="FGIS-AD-099")])
+        assert fgis.sync_directives().records_synced == 1
+        data = client.get("/api/v1/airworthiness-core/aircraft-status/RA-97043", headers=auth_headers).json()
+        assert data["summary"]["open_mandatory_directives"] == 1
+        assert data["airworthy"] is False
+
+    def test_status_unknown_aircraft(self, client, auth_headers):
+        resp = client.get("/api/v1/airworthiness-core/aircraft-status/RA-NOPE", headers=auth_headers)
+        assert resp.status_code == 404
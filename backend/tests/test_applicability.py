@@ -0,0 +1,107 @@
+"""
+Tests for the AD/SB applicability engine (app.services.applicability).
+"""
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.models import Aircraft, AircraftType
+from app.services.applicability import ApplicabilityEngine, aircraft_tokens
+
+
+def _ad(did, types=(), parts=(), status="open"):
+    return {"id": did, "number": did, "aircraft_types": list(types), "affected_parts": list(parts),
+            "status": status, "compliance_type": "mandatory"}
+
+
+@pytest.fixture
+def stores():
+    return {"directives": {}, "bulletins": {}, "components": {}, "life_limits": {}}
+
+
+@pytest.fixture
+def engine(stores):
+    e = ApplicabilityEngine(**stores)
+    e.set_aircraft("ac-ssj", "RA-89001", aircraft_tokens("Sukhoi", "SSJ-100", "SU95", "SaM146"))
+    e.set_aircraft("ac-737", "RA-73001", aircraft_tokens("Boeing", "737-800", "B738", "CFM56-7B"))
+    return e
+
+
+def _add(engine, stores, d, kind="ad"):
+    stores["directives" if kind == "ad" else "bulletins"][d["id"]] = d
+    engine.upsert_directive(kind, d)
+
+
+class TestApplicability:
+    def test_type_prefix_and_engine_match(self, engine, stores):
+        _add(engine, stores, _ad("ad-ssj", ["SSJ100"]))
+        _add(engine, stores, _ad("ad-737", ["B737"]))
+        _add(engine, stores, _ad("ad-cfm", ["CFM56"]))
+        assert {d["id"] for d in engine.applicable("ac-ssj")} == {"ad-ssj"}
+        assert {d["id"] for d in engine.applicable("ac-737")} == {"ad-737", "ad-cfm"}
+        assert engine.aircraft_id_for("ra-73001") == "ac-737"
+
+    def test_part_numbers_follow_component_transfer(self, engine, stores):
+        _add(engine, stores, _ad("ad-pn", parts=["NLG-1234"]))
+        _add(engine, stores, _ad("ad-pn-737", types=["B737"], parts=["NLG-1234"]))
+        comp = {"id": "c1", "part_number": "NLG-1234", "aircraft_id": "ac-ssj"}
+        stores["components"]["c1"] = comp
+        engine.upsert_part(comp)
+        assert [d["id"] for d in engine.applicable("ac-ssj")] == ["ad-pn"]
+        comp["aircraft_id"] = "ac-737"
+        engine.upsert_part(comp)
+        assert engine.applicable("ac-ssj") == []
+        assert {d["id"] for d in engine.applicable("ac-737")} == {"ad-pn", "ad-pn-737"}
+
+    def test_status_and_directive_edits_are_incremental(self, engine, stores):
+        d = _ad("ad-1", ["SSJ100"])
+        _add(engine, stores, d)
+        assert engine.summary("ac-ssj")["open_directives"] == 1
+        d["status"] = "complied"
+        engine.set_status("ad", d)
+        assert engine.summary("ac-ssj") == {"applicable_directives": 1, "applicable_bulletins": 0,
+                                            "open_directives": 0, "open_mandatory_directives": 0,
+                                            "open_bulletins": 0}
+        d["aircraft_types"] = ["B737"]
+        engine.upsert_directive("ad", d)
+        assert engine.aircraft_for("ad", "ad-1") == ["ac-737"]
+        sb = {"id": "sb-1", "number": "SB", "aircraft_types": ["SU95"], "status": "open", "category": "alert"}
+        _add(engine, stores, sb, kind="sb")
+        assert engine.summary("ac-ssj")["open_bulletins"] == 1
+        assert engine.matrix() == {"ac-ssj": ["sb-1"]}
+
+    def test_sync_fleet_picks_up_type_change(self, stores):
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(db_engine, tables=[Base.metadata.tables[t] for t in ("organizations", "aircraft_types", "aircraft")])
+        db = sessionmaker(bind=db_engine)()
+        db.add_all([AircraftType(id="t1", manufacturer="Sukhoi", model="SSJ-100"),
+                    AircraftType(id="t2", manufacturer="Airbus", model="A320", icao_code="A320")])
+        db.add(Aircraft(id="ac-1", registration_number="RA-1", aircraft_type_id="t1"))
+        db.commit()
+        e = ApplicabilityEngine(**stores)
+        _add(e, stores, _ad("ad-a320", ["A320"]))
+        e.sync_fleet(db)
+        assert e.applicable("ac-1") == []
+        db.get(Aircraft, "ac-1").aircraft_type_id = "t2"
+        db.commit()
+        db.execute(Aircraft.__table__.update().values(updated_at=datetime(2099, 1, 1)))  # SQLite: now() с точностью до секунды
+        e.sync_fleet(db)
+        assert [d["id"] for d in e.applicable("ac-1")] == ["ad-a320"]
+
+    def test_per_tail_status_is_fast_at_fleet_scale(self, stores):
+        e = ApplicabilityEngine(**stores)
+        types = ["SSJ100", "B737", "A320", "MC21", "AN148"]
+        for i in range(3000):
+            _add(e, stores, _ad(f"ad-{i}", [types[i % 5]], status="open" if i % 3 else "complied"))
+        for i in range(2000):
+            e.set_aircraft(f"ac-{i}", f"RA-{i}", frozenset({types[i % 5]}))
+        start = time.perf_counter()
+        for i in range(2000):
+            e.summary(f"ac-{i}")
+        assert (time.perf_counter() - start) / 2000 < 0.002
+        assert e.summary("ac-0")["applicable_directives"] == 600
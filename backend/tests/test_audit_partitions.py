@@ -0,0 +1,124 @@
+"""
+Tests for audit_log partition maintenance (app.services.audit_partitions).
+"""
+import os
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+from app.services import audit_partitions as ap
+
+PG_URL = os.environ.get("KLG_TEST_POSTGRES_URL")
+
+
+class FakeCatalog:
+    """Партиции audit_log в памяти: default-партиция с датами строк и правило PostgreSQL —
+    CREATE … PARTITION OF падает, если в присоединённой default есть строки новой границы."""
+
+    def __init__(self, default_rows, partitions=(), fail=()):
+        self.dialect = SimpleNamespace(name="postgresql")
+        self.attached = {ap.DEFAULT, *partitions}
+        self.rows = {name: [] for name in self.attached}
+        self.rows[ap.DEFAULT] = list(default_rows)
+        self.fail = set(fail)
+
+    @contextmanager
+    def begin_nested(self):
+        saved = (set(self.attached), {k: list(v) for k, v in self.rows.items()})
+        try:
+            yield
+        except Exception:
+            self.attached, self.rows = saved
+            raise
+
+    def _in(self, name, lo, hi):
+        return [d for d in self.rows[name] if lo <= d < hi]
+
+    def execute(self, stmt, params=None):
+        sql, p = str(stmt), params or {}
+        result = SimpleNamespace(scalar=lambda: None, rowcount=0, scalars=lambda: SimpleNamespace(all=lambda: []))
+        if "pg_partitioned_table" in sql:
+            result.scalar = lambda: 1
+        elif "pg_inherits" in sql:
+            names = sorted(self.attached)
+            result.scalars = lambda: SimpleNamespace(all=lambda: names)
+        elif "date_trunc" in sql:
+            months = sorted({date(d.year, d.month, 1) for d in self.rows[ap.DEFAULT] if d < p["before"]})
+            result.scalars = lambda: SimpleNamespace(all=lambda: months)
+        elif sql.startswith("SELECT 1 FROM"):
+            found = self._in(ap.DEFAULT, p["lo"], p["hi"])
+            result.scalar = lambda: 1 if found else None
+        elif m := re.match(r'ALTER TABLE audit_log DETACH PARTITION "(\w+)"', sql):
+            self.attached.discard(m.group(1))
+        elif m := re.match(r'ALTER TABLE audit_log ATTACH PARTITION "(\w+)" DEFAULT', sql):
+            self.attached.add(m.group(1))
+        elif m := re.match(r"CREATE TABLE (?:IF NOT EXISTS )?\"(\w+)\" PARTITION OF audit_log DEFAULT", sql):
+            self.attached.add(m.group(1))
+            self.rows.setdefault(m.group(1), [])
+        elif m := re.match(r"CREATE TABLE \"(\w+)\" PARTITION OF audit_log FOR VALUES FROM \('(.+)'\) TO \('(.+)'\)", sql):
+            name, lo, hi = m.group(1), date.fromisoformat(m.group(2)), date.fromisoformat(m.group(3))
+            if name in self.fail or (ap.DEFAULT in self.attached and self._in(ap.DEFAULT, lo, hi)):
+                raise DBAPIError(sql, {}, Exception("updated partition constraint for default partition would be violated"))
+            self.attached.add(name)
+            self.rows[name] = []
+        elif sql.startswith("INSERT INTO audit_log SELECT"):
+            moved = self._in(ap.DEFAULT, p["lo"], p["hi"])
+            self.rows[ap.partition_name(p["lo"])] += moved
+            result.rowcount = len(moved)
+        elif sql.startswith(f'DELETE FROM "{ap.DEFAULT}"'):
+            self.rows[ap.DEFAULT] = [d for d in self.rows[ap.DEFAULT] if not p["lo"] <= d < p["hi"]]
+        elif m := re.match(r'DROP TABLE "(\w+)"', sql):
+            self.rows.pop(m.group(1))
+        else:
+            raise AssertionError(f"unexpected SQL: {sql}")
+        return result
+
+
+class TestMissedMonths:
+    def test_rows_in_default_moved_before_create(self):
+        conn = FakeCatalog([date(2026, 8, 3), date(2026, 10, 2), date(2026, 10, 20)])
+        created = ap.ensure_partitions(conn, months_ahead=1, start=date(2026, 10, 19))
+        assert created == ["audit_log_2026_08", "audit_log_2026_10", "audit_log_2026_11"]
+        assert conn.rows[ap.DEFAULT] == [] and ap.DEFAULT in conn.attached
+        assert conn.rows["audit_log_2026_10"] == [date(2026, 10, 2), date(2026, 10, 20)]
+
+    def test_failed_month_skipped_others_created(self):
+        conn = FakeCatalog([date(2026, 10, 2)], fail={"audit_log_2026_10"})
+        created = ap.ensure_partitions(conn, months_ahead=1, start=date(2026, 10, 19))
+        assert created == ["audit_log_2026_11"]
+        # Откат SAVEPOINT: default снова присоединена и строки на месте
+        assert ap.DEFAULT in conn.attached and conn.rows[ap.DEFAULT] == [date(2026, 10, 2)]
+
+    def test_archive_moves_old_rows_out_of_default(self, tmp_path, monkeypatch):
+        today = datetime.now(timezone.utc).date()
+        old = ap.add_months(date(today.year, today.month, 1), -30)
+        conn = FakeCatalog([old, today])
+        assert ap.archive_old_partitions(conn, retention_months=24, dry_run=True) == [
+            {"partition": ap.partition_name(old), "dry_run": True, "from_default": True}]
+        monkeypatch.setattr(ap, "_copy_to_gzip", lambda c, table, path: path.write_bytes(b"") or len(c.rows[table]))
+        archived = ap.archive_old_partitions(conn, retention_months=24, archive_dir=str(tmp_path))
+        assert [(a["partition"], a["rows"]) for a in archived] == [(ap.partition_name(old), 1)]
+        assert conn.rows[ap.DEFAULT] == [today]
+
+
+@pytest.mark.skipif(not PG_URL, reason="KLG_TEST_POSTGRES_URL not set")
+class TestPostgres:
+    def test_missed_month_recovered(self):
+        engine = create_engine(PG_URL)
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA IF EXISTS klg_part_test CASCADE; CREATE SCHEMA klg_part_test"))
+            conn.execute(text("SET LOCAL search_path TO klg_part_test"))
+            conn.execute(text("CREATE TABLE audit_log (id serial, created_at timestamptz NOT NULL) "
+                              "PARTITION BY RANGE (created_at)"))
+            conn.execute(text(f'CREATE TABLE "{ap.DEFAULT}" PARTITION OF audit_log DEFAULT'))
+            conn.execute(text("INSERT INTO audit_log (created_at) VALUES ('2026-08-03'), ('2026-10-02')"))
+            created = ap.ensure_partitions(conn, months_ahead=0, start=date(2026, 10, 19))
+            assert created == ["audit_log_2026_08", "audit_log_2026_10"]
+            assert conn.execute(text(f'SELECT count(*) FROM "{ap.DEFAULT}"')).scalar() == 0
+            assert conn.execute(text('SELECT count(*) FROM "audit_log_2026_10"')).scalar() == 1
+            conn.execute(text("DROP SCHEMA klg_part_test CASCADE"))
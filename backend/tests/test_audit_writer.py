@@ -0,0 +1,110 @@
+"""
+Tests for buffered audit-log writer (AUDIT_MODE=buffered).
+Проверяет: запись после commit, откат, порядок, дренаж при остановке, битые строки.
+"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.audit_log import AuditLog
+
+
+class _User:
+    id = "u-1"
+    email = "audit@klg.ru"
+    role = "admin"
+    organization_id = "org-1"
+
+
+@pytest.fixture
+def audit_db(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'audit.db'}", connect_args={"check_same_thread": False})
+    AuditLog.__table__.create(bind=eng)
+    yield sessionmaker(bind=eng)
+    eng.dispose()
+
+
+@pytest.fixture
+def buffered(monkeypatch, audit_db):
+    from app.services import audit_writer as aw
+    writer = aw.AuditWriter(session_factory=audit_db, batch_size=50, flush_interval=0.01)
+    monkeypatch.setattr(settings, "AUDIT_MODE", "buffered")
+    monkeypatch.setattr(aw, "audit_writer", writer)
+    import app.api.helpers as helpers
+    monkeypatch.setattr(helpers, "audit_writer", writer)
+    yield writer
+    writer.stop()
+
+
+class TestBufferedAudit:
+    def test_written_after_commit(self, buffered, audit_db):
+        from app.api.helpers import audit
+        db = audit_db()
+        audit(db, _User(), "create", "aircraft", "a-1")
+        assert db.query(AuditLog).count() == 0
+        db.commit()
+        assert buffered.flush()
+        assert db.query(AuditLog).count() == 1
+        db.close()
+
+    def test_rollback_discards_entries(self, buffered, audit_db):
+        from app.api.helpers import audit
+        db = audit_db()
+        audit(db, _User(), "delete", "aircraft", "a-1")
+        db.rollback()
+        db.commit()
+        assert buffered.flush()
+        assert db.query(AuditLog).count() == 0
+        db.close()
+
+    def test_order_preserved_across_batches(self, buffered, audit_db):
+        from app.api.helpers import audit
+        db = audit_db()
+        for i in range(120):
+            audit(db, _User(), "update", "aircraft", f"a-{i:03d}")
+        db.commit()
+        assert buffered.flush()
+        rows = db.query(AuditLog).order_by(AuditLog.created_at, AuditLog.entity_id).all()
+        assert [r.entity_id for r in rows] == [f"a-{i:03d}" for i in range(120)]
+        assert buffered.batches_total >= 3
+        db.close()
+
+    def test_stop_drains_queue(self, buffered, audit_db):
+        buffered.submit([{"id": f"id-{i}", "user_id": "u", "action": "read", "entity_type": "x",
+                          "created_at": datetime.now(timezone.utc)} for i in range(200)])
+        buffered.stop()
+        db = audit_db()
+        assert db.query(AuditLog).count() == 200
+        assert buffered.stats()["queue_depth"] == 0
+        db.close()
+
+
+    def test_poison_row_dead_lettered(self, buffered, audit_db, monkeypatch, tmp_path):
+        dead_letter = tmp_path / "dead.jsonl"
+        monkeypatch.setattr(settings, "AUDIT_DEAD_LETTER_PATH", str(dead_letter))
+        monkeypatch.setattr(settings, "AUDIT_WRITE_ATTEMPTS", 1)
+        rows = [{"id": f"id-{i}", "user_id": "u", "action": "read", "entity_type": "x",
+                 "created_at": datetime.now(timezone.utc)} for i in range(40)]
+        rows[17]["user_id"] = None  # NOT NULL — пачку отвергнет любая БД
+        buffered.submit(rows)
+        assert buffered.flush()
+        db = audit_db()
+        ids = [r.id for r in db.query(AuditLog).order_by(AuditLog.created_at).all()]
+        assert len(ids) == 39 and "id-17" not in ids
+        assert buffered.stats()["dead_letter_total"] == 1
+        assert json.loads(dead_letter.read_text())["row"]["id"] == "id-17"
+        db.close()
+
+
+class TestTransactionalAudit:
+    def test_row_added_to_session(self, audit_db):
+        from app.api.helpers import audit
+        db = audit_db()
+        audit(db, _User(), "create", "aircraft", "a-1")
+        db.commit()
+        assert db.query(AuditLog).count() == 1
+        db.close()
@@ -0,0 +1,123 @@
+"""
+Tests for set-based batch operations (app.services.bulk_ops).
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.api.helpers import audit_many
+from app.api.routes import work_orders
+from app.api.routes.batch import ENTITY_MAP, BatchStatusUpdate, batch_status_update
+from app.core.config import settings
+from app.db.base import Base
+from app.models import Aircraft, AuditLog, Organization, RiskAlert
+from app.services import bulk_ops
+
+ADMIN = SimpleNamespace(id="u-admin", email="a@x", role="admin", organization_id=None)
+OPERATOR = SimpleNamespace(id="u-op", email="o@x", role="operator_manager", organization_id="org-a")
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    tables = [Base.metadata.tables[t] for t in ("organizations", "aircraft_types", "aircraft", "risk_alerts", "audit_log")]
+    Base.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    session.add_all([Organization(id="org-a", kind="operator", name="A"), Organization(id="org-b", kind="operator", name="B")])
+    session.add_all([Aircraft(id="ac-a", registration_number="RA-1", operator_id="org-a"),
+                     Aircraft(id="ac-b", registration_number="RA-2", operator_id="org-b")])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _alerts(db, n, aircraft_id="ac-a", prefix="ra"):
+    db.execute(RiskAlert.__table__.insert(), [
+        {"id": f"{prefix}-{i}", "entity_type": "maintenance_task", "entity_id": f"t-{i}", "aircraft_id": aircraft_id,
+         "severity": "high", "title": "x", "is_resolved": False} for i in range(n)])
+    db.commit()
+
+
+class TestBulkOps:
+    def test_update_no_cap_and_chunked(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "BULK_CHUNK_SIZE", 50)
+        _alerts(db, 250)
+        ids = [f"ra-{i}" for i in range(250)] + ["missing-1"]
+        result = bulk_ops.bulk_update(db, ENTITY_MAP["risk_alerts"], ids, {"severity": "low"}, ADMIN)
+        assert len(result.affected) == 250 and result.not_found == ["missing-1"]
+        assert db.execute(select(func.count()).where(RiskAlert.severity == "low")).scalar() == 250
+
+    def test_tenant_filter_marks_forbidden(self, db):
+        _alerts(db, 3, "ac-a", "own")
+        _alerts(db, 2, "ac-b", "other")
+        result = bulk_ops.bulk_update(db, ENTITY_MAP["risk_alerts"], ["own-0", "other-0", "nope"],
+                                      {"severity": "low"}, OPERATOR)
+        assert result.affected == ["own-0"]
+        assert result.forbidden == ["other-0"] and result.not_found == ["nope"]
+
+    def test_delete_returning(self, db):
+        _alerts(db, 5)
+        result = bulk_ops.bulk_delete(db, ENTITY_MAP["risk_alerts"], ["ra-0", "ra-1", "ra-1", "zzz"], ADMIN)
+        assert result.requested == 3 and sorted(result.affected) == ["ra-0", "ra-1"]
+        assert db.execute(select(func.count()).select_from(RiskAlert)).scalar() == 3
+
+    def test_skipped_already_resolved(self, db):
+        _alerts(db, 2)
+        entity = ENTITY_MAP["risk_alerts"]
+        values = {"is_resolved": True}
+        bulk_ops.bulk_update(db, entity, ["ra-0"], values, ADMIN, extra_where=[RiskAlert.is_resolved.is_(False)])
+        result = bulk_ops.bulk_update(db, entity, ["ra-0", "ra-1"], values, ADMIN,
+                                      extra_where=[RiskAlert.is_resolved.is_(False)])
+        assert result.affected == ["ra-1"] and result.skipped == ["ra-0"] and not result.not_found
+
+    def test_resolve_all_10k_under_a_second(self, db):
+        _alerts(db, 10_000)
+        _alerts(db, 10, "ac-b", "other")
+        started = time.perf_counter()
+        resolved = bulk_ops.resolve_where(db, ENTITY_MAP["risk_alerts"], OPERATOR,
+                                          [RiskAlert.is_resolved.is_(False)], {"is_resolved": True})
+        audit_many(db, OPERATOR, "update", "risk_alert", resolved, description="Resolved (batch)")
+        db.commit()
+        elapsed = time.perf_counter() - started
+        assert len(resolved) == 10_000
+        assert db.execute(select(func.count()).select_from(AuditLog)).scalar() == 10_000
+        assert db.execute(select(func.count()).where(RiskAlert.is_resolved.is_(False))).scalar() == 10
+        assert elapsed < 1.0
+
+    def test_delete_isolates_referenced_ids(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "BULK_CHUNK_SIZE", 8)
+        db.execute(text("PRAGMA foreign_keys=ON"))
+        db.add_all([Organization(id=f"org-{i}", kind="operator", name=str(i)) for i in range(6)])
+        db.commit()
+        ids = ["org-0", "org-a", "org-1", "org-2", "org-b", "org-3", "org-4", "org-5", "nope"]
+        result = bulk_ops.bulk_delete(db, ENTITY_MAP["organizations"], ids, ADMIN)
+        db.commit()
+        # На org-a и org-b ссылаются ВС — конфликт только у них, остальная пачка удалена
+        assert sorted(result.conflict) == ["org-a", "org-b"] and result.not_found == ["nope"]
+        assert sorted(result.affected) == [f"org-{i}" for i in range(6)]
+        assert set(db.execute(select(Organization.id)).scalars()) == {"org-a", "org-b"}
+
+    def test_memory_entities(self):
+        store = {"w1": {"status": "draft"}, "w2": {"status": "cancelled"}}
+        transitions = {"draft": frozenset({"in_progress", "cancelled"})}
+        result = bulk_ops.bulk_update_memory(store, ["w1", "w2", "w3"], "in_progress", transitions,
+                                             lambda o: o.update(opened_at="t"))
+        assert result.affected == ["w1"] and result.skipped == ["w2"] and result.not_found == ["w3"]
+        assert store["w1"] == {"status": "in_progress", "opened_at": "t"} and store["w2"] == {"status": "cancelled"}
+        assert bulk_ops.bulk_delete_memory(store, ["w1", "x"]).as_dict("deleted") == \
+            {"deleted": 1, "total_requested": 2, "not_found": ["x"]}
+
+    def test_batch_status_respects_work_order_transitions(self, db, monkeypatch):
+        monkeypatch.setattr(work_orders, "_work_orders", {"w1": {"status": "draft"}, "w2": {"status": "closed"}})
+        with pytest.raises(HTTPException) as exc:
+            batch_status_update(BatchStatusUpdate(entity_type="work_orders", ids=["w1"], status="closed"), db, ADMIN)
+        assert exc.value.status_code == 400 and "close" in exc.value.detail
+        body = batch_status_update(BatchStatusUpdate(entity_type="work_orders", ids=["w1", "w2"], status="cancelled"),
+                                   db, ADMIN)
+        assert body["updated"] == 1 and body["skipped"] == ["w2"]
+        assert work_orders._work_orders["w2"]["status"] == "closed"
@@ -0,0 +1,65 @@
+"""
+Tests for the versioned checklist template cache (app.services.checklist_cache).
+"""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.models import ChecklistItem, ChecklistTemplate
+from app.services.checklist_cache import TemplateCache, bump_version
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[t] for t in ("checklist_templates", "checklist_items")])
+    session = sessionmaker(bind=engine)()
+    for t in range(20):
+        session.add(ChecklistTemplate(id=f"t-{t}", name=f"T{t}", version=1))
+        session.add_all([ChecklistItem(id=f"t-{t}-{i}", template_id=f"t-{t}", code=f"{i}", text="x", sort_order=100 - i)
+                         for i in range(30)])
+    session.commit()
+    session.queries = []
+    event.listen(engine, "before_cursor_execute", lambda *a: session.queries.append(a[2]))
+    yield session
+    session.close()
+
+
+class TestTemplateCache:
+    def test_hydrate_constant_queries(self, db):
+        cache = TemplateCache(max_size=100)
+        templates = db.query(ChecklistTemplate).all()
+        db.queries.clear()
+        out = cache.hydrate(db, templates)
+        assert len(out) == 20 and all(len(t.items) == 30 for t in out)
+        assert len(db.queries) <= 2  # шаблоны + пункты одним selectinload
+        assert [i.sort_order for i in out[0].items] == sorted(i.sort_order for i in out[0].items)
+        db.queries.clear()
+        cache.hydrate(db, templates)
+        assert db.queries == [] and cache.hits == 20
+
+    def test_version_bump_gives_new_snapshot(self, db):
+        cache = TemplateCache(max_size=100)
+        assert len(cache.get(db, "t-1").items) == 30
+        db.add(ChecklistItem(template_id="t-1", code="new", text="y", sort_order=0))
+        bump_version(db.get(ChecklistTemplate, "t-1"))
+        db.commit()
+        out = cache.get(db, "t-1")
+        assert out.version == 2 and len(out.items) == 31 and out.items[0].code == "new"
+
+    def test_get_many_bulk(self, db):
+        cache = TemplateCache(max_size=100)
+        db.queries.clear()
+        out = cache.get_many(db, ["t-3", "missing", "t-1", "t-3"])
+        assert list(out) == ["t-3", "t-1"]
+        assert len(db.queries) <= 3  # версии + шаблоны + пункты
+        db.queries.clear()
+        cache.get_many(db, ["t-1", "t-3"])
+        assert len(db.queries) == 1  # только версии
+
+    def test_lru_bound(self, db):
+        cache = TemplateCache(max_size=5)
+        cache.get_many(db, [f"t-{i}" for i in range(20)])
+        assert cache.stats()["size"] == 5
@@ -0,0 +1,96 @@
+"""
+Tests for primary/replica session routing (two SQLite files stand in for Postgres).
+"""
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select, text
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.core.config import settings
+from app.db.routing import EngineRouter, RoutingSession, sticky_key
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "routing_items"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
+
+@pytest.fixture
+def router(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path}/primary.db")
+    replica = create_engine(f"sqlite:///{tmp_path}/replica.db")
+    for eng, name in ((primary, "from-primary"), (replica, "from-replica")):
+        Base.metadata.create_all(eng)
+        with eng.begin() as conn:
+            conn.execute(Item.__table__.insert(), {"id": 1, "name": name})
+    return EngineRouter(primary, replica)
+
+
+@pytest.fixture
+def make_session(router):
+    return sessionmaker(class_=RoutingSession, router=router, autoflush=False)
+
+
+def _name(db):
+    return db.execute(select(Item.name).where(Item.id == 1)).scalar()
+
+
+class TestRouting:
+    def test_reads_go_to_replica_only_when_marked(self, make_session):
+        with make_session() as db:
+            assert _name(db) == "from-primary"
+        with make_session() as db:
+            db.info["use_replica"] = True
+            assert _name(db) == "from-replica"
+
+    def test_read_your_writes_within_session(self, make_session, router):
+        with make_session() as db:
+            db.info["use_replica"] = True
+            assert _name(db) == "from-replica"
+            db.add(Item(id=2, name="new"))
+            db.flush()
+            assert db.info["wrote"]
+            assert db.execute(select(Item.name).where(Item.id == 2)).scalar() == "new"
+            db.commit()
+        assert router.routed["primary"] >= 1 and router.routed["replica"] >= 1
+
+    def test_text_dml_pins_primary(self, make_session):
+        with make_session() as db:
+            db.info["use_replica"] = True
+            db.execute(text("UPDATE routing_items SET name = 'changed' WHERE id = 1"))
+            assert _name(db) == "changed"
+
+    def test_sticky_window_after_commit(self, make_session, router, monkeypatch):
+        monkeypatch.setattr(settings, "DB_REPLICA_STICKY_S", 60.0)
+        key = sticky_key("Bearer abc", None)
+        with make_session() as db:
+            db.info["sticky_key"] = key
+            db.add(Item(id=3, name="x"))
+            db.commit()
+        assert router.is_sticky(key)
+        assert not router.is_sticky(sticky_key("Bearer other", None))
+
+    def test_lag_fallback(self, make_session, router, monkeypatch):
+        monkeypatch.setattr(settings, "DB_REPLICA_LAG_CHECK_S", 0.0)
+        monkeypatch.setattr(settings, "DB_REPLICA_MAX_LAG_S", 5.0)
+        monkeypatch.setattr(router, "_probe_lag", lambda: 30.0)
+        with make_session() as db:
+            db.info["use_replica"] = True
+            assert _name(db) == "from-primary"
+        monkeypatch.setattr(router, "_probe_lag", lambda: None)
+        with make_session() as db:
+            db.info["use_replica"] = True
+            assert _name(db) == "from-primary"
+        assert router.fallbacks["lag"] == 1 and router.fallbacks["unavailable"] == 1
+        text_metrics = "\n".join(router.render_prometheus())
+        assert 'klg_db_replica_fallback_total{reason="lag"} 1' in text_metrics
+        assert 'klg_db_pool_checked_out{engine="replica"}' in text_metrics
+
+    def test_disabled_without_replica(self, tmp_path):
+        primary = create_engine(f"sqlite:///{tmp_path}/only.db")
+        r = EngineRouter(primary, primary)
+        assert not r.enabled
+        r.mark_write("k")
+        assert not r.is_sticky("k")
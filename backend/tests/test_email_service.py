@@ -0,0 +1,169 @@
+"""
+Tests for SMTP delivery (app.services.email_service) against a local SMTP stand-in.
+"""
+import asyncio
+import socketserver
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.db.base import Base
+from app.models import EmailOutbox
+from app.services import email_service as module
+from app.services.email_service import EmailDelivery, EmailMessage, EmailService, SmtpConnection, render_critical
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """Минимальный SMTP-сервер: EHLO / MAIL / RCPT / DATA / RSET / NOOP / QUIT."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpHandler)
+        self.connections = 0
+        self.messages: list[tuple[str, bytes]] = []
+        self.rcpt_replies: dict[str, bytes] = {}  # адрес → ответ на RCPT (отказы)
+        self.max_messages_per_connection = 0  # > 0 — закрыть соединение после N писем
+        self.lock = threading.Lock()
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server: SmtpStandIn = self.server
+        with server.lock:
+            server.connections += 1
+        self.wfile.write(b"220 stand-in ESMTP\r\n")
+        rcpt, sent = None, 0
+        while line := self.rfile.readline():
+            cmd = line.decode().strip()
+            verb = cmd[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.wfile.write(b"250-stand-in\r\n250 8BITMIME\r\n")
+            elif verb == "MAIL":
+                self.wfile.write(b"250 OK\r\n")
+            elif verb == "RCPT":
+                rcpt = cmd.partition(":")[2].strip(" <>")
+                self.wfile.write(server.rcpt_replies.get(rcpt, b"250 OK\r\n"))
+            elif verb == "DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                data = b"".join(iter(lambda: self.rfile.readline(), b".\r\n"))
+                with server.lock:
+                    server.messages.append((rcpt, data))
+                self.wfile.write(b"250 queued\r\n")
+                sent += 1
+                if server.max_messages_per_connection and sent >= server.max_messages_per_connection:
+                    return  # обрыв без QUIT
+            elif verb in ("RSET", "NOOP"):
+                self.wfile.write(b"250 OK\r\n")
+            elif verb == "QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"502 not implemented\r\n")
+
+
+@pytest.fixture
+def smtp():
+    server = SmtpStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[EmailOutbox.__table__])
+    return sessionmaker(bind=engine)
+
+
+def _delivery(smtp, session_factory, pool_size=4, batch_size=50):
+    port = smtp.server_address[1]
+    return EmailDelivery(lambda: SmtpConnection("127.0.0.1", port, starttls=True, timeout=5),
+                         "noreply@klg.refly.ru", session_factory=session_factory,
+                         pool_size=pool_size, batch_size=batch_size)
+
+
+class TestDelivery:
+    def test_persistent_connections(self, smtp, session_factory):
+        # Пропускная способность — benchmarks/bench_email_delivery.py
+        delivery = _delivery(smtp, session_factory)
+        delivery.submit([EmailMessage(to=f"camo{i}@operator.ru", subject="ДЛГ", body="<p>AD</p>") for i in range(1000)])
+        assert delivery.flush(30)
+        stats = delivery.stats()
+        delivery.stop()
+        assert len(smtp.messages) == 1000 and stats["sent_total"] == 1000
+        assert smtp.connections == stats["connections_opened"] <= 4  # одно рукопожатие на поток
+
+    def test_dropped_connection_reconnects(self, smtp, session_factory):
+        smtp.max_messages_per_connection = 10
+        delivery = _delivery(smtp, session_factory, pool_size=1)
+        delivery.submit([EmailMessage(to=f"u{i}@klg.ru", subject="s", body="b") for i in range(25)])
+        assert delivery.flush(10)
+        delivery.stop()
+        assert len(smtp.messages) == 25 and smtp.connections == 3
+
+    def test_transient_failure_goes_to_outbox_and_retries(self, smtp, session_factory, monkeypatch):
+        monkeypatch.setattr(settings, "SMTP_RETRY_BASE_S", 60)
+        smtp.rcpt_replies = {"busy@klg.ru": b"451 try later\r\n", "nobody@klg.ru": b"550 no such user\r\n"}
+        delivery = _delivery(smtp, session_factory, pool_size=1)
+        delivery.submit([EmailMessage(to=a, subject="s", body="b") for a in ("ok@klg.ru", "busy@klg.ru", "nobody@klg.ru")])
+        assert delivery.flush(10)
+        db = session_factory()
+        rows = db.execute(select(EmailOutbox)).scalars().all()
+        assert [(r.to_addr, r.attempts) for r in rows] == [("busy@klg.ru", 1)]
+        assert rows[0].last_error and delivery.failed_total == 1 and delivery.sent_total == 1
+        assert delivery.retry_due() == 0  # ещё не срок
+
+        smtp.rcpt_replies = {}
+        db.execute(update(EmailOutbox).values(next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        db.commit()
+        assert delivery.retry_due() == 1
+        assert delivery.flush(10)
+        delivery.stop()
+        assert db.execute(select(EmailOutbox)).scalars().all() == []
+        assert [rcpt for rcpt, _ in smtp.messages] == ["ok@klg.ru", "busy@klg.ru"]
+
+    def test_unreachable_server_defers_everything(self, session_factory):
+        delivery = EmailDelivery(lambda: SmtpConnection("127.0.0.1", 1, timeout=1), "noreply@klg.refly.ru",
+                                 session_factory=session_factory, pool_size=2)
+        delivery.submit([EmailMessage(to=f"u{i}@klg.ru", subject="s", body="b") for i in range(5)])
+        assert delivery.flush(10)
+        delivery.stop()
+        db = session_factory()
+        assert len(db.execute(select(EmailOutbox)).scalars().all()) == 5 and delivery.deferred_total == 5
+
+
+class TestCriticalAlerts:
+    def test_templates_precompiled(self):
+        subject, body = render_critical("ad_new_mandatory", ad_number="AD-2026-01", aircraft_types="RRJ-95",
+                                        deadline="2026-11-01")
+        assert subject == "⚠️ Новая обязательная ДЛГ: AD-2026-01" and "RRJ-95" in body
+        with pytest.raises(ValueError):
+            render_critical("ad_new_mandatory", ad_number="AD-1")
+        with pytest.raises(ValueError):
+            module.CompiledTemplate("{component.pn}")
+
+    def test_send_critical_alert_fans_out(self, smtp, session_factory, monkeypatch):
+        service = EmailService(smtp_host="127.0.0.1", smtp_port=smtp.server_address[1],
+                               delivery=_delivery(smtp, session_factory))
+        monkeypatch.setattr(module, "email_service", service)
+        recipients = [f"camo{i}@operator.ru" for i in range(100)] + ["camo0@operator.ru"]
+        assert asyncio.run(module.send_critical_alert(
+            "defect_critical", recipients, aircraft_reg="RA-89060", ata="32", description="утечка"))
+        assert service.delivery.flush(10)
+        service.delivery.stop()
+        assert len(smtp.messages) == 100
+        assert not asyncio.run(module.send_critical_alert("unknown", recipients))
+
+    def test_stub_without_smtp_host(self):
+        service = EmailService(smtp_host="")
+        assert service.send("a@klg.ru", "s", "b") and not service.delivery.running
@@ -0,0 +1,51 @@
+"""
+Tests for lazy router registry and the -X importtime report parser.
+"""
+from types import SimpleNamespace
+
+import app.api.routes as routes
+from benchmarks.import_profile import group_key, parse_importtime, summarize
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2000 |       5000 | fastapi
+import time:      3000 |       3000 |   fastapi.routing
+import time:       500 |       9000 | app.api.routes.aircraft
+import time:      8500 |       8500 |   app.models.aircraft_db
+"""
+
+
+class TestImportProfile:
+    def test_parse_and_depth(self):
+        records = parse_importtime(SAMPLE)
+        assert [r.module for r in records] == ["_io", "fastapi", "fastapi.routing", "app.api.routes.aircraft", "app.models.aircraft_db"]
+        assert records[2].depth == 1 and records[1].depth == 0
+        assert records[3].cumulative_us == 9000
+
+    def test_groups(self):
+        assert group_key("app.api.routes.legal.handlers") == "app.api.routes.legal"
+        assert group_key("app.services.fgis_revs") == "app.services.fgis_revs"
+        assert group_key("sqlalchemy.orm.session") == "sqlalchemy"
+        report = summarize(parse_importtime(SAMPLE))
+        assert report["total_ms"] == 14.1
+        assert report["groups"][0] == {"group": "app.models.aircraft_db", "ms": 8.5}
+
+
+class TestRouterRegistry:
+    def test_disabled_features_are_not_loaded(self, monkeypatch):
+        loaded = []
+        monkeypatch.setattr(routes, "load_router", lambda m: loaded.append(m) or m)
+        flags = SimpleNamespace(ENABLE_AI=False, ENABLE_FGIS=False, ENABLE_LEGAL=False)
+        modules = [m for m, _, _ in routes.iter_routers(flags)]
+        assert {"ai_assistant", "fgis_revs", "legal"}.isdisjoint(loaded)
+        assert modules == loaded and "aircraft" in modules
+        assert modules[0] == "notification_prefs"
+
+    def test_all_enabled_keeps_order(self, monkeypatch):
+        monkeypatch.setattr(routes, "load_router", lambda m: m)
+        flags = SimpleNamespace(ENABLE_AI=True, ENABLE_FGIS=True, ENABLE_LEGAL=True)
+        assert [m for m, _, _ in routes.iter_routers(flags)] == [m for m, _, _ in routes.ROUTER_MODULES]
+
+    def test_public_routers_without_auth(self):
+        public = {m for m, _, auth in routes.ROUTER_MODULES if not auth}
+        assert public == {"health", "metrics", "ws_notifications"}
@@ -0,0 +1,158 @@
+"""
+Tests for the inbox extraction pipeline (app.services.inbox_extraction).
+"""
+import json
+import zipfile
+
+import pytest
+
+from app.services import inbox_extraction
+from app.services.inbox_extraction import ExtractionPipeline, extract_text, fit_budget, parse_fields
+from app.services.inbox_store import InboxStore
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+ANSWER = json.dumps([
+    {"field_code": "part_number", "value": "PN-1234", "confidence": 0.97, "provenance": "стр. 1"},
+    {"field_code": "serial_number", "value": "SN-77", "confidence": 1.4},
+    {"field_code": "quantity", "value": 2, "confidence": "n/a"},
+])
+
+
+def _docx(path, paragraphs):
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("word/document.xml", '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+                   f'wordprocessingml/2006/main"><w:body>{body}</w:body></w:document>')
+
+
+class FakeAI:
+    def __init__(self, answer=ANSWER):
+        self.answer, self.calls = answer, []
+
+    def __call__(self, text, system, max_tokens):
+        self.calls.append(text)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(inbox_extraction.settings, "INBOX_DATA_DIR", str(tmp_path))
+    store = InboxStore(tmp_path / "db" / "inbox.db")
+    (tmp_path / "ai-inbox").mkdir()
+
+    def add(i, paragraphs=("Карточка компонента", "P/N PN-1234"), sha=None, name=None):
+        stored = f"ai-inbox/doc{i}.docx"
+        _docx(tmp_path / stored, paragraphs)
+        store.register_file({"id": f"f-{i}", "original_name": name or f"doc{i}.docx", "stored_path": stored,
+                             "mime": DOCX, "size": 1, "sha256": sha or f"{i:064x}",
+                             "created_at": f"2026-10-0{i}T00:00:00Z", "status": "pending"})
+
+    yield store, add
+    store.close()
+
+
+class TestStages:
+    def test_docx_text(self, tmp_path):
+        _docx(tmp_path / "a.docx", ["Журнал", "", "RA-89060"])
+        assert extract_text(str(tmp_path / "a.docx"), DOCX) == "Журнал\nRA-89060"
+        with pytest.raises(ValueError):
+            extract_text(str(tmp_path / "a.doc"), "application/msword")
+
+    def test_fit_budget_truncates(self):
+        text, truncated, tokens = fit_budget("x" * 100_000, "system", budget=5000, max_output=1000)
+        assert truncated and len(text) < 100_000 and tokens <= 5000
+        text, truncated, _ = fit_budget("short", "system", budget=5000, max_output=1000)
+        assert text == "short" and not truncated
+
+    def test_parse_fields_clamps_confidence(self):
+        fields = {f["field_code"]: f for f in parse_fields("Ответ:\n" + ANSWER)}
+        assert fields["serial_number"]["confidence"] == 1.0
+        assert fields["quantity"]["value"] == "2" and fields["quantity"]["confidence"] is None
+        assert parse_fields('{"fields": [{"field_code": "pn", "value": "1"}]}')[0]["field_code"] == "pn"
+
+
+class TestPipeline:
+    def test_batch_written_with_confidence(self, env):
+        store, add = env
+        for i in range(1, 4):
+            add(i)
+        ai = FakeAI()
+        pipeline = ExtractionPipeline(store, workers=0, ai_concurrency=2, batch_size=2, extract_fields=ai)
+        assert pipeline.run_once() == 2 and pipeline.run_once() == 1 and pipeline.run_once() == 0
+        assert store.count_by_status() == {"extracted": 3}
+        run, fields = store.latest_run("f-1")
+        assert run["status"] == "completed" and run["tokens"] > 0 and not run["truncated"]
+        assert {f["field_code"]: f["confidence"] for f in fields}["part_number"] == 0.97
+        assert "P/N PN-1234" in ai.calls[0]
+
+    def test_same_content_reuses_fields(self, env):
+        store, add = env
+        add(1)
+        ai = FakeAI()
+        pipeline = ExtractionPipeline(store, workers=0, extract_fields=ai)
+        pipeline.run_once()
+        # тот же документ, зарегистрированный inbox-server (Express) без проверки sha256
+        with store.transaction() as conn:
+            conn.execute("INSERT INTO file_registry (id, original_name, stored_path, mime, size, sha256, "
+                         "created_at, status) SELECT 'f-2', original_name, stored_path, mime, size, sha256, "
+                         "created_at, 'pending' FROM file_registry WHERE id = 'f-1'")
+        pipeline.run_once()
+        assert len(ai.calls) == 1
+        run, fields = store.latest_run("f-2")
+        assert run["status"] == "completed" and run["tokens"] == 0 and len(fields) == 3
+        assert pipeline.stats.snapshot()["outcomes"] == {"completed": 1, "reused": 1}
+
+        assert pipeline.reprocess("f-2", force=True)
+        pipeline.run_once()
+        assert len(ai.calls) == 2
+
+    def test_token_budget_truncates_long_document(self, env):
+        store, add = env
+        add(1, paragraphs=["Лист " * 20_000])
+        ai = FakeAI()
+        ExtractionPipeline(store, workers=0, token_budget=4000, extract_fields=ai).run_once()
+        run, _ = store.latest_run("f-1")
+        assert run["truncated"] == 1 and run["tokens"] <= 4000
+        assert len(ai.calls[0]) < len("Лист " * 20_000)
+
+    def test_failures_marked_and_stale_requeued(self, env):
+        store, add = env
+        add(1)
+        add(2)
+        with store.transaction() as conn:
+            conn.execute("UPDATE file_registry SET mime = 'application/msword', stored_path = 'ai-inbox/x.doc' "
+                         "WHERE id = 'f-2'")
+        pipeline = ExtractionPipeline(store, workers=0, extract_fields=FakeAI(RuntimeError("timeout")))
+        pipeline.run_once()
+        assert store.count_by_status() == {"failed": 2}
+        assert store.latest_run("f-1")[0]["error"].startswith("AI:")
+        assert store.latest_run("f-2")[0]["error"].startswith("Текст:")
+
+        assert store.requeue("f-1")
+        store.claim_pending(10, "2026-10-01T00:00:00+00:00")
+        assert store.reset_stale("2026-10-02T00:00:00+00:00") == 1
+        assert store.count_by_status()["pending"] == 1
+
+    def test_process_pool_and_stats(self, env):
+        store, add = env
+        add(1)
+        pipeline = ExtractionPipeline(store, workers=1, extract_fields=FakeAI())
+        try:
+            pipeline.run_once()
+        finally:
+            pipeline.stop()
+        snap = pipeline.snapshot()
+        assert snap["backlog"] == {"extracted": 1} and snap["stages"]["text"]["count"] == 1
+        assert snap["docs_per_minute"] > 0
+        metrics = "\n".join(pipeline.render_prometheus())
+        assert 'klg_inbox_files{status="extracted"} 1' in metrics
+
+    def test_pdf_text_has_page_markers(self, tmp_path):
+        pypdf = pytest.importorskip("pypdf")
+        writer = pypdf.PdfWriter()
+        writer.add_blank_page(width=100, height=100)
+        with open(tmp_path / "a.pdf", "wb") as f:
+            writer.write(f)
+        assert extract_text(str(tmp_path / "a.pdf"), "application/pdf").startswith("[стр. 1]")
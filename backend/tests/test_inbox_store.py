@@ -0,0 +1,93 @@
+"""
+Tests for the pooled WAL inbox registry (app.services.inbox_store) and inbox upload dedup.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_user
+from app.services import inbox_store as store_module
+from app.services.inbox_store import InboxStore
+
+
+def _record(i: int, status: str = "pending", sha: str | None = None) -> dict:
+    return {"id": f"f-{i}", "original_name": f"doc{i}.pdf", "stored_path": f"ai-inbox/doc{i}.pdf",
+            "mime": "application/pdf", "size": i, "sha256": sha or f"{i:064x}",
+            "created_at": f"2026-10-{i % 28 + 1:02d}T00:00:00Z", "status": status}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = InboxStore(tmp_path / "db" / "inbox.db", pool_size=3)
+    yield s
+    s.close()
+
+
+class TestInboxStore:
+    def test_wal_and_indexes_created_once(self, store):
+        with store.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            plan = " ".join(r[3] for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM file_registry WHERE status = 'pending' ORDER BY created_at DESC"))
+        assert {"ix_file_registry_status_created", "ix_file_registry_sha256"} <= indexes
+        assert "ix_file_registry_status_created" in plan
+
+    def test_paginated_listing_by_status_and_date(self, store):
+        for i in range(30):
+            store.register_file(_record(i, status="processed" if i % 3 == 0 else "pending"))
+        items, total = store.list_files(status="pending", limit=5, offset=0)
+        assert total == 20 and len(items) == 5
+        assert [r["created_at"] for r in items] == sorted((r["created_at"] for r in items), reverse=True)
+        _, total = store.list_files(created_from="2026-10-10", created_to="2026-10-20")
+        assert total == 10
+
+    def test_duplicate_sha256_returns_existing(self, store):
+        first, created = store.register_file(_record(1, sha="a" * 64))
+        again, created_again = store.register_file(_record(2, sha="a" * 64))
+        assert created and not created_again and again["id"] == first["id"]
+        assert store.list_files()[1] == 1
+
+    def test_concurrent_register_is_race_free(self, store):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: store.register_file(_record(i, sha="b" * 64))[1], range(16)))
+        assert results.count(True) == 1
+        assert store._created <= store.pool_size
+
+    def test_delete_removes_extraction_rows(self, store):
+        store.register_file(_record(1))
+        with store.transaction() as conn:
+            conn.execute("INSERT INTO ai_extraction_run (id, file_id, started_at) VALUES ('r-1', 'f-1', 'now')")
+            conn.execute("INSERT INTO ai_extraction_field (id, run_id, field_code) VALUES ('x-1', 'r-1', 'pn')")
+        assert store.delete_file("f-1")["id"] == "f-1"
+        assert store.get_file("f-1") is None and store.delete_file("f-1") is None
+
+
+class TestInboxUpload:
+    def test_resent_document_not_stored_twice(self, tmp_path, monkeypatch):
+        from app.api.routes import inbox
+
+        monkeypatch.setattr(inbox, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(inbox, "INBOX_DIR", tmp_path / "ai-inbox")
+        monkeypatch.setattr(inbox, "audit_detached", lambda *a, **k: None)
+        monkeypatch.setattr(store_module, "_store", InboxStore(tmp_path / "db" / "inbox.db"))
+        monkeypatch.setattr(inbox.settings, "storage_dir", str(tmp_path / "storage"))
+        app = FastAPI()
+        app.include_router(inbox.router)
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="u-1")
+        client = TestClient(app)
+
+        def upload(name):
+            return client.post("/inbox/upload", files={"file": (name, io.BytesIO(b"%PDF-1.7 logbook"), "application/pdf")})
+
+        first, second = upload("a.pdf").json(), upload("b.pdf").json()
+        assert not first["duplicate"] and second["duplicate"] and second["id"] == first["id"]
+        assert len(list((tmp_path / "ai-inbox").iterdir())) == 1
+        listing = client.get("/inbox/files", params={"status": "pending", "per_page": 10}).json()
+        assert listing["total"] == 1 and listing["pages"] == 1
+        assert client.get(f"/inbox/files/{first['id']}/download").content == b"%PDF-1.7 logbook"
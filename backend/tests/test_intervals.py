@@ -0,0 +1,125 @@
+"""
+Tests for interval parsing, typed shadow columns and counter-based risk scan.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.api.routes.maintenance_planning import list_due
+from app.db.base import Base
+from app.models import Aircraft, LandingGearComponent, LimitedLifeComponent, MaintenanceTask, RiskAlert
+from app.services.intervals import Interval, parse_counter, parse_interval, project_due
+from app.services.risk_scanner import scan_risks
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    tables = ("organizations", "aircraft_types", "aircraft", "maintenance_tasks",
+              "limited_life_components", "landing_gear_components", "defect_reports",
+              "airworthiness_certificates", "risk_alerts")
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[t] for t in tables])
+    session = sessionmaker(bind=engine)()
+    session.add(Aircraft(id="ac-1", registration_number="RA-1"))
+    session.commit()
+    yield session
+    session.close()
+
+
+class TestParser:
+    @pytest.mark.parametrize("text,expected", [
+        ("6000 FH / 24 MO", Interval(fh=6000, months=24)),
+        ("12 000 FC or 10 YR", Interval(fc=12000, months=120)),
+        ("120 FH, 30 DY", Interval(fh=120, days=30)),
+        ("2 000,5 ч / 500 циклов", Interval(fh=2000.5, fc=500)),
+        ("600 FH / 400 FH", Interval(fh=400)),
+        ("1,200 FH", Interval(fh=1200)),
+        ("20,000 FC / 1,500.5 FH", Interval(fh=1500.5, fc=20000)),
+        ("1,234,567 FH", Interval(fh=1234567)),
+        ("1,5 FH, 30 DY", Interval(fh=1.5, days=30)),
+        ("", Interval()),
+        (None, Interval()),
+    ])
+    def test_parse_interval(self, text, expected):
+        assert parse_interval(text) == expected
+
+    def test_default_unit_and_counters(self):
+        assert parse_interval("1500", default_unit="FC") == Interval(fc=1500)
+        assert parse_interval("1500") == Interval()
+        assert parse_counter("12345:30") == 12345.5
+        assert parse_counter("12 345,5") == 12345.5
+        assert parse_counter("1,234.5") == 1234.5
+        assert parse_counter("20,000") == 20000
+        assert parse_counter("2000,25") == 2000.25
+        assert parse_counter("1,234:30") == 1234.5
+        assert parse_counter("n/a") is None
+
+    def test_calendar_months(self):
+        assert Interval(months=1).calendar_from(date(2026, 1, 31)) == date(2026, 2, 28)
+
+    def test_project_due_whichever_first(self):
+        days, driver = project_due([100, None, -5, None], [None, 40, None, None],
+                                   [None, date(2026, 11, 1), None, None], 10, 2, today=date(2026, 10, 19))
+        assert days.tolist()[:3] == [10.0, 13.0, 0.0] and days[3] == float("inf")
+        assert driver.tolist() == [0, 2, 0, -1]
+
+
+class TestShadowColumns:
+    def test_synced_on_insert_and_update(self, db):
+        task = MaintenanceTask(aircraft_id="ac-1", ata_code="32", task_number="T-1", status="open",
+                               interval="6000 FH / 24 MO", time_remaining="40 FH / 20 FC",
+                               last_accomplished=datetime(2026, 1, 15, tzinfo=timezone.utc))
+        db.add(task)
+        db.commit()
+        assert (task.interval_fh, task.interval_months) == (6000, 24)
+        assert (task.remaining_fh, task.remaining_fc) == (40, 20)
+        assert task.calendar_due == date(2028, 1, 15)
+        task.time_remaining = "5 FH"
+        db.commit()
+        assert task.remaining_fh == 5 and task.remaining_fc is None
+
+    def test_llp_and_gear_remaining_from_counters(self, db):
+        llp = LimitedLifeComponent(aircraft_id="ac-1", ata_code="72", part_number="P1", serial_number="S1",
+                                   interval="20000 FC", csn="19 990", tsn="30000:30")
+        gear = LandingGearComponent(aircraft_id="ac-1", ata_code="32", part_number="G1", serial_number="S2",
+                                    dim="FC", interval="8000", tsr="7 900")
+        db.add_all([llp, gear])
+        db.commit()
+        assert llp.remaining_fc == 10 and llp.tsn_fh == 30000.5
+        assert gear.remaining_fc == 100 and gear.remaining_fh is None
+
+    def test_scan_risks_filters_by_remaining_counters(self, db):
+        db.add_all([
+            MaintenanceTask(aircraft_id="ac-1", ata_code="32", task_number="LOW", status="open", time_remaining="8 FH"),
+            MaintenanceTask(aircraft_id="ac-1", ata_code="32", task_number="OK", status="open", time_remaining="900 FH"),
+            LimitedLifeComponent(aircraft_id="ac-1", ata_code="72", part_number="P1", serial_number="S1",
+                                 interval="20000 FC", csn="19980"),
+        ])
+        db.commit()
+        assert scan_risks(db) == 2
+        alerts = {a.title: a.severity for a in db.query(RiskAlert)}
+        assert alerts == {"Исчерпание ресурса ТО: LOW": "critical", "Исчерпание ресурса компонента: P1": "high"}
+        assert scan_risks(db) == 0
+
+
+class TestDueList:
+    def test_most_urgent_kept_past_limit(self, db):
+        today = date.today()
+        tasks = [MaintenanceTask(aircraft_id="ac-1", ata_code="32", task_number=f"T-{i}", status="open",
+                                 time_remaining=f"{i * 10} FH") for i in range(1, 31)]
+        # Календарный срок через 3 дня — между T-1 (2,5 сут) и T-2 (5 сут)
+        tasks.append(MaintenanceTask(aircraft_id="ac-1", ata_code="32", task_number="CAL", status="open",
+                                     next_due=datetime.combine(today + timedelta(days=3), datetime.min.time())))
+        random.Random(3).shuffle(tasks)
+        db.add_all(tasks)
+        db.commit()
+        admin = SimpleNamespace(id="u-admin", role="admin", organization_id=None)
+        result = list_due(kind="task", aircraft_id=None, max_remaining_fh=1000, max_remaining_fc=None,
+                          due_within_days=30, fh_per_day=4, fc_per_day=None, limit=4, db=db, user=admin)
+        assert result["total"] == 31
+        assert [i["name"] for i in result["items"]] == ["T-1", "CAL", "T-2", "T-3"]
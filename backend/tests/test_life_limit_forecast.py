@@ -0,0 +1,108 @@
+"""
+Tests for LifeLimitForecaster — остаток ресурса и прогноз исчерпания.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from app.services.life_limit_forecast import LifeLimitForecaster, add_months
+
+TODAY = date(2026, 10, 1)
+
+
+def _store():
+    return {
+        "e1": {"id": "e1", "aircraft_id": "ac1", "component_name": "ENG", "flight_hours_limit": 30000.0,
+               "cycles_limit": 20000, "current_hours": 29900.0, "current_cycles": 15000},
+        "g1": {"id": "g1", "aircraft_id": "ac1", "component_name": "LG", "cycles_limit": 40000,
+               "current_cycles": 40000},
+        "a2": {"id": "a2", "aircraft_id": "ac2", "component_name": "APU", "flight_hours_limit": 15000.0,
+               "current_hours": 6500.0, "calendar_limit_months": 12, "install_date": "2026-01-31"},
+    }
+
+
+class TestLifeLimitForecaster:
+    def test_calendar_months_are_calendar(self):
+        assert add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
+        assert add_months(date(2024, 11, 30), 3) == date(2025, 2, 28)
+
+    def test_remaining_without_rates(self):
+        store = _store()
+        f = LifeLimitForecaster(store)
+        items = {i["id"]: i for i in f.for_aircraft("ac1", TODAY)}
+        assert items["e1"]["remaining"] == {"hours": 100.0, "cycles": 5000}
+        assert items["e1"]["projected_exhaustion_date"] is None
+        assert items["g1"]["critical"] is True
+        assert items["g1"]["projected_exhaustion_date"] == TODAY.isoformat()
+        apu = f.for_aircraft("ac2", TODAY)[0]
+        assert apu["remaining"]["days"] == (date(2027, 1, 31) - TODAY).days
+        assert apu["limiting_factor"] == "calendar"
+        assert "remaining" not in store["e1"]
+
+    def test_rate_from_usage_updates_and_cache_invalidation(self):
+        store = _store()
+        f = LifeLimitForecaster(store)
+        t0 = datetime(2026, 9, 21, tzinfo=timezone.utc)
+        f.record_usage(store["e1"], at=t0)
+        assert f.for_aircraft("ac1", TODAY)[0]["projected_days"] is None
+        store["e1"]["current_hours"] = 29950.0
+        store["e1"]["current_cycles"] = 15020
+        f.record_usage(store["e1"], at=t0 + timedelta(days=10))
+        assert f.utilization("ac1") == {"fh_per_day": 5.0, "fc_per_day": 2.0}
+        e1 = f.for_aircraft("ac1", TODAY)[0]
+        assert e1["remaining"]["hours"] == 50.0
+        assert e1["projected_days"] == 10
+        assert e1["limiting_factor"] == "flight_hours"
+
+    def test_fleet_mean_rate_for_aircraft_without_history(self):
+        store = _store()
+        store["a2"]["calendar_limit_months"] = 36
+        f = LifeLimitForecaster(store)
+        f.set_utilization("ac1", 10.0, 4.0)
+        apu = f.for_aircraft("ac2", TODAY)[0]
+        assert apu["projected_days"] == 850
+        assert apu["limiting_factor"] == "flight_hours"
+
+    def test_fleet_mean_change_refreshes_other_aircraft(self):
+        store = _store()
+        store["a2"]["calendar_limit_months"] = 120
+        f = LifeLimitForecaster(store)
+        f.set_utilization("ac1", 10.0, 4.0)
+        assert f.for_aircraft("ac2", TODAY)[0]["projected_days"] == 850
+        f.set_utilization("ac1", 5.0, 2.0)
+        apu = f.for_aircraft("ac2", TODAY)[0]
+        assert apu["projected_days"] == 1700
+        assert [i["id"] for i in f.expiring_within(1700, TODAY, aircraft_id="ac2")] == [apu["id"]]
+        assert not f.expiring_within(1699, TODAY, aircraft_id="ac2")
+
+    def test_cached_items_not_shared(self):
+        f = LifeLimitForecaster(_store())
+        first = f.for_aircraft("ac1", TODAY)
+        first[0]["remaining"]["hours"] = -1
+        first[0]["critical"] = "changed"
+        again = f.for_aircraft("ac1", TODAY)[0]
+        assert again["remaining"]["hours"] != -1 and again["critical"] != "changed"
+
+    def test_expiring_within_sorted(self):
+        f = LifeLimitForecaster(_store())
+        f.set_utilization("ac1", 10.0, 4.0)
+        assert [i["id"] for i in f.expiring_within(30, TODAY)] == ["g1", "e1"]
+        assert [i["id"] for i in f.expiring_within(30, TODAY, aircraft_id="ac2")] == []
+        assert f.critical_count(TODAY) == 1
+
+    def test_upsert_moves_row_between_aircraft(self):
+        store = _store()
+        f = LifeLimitForecaster(store)
+        store["a2"]["aircraft_id"] = "ac1"
+        f.upsert(store["a2"])
+        assert {i["id"] for i in f.for_aircraft("ac1", TODAY)} == {"e1", "g1", "a2"}
+        assert f.for_aircraft("ac2", TODAY) == []
+
+    def test_cache_drops_past_days_and_is_bounded(self):
+        f = LifeLimitForecaster(_store(), cache_size=3)
+        f.for_aircraft("ac1", TODAY)
+        f.for_aircraft("ac2", TODAY)
+        f.for_aircraft("ac1", TODAY + timedelta(days=1))
+        assert set(f._cache) == {("ac1", TODAY + timedelta(days=1))}
+        small = LifeLimitForecaster(_store(), cache_size=1)
+        small.for_aircraft("ac1", TODAY)
+        small.for_aircraft("ac2", TODAY)
+        assert list(small._cache) == [("ac2", TODAY)]
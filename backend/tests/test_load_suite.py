@@ -0,0 +1,84 @@
+"""
+Tests for the synthetic fleet generator and load-test percentile/baseline logic.
+"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from benchmarks.fleet_generator import TABLES, FleetGenerator, ScaleUnit, generate
+from benchmarks.load_test import BASELINE_DIR, SCENARIOS, compare, percentile, schedule, summarize
+
+SMALL = ScaleUnit(operators=2, aircraft=3, tasks_per_aircraft=4, llp_per_aircraft=2, gear_per_aircraft=1,
+                  defects_per_aircraft=2, audits_per_aircraft=1, audit_log_per_aircraft=5)
+
+
+def _rows(gen: FleetGenerator) -> dict[str, list[dict]]:
+    return {table: list(rows) for table, rows in gen.tables()}
+
+
+class TestFleetGenerator:
+    def test_deterministic_by_seed(self):
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        a = _rows(FleetGenerator(scale=2, seed=7, now=now, unit=SMALL))
+        b = _rows(FleetGenerator(scale=2, seed=7, now=now, unit=SMALL))
+        c = _rows(FleetGenerator(scale=2, seed=8, now=now, unit=SMALL))
+        assert a == b
+        assert a["aircraft"] != c["aircraft"]
+
+    def test_counts_scale(self):
+        gen = FleetGenerator(scale=3, unit=SMALL)
+        rows = _rows(gen)
+        for table, n in gen.expected_counts().items():
+            assert len(rows[table]) == n, table
+        assert len({r["registration_number"] for r in rows["aircraft"]}) == 9
+        aircraft_ids = {r["id"] for r in rows["aircraft"]}
+        assert {r["aircraft_id"] for r in rows["maintenance_tasks"]} <= aircraft_ids
+
+    def test_load_insert_fallback(self):
+        import app.models  # noqa: F401 — регистрирует таблицы
+        from app.db.base import Base
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[Base.metadata.tables[t] for t in (*TABLES, "users")])
+        counts = generate(engine, scale=1, seed=1, unit=SMALL)
+        counts_again = generate(engine, scale=1, seed=1, unit=SMALL, do_truncate=True)
+        assert counts == counts_again
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM maintenance_tasks")).scalar() == 12
+            # COPY / executemany обходят before_insert — теневые колонки заполняет генератор
+            assert conn.execute(text("SELECT count(*) FROM maintenance_tasks WHERE calendar_due IS NULL")).scalar() == 0
+            assert conn.execute(text("SELECT count(*) FROM limited_life_components "
+                                     "WHERE remaining_fc IS NULL OR interval_fc IS NULL")).scalar() == 0
+            assert conn.execute(text("SELECT count(*) FROM landing_gear_components "
+                                     "WHERE remaining_fc IS NULL")).scalar() == 0
+
+
+class TestLoadTest:
+    def test_percentile_interpolation(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == pytest.approx(50.5)
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([], 95) == 0.0
+
+    def test_compare_flags_regressions(self):
+        result = summarize({"stats": [10.0] * 50 + [200.0] * 5}, {"stats": 0})
+        assert compare(result, {"stats": {"p50": 20, "p95": 500, "p99": 500}}, 0.25) == []
+        failures = compare(result, {"stats": {"p50": 5, "p95": 500, "p99": 500}}, 0.25)
+        assert failures and failures[0].startswith("stats p50")
+        assert compare(result, {}, 0.25) == []
+
+    def test_throttled_counted_apart(self):
+        result = summarize({"stats": [10.0] * 10}, {}, {"stats": 5, "risk_scan": 2})
+        assert result["stats"]["requests"] == 10 and result["stats"]["throttled"] == 5
+        assert result["risk_scan"]["requests"] == 0 and result["stats"]["errors"] == 0
+        # 429 делает замер недействительным и без baseline
+        assert sorted(compare(result, {}, 0.25)) == ["risk_scan: 2 throttled (429) responses",
+                                                     "stats: 5 throttled (429) responses"]
+
+    def test_schedule_and_recorded_baselines_cover_scenarios(self):
+        plan = schedule(len(SCENARIOS) * 10)
+        assert {s.name for s in plan} == {s.name for s in SCENARIOS}
+        for path in BASELINE_DIR.glob("load_*x.json"):
+            assert set(json.loads(path.read_text(encoding="utf-8"))) == {s.name for s in SCENARIOS}, path.name
@@ -0,0 +1,127 @@
+"""
+Tests for bulk notification dispatch (app.services.notifications).
+"""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.api.deps import UserInfo, get_current_user, get_db
+from app.api.routes.notification_prefs import router as prefs_router
+from app.db.base import Base
+from app.models import Aircraft, AircraftType, Notification, NotificationPreference, Organization, User
+from app.services import notifications
+from app.services.notifications import Audience, aircraft_type_ids, dispatch, register_channel
+
+NOW = datetime.now(timezone.utc)
+TABLES = [User.__table__, NotificationPreference.__table__, Notification.__table__, Organization.__table__,
+          AircraftType.__table__, Aircraft.__table__]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=TABLES)
+    session = sessionmaker(bind=engine)()
+    session.info["statements"] = statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2].split()[0]))
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def channels(monkeypatch):
+    sent: dict[str, list] = {}
+
+    def recorder(channel):
+        def sender(recipients, event_name, title, body, payload):
+            sent.setdefault(channel, []).extend(r.user_id for r in recipients)
+            return len(recipients)
+        return sender
+
+    monkeypatch.setattr(notifications, "_senders", {})
+    for channel in notifications.CHANNELS:
+        register_channel(channel, recorder(channel))
+    return sent
+
+
+def _users(db, n, org_id="org-1", role="operator_user", prefix="u"):
+    db.execute(insert(User.__table__), [
+        {"id": f"id-{prefix}{i}", "external_subject": f"{prefix}{i}", "display_name": f"User {i}",
+         "email": f"{prefix}{i}@klg.ru", "role": role, "organization_id": org_id,
+         "created_at": NOW, "updated_at": NOW}
+        for i in range(n)
+    ])
+    db.commit()
+
+
+class TestDispatch:
+    def test_preferences_resolved_in_one_pass(self, db, channels):
+        _users(db, 5)
+        db.add_all([
+            NotificationPreference(user_id="u0", ad_mandatory=False),  # отписался от ДЛГ
+            NotificationPreference(user_id="u1", channels_email=False, channels_push=True),
+        ])
+        db.commit()
+        db.info["statements"].clear()
+        result = dispatch(db, "ad_new_mandatory", Audience(org_ids=("org-1",)), "ДЛГ AD-1", "Требуется выполнение")
+        assert result.recipients == 4
+        assert db.info["statements"] == ["SELECT", "INSERT"]
+        assert sorted(channels["email"]) == ["u2", "u3", "u4"] and channels["push"] == ["u1"]
+        assert len(channels["ws"]) == 4
+        owners = db.execute(select(Notification.recipient_user_id)).scalars().all()
+        assert sorted(owners) == ["u1", "u2", "u3", "u4"]
+
+    def test_audience_by_role_and_fleet_type(self, db, channels):
+        _users(db, 3, org_id="org-1", role="operator_manager", prefix="m")
+        _users(db, 3, org_id="org-1", role="mro_user", prefix="t")
+        _users(db, 3, org_id="org-2", role="operator_manager", prefix="x")
+        db.add_all([
+            Organization(id="org-1", name="Авиалинии", kind="operator"),
+            Organization(id="org-2", name="Другой", kind="operator"),
+            AircraftType(id="t-1", manufacturer="Sukhoi", model="RRJ-95", icao_code="SU95"),
+        ])
+        db.flush()
+        db.add(Aircraft(id="a-1", registration_number="RA-89060", aircraft_type_id="t-1", operator_id="org-1"))
+        db.commit()
+        assert aircraft_type_ids(db, ["SU95"]) == ["t-1"]
+        result = dispatch(db, "defect_critical", Audience(roles=("operator_manager",), aircraft_type_ids=("t-1",),
+                                                          user_ids=("x0",)), "Критический дефект")
+        assert result.recipients == 4
+        assert sorted(channels["ws"]) == ["m0", "m1", "m2", "x0"]
+
+    def test_preferences_route_feeds_dispatch(self, db, channels):
+        _users(db, 2)
+        api = FastAPI()
+        api.include_router(prefs_router)
+        api.dependency_overrides[get_db] = lambda: db
+        api.dependency_overrides[get_current_user] = lambda: UserInfo({"id": "u0"})  # sub токена
+        client = TestClient(api)
+        response = client.put("/notification-preferences/", json={"ad_mandatory": False, "channels_push": True})
+        assert response.status_code == 200
+        assert client.get("/notification-preferences/").json()["ad_mandatory"] is False
+        assert dispatch(db, "ad_new_mandatory", Audience(org_ids=("org-1",)), "ДЛГ AD-3").recipients == 1
+        assert channels["ws"] == ["u1"]
+        dispatch(db, "defect_critical", Audience(user_ids=("u0",)), "Дефект")
+        assert channels["push"] == ["u0"]
+        assert sorted(db.execute(select(Notification.recipient_user_id)).scalars()) == ["u0", "u1"]
+
+    def test_unknown_audience_and_channel(self, db, channels):
+        _users(db, 2)
+        assert dispatch(db, "wo_aog", Audience(), "AOG").recipients == 0
+        with pytest.raises(ValueError):
+            register_channel("sms", lambda *a: 0)
+
+    def test_ten_thousand_recipients(self, db, channels):
+        # Время рассылки — benchmarks/bench_notification_dispatch.py
+        _users(db, 10_000)
+        db.info["statements"].clear()
+        result = dispatch(db, "ad_new_mandatory", Audience(org_ids=("org-1",)), "ДЛГ AD-2", "Требуется выполнение")
+        assert db.info["statements"] == ["SELECT", "INSERT"]
+        assert result.recipients == 10_000 and len(channels["email"]) == 10_000
+        assert db.execute(select(func.count()).select_from(Notification)).scalar() == 10_000
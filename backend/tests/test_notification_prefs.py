@@ -22,3 +22,9 @@ class TestNotificationPrefs:
         assert resp.status_code == 200
         assert resp.json()["channels_push"] is True
         assert resp.json()["wo_closed"] is False
+
+    def test_prefs_persisted_per_user(self, client, auth_headers):
+        payload = {"ad_mandatory": False, "channels_email": False}
+        assert client.put("/api/v1/notification-preferences/", headers=auth_headers, json=payload).status_code == 200
+        data = client.get("/api/v1/notification-preferences/", headers=auth_headers).json()
+        assert data["ad_mandatory"] is False and data["channels_email"] is False and data["channels_ws"] is True
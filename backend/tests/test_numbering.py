@@ -0,0 +1,72 @@
+"""
+Tests for per-day atomic document numbering (app.services.numbering).
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.number_counter import NumberCounter
+from app.services import numbering
+
+PG_URL = os.environ.get("KLG_TEST_POSTGRES_URL")
+
+
+def _engine(url: str):
+    if url == "sqlite://":
+        engine = create_engine(url)
+    else:
+        engine = create_engine(url, connect_args={"timeout": 30} if url.startswith("sqlite") else {},
+                               pool_size=50, max_overflow=200)
+    Base.metadata.create_all(engine, tables=[NumberCounter.__table__])
+    return engine
+
+
+def _parallel(engine, scope: str, n: int, workers: int = 200) -> tuple[list[int], float]:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        values = list(pool.map(lambda _: numbering.allocate(engine, scope, "20261019"), range(n)))
+    return values, time.perf_counter() - started
+
+
+class TestNumbering:
+    def test_format_and_daily_reset(self):
+        engine = _engine("sqlite://")
+        db = sessionmaker(bind=engine)()
+        day1 = datetime(2026, 10, 19, 23, 59, tzinfo=timezone.utc)
+        day2 = datetime(2026, 10, 20, 0, 1, tzinfo=timezone.utc)
+        assert numbering.next_number(db, "cert_application", day1) == "KLG-20261019-0001"
+        assert numbering.next_number(db, "cert_application", day1) == "KLG-20261019-0002"
+        assert numbering.next_number(db, "work_order", day1) == "WO-20261019-0001"
+        assert numbering.next_number(db, "defect", day2) == "DEF-20261020-0001"
+        assert numbering.next_number(db, "cert_application", day2) == "KLG-20261020-0001"
+        db.rollback()
+
+    def test_never_reuses_after_gap(self):
+        engine = _engine("sqlite://")
+        assert numbering.allocate(engine, "work_order", "20261019") == 1
+        assert numbering.allocate(engine, "work_order", "20261019", count=10) == 11
+        assert numbering.allocate(engine, "work_order", "20261019") == 12
+
+    def test_200_parallel_creates_unique_and_linear(self, tmp_path):
+        engine = _engine(f"sqlite:///{tmp_path}/numbers.db")
+        small, t_small = _parallel(engine, "cert_application", 50)
+        large, t_large = _parallel(engine, "work_order", 200)
+        assert sorted(small) == list(range(1, 51))
+        assert sorted(large) == list(range(1, 201))
+        # линейный рост: 4× созданий — не хуже ~4× времени (с запасом на планировщик)
+        assert t_large < t_small * 4 * 2 + 0.5
+
+    @pytest.mark.skipif(not PG_URL, reason="KLG_TEST_POSTGRES_URL not set")
+    def test_200_parallel_creates_postgres(self):
+        engine = _engine(PG_URL)
+        with engine.begin() as conn:
+            conn.execute(NumberCounter.__table__.delete())
+        values, elapsed = _parallel(engine, "cert_application", 200)
+        assert sorted(values) == list(range(1, 201))
+        assert elapsed < 5.0
@@ -0,0 +1,60 @@
+"""
+Tests for PDF rendering service: кэш по версии, пакетный ZIP, пул процессов.
+"""
+import zipfile
+from io import BytesIO
+
+from app.services.pdf_renderer import PdfRenderService, render_zip_stream, version_hash
+
+
+def _wo(i: int, **extra) -> dict:
+    return {"id": f"wo-{i}", "wo_number": f"WO-{i:03d}", "aircraft_reg": "RA-89060",
+            "wo_type": "scheduled", "title": "Форма А", "status": "closed",
+            "crs_signed_by": "Иванов И.И.", **extra}
+
+
+class TestVersionHash:
+    def test_stable_for_same_data(self):
+        assert version_hash("work_order", _wo(1)) == version_hash("work_order", dict(reversed(list(_wo(1).items()))))
+
+    def test_changes_with_entity(self):
+        assert version_hash("work_order", _wo(1)) != version_hash("work_order", _wo(1, status="in_progress"))
+
+    def test_includes_generation_stamp(self):
+        # Дата формирования печатается на странице — другой штамп, другой документ
+        a = {"overview": {"x": 1}, "generated_by": "u", "generated_at": "01.01.2026 10:00 UTC"}
+        b = {**a, "generated_at": "01.01.2026 10:05 UTC"}
+        assert version_hash("regulator_report", a) != version_hash("regulator_report", b)
+        assert version_hash("work_order", _wo(1, generated_at="01.01.2026")) != version_hash("work_order", _wo(1))
+
+
+class TestRenderService:
+    def test_render_pdf_and_cache(self):
+        svc = PdfRenderService(workers=0)
+        pdf = svc.render("work_order", _wo(1))
+        assert pdf.startswith(b"%PDF")
+        assert svc.render("work_order", _wo(1)) is pdf
+        assert svc.stats()["hits"] == 1 and svc.stats()["rendered"] == 1
+
+    def test_cache_evicts_by_size(self):
+        svc = PdfRenderService(workers=0, cache_max_bytes=1)
+        svc.render("work_order", _wo(1))
+        assert svc.stats()["cached"] == 0
+
+    def test_zip_stream_in_pool(self):
+        svc = PdfRenderService(workers=2)
+        try:
+            wos = [_wo(i) for i in range(6)]
+            body = b"".join(render_zip_stream(svc, "work_order", wos, lambda w: f"{w['wo_number']}.pdf"))
+        finally:
+            svc.shutdown()
+        with zipfile.ZipFile(BytesIO(body)) as zf:
+            assert zf.namelist() == [f"WO-{i:03d}.pdf" for i in range(6)]
+            assert all(zf.read(n).startswith(b"%PDF") for n in zf.namelist())
+
+    def test_zip_entry_names_unique(self):
+        svc = PdfRenderService(workers=0)
+        wos = [_wo(1), _wo(2, wo_number="WO-001"), _wo(3, wo_number="WO-001")]
+        body = b"".join(render_zip_stream(svc, "work_order", wos, lambda w: f"{w['wo_number']}.pdf"))
+        with zipfile.ZipFile(BytesIO(body)) as zf:
+            assert zf.namelist() == ["WO-001.pdf", "WO-001_2.pdf", "WO-001_3.pdf"]
@@ -0,0 +1,87 @@
+"""
+Tests for PersonnelComplianceEngine — индексы по специалисту и срокам.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.personnel_plg import list_due_items
+from app.services.personnel_compliance import PersonnelComplianceEngine
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _day(offset: int) -> str:
+    return (NOW + timedelta(days=offset)).date().isoformat()
+
+
+def _engine():
+    specs, atts, quals = {}, {}, {}
+    eng = PersonnelComplianceEngine(specs, atts, quals)
+    for sid, cat, lic in (("s1", "B1", _day(10)), ("s2", "B2", _day(400)), ("s3", "B1", None)):
+        specs[sid] = {"id": sid, "full_name": sid.upper(), "category": cat,
+                      "license_number": f"L-{sid}", "license_expires": lic}
+        eng.on_specialist(specs[sid])
+    for qid, sid, due in (("q1", "s1", _day(-5)), ("q2", "s1", _day(60)), ("q3", "s2", _day(20)), ("q4", "s3", None)):
+        quals[qid] = {"id": qid, "specialist_id": sid, "program_name": f"P-{qid}", "next_due": due}
+        eng.on_qualification(quals[qid])
+    return eng, specs, quals
+
+
+class TestComplianceEngine:
+    def test_snapshot_counts(self):
+        eng, _, _ = _engine()
+        snap = eng.snapshot(NOW)
+        assert snap == {"total_specialists": 3, "compliant": 2, "non_compliant": 1,
+                        "by_category": {"B1": 2, "B2": 1}}
+
+    def test_snapshot_moves_with_time(self):
+        eng, _, _ = _engine()
+        assert eng.snapshot(NOW + timedelta(days=30))["non_compliant"] == 2
+
+    def test_incremental_qualification(self):
+        eng, _, quals = _engine()
+        quals["q5"] = {"id": "q5", "specialist_id": "s3", "program_name": "P-q5", "next_due": _day(-1)}
+        eng.on_qualification(quals["q5"])
+        assert eng.snapshot(NOW)["non_compliant"] == 2
+        assert [q["id"] for q in eng.qualifications_of("s3")] == ["q4", "q5"]
+
+    def test_due_range_query(self):
+        eng, _, _ = _engine()
+        items = list(eng.due_between(NOW, NOW + timedelta(days=30)))
+        assert [(i.kind, i.ref_id) for i in items] == [("license", "s1"), ("qualification", "q3")]
+
+    def test_specialist_update_reindexes_license(self):
+        eng, specs, _ = _engine()
+        specs["s1"]["license_expires"] = _day(500)
+        eng.on_specialist(specs["s1"])
+        assert [i.ref_id for i in eng.due_between(NOW, NOW + timedelta(days=30), ("license",))] == []
+
+    def test_report_matches_previous_semantics(self):
+        eng, _, _ = _engine()
+        report = eng.compliance_report(NOW, horizon_days=90)
+        assert report["overdue"] == [{"specialist": "S1", "program": "P-q1", "due": _day(-5)}]
+        assert {"specialist": "S1", "item": "Свидетельство", "due": _day(10)} in report["expiring_soon"]
+        assert len(report["expiring_soon"]) == 3
+
+    def test_expiry_alerts(self):
+        eng, _, _ = _engine()
+        types = sorted(a["type"] for a in eng.expiry_alerts(NOW, horizon_days=30))
+        assert types == ["personnel_license_expiring", "qualification_expired", "qualification_expiring"]
+
+
+class TestDueRoute:
+    @pytest.mark.parametrize("params,field", [
+        ({"date_from": "garbage"}, "date_from"),
+        ({"date_to": "2026-13-01"}, "date_to"),
+        ({"kind": "passport"}, "kind"),
+    ])
+    def test_bad_bounds_and_kind_rejected(self, params, field):
+        with pytest.raises(HTTPException) as exc:
+            list_due_items(**{"date_from": None, "date_to": None, "kind": None, **params}, user=None)
+        assert exc.value.status_code == 400 and field in exc.value.detail
+
+    def test_valid_bounds_accepted(self):
+        assert "items" in list_due_items(date_from="2026-10-01", date_to="2026-11-01T00:00:00+00:00",
+                                         kind="license", user=None)
@@ -0,0 +1,101 @@
+"""
+Tests for the sampling profiler middleware and collapsed-stack helpers.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.middleware import profiling as profiling_mw
+from app.services.profiler import SamplingProfiler, parse_collapsed, render_text, to_collapsed, top_functions
+
+
+def _busy(ms: float) -> int:
+    end = time.perf_counter() + ms / 1000
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def _busy_other(ms: float) -> int:
+    return _busy(ms)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    prof = SamplingProfiler(interval_ms=1, max_profiles=10)
+    monkeypatch.setattr(profiling_mw, "profiler", prof)
+    monkeypatch.setattr(settings, "PROFILER_HEADER_TOKEN", "secret")
+    app = FastAPI()
+    app.add_middleware(profiling_mw.ProfilingMiddleware)
+
+    @app.get("/slow/{n}")
+    def slow(n: int):
+        return {"n": _busy(120) if n != 0 else _busy_other(240)}
+
+    @app.get("/async")
+    async def slow_async():
+        await asyncio.sleep(0.01)
+        return {"n": _busy(120)}
+
+    @app.get("/fast")
+    def fast():
+        return {"ok": True}
+
+    return TestClient(app), prof
+
+
+class TestProfilingMiddleware:
+    def test_header_selects_request(self, client):
+        c, prof = client
+        r = c.get("/slow/1", headers={"X-Profile": "secret"})
+        assert int(r.headers["X-Profile-Samples"]) > 0
+        samples, n = prof.aggregate("/slow/{n}")
+        assert n == 1
+        assert any(stack.endswith("tests.test_profiler:_busy") or "test_profiler:_busy" in stack for stack in samples)
+        assert prof.summary()[0]["route"] == "/slow/{n}"
+
+    def test_wrong_or_missing_header_not_profiled(self, client):
+        c, prof = client
+        assert "X-Profile-Samples" not in c.get("/slow/1", headers={"X-Profile": "nope"}).headers
+        assert prof.aggregate()[1] == 0
+
+    def test_async_handler_profiled(self, client):
+        c, prof = client
+        r = c.get("/async", headers={"X-Profile": "secret"})
+        assert int(r.headers["X-Profile-Samples"]) > 0
+        assert any("test_profiler:_busy" in stack for stack in prof.aggregate("/async")[0])
+
+    def test_concurrent_unprofiled_request_not_attributed(self, client):
+        c, prof = client
+        other = threading.Thread(target=c.get, args=("/slow/0",))
+        other.start()
+        c.get("/slow/1", headers={"X-Profile": "secret"})
+        other.join()
+        samples, n = prof.aggregate("/slow/{n}")
+        assert n == 1 and samples
+        assert not any("_busy_other" in stack for stack in samples)
+
+    def test_route_selection(self, client):
+        c, prof = client
+        prof.configure(routes=["/slow/{n}"])
+        c.get("/fast")
+        c.get("/slow/2")
+        assert [r["route"] for r in prof.summary()] == ["/slow/{n}"]
+
+
+class TestCollapsed:
+    def test_roundtrip_and_top(self):
+        text = "a:main;b:work;c:leaf 7\na:main;b:work 3\n"
+        samples = parse_collapsed(text)
+        assert samples["a:main;b:work;c:leaf"] == 7
+        assert parse_collapsed(to_collapsed(samples)) == samples
+        top = top_functions(samples)
+        assert ("a:main", 0, 10) in top and ("b:work", 3, 10) in top
+        assert ("c:leaf", 7, 7) in top
+        assert "b:work" in render_text(samples)
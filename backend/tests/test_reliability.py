@@ -0,0 +1,192 @@
+"""
+Tests for reliability-program analytics (app.services.reliability).
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.models import Aircraft, AircraftHistory, AircraftType, DefectDaily, DefectReport, UtilizationDaily
+from app.services.life_limit_forecast import add_months
+from app.services.reliability import (
+    ata_chapter, defect_rates, refresh_defect_rollup, refresh_utilization_rollup, spread_counters,
+)
+
+AS_OF = date(2026, 6, 30)
+TABLES = [AircraftType.__table__, Aircraft.__table__, DefectReport.__table__, AircraftHistory.__table__,
+          DefectDaily.__table__, UtilizationDaily.__table__]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        AircraftType(id="t-ssj", manufacturer="Sukhoi", model="RRJ-95", icao_code="SU95"),
+        AircraftType(id="t-mc21", manufacturer="Irkut", model="MC-21-300", icao_code="MC23"),
+    ])
+    session.flush()
+    session.add_all([
+        Aircraft(id="ac-1", registration_number="RA-89001", aircraft_type_id="t-ssj", operator_id="org-1"),
+        Aircraft(id="ac-2", registration_number="RA-89002", aircraft_type_id="t-ssj", operator_id="org-1"),
+        Aircraft(id="ac-3", registration_number="RA-73001", aircraft_type_id="t-mc21", operator_id="org-2"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _utilization(db, aircraft_ids, hours_per_day, start=add_months(AS_OF, -15) + timedelta(days=1), end=AS_OF):
+    days = (end - start).days + 1
+    db.execute(insert(UtilizationDaily.__table__), [
+        {"aircraft_id": a, "day": start + timedelta(days=i), "flight_hours": hours_per_day, "cycles": 2.0,
+         "source": "flight_log"}
+        for a in aircraft_ids for i in range(days)
+    ])
+    db.commit()
+
+
+def _defects(db, aircraft_id, chapter, per_month, months=15, recent=None, recent_months=3):
+    """per_month дефектов в каждом месяце назад; recent — иначе в последних recent_months месяцах."""
+    rows = []
+    for b in range(months):
+        count = recent if b < recent_months and recent is not None else per_month
+        day = add_months(AS_OF, -b) - timedelta(days=1)
+        if count:
+            rows.append({"aircraft_id": aircraft_id, "day": day, "ata_chapter": chapter, "defects": count})
+    db.execute(insert(DefectDaily.__table__), rows)
+    db.commit()
+
+
+class TestRollups:
+    def test_ata_chapter(self):
+        assert ata_chapter("32-41-00") == "32"
+        assert ata_chapter("ATA 21") == "21"
+        assert ata_chapter(None) == "00"
+
+    def test_defect_rollup_from_reports_and_register(self, db):
+        at = datetime(2026, 6, 10, 8, tzinfo=timezone.utc)
+        db.add_all([
+            DefectReport(aircraft_id="ac-1", ata_code="32-41-00", incident_date=at),
+            DefectReport(aircraft_id="ac-1", ata_code="32-11", incident_date=at),
+            DefectReport(aircraft_id="ac-2", ata_code="21-50", incident_date=None,
+                         created_at=datetime(2026, 6, 11, tzinfo=timezone.utc)),
+        ])
+        db.commit()
+        memory = [{"aircraft_reg": "RA-89001", "ata_chapter": "32", "created_at": at.isoformat()},
+                  {"aircraft_reg": "RA-UNKNOWN", "ata_chapter": "21", "created_at": at.isoformat()}]
+        assert refresh_defect_rollup(db, memory_defects=memory) == 2
+        rows = {(r.aircraft_id, r.day, r.ata_chapter): r.defects for r in db.execute(select(DefectDaily)).scalars()}
+        assert rows == {("ac-1", date(2026, 6, 10), "32"): 3, ("ac-2", date(2026, 6, 11), "21"): 1}
+        # Повторный пересчёт с даты — без задвоения
+        refresh_defect_rollup(db, since=date(2026, 6, 11), memory_defects=memory)
+        assert sum(r.defects for r in db.execute(select(DefectDaily)).scalars()) == 4
+
+    def test_spread_counters_between_readings(self):
+        ac, days, hours, cycles = spread_counters(
+            np.array([0, 0, 0, 1]), np.array(["2026-01-01", "2026-01-05", "2026-01-05", "2026-01-01"], dtype="datetime64[D]"),
+            np.array([100.0, 120.0, 121.0, 50.0]), np.array([10.0, 14.0, 15.0, 5.0]),
+        )
+        assert ac.tolist() == [0] * 4
+        assert days[0] == np.datetime64("2026-01-02") and days[-1] == np.datetime64("2026-01-05")
+        assert hours.tolist() == [5.0, 5.0, 5.0, 6.0] and cycles.sum() == 5.0
+
+    def test_utilization_rollup_keeps_flight_log(self, db):
+        for day, fh, fc in [(1, "1000:00", "500"), (11, "1 050,0", "520"), (21, None, "530"), (31, "1100", "540")]:
+            db.add(AircraftHistory(aircraft_id="ac-1", event_type="inspection", description="ТО",
+                                   event_date=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(days=day - 1),
+                                   hours_at_event=fh, cycles_at_event=fc))
+        db.add(UtilizationDaily(aircraft_id="ac-1", day=date(2026, 1, 2), flight_hours=9.0, cycles=3, source="flight_log"))
+        db.commit()
+        assert refresh_utilization_rollup(db) == 30
+        rows = {r.day: r for r in db.execute(select(UtilizationDaily)).scalars()}
+        assert len(rows) == 30
+        assert rows[date(2026, 1, 2)].flight_hours == 9.0 and rows[date(2026, 1, 2)].source == "flight_log"
+        assert rows[date(2026, 1, 3)].flight_hours == pytest.approx(5.0)
+        # Налёт в отметке 21.01 не указан — приращение 50 ч распределено на 20 суток 11.01–31.01
+        assert rows[date(2026, 1, 15)].flight_hours == pytest.approx(2.5)
+        assert rows[date(2026, 1, 15)].cycles == pytest.approx(1.0)
+
+    def test_utilization_rollup_since_keeps_whole_interval(self, db):
+        for day, fh in [(date(2026, 1, 1), "1000"), (date(2026, 3, 1), "1590")]:
+            db.add(AircraftHistory(aircraft_id="ac-1", event_type="inspection", description="ТО",
+                                   event_date=datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc),
+                                   hours_at_event=fh))
+        db.commit()
+        refresh_utilization_rollup(db)
+        db.add(AircraftHistory(aircraft_id="ac-1", event_type="inspection", description="ТО",
+                               event_date=datetime(2026, 3, 20, tzinfo=timezone.utc), hours_at_event="1780"))
+        db.commit()
+        # Окно 3 суток: приращение 01.03–20.03 всё равно разнесено на весь интервал
+        refresh_utilization_rollup(db, since=date(2026, 3, 17))
+        rows = db.execute(select(UtilizationDaily)).scalars().all()
+        assert sum(r.flight_hours for r in rows) == pytest.approx(780.0)
+        assert len(rows) == 78
+
+
+class TestRates:
+    def test_rates_per_ata_and_alert(self, db):
+        _utilization(db, ["ac-1", "ac-2"], hours_per_day=5.0)
+        _defects(db, "ac-1", "32", per_month=1, recent=12)  # рост в последние 3 месяца
+        _defects(db, "ac-2", "21", per_month=1)
+        result = defect_rates(db, by=["ata"], as_of=AS_OF)
+        items = {i["ata"]: i for i in result["items"]}
+        assert items["32"]["status"] == "alert" and items["21"]["status"] == "ok"
+        assert result["items"][0]["ata"] == "32"
+        # Парк из двух ВС по 5 ч/сут, месяц 31.05–30.06 — 310 ч; 12 дефектов → 38,7 на 1000 ч
+        assert items["32"]["flight_hours"]["1m"] == 310.0
+        assert items["32"]["rate_per_1000fh"]["1m"] == pytest.approx(12000 / 310, abs=1e-3)
+        assert items["21"]["defects"]["12m"] == 12 and items["21"]["alert_level"] is not None
+        # База alert level — 12 месяцев до текущего 3-мес окна: рост её не поднимает
+        assert items["32"]["alert_level"] < 5 < items["32"]["rate_per_1000fh"]["3m"]
+        assert len(items["32"]["trend"]) == 12 and items["32"]["trend"][-1] == pytest.approx(12000 / 310, abs=1e-3)
+
+    def test_rates_by_type_and_tail_use_own_exposure(self, db):
+        _utilization(db, ["ac-1", "ac-2"], hours_per_day=5.0)
+        _utilization(db, ["ac-3"], hours_per_day=10.0)
+        _defects(db, "ac-1", "32", per_month=3)
+        _defects(db, "ac-3", "32", per_month=3)
+        by_type = {i["type"]: i for i in defect_rates(db, by=["type", "ata"], as_of=AS_OF)["items"]}
+        assert by_type["t-ssj"]["type_name"] == "RRJ-95"
+        assert by_type["t-ssj"]["rate_per_1000fh"]["12m"] == pytest.approx(36 * 1000 / 3650, abs=1e-3)
+        assert by_type["t-mc21"]["rate_per_1000fh"]["12m"] == pytest.approx(36 * 1000 / 3650, abs=1e-3)
+        by_tail = {i["tail"]: i for i in defect_rates(db, by=["tail"], as_of=AS_OF)["items"]}
+        assert set(by_tail) == {"RA-89001", "RA-73001"}
+        assert by_tail["RA-89001"]["rate_per_1000fh"]["12m"] == pytest.approx(36 * 1000 / 1825, abs=1e-3)
+
+    def test_operator_scope_and_validation(self, db):
+        _utilization(db, ["ac-1", "ac-3"], hours_per_day=5.0)
+        _defects(db, "ac-1", "32", per_month=1)
+        _defects(db, "ac-3", "21", per_month=1)
+        items = defect_rates(db, by=["ata"], as_of=AS_OF, operator_id="org-2")["items"]
+        assert [i["ata"] for i in items] == ["21"]
+        with pytest.raises(ValueError):
+            defect_rates(db, by=["engine"], as_of=AS_OF)
+
+    def test_fleet_year_totals(self, db):
+        # Время расчёта — benchmarks/bench_reliability.py
+        rng = random.Random(7)
+        db.execute(insert(Aircraft.__table__), [
+            {"id": f"bench-{i}", "registration_number": f"RA-9{i:04d}",
+             "aircraft_type_id": "t-ssj" if i % 2 else "t-mc21", "operator_id": "org-1"}
+            for i in range(100)
+        ])
+        db.commit()
+        _utilization(db, [f"bench-{i}" for i in range(100)], hours_per_day=8.0)
+        start = add_months(AS_OF, -12) + timedelta(days=1)
+        counts = {}
+        for _ in range(11_000):
+            key = (f"bench-{rng.randrange(100)}", start + timedelta(days=rng.randrange(365)), f"{rng.randrange(20, 80):02d}")
+            counts[key] = counts.get(key, 0) + 1
+        db.execute(insert(DefectDaily.__table__), [
+            {"aircraft_id": a, "day": d, "ata_chapter": c, "defects": n} for (a, d, c), n in counts.items()
+        ])
+        db.commit()
+        result = defect_rates(db, by=["type", "ata"], as_of=AS_OF)
+        assert sum(i["defects"]["12m"] for i in result["items"]) == 11_000
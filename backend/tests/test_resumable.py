@@ -0,0 +1,127 @@
+"""
+Tests for tus resumable uploads (app.services.resumable) and Range/ETag downloads.
+"""
+import base64
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_user
+from app.api.routes.uploads import router as uploads_router
+from app.core.config import settings
+from app.services.file_responses import RangeNotSatisfiable, parse_range, ranged_response
+
+DATA = bytes(range(256)) * 64  # 16 КБ
+TUS = {"Tus-Resumable": "1.0.0"}
+OCTET = {**TUS, "Content-Type": "application/offset+octet-stream"}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "storage_dir", str(tmp_path / "storage"))
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(DATA)
+    app = FastAPI()
+    app.include_router(uploads_router)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="u-1")
+
+    @app.get("/file")
+    def download(request: Request):
+        return ranged_response(request, size=len(DATA), etag="abc", filename="скан.pdf",
+                               media_type="application/pdf", path=path)
+
+    @app.get("/stream")
+    def stream(request: Request):
+        return ranged_response(request, size=len(DATA), etag="abc", filename="scan.pdf",
+                               read_range=lambda offset, length: iter([DATA[offset:offset + length]]))
+
+    return TestClient(app)
+
+
+def _create(client, length=len(DATA)):
+    meta = "filename " + base64.b64encode("журнал.pdf".encode()).decode()
+    r = client.post("/uploads", headers={**TUS, "Upload-Length": str(length), "Upload-Metadata": meta})
+    assert r.status_code == 201 and r.headers["Upload-Offset"] == "0"
+    return r.headers["Location"]
+
+
+class TestTusProtocol:
+    def test_resume_after_drop(self, client):
+        from app.services import resumable
+
+        location = _create(client)
+        r = client.patch(location, content=DATA[:5000], headers={**OCTET, "Upload-Offset": "0"})
+        assert r.status_code == 204 and r.headers["Upload-Offset"] == "5000"
+        # повтор с устаревшим смещением — 409, клиент спрашивает HEAD
+        assert client.patch(location, content=DATA[:100], headers={**OCTET, "Upload-Offset": "0"}).status_code == 409
+        head = client.head(location, headers=TUS)
+        assert head.headers["Upload-Offset"] == "5000" and head.headers["Upload-Length"] == str(len(DATA))
+        r = client.patch(location, content=DATA[5000:], headers={**OCTET, "Upload-Offset": "5000"})
+        assert r.headers["Upload-Offset"] == str(len(DATA))
+
+        session = resumable.get(location.rsplit("/", 1)[1], "u-1")
+        assert session.metadata == {"filename": "журнал.pdf"}
+        with pytest.raises(resumable.UploadError) as e:
+            resumable.finish(session, sha256="0" * 64)
+        assert e.value.status_code == 460
+        upload = resumable.finish(session, sha256=hashlib.sha256(DATA).hexdigest())
+        assert upload.path.read_bytes() == DATA and upload.size == len(DATA)
+
+    def test_chunk_checksum_mismatch_discards_chunk(self, client):
+        location = _create(client)
+        bad = "sha256 " + base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+        r = client.patch(location, content=DATA[:100], headers={**OCTET, "Upload-Offset": "0", "Upload-Checksum": bad})
+        assert r.status_code == 460
+        assert client.head(location).headers["Upload-Offset"] == "0"
+        good = "sha256 " + base64.b64encode(hashlib.sha256(DATA[:100]).digest()).decode()
+        r = client.patch(location, content=DATA[:100], headers={**OCTET, "Upload-Offset": "0", "Upload-Checksum": good})
+        assert r.headers["Upload-Offset"] == "100"
+
+    def test_overflow_and_foreign_user_rejected(self, client):
+        location = _create(client, length=10)
+        assert client.patch(location, content=b"x" * 11, headers={**OCTET, "Upload-Offset": "0"}).status_code == 413
+        client.app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="u-2")
+        assert client.head(location).status_code == 404
+
+    def test_terminate_and_expire(self, client, monkeypatch):
+        from app.services import resumable
+
+        location = _create(client)
+        assert client.delete(location, headers=TUS).status_code == 204
+        assert client.head(location).status_code == 404
+        monkeypatch.setattr(settings, "STORAGE_UPLOAD_EXPIRE_H", -1)
+        _create(client)
+        assert resumable.expire() == 1
+
+
+class TestRangeDownloads:
+    def test_parse_range(self):
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=0-5000", 1000) == (0, 999)
+        assert parse_range("bytes=0-1,5-6", 1000) is None
+        assert parse_range("items=0-1", 1000) is None
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+
+    @pytest.mark.parametrize("url", ["/file", "/stream"])
+    def test_partial_content(self, client, url):
+        full = client.get(url)
+        assert full.status_code == 200 and full.content == DATA
+        assert full.headers["etag"] == '"abc"' and full.headers["accept-ranges"] == "bytes"
+        r = client.get(url, headers={"Range": "bytes=1000-1999"})
+        assert r.status_code == 206 and r.content == DATA[1000:2000]
+        assert r.headers["content-range"] == f"bytes 1000-1999/{len(DATA)}"
+        assert client.get(url, headers={"Range": f"bytes={len(DATA)}-"}).status_code == 416
+
+    def test_conditional_requests(self, client):
+        assert client.get("/file", headers={"If-None-Match": '"abc"'}).status_code == 304
+        stale = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+        assert stale.status_code == 200 and len(stale.content) == len(DATA)
+        fresh = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"abc"'})
+        assert fresh.status_code == 206 and fresh.content == DATA[:10]
+        assert "filename*=utf-8''" in fresh.headers["content-disposition"]
@@ -0,0 +1,58 @@
+"""
+Tests for seed job (app.db.seed_runner) and cold-start report.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from app.db import seed_runner
+
+
+@pytest.fixture
+def seed_engine(tmp_path, monkeypatch):
+    import app.db.session as session
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    monkeypatch.setattr(session, "engine", engine)
+    CALLS.clear()
+    monkeypatch.setattr(seed_runner, "SEED_STEPS", (("fake", f"{__name__}:_fake_step"),))
+    return engine
+
+
+CALLS = []
+
+
+def _fake_step():
+    CALLS.append(1)
+
+
+class TestSeedRunner:
+    def test_applies_once_then_up_to_date(self, seed_engine, tmp_path):
+        first = seed_runner.run_seeds(str(tmp_path / "no-snapshot"))
+        assert first["status"] == "applied" and first["source"] == "routines"
+        second = seed_runner.run_seeds(str(tmp_path / "no-snapshot"))
+        assert second == {"status": "up_to_date", "version": seed_runner.SEED_VERSION}
+        assert len(CALLS) == 1
+
+    def test_force_and_version_bump_reapply(self, seed_engine, tmp_path, monkeypatch):
+        seed_runner.run_seeds(str(tmp_path))
+        seed_runner.run_seeds(str(tmp_path), force=True)
+        monkeypatch.setattr(seed_runner, "SEED_VERSION", seed_runner.SEED_VERSION + 1)
+        assert seed_runner.run_seeds(str(tmp_path))["status"] == "applied"
+        assert len(CALLS) == 3
+        with seed_engine.connect() as conn:
+            assert seed_runner.current_version(conn) == seed_runner.SEED_VERSION
+
+    def test_snapshot_not_used_without_postgres(self, seed_engine, tmp_path):
+        (tmp_path / "manifest.json").write_text('{"seed_version": 1, "tables": []}')
+        assert seed_runner.run_seeds(str(tmp_path))["source"] == "routines"
+
+
+class TestStartupReport:
+    def test_phases_and_ready(self):
+        from app.core import startup
+        with startup.phase("unit"):
+            pass
+        startup.mark_ready()
+        report = startup.report()
+        assert report["ready"] is True
+        assert "unit" in report["phases"]
+        assert report["cold_start_ms"] >= report["import_to_ready_ms"]
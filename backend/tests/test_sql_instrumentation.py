@@ -0,0 +1,97 @@
+"""
+Tests for SQL instrumentation: per-request stats, Server-Timing, N+1 and slow queries.
+"""
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.db import instrumentation
+from app.middleware.query_stats import QueryStatsMiddleware
+
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'sql.db'}")
+    instrumentation.install(eng)
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO t (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    return eng
+
+
+def _app(engine, n: int):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def read(item_id: int):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text("SELECT name FROM t WHERE id = :id"), {"id": i % 3 + 1}).all()
+        return {"ok": True}
+
+    return app
+
+
+class TestNormalize:
+    def test_literals_and_params_collapse(self):
+        a = instrumentation.normalize_statement("SELECT * FROM t WHERE id = 5 AND name = 'x'")
+        b = instrumentation.normalize_statement("SELECT * FROM t WHERE id = %(id_1)s AND name = %(n)s")
+        assert a == b == "SELECT * FROM t WHERE id = ? AND name = ?"
+
+    def test_in_lists_collapse(self):
+        s = instrumentation.normalize_statement("DELETE FROM t WHERE id IN (1, 2,\n 3)")
+        assert s == "DELETE FROM t WHERE id IN (?, ...)"
+
+
+class TestRequestStats:
+    def test_server_timing_and_histograms(self, engine):
+        client = TestClient(_app(engine, 3))
+        r = client.get("/items/7")
+        assert r.status_code == 200
+        assert r.headers["Server-Timing"].startswith('db;dur=')
+        assert '3 queries' in r.headers["Server-Timing"]
+        rendered = "\n".join(instrumentation.render_prometheus())
+        assert 'klg_db_queries_per_request_count{route="/items/{item_id}"}' in rendered
+
+    def test_no_stats_outside_request(self, engine):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert instrumentation.current_stats() is None
+
+    def test_n_plus_one_warn(self, engine, monkeypatch):
+        monkeypatch.setattr(settings, "SQL_N_PLUS_ONE", "warn")
+        monkeypatch.setattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 5)
+        client = TestClient(_app(engine, 6))
+        r = client.get("/items/1")
+        assert r.headers["X-N-Plus-One"] == "1"
+        assert "X-N-Plus-One" not in TestClient(_app(engine, 4)).get("/items/1").headers
+
+    def test_n_plus_one_warn_names_route(self, engine, monkeypatch, caplog):
+        monkeypatch.setattr(settings, "SQL_N_PLUS_ONE", "warn")
+        monkeypatch.setattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 5)
+        with caplog.at_level(logging.WARNING, logger="klg.sql"):
+            TestClient(_app(engine, 6)).get("/items/1")
+        assert "N+1 suspected on /items/{item_id}" in caplog.text
+
+    def test_n_plus_one_raise(self, engine, monkeypatch):
+        monkeypatch.setattr(settings, "SQL_N_PLUS_ONE", "raise")
+        monkeypatch.setattr(settings, "SQL_N_PLUS_ONE_THRESHOLD", 3)
+        with pytest.raises(instrumentation.NPlusOneError, match=r"^/items/\{item_id\}:"):
+            TestClient(_app(engine, 3)).get("/items/1")
+
+    def test_slow_query_log(self, engine, monkeypatch):
+        monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0.000001)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT name FROM t WHERE name = 'zzz-slow'"))
+        shapes = [s["statement"] for s in instrumentation.slow_queries()["by_shape"]]
+        assert "SELECT name FROM t WHERE name = ?" in shapes
+
+    def test_slow_query_in_request_names_route(self, engine, monkeypatch):
+        monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0.000001)
+        TestClient(_app(engine, 1)).get("/items/1")
+        assert instrumentation.slow_queries()["recent"][0]["route"] == "/items/{item_id}"
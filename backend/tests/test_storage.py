@@ -0,0 +1,119 @@
+"""
+Tests for content-addressed attachment storage: streaming hash, dedup, GC, multipart.
+"""
+import asyncio
+import hashlib
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.db.base import Base
+from app.models import StorageBlob
+from app.services.storage import LocalBackend, collect_garbage, release, spool_upload, store
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[StorageBlob.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "storage_dir", str(tmp_path / "storage"))
+    return LocalBackend(tmp_path / "objects")
+
+
+def _spool(data: bytes, chunk_size: int = 1024 * 1024):
+    return asyncio.run(spool_upload(UploadFile(file=io.BytesIO(data), filename="amm.pdf"), chunk_size=chunk_size))
+
+
+class TestSpool:
+    def test_hash_computed_while_streaming(self, backend):
+        data = b"x" * 10_000 + b"tail"
+        upload = _spool(data, chunk_size=1000)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.size == len(data) and upload.path.read_bytes() == data
+        upload.discard()
+        assert not upload.path.exists()
+
+
+class TestDedup:
+    def test_same_content_stored_once(self, db, backend):
+        first, second = _spool(b"AMM rev 42"), _spool(b"AMM rev 42")
+        assert store(db, first, "application/pdf", backend=backend) == 1
+        second.path.unlink()  # второй раз содержимое не читается
+        assert store(db, second, "application/pdf", backend=backend) == 2
+        db.commit()
+        assert b"".join(backend.iter_chunks(first.sha256)) == b"AMM rev 42"
+        assert len(list((backend.root / "objects").rglob("*"))) == 3  # ab/, ab/cd/, объект
+
+    def test_missing_object_reuploaded(self, db, backend):
+        upload = _spool(b"payload")
+        store(db, upload, backend=backend)
+        backend.delete(upload.sha256)
+        assert store(db, upload, backend=backend) == 2
+        assert backend.exists(upload.sha256)
+
+
+class TestGarbageCollection:
+    def test_unreferenced_removed_after_grace(self, db, backend):
+        kept, dropped = _spool(b"kept"), _spool(b"dropped")
+        for upload in (kept, dropped):
+            store(db, upload, backend=backend)
+        release(db, dropped.sha256)
+        db.commit()
+        assert collect_garbage(db, grace_s=3600, backend=backend) == 0
+
+        db.execute(update(StorageBlob).values(updated_at=datetime.now(timezone.utc) - timedelta(hours=2)))
+        db.commit()
+        assert collect_garbage(db, grace_s=3600, backend=backend) == 1
+        assert not backend.exists(dropped.sha256) and backend.exists(kept.sha256)
+        assert [b.sha256 for b in db.query(StorageBlob)] == [kept.sha256]
+
+    def test_rereference_after_gc_restores_object(self, db, backend):
+        upload = _spool(b"again")
+        store(db, upload, backend=backend)
+        release(db, upload.sha256)
+        db.commit()
+        assert collect_garbage(db, grace_s=0, backend=backend) == 1
+        assert store(db, upload, backend=backend) == 1
+        assert backend.exists(upload.sha256)
+
+
+class TestMultipart:
+    def test_large_file_split_into_parts(self, backend, monkeypatch):
+        data = bytes(range(256)) * 40  # 10 240 байт
+        upload = _spool(data)
+        calls = []
+        put_part = backend.put_part
+        monkeypatch.setattr(backend, "put_part", lambda *a: calls.append(a[2]) or put_part(*a))
+        backend.put_file(upload.sha256, upload.path, upload.size, threshold=4096, part_size=4096)
+        assert calls == [1, 2, 3]
+        assert b"".join(backend.iter_chunks(upload.sha256)) == data
+        assert not any((backend.root / "multipart").iterdir())
+
+    def test_failed_part_aborts_upload(self, backend, monkeypatch):
+        upload = _spool(b"z" * 9000)
+
+        def fail(*args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(backend, "complete_multipart", fail)
+        with pytest.raises(OSError):
+            backend.put_file(upload.sha256, upload.path, upload.size, threshold=4096, part_size=4096)
+        assert not backend.exists(upload.sha256)
+        assert not any((backend.root / "multipart").iterdir())
+
+    def test_rejects_non_hash_keys(self, backend):
+        with pytest.raises(ValueError):
+            backend.local_path("../../etc/passwd")
@@ -0,0 +1,61 @@
+"""
+Tests for per-transaction tenant context piggybacked on the first statement.
+"""
+from types import SimpleNamespace
+
+from app.db import tenant
+
+
+def _conn(dialect="postgresql"):
+    return SimpleNamespace(dialect=SimpleNamespace(name=dialect), info={})
+
+
+class FakeCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+
+class TestTenantContext:
+    def test_tenant_for_roles(self):
+        op = SimpleNamespace(role="operator_manager", organization_id="org-1")
+        assert tenant.tenant_for(op) == "org-1"
+        assert tenant.tenant_for(SimpleNamespace(role="admin", organization_id="org-1")) == ""
+        assert tenant.tenant_for(SimpleNamespace(role="mro_user", organization_id="org-2")) == ""
+        assert tenant.tenant_for(SimpleNamespace(role="operator_user", organization_id=None)) == ""
+
+    def test_piggyback_once_per_transaction(self):
+        conn = _conn()
+        session = SimpleNamespace(info={})
+        with tenant.tenant_scope("org-7"):
+            tenant._after_begin(session, None, conn)
+        sql, params = tenant._before_cursor_execute(conn, FakeCursor(), "SELECT 1", {}, None, False)
+        assert sql == "SELECT set_config('app.current_org_id', 'org-7', true); SELECT 1"
+        sql, _ = tenant._before_cursor_execute(conn, FakeCursor(), "SELECT 2", {}, None, False)
+        assert sql == "SELECT 2"
+
+    def test_session_override_and_escaping(self):
+        conn = _conn()
+        tenant._after_begin(SimpleNamespace(info={"tenant": "o'1%"}), None, conn)
+        sql, params = tenant._before_cursor_execute(
+            conn, FakeCursor(), "SELECT * FROM aircraft WHERE id = %(id)s", {"id": "x"}, None, False)
+        assert sql.startswith("SELECT set_config('app.current_org_id', 'o''1%%', true); ")
+        assert params == {"id": "x"}
+
+    def test_executemany_separate_statement_and_end(self):
+        conn = _conn()
+        tenant._after_begin(SimpleNamespace(info={}), None, conn)
+        cursor = FakeCursor()
+        sql, _ = tenant._before_cursor_execute(conn, cursor, "UPDATE t SET a = %(a)s", [{"a": 1}], None, True)
+        assert sql == "UPDATE t SET a = %(a)s"
+        assert cursor.executed == ["SELECT set_config('app.current_org_id', '', true)"]
+        tenant._after_begin(SimpleNamespace(info={}), None, conn)
+        tenant._on_end(conn)
+        assert tenant._before_cursor_execute(conn, cursor, "SELECT 1", {}, None, False)[0] == "SELECT 1"
+
+    def test_noop_on_sqlite(self):
+        conn = _conn("sqlite")
+        tenant._after_begin(SimpleNamespace(info={"tenant": "org"}), None, conn)
+        assert conn.info == {}
@@ -0,0 +1,194 @@
+"""
+Tests for flight-log utilization ingestion (app.services.utilization).
+"""
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.models import (
+    Aircraft, AircraftHistory, AircraftType, AirworthinessCertificate, DefectReport, FlightLeg,
+    LandingGearComponent, LimitedLifeComponent, MaintenanceTask, Organization, RiskAlert, UtilizationDaily,
+)
+from app.services.reliability import refresh_utilization_rollup
+from app.services.risk_scanner import scan_risks
+from app.services.utilization import UtilizationIngest, ingest_legs
+
+TABLES = [Organization.__table__, AircraftType.__table__, Aircraft.__table__, LimitedLifeComponent.__table__,
+          LandingGearComponent.__table__, AircraftHistory.__table__, FlightLeg.__table__,
+          UtilizationDaily.__table__, RiskAlert.__table__, MaintenanceTask.__table__,
+          DefectReport.__table__, AirworthinessCertificate.__table__]
+TAKEOFF = datetime(2026, 6, 1, 6, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES)
+    session = sessionmaker(bind=engine)()
+    session.add(AircraftType(id="t-ssj", manufacturer="Sukhoi", model="RRJ-95", icao_code="SU95"))
+    session.flush()
+    session.add_all([
+        Aircraft(id="ac-1", registration_number="RA-89001", aircraft_type_id="t-ssj", operator_id="org-1",
+                 total_time=1000.0, total_cycles=500),
+        Aircraft(id="ac-2", registration_number="RA-89002", aircraft_type_id="t-ssj", operator_id="org-2",
+                 total_time=2000.0, total_cycles=900),
+        Aircraft(id="ac-3", registration_number="RA-89003", aircraft_type_id="t-ssj", operator_id="org-1"),
+    ])
+    session.flush()
+    session.add_all([
+        LimitedLifeComponent(id="llp-1", aircraft_id="ac-1", ata_code="72", part_number="DISK-1", serial_number="S1",
+                             tsn="1000", csn="500", interval="20000 FH / 10000 FC", current_status="installed"),
+        LimitedLifeComponent(id="llp-2", aircraft_id="ac-1", ata_code="72", part_number="DISK-2", serial_number="S2",
+                             tsn="3000", csn="1000", interval="20000 FH", current_status="removed"),
+        LimitedLifeComponent(id="llp-3", aircraft_id="ac-1", ata_code="32", part_number="PIN", serial_number="S3",
+                             interval="5000 FC"),
+        LandingGearComponent(id="lg-1", aircraft_id="ac-1", ata_code="32", part_number="MLG", serial_number="G1",
+                             tsn="900", csn="450", tsr="120", dim="FC", interval="2000"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _leg(reg, i, hours=None, **extra):
+    takeoff = TAKEOFF + timedelta(hours=3 * i)
+    leg = {"registration": reg, "flight_no": f"SU{i:04d}", "takeoff": takeoff.isoformat(),
+           "landing": (takeoff + timedelta(hours=2)).isoformat()}
+    if hours is not None:
+        leg["flight_hours"] = hours
+    leg.update(extra)
+    return leg
+
+
+def _ndjson(legs) -> bytes:
+    return b"".join(json.dumps(leg).encode() + b"\n" for leg in legs)
+
+
+class TestIngest:
+    def test_stream_updates_aircraft_components_and_history(self, db):
+        body = _ndjson([_leg("RA-89001", i) for i in range(10)] + [_leg("RA-89001", 10, hours="1:30", cycles=2)])
+        ingest = UtilizationIngest(db, chunk_size=4)
+        for i in range(0, len(body), 37):  # строки режутся между частями потока
+            ingest.feed(body[i:i + 37])
+        result = ingest.finish()
+        db.commit()
+        assert (result.accepted, result.rejected, result.aircraft_ids) == (11, 0, ["ac-1"])
+        assert result.flight_hours == pytest.approx(21.5) and result.cycles == 12
+
+        aircraft = db.get(Aircraft, "ac-1")
+        assert aircraft.total_time == pytest.approx(1021.5) and aircraft.total_cycles == 512
+        llp = db.get(LimitedLifeComponent, "llp-1")
+        assert llp.tsn_fh == pytest.approx(1021.5) and llp.csn_fc == 512
+        assert llp.remaining_fh == pytest.approx(18978.5) and llp.remaining_fc == 9488
+        assert float(llp.tsn) == pytest.approx(1021.5) and float(llp.csn) == 512
+        removed, unknown = db.get(LimitedLifeComponent, "llp-2"), db.get(LimitedLifeComponent, "llp-3")
+        assert removed.tsn_fh == 3000 and unknown.tsn_fh is None and unknown.remaining_fc is None
+        gear = db.get(LandingGearComponent, "lg-1")
+        assert gear.tsr_value == 132 and gear.remaining_fc == 1868 and gear.tsn_fh == pytest.approx(921.5)
+
+        history = db.execute(select(AircraftHistory).where(AircraftHistory.event_type == "utilization")).scalars().all()
+        assert len(history) == 1
+        assert float(history[0].hours_at_event) == pytest.approx(1021.5) and history[0].cycles_at_event == "512"
+        daily = db.execute(select(UtilizationDaily)).scalars().all()
+        assert {(d.day, d.source) for d in daily} == {(date(2026, 6, 1), "flight_log"), (date(2026, 6, 2), "flight_log")}
+        assert sum(d.flight_hours for d in daily) == pytest.approx(21.5)
+
+    def test_redelivery_and_bad_lines(self, db):
+        legs = [_leg("RA-89001", i) for i in range(3)]
+        ingest_legs(db, legs)
+        db.commit()
+        ingest = UtilizationIngest(db)
+        ingest.feed(_ndjson(legs + [legs[0], _leg("RA-00000", 9), _leg("RA-89001", 9, hours=30)]))
+        ingest.feed(b"not json\n[1, 2]\n{\"registration\": \"RA-89001\", \"flight_hours\": 1}")
+        result = ingest.finish()
+        db.commit()
+        assert (result.lines, result.accepted, result.duplicates, result.rejected) == (9, 0, 4, 5)
+        assert [e["line"] for e in result.errors] == [7, 8, 5, 6, 9]
+        assert "unknown aircraft" in result.errors[2]["error"]
+        assert db.get(Aircraft, "ac-1").total_time == pytest.approx(1006.0)
+        assert db.execute(select(func.count()).select_from(FlightLeg)).scalar() == 3
+
+    def test_operator_scope_and_unknown_totals(self, db):
+        result = ingest_legs(db, [_leg("RA-89002", 0), _leg("RA-89003", 1), _leg("ac-3", 2)], operator_id="org-1")
+        db.commit()
+        assert result.accepted == 2 and result.rejected == 1
+        assert db.get(Aircraft, "ac-2").total_time == 2000.0
+        assert db.get(Aircraft, "ac-3").total_time is None  # наработка не введена — не выдумывается
+
+    def test_flight_log_replaces_history_estimate(self, db):
+        db.add(UtilizationDaily(aircraft_id="ac-1", day=date(2026, 6, 1), flight_hours=7.0, cycles=3, source="history"))
+        db.commit()
+        ingest_legs(db, [_leg("RA-89001", 0)])
+        ingest_legs(db, [_leg("RA-89001", 1)])
+        db.commit()
+        row = db.get(UtilizationDaily, ("ac-1", date(2026, 6, 1)))
+        assert (row.flight_hours, row.cycles, row.source) == (4.0, 2.0, "flight_log")
+
+    def test_to_go_follows_remaining_after_edit(self, db):
+        db.add_all([
+            LimitedLifeComponent(id="llp-go", aircraft_id="ac-1", ata_code="72", part_number="TOGO",
+                                 serial_number="T1", to_go="300 FH / 6 MO", interval="20000 FH"),
+            LandingGearComponent(id="lg-go", aircraft_id="ac-1", ata_code="32", part_number="NLG",
+                                 serial_number="G2", dim="FC", to_go="100"),
+        ])
+        db.commit()
+        ingest_legs(db, [_leg("RA-89001", i, hours=20, cycles=2) for i in range(10)])
+        db.commit()
+        llp, gear = db.get(LimitedLifeComponent, "llp-go"), db.get(LandingGearComponent, "lg-go")
+        db.refresh(llp)
+        db.refresh(gear)
+        assert (llp.to_go, llp.remaining_fh) == ("100 FH / 6 MO", 100)
+        assert (gear.to_go, gear.remaining_fc) == ("80 FC", 80)
+        # Правка другого поля пересчитывает остаток из to_go — израсходованный ресурс не возвращается
+        llp.position = "L"
+        gear.position = "L"
+        db.commit()
+        assert db.get(LimitedLifeComponent, "llp-go").remaining_fh == 100
+        assert db.get(LandingGearComponent, "lg-go").remaining_fc == 80
+
+    def test_reliability_rollup_does_not_recount_ingest(self, db):
+        db.add(AircraftHistory(aircraft_id="ac-1", event_type="inspection", description="ТО",
+                               event_date=datetime(2026, 5, 1, tzinfo=timezone.utc), hours_at_event="1000"))
+        db.commit()
+        ingest_legs(db, [_leg("RA-89001", i) for i in range(10)])
+        db.commit()
+        refresh_utilization_rollup(db)
+        daily = db.execute(select(UtilizationDaily)).scalars().all()
+        assert {d.source for d in daily} == {"flight_log"}
+        assert sum(d.flight_hours for d in daily) == pytest.approx(20.0)
+
+    def test_rescan_only_affected_aircraft(self, db):
+        db.add_all([
+            LimitedLifeComponent(aircraft_id="ac-1", ata_code="72", part_number="NEAR-1", serial_number="N1",
+                                 tsn="19990", interval="20000 FH"),
+            LimitedLifeComponent(aircraft_id="ac-2", ata_code="72", part_number="NEAR-2", serial_number="N2",
+                                 tsn="19990", interval="20000 FH"),
+        ])
+        db.commit()
+        assert scan_risks(db, aircraft_ids=[]) == 0
+        assert scan_risks(db, aircraft_ids=["ac-1"]) == 1
+        assert {a.aircraft_id for a in db.execute(select(RiskAlert)).scalars()} == {"ac-1"}
+
+    def test_fleet_stream_in_chunks(self, db):
+        # Пропускная способность — benchmarks/bench_utilization.py
+        fleet = [f"RA-9{i:04d}" for i in range(20)]
+        db.add_all([Aircraft(id=f"bench-{i}", registration_number=reg, aircraft_type_id="t-ssj",
+                             total_time=0.0, total_cycles=0) for i, reg in enumerate(fleet)])
+        db.flush()
+        db.add_all([LimitedLifeComponent(aircraft_id=f"bench-{i}", ata_code="72", part_number=f"LLP-{k}",
+                                         serial_number=f"{i}-{k}", tsn="0", csn="0", interval="20000 FH / 10000 FC")
+                    for i in range(20) for k in range(10)])
+        db.commit()
+        body = _ndjson(_leg(fleet[n % 20], n // 20, hours=1.5) for n in range(10_000))
+        ingest = UtilizationIngest(db, chunk_size=1000)
+        for i in range(0, len(body), 64 * 1024):
+            ingest.feed(body[i:i + 64 * 1024])
+        result = ingest.finish()
+        db.commit()
+        assert result.accepted == 10_000 and result.components == 200
+        assert db.get(Aircraft, "bench-0").total_time == pytest.approx(750.0)